@@ -4,19 +4,32 @@ Mathematical Optimization Analysis
 This module contains search, evaluation, and optimization algorithms for Azul.
 """
 
-from .azul_evaluator import AzulEvaluator
+from .azul_evaluator import AzulEvaluator, EvaluationBatch, EvaluationCache, EvaluatorWeights
 from .azul_search import AzulAlphaBetaSearch
 from .azul_mcts import AzulMCTS
+from .azul_rollout import RolloutSimulator
+from .azul_chance import ChanceSampler
 from .azul_move_generator import AzulMoveGenerator, FastMoveGenerator
+from .azul_opening_book import OpeningBook, compile_opening_book
+from .azul_weight_tuning import load_tuning_set, tune_evaluator_weights
 from .linear_optimizer import AzulLinearOptimizer, OptimizationObjective, OptimizationResult
 from .dynamic_optimizer import AzulDynamicOptimizer, EndgamePhase, MultiTurnPlan
 
 __all__ = [
     'AzulEvaluator',
+    'EvaluationBatch',
+    'EvaluationCache',
+    'EvaluatorWeights',
     'AzulAlphaBetaSearch',
     'AzulMCTS',
+    'RolloutSimulator',
+    'ChanceSampler',
     'AzulMoveGenerator',
     'FastMoveGenerator',
+    'OpeningBook',
+    'compile_opening_book',
+    'load_tuning_set',
+    'tune_evaluator_weights',
     'AzulLinearOptimizer',
     'OptimizationObjective',
     'OptimizationResult',
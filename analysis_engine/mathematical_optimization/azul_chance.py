@@ -0,0 +1,206 @@
+"""
+Chance nodes at Azul round boundaries.
+
+This module provides:
+- Seeded sampling of next-round factory deals from the bag's tile counts
+- A cache of sampled deals keyed by bag composition, so sibling nodes and
+  later searches reuse the same K deals
+- Helpers that score the finished round and deal a sampled next round
+
+The bag order of an AzulState is hidden information, so deals are drawn from
+the tile counts alone, refilling from the used tiles as InitialiseFactory does.
+"""
+
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import azul_utils as utils
+from core.azul_model import AzulState, AzulGameRule
+
+
+NUM_TILE_TYPES = 5
+NUM_ON_FACTORY = 4
+
+
+def score_round(state: AzulState, game_rule: Optional[AzulGameRule] = None):
+    """
+    Score the finished round of state in place.
+
+    The first player token stays with its holder when nobody took from the
+    centre, as a deal can only start from a valid first agent.
+    """
+    for agent in state.agents:
+        if not hasattr(agent, 'agent_trace') or agent.agent_trace is None:
+            agent.agent_trace = utils.AgentTrace(agent.id)
+        if not agent.agent_trace.round_scores:
+            agent.agent_trace.StartRound()
+
+    first_agent = state.first_agent
+    (game_rule or AzulGameRule(len(state.agents))).generateSuccessor(state, "ENDROUND", None)
+    if state.first_agent < 0:
+        # Nobody took from the centre; the token stays where it was
+        state.first_agent = first_agent
+
+
+@dataclass(frozen=True)
+class SampledDeal:
+    """One sampled deal of the next round."""
+    factories: Tuple[Tuple[int, ...], ...]  # Tile counts per factory
+    refilled: bool  # The used tiles were poured into the bag while dealing
+
+
+class ChanceSampler:
+    """
+    Fixed sets of sampled factory deals for expectimax-style chance nodes.
+
+    Deals only depend on the bag (and, when the bag runs short, the used
+    tiles), so every round-boundary position with the same composition gets
+    the same K deals from a generator seeded by that composition.
+    """
+
+    def __init__(self, num_samples: int = 8, seed: int = 0, max_cache_size: int = 4096):
+        """
+        Initialize the sampler.
+
+        Args:
+            num_samples: Deals (K) per chance node
+            seed: Seed mixed into every composition's generator
+            max_cache_size: Bag compositions kept in the deal cache
+        """
+        if num_samples < 1:
+            raise ValueError(f"num_samples must be >= 1, got {num_samples}")
+
+        self.num_samples = num_samples
+        self.seed = seed
+        self.max_cache_size = max_cache_size
+        self.cache: "OrderedDict[Tuple, List[SampledDeal]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def composition_key(self, state: AzulState) -> Tuple:
+        """Key of the tile counts the next deal is drawn from."""
+        bag = self._counts(state.bag)
+        key = (len(state.factories), bag)
+        if len(state.bag) < NUM_ON_FACTORY * len(state.factories):
+            # The used tiles only matter once the bag runs short
+            key += (self._counts(state.bag_used),)
+        return key
+
+    def sample_deals(self, state: AzulState) -> List[SampledDeal]:
+        """The K deals for a state whose round has been scored."""
+        key = self.composition_key(state)
+        deals = self.cache.get(key)
+        if deals is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return deals
+
+        self.misses += 1
+        rng = random.Random(f"{self.seed}:{key}")
+        deals = [self._sample_deal(state, rng) for _ in range(self.num_samples)]
+
+        self.cache[key] = deals
+        if len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
+        return deals
+
+    def end_round(self, state: AzulState) -> AzulState:
+        """Copy of state with the finished round scored."""
+        scored = state.clone()
+        score_round(scored)
+        return scored
+
+    def start_round(self, state: AzulState, deal: SampledDeal) -> AzulState:
+        """Copy of a scored state with deal on the factories, as STARTROUND would leave it."""
+        dealt = state.clone()
+        if deal.refilled:
+            dealt.bag.extend(dealt.bag_used)
+            dealt.bag_used = []
+
+        for factory, counts in zip(dealt.factories, deal.factories):
+            factory.total = 0
+            for tile in utils.Tile:
+                factory.tiles[tile] = counts[tile]
+                factory.total += counts[tile]
+                for _ in range(counts[tile]):
+                    dealt.bag.remove(tile)
+
+        for tile in utils.Tile:
+            dealt.centre_pool.tiles[tile] = 0
+        dealt.centre_pool.total = 0
+
+        for agent in dealt.agents:
+            agent.agent_trace.StartRound()
+        return dealt
+
+    def next_round_states(self, state: AzulState) -> Tuple[AzulState, List[AzulState]]:
+        """
+        Score the finished round of state and deal every sampled next round.
+
+        Returns:
+            (scored state, one dealt state per sample); the list is empty when
+            the game is over or no tiles are left to deal
+        """
+        scored = self.end_round(state)
+        if any(agent.GetCompletedRows() > 0 for agent in scored.agents):
+            return scored, []
+        if not scored.bag and not scored.bag_used:
+            return scored, []
+        return scored, [self.start_round(scored, deal) for deal in self.sample_deals(scored)]
+
+    def clear(self):
+        """Clear the deal cache."""
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get deal cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            'num_samples': self.num_samples,
+            'size': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0
+        }
+
+    def _sample_deal(self, state: AzulState, rng: random.Random) -> SampledDeal:
+        """Deal every factory from the bag counts, refilling like InitialiseFactory."""
+        bag = list(self._counts(state.bag))
+        used = list(self._counts(state.bag_used))
+        bag_total, used_total = sum(bag), sum(used)
+        refilled = False
+        factories = []
+
+        for _ in state.factories:
+            if bag_total < NUM_ON_FACTORY and used_total > 0:
+                for tile in range(NUM_TILE_TYPES):
+                    bag[tile] += used[tile]
+                    used[tile] = 0
+                bag_total += used_total
+                used_total = 0
+                refilled = True
+
+            counts = [0] * NUM_TILE_TYPES
+            for _ in range(min(NUM_ON_FACTORY, bag_total)):
+                pick = rng.randrange(bag_total)
+                tile = 0
+                while pick >= bag[tile]:
+                    pick -= bag[tile]
+                    tile += 1
+                bag[tile] -= 1
+                bag_total -= 1
+                counts[tile] += 1
+            factories.append(tuple(counts))
+
+        return SampledDeal(factories=tuple(factories), refilled=refilled)
+
+    @staticmethod
+    def _counts(tiles: List[int]) -> Tuple[int, ...]:
+        counts = [0] * NUM_TILE_TYPES
+        for tile in tiles:
+            counts[tile] += 1
+        return tuple(counts)
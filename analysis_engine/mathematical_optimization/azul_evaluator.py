@@ -6,14 +6,265 @@ This module provides fast heuristic evaluation for Azul positions with:
 - Pattern potential estimation
 - Penalty estimation
 - O(1) performance target
+- Vectorized batch evaluation matching the scalar path exactly
+- Incremental evaluation terms updated per move, with a consistency check
+- Fixed-size evaluation cache keyed by (Zobrist key, agent_id)
+- Scoring weights loaded from a versioned weights file (see azul_weight_tuning)
 """
 
+import hashlib
+import json
+import os
+import time
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple, Optional, Sequence, Union
 from core import azul_utils as utils
 from core.azul_model import AzulState
 
 
+DEFAULT_WEIGHTS_PATH = "data/evaluator_weights.json"
+WEIGHTS_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class EvaluatorWeights:
+    """Scoring weights of AzulEvaluator; the defaults are the hand-set values."""
+    pattern_completion_bonuses: Tuple[float, ...] = (1, 3, 6, 10, 15)  # Per pattern line size
+    floor_penalties: Tuple[float, ...] = (-1, -1, -2, -2, -2, -3, -3)  # Per floor slot
+    row_bonus: float = 2
+    col_bonus: float = 7
+    set_bonus: float = 10
+    version: str = field(default='default', compare=False)
+    
+    # Order of the weights in to_vector
+    NUM_WEIGHTS = 15
+    
+    def to_vector(self) -> np.ndarray:
+        """The weights as one float vector (line bonuses, floor penalties, row, column, set)."""
+        return np.array(list(self.pattern_completion_bonuses) + list(self.floor_penalties)
+                        + [self.row_bonus, self.col_bonus, self.set_bonus], dtype=np.float64)
+    
+    @classmethod
+    def from_vector(cls, vector: Sequence[float], version: str = 'default') -> 'EvaluatorWeights':
+        """Weights from a vector in to_vector's order."""
+        values = [float(value) for value in vector]
+        if len(values) != cls.NUM_WEIGHTS:
+            raise ValueError(f"Expected {cls.NUM_WEIGHTS} weights, got {len(values)}")
+        return cls(tuple(values[:5]), tuple(values[5:12]), values[12], values[13], values[14], version)
+    
+    def content_version(self) -> str:
+        """Version derived from the weight values, so equal weights share a version."""
+        payload = json.dumps(self.to_vector().tolist()).encode('utf-8')
+        return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def save_evaluator_weights(weights: EvaluatorWeights, path: str = DEFAULT_WEIGHTS_PATH,
+                           metadata: Optional[Dict[str, Any]] = None) -> EvaluatorWeights:
+    """
+    Write weights to a versioned weights file, replacing it atomically.
+    
+    Returns:
+        The weights with their version set to the written content version
+    """
+    weights = EvaluatorWeights.from_vector(weights.to_vector(), version=weights.content_version())
+    document = {
+        'format_version': WEIGHTS_FORMAT_VERSION,
+        'version': weights.version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'weights': {
+            'pattern_completion_bonuses': list(weights.pattern_completion_bonuses),
+            'floor_penalties': list(weights.floor_penalties),
+            'row_bonus': weights.row_bonus,
+            'col_bonus': weights.col_bonus,
+            'set_bonus': weights.set_bonus
+        },
+        'metadata': metadata or {}
+    }
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f, indent=2)
+    os.replace(tmp_path, path)
+    return weights
+
+
+# Parsed weights files by absolute path: (file stamp, weights)
+_loaded_weights: Dict[str, Tuple[Tuple[int, int, int], EvaluatorWeights]] = {}
+
+
+def load_evaluator_weights(path: Optional[str] = None) -> Optional[EvaluatorWeights]:
+    """
+    Load weights from path, AZUL_EVALUATOR_WEIGHTS_PATH or the default location.
+    
+    A file is parsed once and served from memory until its modification
+    time, size or inode changes, so evaluators can be built per request.
+    
+    Returns:
+        EvaluatorWeights, or None if no weights file exists
+    """
+    path = os.path.abspath(path or os.environ.get('AZUL_EVALUATOR_WEIGHTS_PATH', DEFAULT_WEIGHTS_PATH))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _loaded_weights.pop(path, None)
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _loaded_weights.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    
+    weights = _read_evaluator_weights(path)
+    _loaded_weights[path] = (stamp, weights)
+    return weights
+
+
+def _read_evaluator_weights(path: str) -> EvaluatorWeights:
+    """Parse and validate a weights file."""
+    with open(path) as f:
+        document = json.load(f)
+    if document.get('format_version') != WEIGHTS_FORMAT_VERSION:
+        raise ValueError(f"Unsupported evaluator weights format in {path}: {document.get('format_version')}")
+    
+    values = document['weights']
+    weights = EvaluatorWeights(
+        pattern_completion_bonuses=tuple(values['pattern_completion_bonuses']),
+        floor_penalties=tuple(values['floor_penalties']),
+        row_bonus=values['row_bonus'],
+        col_bonus=values['col_bonus'],
+        set_bonus=values['set_bonus'],
+        version=document['version']
+    )
+    if len(weights.pattern_completion_bonuses) != 5 or len(weights.floor_penalties) != 7:
+        raise ValueError(f"Malformed evaluator weights in {path}")
+    return weights
+
+
+@dataclass
+class EvaluationBatch:
+    """Board features of one agent in each of N positions, as arrays."""
+    lines_number: np.ndarray  # (N, 5) tiles on each pattern line
+    floor_count: np.ndarray   # (N,) tiles on the floor line
+    grid_state: np.ndarray    # (N, 5, 5) wall occupancy
+    tile_counts: np.ndarray   # (N, 5) wall tiles per colour (AgentState.number_of)
+    
+    @classmethod
+    def from_states(cls, states: Sequence[AzulState],
+                    agent_ids: Union[int, Sequence[int]] = 0) -> 'EvaluationBatch':
+        """Gather the features of agent_ids[i] (or one agent for all) in states[i]."""
+        if isinstance(agent_ids, (int, np.integer)):
+            agent_ids = [agent_ids] * len(states)
+        if len(agent_ids) != len(states):
+            raise ValueError(f"Got {len(agent_ids)} agent ids for {len(states)} states")
+        
+        agents = [state.agents[agent_id] for state, agent_id in zip(states, agent_ids)]
+        count = len(agents)
+        batch = cls(
+            lines_number=np.zeros((count, 5), dtype=np.int64),
+            floor_count=np.zeros(count, dtype=np.int64),
+            grid_state=np.zeros((count, 5, 5), dtype=bool),
+            tile_counts=np.zeros((count, 5), dtype=np.int64)
+        )
+        for i, agent in enumerate(agents):
+            batch.lines_number[i] = agent.lines_number
+            batch.floor_count[i] = len(agent.floor_tiles)
+            batch.grid_state[i] = agent.grid_state
+            batch.tile_counts[i] = [agent.number_of.get(tile, 0) for tile in utils.Tile]
+        return batch
+    
+    def __len__(self) -> int:
+        return len(self.floor_count)
+
+
+@dataclass
+class EvaluationTerms:
+    """One agent's evaluation split into terms that a move updates independently."""
+    line_scores: List[float]      # Bonus of each full pattern line
+    line_potentials: List[float]  # Pattern potential of each line
+    floor_count: int
+    endgame_bonuses: int          # Changes only when tiles reach the wall
+
+
+class EvaluationCache:
+    """
+    Fixed-size evaluation cache keyed by (Zobrist key, agent_id).
+    
+    With 'always' replacement every bucket holds one entry and a new entry
+    overwrites it. With 'two_tier' every bucket holds two: new entries go to
+    the always-replace slot and are promoted to the protected slot when hit
+    there, so positions probed repeatedly survive streams of one-off leaves.
+    """
+    
+    REPLACEMENT_POLICIES = ('always', 'two_tier')
+    
+    def __init__(self, max_entries: int = 1 << 16, replacement: str = 'two_tier'):
+        if replacement not in self.REPLACEMENT_POLICIES:
+            raise ValueError(f"replacement must be one of {self.REPLACEMENT_POLICIES}")
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1, got {max_entries}")
+        
+        self.replacement = replacement
+        self.ways = 2 if replacement == 'two_tier' else 1
+        self.num_buckets = max(1, max_entries // self.ways)
+        self.keys: List[Optional[Tuple[int, int]]] = [None] * (self.num_buckets * self.ways)
+        self.values: List[float] = [0.0] * (self.num_buckets * self.ways)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+    
+    def get(self, hash_key: int, agent_id: int) -> Optional[float]:
+        """Get a cached evaluation, or None."""
+        key = (hash_key, agent_id)
+        slot = (hash(key) % self.num_buckets) * self.ways
+        if self.keys[slot] == key:
+            self.hits += 1
+            return self.values[slot]
+        
+        if self.ways == 2 and self.keys[slot + 1] == key:
+            self.hits += 1
+            value = self.values[slot + 1]
+            # Promote to the protected slot; its old entry becomes replaceable
+            self.keys[slot], self.keys[slot + 1] = key, self.keys[slot]
+            self.values[slot], self.values[slot + 1] = value, self.values[slot]
+            return value
+        
+        self.misses += 1
+        return None
+    
+    def put(self, hash_key: int, agent_id: int, value: float):
+        """Store an evaluation."""
+        key = (hash_key, agent_id)
+        slot = (hash(key) % self.num_buckets) * self.ways
+        if self.ways == 2 and self.keys[slot] != key:
+            slot += 1
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.stores += 1
+    
+    def clear(self):
+        """Clear the cache."""
+        self.keys = [None] * len(self.keys)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            'size': sum(key is not None for key in self.keys),
+            'max_entries': len(self.keys),
+            'replacement': self.replacement,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0
+        }
+
+
 class AzulEvaluator:
     """
     Fast heuristic evaluator for Azul positions.
@@ -23,42 +274,82 @@ class AzulEvaluator:
     - Pattern potential estimation
     - Penalty estimation
     - O(1) performance target
+    
+    The weights are fixed for the evaluator's lifetime, so its cache never
+    holds scores from other weights.
     """
     
-    def __init__(self):
+    def __init__(self, check_incremental: bool = False, cache_size: int = 1 << 16,
+                 cache_replacement: str = 'two_tier', weights: Optional[EvaluatorWeights] = None):
+        """
+        Initialize the evaluator.
+        
+        Args:
+            check_incremental: Compare every incremental evaluation with a
+                full evaluate_position and raise on any difference
+            cache_size: Entries in the evaluation cache (0 disables it)
+            cache_replacement: 'always' or 'two_tier' (see EvaluationCache)
+            weights: Scoring weights (default: the weights file, if any,
+                else the hand-set weights)
+        """
+        if weights is None:
+            weights = load_evaluator_weights() or EvaluatorWeights()
+        self.weights = weights
+        self.check_incremental = check_incremental
+        self.cache = EvaluationCache(cache_size, cache_replacement) if cache_size > 0 else None
+        self.incremental_evaluations = 0
+        self.term_updates = 0
+        self.full_term_computations = 0
+        
         # Pre-compute scoring tables for efficiency
         self._init_scoring_tables()
     
     def _init_scoring_tables(self):
-        """Initialize pre-computed scoring tables."""
-        # Pattern line completion bonuses
+        """Initialize pre-computed scoring tables from the weights."""
+        # Pattern line completion bonuses, by pattern line size
         self._pattern_completion_bonuses = {
-            1: 1,   # 1 tile in pattern line = 1 point
-            2: 3,   # 2 tiles = 3 points
-            3: 6,   # 3 tiles = 6 points
-            4: 10,  # 4 tiles = 10 points
-            5: 15   # 5 tiles = 15 points
+            size: bonus for size, bonus in enumerate(self.weights.pattern_completion_bonuses, start=1)
         }
         
         # Floor penalty scores
-        self._floor_penalties = [-1, -1, -2, -2, -2, -3, -3]
+        self._floor_penalties = list(self.weights.floor_penalties)
         
         # Grid completion bonuses
-        self._row_bonus = 2
-        self._col_bonus = 7
-        self._set_bonus = 10
+        self._row_bonus = self.weights.row_bonus
+        self._col_bonus = self.weights.col_bonus
+        self._set_bonus = self.weights.set_bonus
+        
+        # Batch lookups, indexed by pattern line and by floor tile count
+        # (the last entry covers every count beyond the floor line)
+        self._line_bonus_array = np.array(
+            [self._pattern_completion_bonuses[line + 1] for line in range(5)], dtype=np.float64
+        )
+        floor_counts = range(len(self._floor_penalties) + 2)
+        self._floor_score_table = np.array(
+            [sum(self._floor_penalties[:count]) for count in floor_counts], dtype=np.float64
+        )
+        self._floor_estimate_table = np.array(
+            [sum(self._floor_penalties[count:count + min(2, 7 - count)]) if count > 0 else 0
+             for count in floor_counts], dtype=np.float64
+        )
     
-    def evaluate_position(self, state: AzulState, agent_id: int) -> float:
+    def evaluate_position(self, state: AzulState, agent_id: int, hash_key: Optional[int] = None) -> float:
         """
         Evaluate a position for the given agent.
         
         Args:
             state: Current game state
             agent_id: Agent to evaluate for
+            hash_key: Zobrist key of state; when given, the evaluation cache is used
             
         Returns:
             Heuristic score (higher is better for the agent)
         """
+        if hash_key is not None and self.cache is not None:
+            cached = self.cache.get(hash_key, agent_id)
+            if cached is not None:
+                return cached
+        
         agent_state = state.agents[agent_id]
         
         # Calculate immediate score
@@ -76,8 +367,178 @@ class AzulEvaluator:
         # Combine all components
         total_score = immediate_score + pattern_potential + penalty_estimation + endgame_bonuses
         
+        if hash_key is not None and self.cache is not None:
+            self.cache.put(hash_key, agent_id, total_score)
+        
         return total_score
     
+    def compute_terms(self, agent_state) -> EvaluationTerms:
+        """Compute all evaluation terms of an agent from scratch."""
+        self.full_term_computations += 1
+        line_terms = [self._line_terms(agent_state, line) for line in range(agent_state.GRID_SIZE)]
+        return EvaluationTerms(
+            line_scores=[score for score, _ in line_terms],
+            line_potentials=[potential for _, potential in line_terms],
+            floor_count=len(agent_state.floor_tiles),
+            endgame_bonuses=self._calculate_endgame_bonuses(agent_state)
+        )
+    
+    def update_terms(self, terms: EvaluationTerms, agent_state, pattern_line: int) -> EvaluationTerms:
+        """
+        Terms of agent_state after a move that changed one pattern line and the floor.
+        
+        Moves never touch the wall, so the endgame bonuses carry over.
+        pattern_line is -1 for moves that only reach the floor.
+        """
+        self.term_updates += 1
+        line_scores = list(terms.line_scores)
+        line_potentials = list(terms.line_potentials)
+        if pattern_line >= 0:
+            line_scores[pattern_line], line_potentials[pattern_line] = self._line_terms(agent_state, pattern_line)
+        return EvaluationTerms(line_scores, line_potentials, len(agent_state.floor_tiles), terms.endgame_bonuses)
+    
+    def evaluate_terms(self, terms: EvaluationTerms) -> float:
+        """Combine terms in evaluate_position's order, giving an identical score."""
+        immediate_score = 0.0
+        for score in terms.line_scores:
+            immediate_score += score
+        if terms.floor_count > 0:
+            immediate_score += float(sum(self._floor_penalties[:terms.floor_count]))
+        
+        pattern_potential = 0
+        for potential in terms.line_potentials:
+            pattern_potential += potential
+        
+        floor_index = min(terms.floor_count, len(self._floor_estimate_table) - 1)
+        penalty_estimation = float(self._floor_estimate_table[floor_index])
+        
+        return immediate_score + pattern_potential + penalty_estimation + terms.endgame_bonuses
+    
+    def attach_terms(self, state: AzulState) -> List[EvaluationTerms]:
+        """(Re)compute the terms of every agent and keep them on the state."""
+        state.eval_terms = [self.compute_terms(agent) for agent in state.agents]
+        return state.eval_terms
+    
+    def advance_terms(self, parent: AzulState, child: AzulState, agent_id: int, pattern_line: int):
+        """
+        Give child, reached from parent by agent_id's move onto pattern_line, its terms.
+        
+        Only the moving agent's terms change; the parent's terms are computed
+        first if it has none.
+        """
+        terms = getattr(parent, 'eval_terms', None)
+        if terms is None:
+            terms = self.attach_terms(parent)
+        child_terms = list(terms)
+        child_terms[agent_id] = self.update_terms(terms[agent_id], child.agents[agent_id], pattern_line)
+        child.eval_terms = child_terms
+    
+    def evaluate_incremental(self, state: AzulState, agent_id: int, hash_key: Optional[int] = None) -> float:
+        """
+        Evaluate a position from the terms kept on it.
+        
+        States without terms are evaluated in full. Terms are only valid for
+        the board they were computed on: callers that change a state in place
+        must call attach_terms again. hash_key is used as in evaluate_position.
+        """
+        terms = getattr(state, 'eval_terms', None)
+        if terms is None:
+            return self.evaluate_position(state, agent_id, hash_key)
+        
+        if hash_key is not None and self.cache is not None:
+            cached = self.cache.get(hash_key, agent_id)
+            if cached is not None:
+                return cached
+        
+        self.incremental_evaluations += 1
+        score = self.evaluate_terms(terms[agent_id])
+        if self.check_incremental:
+            expected = self.evaluate_position(state, agent_id)
+            if score != expected:
+                raise RuntimeError(
+                    f"Incremental evaluation {score} differs from full evaluation {expected} for agent {agent_id}"
+                )
+        if hash_key is not None and self.cache is not None:
+            self.cache.put(hash_key, agent_id, score)
+        return score
+    
+    def get_incremental_stats(self) -> Dict[str, int]:
+        """Get incremental evaluation statistics."""
+        return {
+            'incremental_evaluations': self.incremental_evaluations,
+            'term_updates': self.term_updates,
+            'full_term_computations': self.full_term_computations,
+            'check_incremental': self.check_incremental
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get evaluation cache statistics."""
+        if self.cache is None:
+            return {'enabled': False}
+        return {'enabled': True, 'weights_version': self.weights.version, **self.cache.get_stats()}
+    
+    def clear_cache(self):
+        """Clear the evaluation cache."""
+        if self.cache is not None:
+            self.cache.clear()
+    
+    def _line_terms(self, agent_state, pattern_line: int) -> Tuple[float, float]:
+        """(immediate score, pattern potential) contributed by one pattern line."""
+        tiles_in_line = agent_state.lines_number[pattern_line]
+        bonus = self._pattern_completion_bonuses[pattern_line + 1]
+        score = float(bonus) if tiles_in_line == pattern_line + 1 else 0.0
+        potential = tiles_in_line / (pattern_line + 1) * bonus * 0.5 if tiles_in_line > 0 else 0.0
+        return score, potential
+    
+    def evaluate_positions(self, positions: Union[Sequence[AzulState], EvaluationBatch],
+                           agent_ids: Union[int, Sequence[int]] = 0) -> np.ndarray:
+        """
+        Evaluate many positions at once.
+        
+        Computes the same features as evaluate_position with NumPy across the
+        batch, in the same floating-point order, so every score is identical
+        to the scalar path.
+        
+        Args:
+            positions: States, or an EvaluationBatch gathered beforehand
+            agent_ids: Agent to evaluate for in each state, or one for all
+                (ignored for an EvaluationBatch)
+            
+        Returns:
+            Array of N heuristic scores
+        """
+        if isinstance(positions, EvaluationBatch):
+            batch = positions
+        else:
+            batch = EvaluationBatch.from_states(positions, agent_ids)
+        if len(batch) == 0:
+            return np.zeros(0, dtype=np.float64)
+        
+        lines = batch.lines_number
+        floor_index = np.minimum(batch.floor_count, len(self._floor_score_table) - 1)
+        
+        # Immediate score: full pattern lines, summed line by line like the scalar loop, then the floor
+        immediate_score = np.zeros(len(batch), dtype=np.float64)
+        for line in range(5):
+            immediate_score = immediate_score + np.where(lines[:, line] == line + 1, self._line_bonus_array[line], 0.0)
+        immediate_score = immediate_score + self._floor_score_table[floor_index]
+        
+        # Pattern potential, summed line by line like the scalar loop
+        pattern_potential = np.zeros(len(batch), dtype=np.float64)
+        for line in range(5):
+            tiles_in_line = lines[:, line]
+            term = tiles_in_line / (line + 1) * self._line_bonus_array[line] * 0.5
+            pattern_potential = pattern_potential + np.where(tiles_in_line > 0, term, 0.0)
+        
+        penalty_estimation = self._floor_estimate_table[floor_index]
+        
+        grid = batch.grid_state.astype(bool)
+        endgame_bonuses = (grid.all(axis=2).sum(axis=1) * self._row_bonus
+                           + grid.all(axis=1).sum(axis=1) * self._col_bonus
+                           + (batch.tile_counts >= 5).sum(axis=1) * self._set_bonus)
+        
+        return immediate_score + pattern_potential + penalty_estimation + endgame_bonuses
+    
     def _calculate_immediate_score(self, agent_state) -> float:
         """Calculate immediate score from completed tiles and bonuses."""
         score = 0.0
@@ -218,12 +679,23 @@ class AzulEvaluator:
         Returns:
             List of scores corresponding to the moves
         """
-        scores = []
-        for move in moves:
-            score = self.evaluate_move(state, agent_id, move)
-            scores.append(score)
+        if not moves:
+            return []
         
-        return scores
+        # Same arithmetic as evaluate_move, with the position evaluated once
+        current_score = self.evaluate_position(state, agent_id)
+        lines_number = np.asarray(state.agents[agent_id].lines_number, dtype=np.int64)
+        dest = np.array([move.pattern_line_dest for move in moves], dtype=np.int64)
+        to_line = np.array([move.num_to_pattern_line for move in moves], dtype=np.int64)
+        to_floor = np.array([move.num_to_floor_line for move in moves], dtype=np.int64)
+        
+        line = np.maximum(dest, 0)
+        new_tiles = lines_number[line] + to_line
+        valid = (dest >= 0) & (new_tiles <= line + 1)
+        move_bonus = np.where(valid, new_tiles / (line + 1) * self._line_bonus_array[line] * 0.3, 0.0)
+        move_bonus = move_bonus - to_floor * 1.0
+        
+        return (current_score + move_bonus).tolist()
     
     def rank_moves(self, state: AzulState, agent_id: int, moves: List) -> List[Tuple[float, int]]:
         """
@@ -7,18 +7,24 @@ This module provides:
 - Fast hint generation with < 200ms target
 - Integration with existing evaluator and move generator
 - Database caching for position analysis
+- Batched neural leaf evaluation with virtual loss
+- Optional RAVE/AMAF value sharing and progressive widening
+- Periodic progress callbacks and cooperative stop for streaming clients
+- Optional chance nodes over sampled next-round deals at round boundaries
 """
 
 import math
 import random
 import time
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any, Callable
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Callable, Tuple
 from enum import Enum
 
 from core.azul_model import AzulState, AzulGameRule
 from .azul_move_generator import FastMoveGenerator, FastMove
-from .azul_evaluator import AzulEvaluator
+from .azul_evaluator import AzulEvaluator, EvaluatorWeights
+from .azul_rollout import RolloutSimulator, POLICY_RANDOM, POLICY_HEAVY
+from .azul_chance import ChanceSampler
 from core.azul_database import AzulDatabase, CachedAnalysis
 
 # Optional neural imports - temporarily disabled for testing
@@ -26,6 +32,7 @@ NEURAL_AVAILABLE = False
 
 try:
     from neural.azul_net import create_azul_net, AzulNeuralRolloutPolicy
+    from neural.batch_evaluator import BatchConfig, create_batch_evaluator
     NEURAL_AVAILABLE = True
 except ImportError:
     # Neural components not available
@@ -51,12 +58,30 @@ class MCTSNode:
     visits: int = 0
     total_score: float = 0.0
     
+    # Pending evaluations through this node (batched leaf evaluation)
+    virtual_loss: int = 0
+    
+    # AMAF statistics for moves played by agent_id below this node,
+    # keyed by packed move (FastMove.bit_mask)
+    amaf_visits: Dict[int, int] = None
+    amaf_score: Dict[int, float] = None
+    
+    # Moves not yet expanded, best last (progressive widening)
+    untried_moves: Optional[List[FastMove]] = None
+    
+    # Round boundary whose children are sampled deals of the next round
+    chance: bool = False
+    
     # Children
     children: List['MCTSNode'] = None
     
     def __post_init__(self):
         if self.children is None:
             self.children = []
+        if self.amaf_visits is None:
+            self.amaf_visits = {}
+        if self.amaf_score is None:
+            self.amaf_score = {}
     
     @property
     def average_score(self) -> float:
@@ -85,6 +110,8 @@ class MCTSResult:
     search_time: float
     rollout_count: int
     average_rollout_depth: float
+    rollouts_per_second: float = 0.0
+    move_visits: List[Tuple[FastMove, int]] = field(default_factory=list)  # Root children, for policy targets
 
 
 class RolloutPolicyBase:
@@ -93,175 +120,40 @@ class RolloutPolicyBase:
     def __init__(self, evaluator: AzulEvaluator, move_generator: FastMoveGenerator):
         self.evaluator = evaluator
         self.move_generator = move_generator
+        self.last_rollout_depth = 0
     
     def rollout(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
         """Perform a rollout from the given state."""
         raise NotImplementedError
 
 
-class RandomRolloutPolicy(RolloutPolicyBase):
-    """Random rollout policy."""
-    
-    def rollout(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
-        """Perform a random rollout."""
-        current_state = state
-        current_agent = agent_id
-        depth = 0
-        
-        while depth < max_depth:
-            # Check for terminal state
-            if self._is_terminal(current_state):
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            # Generate moves
-            moves = self.move_generator.generate_moves_fast(current_state, current_agent)
-            if not moves:
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            # Select random move
-            move = random.choice(moves)
-            
-            # Apply move
-            new_state = self._apply_move(current_state, move, current_agent)
-            if new_state is None:
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            current_state = new_state
-            current_agent = self._get_next_agent(current_agent, current_state)
-            depth += 1
-        
-        # Return evaluation if we reached max depth
-        return self.evaluator.evaluate_position(current_state, agent_id)
-    
-    def _is_terminal(self, state: AzulState) -> bool:
-        """Check if state is terminal."""
-        # Simplified - can be enhanced
-        return False
+class SimulatorRolloutPolicy(RolloutPolicyBase):
+    """Rollout policy backed by the allocation-free RolloutSimulator."""
     
-    def _evaluate_terminal(self, state: AzulState, agent_id: int) -> float:
-        """Evaluate terminal state."""
-        return self.evaluator.evaluate_position(state, agent_id)
+    simulator_policy = POLICY_RANDOM
     
-    def _apply_move(self, state: AzulState, move: FastMove, agent_id: int) -> Optional[AzulState]:
-        """Apply move to state."""
-        try:
-            new_state = state.clone()
-            game_rule = AzulGameRule(len(new_state.agents))
-            
-            # Initialize agent traces
-            for agent in new_state.agents:
-                agent.agent_trace.StartRound()
-            
-            # Convert FastMove to tuple format
-            move_tuple = (
-                move.source_id,
-                move.tile_type,
-                move.pattern_line_dest,
-                move.num_to_pattern_line,
-                move.num_to_floor_line
-            )
-            
-            # Apply move
-            successor = game_rule.generateSuccessor(new_state, move_tuple, agent_id)
-            return successor
-        except Exception:
-            return None
+    def __init__(self, evaluator: AzulEvaluator, move_generator: FastMoveGenerator,
+                 max_rounds: int = 1):
+        super().__init__(evaluator, move_generator)
+        self.simulator = RolloutSimulator(policy=self.simulator_policy, max_rounds=max_rounds)
     
-    def _get_next_agent(self, agent_id: int, state: AzulState) -> int:
-        """Get next agent ID."""
-        return (agent_id + 1) % len(state.agents)
+    def rollout(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
+        """Play out to the end of the round and return agent_id's score margin."""
+        score = self.simulator.simulate(state, agent_id, max_depth)
+        self.last_rollout_depth = self.simulator.last_depth
+        return score
 
 
-class HeavyRolloutPolicy(RolloutPolicyBase):
-    """Heavy playout policy using heuristic evaluation."""
-    
-    def rollout(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
-        """Perform a heavy playout using heuristic evaluation."""
-        current_state = state
-        current_agent = agent_id
-        depth = 0
-        
-        while depth < max_depth:
-            # Check for terminal state
-            if self._is_terminal(current_state):
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            # Generate moves
-            moves = self.move_generator.generate_moves_fast(current_state, current_agent)
-            if not moves:
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            # Select best move using heuristic evaluation
-            best_move = self._select_best_move(current_state, moves, current_agent)
-            
-            # Apply move
-            new_state = self._apply_move(current_state, best_move, current_agent)
-            if new_state is None:
-                return self._evaluate_terminal(current_state, agent_id)
-            
-            current_state = new_state
-            current_agent = self._get_next_agent(current_agent, current_state)
-            depth += 1
-        
-        # Return evaluation if we reached max depth
-        return self.evaluator.evaluate_position(current_state, agent_id)
-    
-    def _select_best_move(self, state: AzulState, moves: List[FastMove], agent_id: int) -> FastMove:
-        """Select best move using heuristic evaluation."""
-        best_move = moves[0]
-        best_score = float('-inf')
-        
-        for move in moves:
-            # Create temporary state to evaluate move
-            temp_state = self._apply_move(state, move, agent_id)
-            if temp_state is None:
-                continue
-            
-            # Evaluate position
-            score = self.evaluator.evaluate_position(temp_state, agent_id)
-            
-            if score > best_score:
-                best_score = score
-                best_move = move
-        
-        return best_move
-    
-    def _is_terminal(self, state: AzulState) -> bool:
-        """Check if state is terminal."""
-        return False
-    
-    def _evaluate_terminal(self, state: AzulState, agent_id: int) -> float:
-        """Evaluate terminal state."""
-        return self.evaluator.evaluate_position(state, agent_id)
+class RandomRolloutPolicy(SimulatorRolloutPolicy):
+    """Random rollout policy."""
     
-    def _apply_move(self, state: AzulState, move: FastMove, agent_id: int) -> Optional[AzulState]:
-        """Apply move to state."""
-        try:
-            new_state = state.clone()
-            game_rule = AzulGameRule(len(new_state.agents))
-            
-            # Initialize agent traces
-            for agent in new_state.agents:
-                agent.agent_trace.StartRound()
-            
-            # Convert FastMove to tuple format
-            move_tuple = (
-                move.source_id,
-                move.tile_type,
-                move.pattern_line_dest,
-                move.num_to_pattern_line,
-                move.num_to_floor_line
-            )
-            
-            # Apply move
-            successor = game_rule.generateSuccessor(new_state, move_tuple, agent_id)
-            return successor
-        except Exception:
-            return None
+    simulator_policy = POLICY_RANDOM
+
+
+class HeavyRolloutPolicy(SimulatorRolloutPolicy):
+    """Heavy playout policy preferring moves that fill lines and avoid the floor."""
     
-    def _get_next_agent(self, agent_id: int, state: AzulState) -> int:
-        """Get next agent ID."""
-        return (agent_id + 1) % len(state.agents)
+    simulator_policy = POLICY_HEAVY
 
 
 class AzulMCTS:
@@ -272,7 +164,20 @@ class AzulMCTS:
                  max_rollouts: int = 300,
                  exploration_constant: float = 1.414,
                  rollout_policy: RolloutPolicy = RolloutPolicy.RANDOM,
-                 database: Optional[AzulDatabase] = None):
+                 database: Optional[AzulDatabase] = None,
+                 leaf_batch_size: int = 1,
+                 virtual_loss_penalty: float = 1.0,
+                 rollout_rounds: int = 1,
+                 use_rave: bool = False,
+                 rave_equivalence: float = 300.0,
+                 progressive_widening: bool = False,
+                 widening_constant: float = 2.0,
+                 widening_exponent: float = 0.5,
+                 chance_samples: int = 0,
+                 chance_seed: int = 0,
+                 inference_server=None,
+                 neural_net=None,
+                 evaluator_weights: Optional[EvaluatorWeights] = None):
         """
         Initialize MCTS.
         
@@ -282,44 +187,110 @@ class AzulMCTS:
             exploration_constant: UCT exploration constant
             rollout_policy: Rollout policy to use
             database: Optional database for caching
+            leaf_batch_size: Leaves gathered per neural forward pass (NEURAL policy only)
+            virtual_loss_penalty: Score penalty per pending evaluation during leaf gathering
+            rollout_rounds: Rounds each random/heavy rollout plays (1 = to the end of
+                the current round; more continues through scoring and refills)
+            use_rave: Blend child values with AMAF statistics keyed by packed move
+            rave_equivalence: Visit count at which UCT and AMAF values weigh equally
+            progressive_widening: Only consider the top-k children by
+                AzulEvaluator.evaluate_move, with k growing with node visits
+            widening_constant: k = ceil(widening_constant * visits ** widening_exponent)
+            widening_exponent: Growth exponent of the widening schedule
+            chance_samples: When > 0, nodes whose round is over get one child per
+                sampled deal of the next round, visited in turn, instead of
+                staying leaves
+            chance_seed: Seed of the deal sampler
+            inference_server: Shared NeuralInferenceServer for the NEURAL policy;
+                its model is used and every forward pass goes through its queue
+            neural_net: (model, encoder) for the NEURAL policy, e.g. from
+                load_azul_net (default: a new untrained AzulNet)
+            evaluator_weights: Scoring weights of the evaluator (default: its own)
         """
+        if leaf_batch_size < 1:
+            raise ValueError(f"leaf_batch_size must be >= 1, got {leaf_batch_size}")
+        
         self.max_time = max_time
         self.max_rollouts = max_rollouts
         self.exploration_constant = exploration_constant
         self.rollout_policy_enum = rollout_policy  # Keep the enum for tests
         self.database = database
+        self.leaf_batch_size = leaf_batch_size
+        self.virtual_loss_penalty = virtual_loss_penalty
+        self.use_rave = use_rave
+        self.rave_equivalence = rave_equivalence
+        self.progressive_widening = progressive_widening
+        self.widening_constant = widening_constant
+        self.widening_exponent = widening_exponent
+        self.chance_sampler = ChanceSampler(chance_samples, seed=chance_seed) if chance_samples > 0 else None
+        self._batch_evaluator = None
         
-        # Initialize components
-        self.evaluator = AzulEvaluator()
+        # Initialize components; MCTS does not hash its states, so the evaluation cache would stay empty
+        self.evaluator = AzulEvaluator(cache_size=0, weights=evaluator_weights)
         self.move_generator = FastMoveGenerator()
         
         # Create rollout policy
         if rollout_policy == RolloutPolicy.RANDOM:
-            self._rollout_policy_instance = RandomRolloutPolicy(self.evaluator, self.move_generator)
+            self._rollout_policy_instance = RandomRolloutPolicy(
+                self.evaluator, self.move_generator, max_rounds=rollout_rounds
+            )
         elif rollout_policy == RolloutPolicy.HEAVY:
-            self._rollout_policy_instance = HeavyRolloutPolicy(self.evaluator, self.move_generator)
+            self._rollout_policy_instance = HeavyRolloutPolicy(
+                self.evaluator, self.move_generator, max_rounds=rollout_rounds
+            )
         elif rollout_policy == RolloutPolicy.NEURAL:
             if not NEURAL_AVAILABLE:
                 raise ValueError(
                     "Neural rollout policy requires PyTorch. Install torch and torchvision (see requirements.txt) or enable the 'neural' extras."
                 )
             # Create neural model and policy
-            model, encoder = create_azul_net(device="cpu")
+            if inference_server is not None:
+                model, encoder = inference_server.model, inference_server.encoder
+            elif neural_net is not None:
+                model, encoder = neural_net
+            else:
+                model, encoder = create_azul_net(device="cpu")
             self._rollout_policy_instance = AzulNeuralRolloutPolicy(
-                model, encoder, self.evaluator, self.move_generator, device="cpu"
+                model, encoder, self.evaluator, self.move_generator, device="cpu",
+                inference_server=inference_server
             )
+            if leaf_batch_size > 1 and inference_server is not None:
+                # Leaf batches join the server's queue like any other request
+                self._batch_evaluator = inference_server
+            elif leaf_batch_size > 1:
+                # Share the rollout model and result cache so both paths see the same weights
+                batch_config = BatchConfig(
+                    default_batch_size=leaf_batch_size,
+                    auto_device_selection=False,
+                    preferred_device="cpu"
+                )
+                self._batch_evaluator = create_batch_evaluator(
+                    model, encoder, batch_config,
+                    result_cache=self._rollout_policy_instance.result_cache
+                )
         else:
             raise ValueError(f"Unknown rollout policy: {rollout_policy}")
         
+        # Rollout moves feed AMAF statistics when the simulator can record them
+        self._rollout_simulator = getattr(self._rollout_policy_instance, 'simulator', None)
+        if self.use_rave and self._rollout_simulator is not None:
+            self._rollout_simulator.record_moves = True
+        
         # Search statistics
         self.nodes_searched = 0
         self.rollout_count = 0
+        self.total_rollout_depth = 0
+        self.leaf_batch_count = 0
         self.search_start_time = 0.0
+        self.search_end_time = 0.0
+        self.stop_requested = False
     
     def search(self, state: AzulState, agent_id: int, 
                max_time: Optional[float] = None,
                max_rollouts: Optional[int] = None,
-               fen_string: Optional[str] = None) -> MCTSResult:
+               fen_string: Optional[str] = None,
+               progress: Optional[Callable[[MCTSResult], bool]] = None,
+               progress_interval: int = 100) -> MCTSResult:
         """
         Perform MCTS search with optional database caching.
         
@@ -329,6 +300,9 @@ class AzulMCTS:
             max_time: Maximum search time (overrides instance default)
             max_rollouts: Maximum rollouts (overrides instance default)
             fen_string: Optional FEN string for caching
+            progress: Called with the current result every progress_interval
+                rollouts; the search stops early if it returns False
+            progress_interval: Rollouts between progress calls
             
         Returns:
             MCTSResult with best move and statistics
@@ -370,7 +344,11 @@ class AzulMCTS:
         # Reset statistics
         self.nodes_searched = 0
         self.rollout_count = 0
+        self.total_rollout_depth = 0
+        self.leaf_batch_count = 0
         self.search_start_time = time.time()
+        self.stop_requested = False
+        next_progress = progress_interval
         
         # Create root node
         root = MCTSNode(state=state, agent_id=agent_id)
@@ -378,7 +356,18 @@ class AzulMCTS:
         
         # Perform MCTS iterations
         while (time.time() - self.search_start_time < max_time and 
-               self.rollout_count < max_rollouts):
+               self.rollout_count < max_rollouts and not self.stop_requested):
+            
+            if progress is not None and self.rollout_count >= next_progress:
+                next_progress = self.rollout_count + progress_interval
+                if progress(self._current_result(root)) is False or self.stop_requested:
+                    break
+            
+            if self._batch_evaluator is not None:
+                # Gather several leaves and evaluate them in one forward pass
+                batch_size = min(self.leaf_batch_size, max_rollouts - self.rollout_count)
+                self._search_leaf_batch(root, batch_size)
+                continue
             
             # Selection and expansion
             node = self._select_and_expand(root)
@@ -386,14 +375,19 @@ class AzulMCTS:
             # Simulation
             score = self._rollout_policy_instance.rollout(node.state, node.agent_id)
             self.rollout_count += 1
+            self.total_rollout_depth += getattr(self._rollout_policy_instance, 'last_rollout_depth', 0)
             
             # Backpropagation
-            self._backpropagate(node, score)
+            if self.use_rave:
+                self._backpropagate(node, score, self._get_rollout_moves())
+            else:
+                self._backpropagate(node, score)
         
         # Select best move
         best_move, best_score, pv = self._select_best_move(root)
         
-        search_time = time.time() - self.search_start_time
+        self.search_end_time = time.time()
+        search_time = self.search_end_time - self.search_start_time
         
         # Cache result if database is available
         if self.database and fen_string:
@@ -420,16 +414,74 @@ class AzulMCTS:
             nodes_searched=self.nodes_searched,
             search_time=search_time,
             rollout_count=self.rollout_count,
-            average_rollout_depth=0.0  # TODO: Track rollout depth
+            average_rollout_depth=self._average_rollout_depth(),
+            rollouts_per_second=self.rollout_count / max(0.001, search_time),
+            move_visits=[(child.move, child.visits) for child in root.children if child.move is not None]
         )
     
+    def _current_result(self, root: MCTSNode) -> MCTSResult:
+        """Snapshot of the search so far."""
+        best_move, best_score, pv = self._select_best_move(root)
+        search_time = time.time() - self.search_start_time
+        return MCTSResult(
+            best_move=best_move,
+            best_score=best_score,
+            principal_variation=pv,
+            nodes_searched=self.nodes_searched,
+            search_time=search_time,
+            rollout_count=self.rollout_count,
+            average_rollout_depth=self._average_rollout_depth(),
+            rollouts_per_second=self.rollout_count / max(0.001, search_time),
+            move_visits=[(child.move, child.visits) for child in root.children if child.move is not None]
+        )
+    
+    def stop(self):
+        """Ask a running search to stop; safe to call from another thread."""
+        self.stop_requested = True
+    
+    def _search_leaf_batch(self, root: MCTSNode, batch_size: int):
+        """
+        Gather up to batch_size leaves and evaluate them with one network call.
+        
+        Virtual loss is applied along each selected path so that subsequent
+        selections in the same batch are steered towards different leaves.
+        Each leaf is valued for the agent to move there, as in the
+        sequential rollout path.
+        """
+        leaves = []
+        for _ in range(batch_size):
+            node = self._select_and_expand(root)
+            self._apply_virtual_loss(node, 1)
+            leaves.append(node)
+        
+        try:
+            scores = self._batch_evaluator.evaluate_batch(
+                [leaf.state for leaf in leaves], [leaf.agent_id for leaf in leaves]
+            )
+        finally:
+            for leaf in leaves:
+                self._apply_virtual_loss(leaf, -1)
+        
+        for leaf, score in zip(leaves, scores):
+            self._backpropagate(leaf, float(score), [] if self.use_rave else None)
+        
+        self.rollout_count += len(leaves)
+        self.leaf_batch_count += 1
+    
+    def _apply_virtual_loss(self, node: MCTSNode, delta: int):
+        """Add (or remove, with a negative delta) pending evaluations along a path."""
+        current = node
+        while current is not None:
+            current.virtual_loss += delta
+            current = current.parent
+    
     def _select_and_expand(self, root: MCTSNode) -> MCTSNode:
         """Select a node using UCT and expand it."""
         current = root
         
         # Selection phase
         while not current.is_leaf and not current.is_terminal:
-            if len(current.children) < len(self._get_moves(current.state, current.agent_id)):
+            if self._can_expand(current):
                 # Expand
                 return self._expand(current)
             else:
@@ -442,8 +494,34 @@ class AzulMCTS:
         
         return current
     
+    def _can_expand(self, node: MCTSNode) -> bool:
+        """Check whether a node should grow a new child before selection."""
+        if node.chance:
+            return False
+        if not self.progressive_widening:
+            return len(node.children) < len(self._get_moves(node.state, node.agent_id))
+        
+        if node.untried_moves is None:
+            node.untried_moves = self._get_ordered_moves(node)
+        return bool(node.untried_moves) and len(node.children) < self._widening_limit(node.visits)
+    
+    def _widening_limit(self, visits: int) -> int:
+        """Number of children a node may have after the given visit count."""
+        return max(1, math.ceil(self.widening_constant * visits ** self.widening_exponent))
+    
+    def _get_ordered_moves(self, node: MCTSNode) -> List[FastMove]:
+        """Legal moves ordered worst-first so the best can be popped off the end."""
+        moves = self._get_moves(node.state, node.agent_id)
+        ranked = self.evaluator.rank_moves(node.state, node.agent_id, moves)
+        return [moves[index] for _, index in reversed(ranked)]
+    
     def _expand(self, node: MCTSNode) -> MCTSNode:
         """Expand a node by adding a child."""
+        if self.chance_sampler is not None and not node.children and not node.state.TilesRemaining():
+            return self._expand_chance(node)
+        if self.progressive_widening:
+            return self._expand_widening(node)
+        
         moves = self._get_moves(node.state, node.agent_id)
         existing_moves = {child.move for child in node.children}
         
@@ -470,13 +548,58 @@ class AzulMCTS:
         # If all moves are explored, return the node itself
         return node
     
+    def _expand_widening(self, node: MCTSNode) -> MCTSNode:
+        """Expand the best-ranked untried move of a node."""
+        if node.untried_moves is None:
+            node.untried_moves = self._get_ordered_moves(node)
+        
+        while node.untried_moves:
+            move = node.untried_moves.pop()
+            new_state = self._apply_move(node.state, move, node.agent_id)
+            if new_state is None:
+                continue
+            
+            child = MCTSNode(
+                state=new_state,
+                parent=node,
+                move=move,
+                agent_id=self._get_next_agent(node.agent_id, new_state)
+            )
+            node.children.append(child)
+            self.nodes_searched += 1
+            return child
+        
+        return node
+    
+    def _expand_chance(self, node: MCTSNode) -> MCTSNode:
+        """
+        Turn a round boundary into a chance node with one child per sampled deal.
+        
+        Deals come from the shared sampler, so boundaries with the same bag
+        composition get the same deals. If the game is over, node stays a leaf.
+        """
+        _, next_rounds = self.chance_sampler.next_round_states(node.state)
+        if not next_rounds:
+            return node
+        
+        node.chance = True
+        for state in next_rounds:
+            node.children.append(MCTSNode(state=state, parent=node, agent_id=state.first_agent))
+        self.nodes_searched += len(next_rounds)
+        return node.children[0]
+    
     def _select_best_child(self, node: MCTSNode) -> MCTSNode:
         """Select best child using UCT formula."""
+        if node.chance:
+            # Deals are equally likely; visit them in turn rather than by value
+            return min(node.children, key=lambda child: child.visits + child.virtual_loss)
+        
+        parent_visits = node.visits + node.virtual_loss
         best_child = node.children[0]
-        best_uct = self._calculate_uct(best_child, node.visits)
+        best_uct = self._calculate_uct(best_child, parent_visits)
         
         for child in node.children[1:]:
-            uct = self._calculate_uct(child, node.visits)
+            uct = self._calculate_uct(child, parent_visits)
             if uct > best_uct:
                 best_uct = uct
                 best_child = child
@@ -485,22 +608,69 @@ class AzulMCTS:
     
     def _calculate_uct(self, node: MCTSNode, parent_visits: int) -> float:
         """Calculate UCT value for a node."""
-        if node.visits == 0:
+        visits = node.visits + node.virtual_loss
+        if visits == 0:
             return float('inf')
         
-        exploitation = node.average_score
-        exploration = self.exploration_constant * math.sqrt(math.log(parent_visits) / node.visits)
+        # Pending evaluations count as visits that scored badly
+        exploitation = (node.total_score - node.virtual_loss * self.virtual_loss_penalty) / visits
+        
+        if self.use_rave and node.parent is not None and node.move is not None:
+            amaf_visits = node.parent.amaf_visits.get(node.move.bit_mask, 0)
+            if amaf_visits > 0:
+                amaf_value = node.parent.amaf_score[node.move.bit_mask] / amaf_visits
+                beta = math.sqrt(self.rave_equivalence / (3 * visits + self.rave_equivalence))
+                exploitation = (1.0 - beta) * exploitation + beta * amaf_value
+        exploration = self.exploration_constant * math.sqrt(math.log(parent_visits) / visits)
         
         return exploitation + exploration
     
-    def _backpropagate(self, node: MCTSNode, score: float):
-        """Backpropagate score up the tree."""
+    def _backpropagate(self, node: MCTSNode, score: float,
+                       playout: Optional[List[tuple]] = None,
+                       perspective: Optional[int] = None):
+        """
+        Backpropagate score up the tree.
+        
+        score is the outcome for perspective (by default node.agent_id, the
+        agent the leaf was evaluated for). Each node accumulates it for the
+        agent who moved into it, negated when that is another agent, so UCT
+        at every parent maximises the value of the agent choosing there.
+        
+        When playout is given (RAVE), it holds (agent_id, move_key) pairs
+        played below node; every ancestor also records the score, for its
+        own agent, against the first occurrence of each move that agent
+        played further down.
+        """
+        if perspective is None:
+            perspective = node.agent_id
+        
         current = node
         while current is not None:
+            mover = current.parent.agent_id if current.parent is not None else current.agent_id
             current.visits += 1
-            current.total_score += score
+            current.total_score += score if mover == perspective else -score
+            
+            if playout is not None:
+                own_score = score if current.agent_id == perspective else -score
+                seen = set()
+                for agent, key in playout:
+                    if agent == current.agent_id and key not in seen:
+                        seen.add(key)
+                        current.amaf_visits[key] = current.amaf_visits.get(key, 0) + 1
+                        current.amaf_score[key] = current.amaf_score.get(key, 0.0) + own_score
+                if current.move is not None and current.parent is not None:
+                    playout.append((current.parent.agent_id, current.move.bit_mask))
+            
             current = current.parent
     
+    def _get_rollout_moves(self) -> List[tuple]:
+        """(agent_id, move_key) pairs played by the last rollout."""
+        simulator = self._rollout_simulator
+        if simulator is None or not simulator.record_moves:
+            return []
+        count = simulator.num_played
+        return list(zip(simulator.played_agents[:count], simulator.played_moves[:count]))
+    
     def _select_best_move(self, root: MCTSNode) -> tuple[Optional[FastMove], float, List[FastMove]]:
         """Select best move from root node."""
         if not root.children:
@@ -528,17 +698,8 @@ class AzulMCTS:
             for agent in new_state.agents:
                 agent.agent_trace.StartRound()
             
-            # Convert FastMove to tuple format
-            move_tuple = (
-                move.source_id,
-                move.tile_type,
-                move.pattern_line_dest,
-                move.num_to_pattern_line,
-                move.num_to_floor_line
-            )
-            
-            # Apply move
-            successor = game_rule.generateSuccessor(new_state, move_tuple, agent_id)
+            # Apply move in the (action_type, source_id, TileGrab) format
+            successor = game_rule.generateSuccessor(new_state, move.to_tuple(), agent_id)
             return successor
         except Exception:
             return None
@@ -552,11 +713,28 @@ class AzulMCTS:
         """Get the rollout policy enum for testing."""
         return self.rollout_policy_enum
     
+    def _average_rollout_depth(self) -> float:
+        """Average number of moves played per rollout in the last search."""
+        return self.total_rollout_depth / self.rollout_count if self.rollout_count > 0 else 0.0
+    
     def get_search_stats(self) -> Dict[str, Any]:
         """Get search statistics."""
+        search_time = 0.0
+        if self.search_start_time > 0:
+            end_time = self.search_end_time if self.search_end_time >= self.search_start_time else time.time()
+            search_time = end_time - self.search_start_time
+        neural_cache_stats = getattr(self._rollout_policy_instance, 'get_cache_stats', None)
         return {
             'nodes_searched': self.nodes_searched,
             'rollout_count': self.rollout_count,
-            'search_time': time.time() - self.search_start_time if self.search_start_time > 0 else 0.0,
-            'rollouts_per_second': self.rollout_count / max(0.001, time.time() - self.search_start_time)
+            'search_time': search_time,
+            'rollouts_per_second': self.rollout_count / max(0.001, search_time),
+            'average_rollout_depth': self._average_rollout_depth(),
+            'leaf_batch_size': self.leaf_batch_size,
+            'leaf_batches': self.leaf_batch_count,
+            'average_leaf_batch': self.rollout_count / self.leaf_batch_count if self.leaf_batch_count > 0 else 0.0,
+            'rave_enabled': self.use_rave,
+            'progressive_widening': self.progressive_widening,
+            'chance_cache': self.chance_sampler.get_stats() if self.chance_sampler else None,
+            'neural_cache': neural_cache_stats() if neural_cache_stats is not None else None
         } 
\ No newline at end of file
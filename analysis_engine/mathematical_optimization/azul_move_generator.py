@@ -90,6 +90,12 @@ class FastMove:
     def __hash__(self):
         return self.bit_mask
     
+    def __repr__(self):
+        """String form parsed by from_string (used when moves are cached in the database)."""
+        return (f"FastMove(action_type={int(self.action_type)}, source_id={self.source_id}, "
+                f"tile_type={int(self.tile_type)}, pattern_line_dest={self.pattern_line_dest}, "
+                f"num_to_pattern_line={self.num_to_pattern_line}, num_to_floor_line={self.num_to_floor_line})")
+    
     @classmethod
     def from_string(cls, move_string: str) -> 'FastMove':
         """Create FastMove from string representation."""
@@ -0,0 +1,53 @@
+"""
+Azul Position and Move Notation
+
+This module parses the positions and moves stored in the research databases:
+- FEN strings, skipping positions without a full FEN
+- Stored move data (dicts, JSON or FastMove strings) matched to legal moves
+"""
+
+import json
+from typing import Optional
+
+from core.azul_model import AzulState
+from .azul_move_generator import FastMove, FastMoveGenerator
+
+
+MOVE_FIELDS = ('source_id', 'tile_type', 'pattern_line_dest', 'num_to_pattern_line', 'num_to_floor_line')
+
+
+def parse_stored_move(state: AzulState, agent_id: int, move_data) -> Optional[FastMove]:
+    """Match stored move data (dict, JSON or FastMove string) to a legal move."""
+    if isinstance(move_data, str):
+        move_data = move_data.strip()
+        if move_data.startswith('FastMove('):
+            parsed = FastMove.from_string(move_data)
+            move_data = {field: getattr(parsed, field) for field in MOVE_FIELDS}
+        else:
+            try:
+                move_data = json.loads(move_data)
+            except ValueError:
+                return None
+    if not isinstance(move_data, dict):
+        return None
+
+    try:
+        wanted = tuple(int(move_data[field]) for field in MOVE_FIELDS)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    for move in FastMoveGenerator().generate_moves_fast(state, agent_id):
+        if (move.source_id, int(move.tile_type), move.pattern_line_dest,
+                move.num_to_pattern_line, move.num_to_floor_line) == wanted:
+            return move
+    return None
+
+
+def state_from_fen(fen_string: str) -> Optional[AzulState]:
+    """Parse a stored FEN string; positions without a full FEN cannot be keyed."""
+    if not fen_string or not AzulState.validate_fen(fen_string):
+        return None
+    try:
+        return AzulState.from_fen(fen_string)
+    except Exception:
+        return None
@@ -0,0 +1,287 @@
+"""
+Azul Opening Book
+
+This module provides a read-only opening book for Azul with:
+- Compilation from position_database / position_continuations and cached analyses
+- A compact, memory-mapped file sorted by canonical position key
+- Microsecond probes shared by every process that maps the file
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.azul_model import AzulState
+from .azul_move_generator import FastMove
+from .azul_notation import parse_stored_move, state_from_fen
+from analysis_engine.strategic_analysis.azul_tablebase import (
+    canonical_move, move_from_key, position_key, resolve_move
+)
+
+
+DEFAULT_OPENING_BOOK_PATH = "data/opening_book.bin"
+
+BOOK_MAGIC = b"AZULBK01"
+BOOK_VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('count', '<u8'),
+    ('positions', '<u8'),
+    ('reserved', 'S32'),
+])
+RECORD_DTYPE = np.dtype([
+    ('key', '<u8'),
+    ('move', '<u4'),
+    ('weight', '<u4'),
+    ('score', '<f4'),
+    ('win_rate', '<f4'),
+])
+
+
+@dataclass
+class BookMove:
+    """A book move for a position, resolved to the probed state's factories."""
+    move: FastMove
+    weight: int  # Times seen in games and analyses
+    score: float  # Best cached search score (NaN if only seen in games)
+    win_rate: float  # Win rate in stored games (NaN if only analysed)
+
+
+class OpeningBook:
+    """
+    Memory-mapped opening book.
+
+    The file is a fixed header followed by records sorted by (key, rank), so
+    all moves for a position are contiguous and found by binary search on the
+    key column. Records are never modified in place; a rebuilt book replaces
+    the file atomically and readers pick it up on refresh().
+    """
+
+    def __init__(self, path: str = DEFAULT_OPENING_BOOK_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Opening book not found: {path}")
+
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self):
+        """Map the header and records of the file."""
+        header = np.memmap(self.path, dtype=HEADER_DTYPE, mode='r', shape=(1,))
+        if header['magic'][0] != BOOK_MAGIC or header['version'][0] != BOOK_VERSION:
+            raise ValueError(f"Not an Azul opening book file: {self.path}")
+        if header['record_size'][0] != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Unsupported opening book record size in {self.path}")
+
+        count = int(header['count'][0])
+        self._header = header
+        if count:
+            self._records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r',
+                                      offset=HEADER_DTYPE.itemsize, shape=(count,))
+        else:
+            self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._keys = self._records['key']
+        self._file_id = self._stat_id()
+
+    def _stat_id(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self) -> bool:
+        """Re-map the file if it has been rebuilt. Returns True if reopened."""
+        if self._stat_id() == self._file_id:
+            return False
+        self._open()
+        return True
+
+    def __len__(self) -> int:
+        """Number of positions in the book."""
+        return int(self._header['positions'][0])
+
+    def probe(self, state: AzulState, agent_id: int) -> List[BookMove]:
+        """
+        Look up the book moves for a position, best first.
+
+        Args:
+            state: Current game state
+            agent_id: Agent to move
+
+        Returns:
+            List of BookMove (empty if the position is not in the book)
+        """
+        key = np.uint64(position_key(state, agent_id, cap_scores=False))
+        start = int(np.searchsorted(self._keys, key, side='left'))
+        end = int(np.searchsorted(self._keys, key, side='right'))
+        if start == end:
+            self.misses += 1
+            return []
+
+        self.hits += 1
+        moves = []
+        for record in self._records[start:end]:
+            move = resolve_move(state, move_from_key(int(record['move'])))
+            if move is not None:
+                moves.append(BookMove(
+                    move=move,
+                    weight=int(record['weight']),
+                    score=float(record['score']),
+                    win_rate=float(record['win_rate'])
+                ))
+        return moves
+
+    def best_move(self, state: AzulState, agent_id: int) -> Optional[BookMove]:
+        """Get the top book move for a position, or None if out of book."""
+        moves = self.probe(state, agent_id)
+        return moves[0] if moves else None
+
+    def get_stats(self) -> Dict:
+        """Get opening book statistics."""
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'positions': len(self),
+            'moves': int(self._header['count'][0]),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+        }
+
+
+def load_opening_book(path: Optional[str] = None) -> Optional[OpeningBook]:
+    """
+    Open the opening book at path, AZUL_OPENING_BOOK_PATH or the default location.
+
+    Returns:
+        OpeningBook, or None if no book file exists
+    """
+    path = path or os.environ.get('AZUL_OPENING_BOOK_PATH', DEFAULT_OPENING_BOOK_PATH)
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+def compile_opening_book(db_path: str, output_path: str = DEFAULT_OPENING_BOOK_PATH,
+                         min_weight: int = 1) -> Dict:
+    """
+    Compile an opening book file from the research database.
+
+    Sources:
+    - position_continuations (joined to position_database): game frequency and win rate
+    - analysis_results (joined to positions): cached search best moves and scores
+
+    Moves of the same position are ranked by weight, then win rate, then score.
+
+    Args:
+        db_path: Research database path
+        output_path: Book file to write (replaced atomically)
+        min_weight: Drop moves seen fewer times than this
+
+    Returns:
+        Statistics dict
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    entries: Dict[Tuple[int, int], Dict] = {}
+    stats = {'continuations': 0, 'analyses': 0, 'skipped': 0}
+
+    def add(state: AzulState, agent_id: int, move: FastMove, weight: int,
+            score: Optional[float] = None, win_rate: Optional[float] = None):
+        key = position_key(state, agent_id, cap_scores=False)
+        move_key = canonical_move(state, move).bit_mask
+        entry = entries.setdefault((key, move_key), {'weight': 0, 'score': None, 'win_rate': None,
+                                                      'win_weight': 0})
+        entry['weight'] += weight
+        if score is not None:
+            entry['score'] = score if entry['score'] is None else max(entry['score'], score)
+        if win_rate is not None:
+            # Frequency-weighted average over duplicate continuations
+            total = entry['win_weight'] + weight
+            previous = entry['win_rate'] if entry['win_rate'] is not None else 0.0
+            entry['win_rate'] = (previous * entry['win_weight'] + win_rate * weight) / total
+            entry['win_weight'] = total
+
+    try:
+        try:
+            rows = conn.execute("""
+                SELECT p.fen_string, c.move_data, c.frequency, c.win_rate
+                FROM position_continuations c
+                JOIN position_database p ON p.id = c.position_id
+            """).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        for fen_string, move_data, frequency, win_rate in rows:
+            state = state_from_fen(fen_string)
+            agent_id = getattr(state, 'current_player', 0) if state is not None else 0
+            move = parse_stored_move(state, agent_id, move_data) if state is not None else None
+            if move is None:
+                stats['skipped'] += 1
+                continue
+            add(state, agent_id, move, int(frequency or 1), win_rate=win_rate)
+            stats['continuations'] += 1
+
+        try:
+            rows = conn.execute("""
+                SELECT p.fen_string, a.agent_id, a.best_move, a.score
+                FROM analysis_results a
+                JOIN positions p ON p.id = a.position_id
+            """).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        for fen_string, agent_id, best_move, score in rows:
+            state = state_from_fen(fen_string)
+            move = parse_stored_move(state, agent_id, best_move) if state is not None else None
+            if move is None:
+                stats['skipped'] += 1
+                continue
+            add(state, agent_id, move, 1, score=score)
+            stats['analyses'] += 1
+    finally:
+        conn.close()
+
+    rows = []
+    for (key, move_key), entry in entries.items():
+        if entry['weight'] < min_weight:
+            continue
+        rows.append((
+            key, move_key, min(entry['weight'], 0xFFFFFFFF),
+            entry['score'] if entry['score'] is not None else np.nan,
+            entry['win_rate'] if entry['win_rate'] is not None else np.nan
+        ))
+
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    if rows:
+        records['key'] = [row[0] for row in rows]
+        records['move'] = [row[1] for row in rows]
+        records['weight'] = [row[2] for row in rows]
+        records['score'] = [row[3] for row in rows]
+        records['win_rate'] = [row[4] for row in rows]
+        # Sort by key, then best first (NaN ranks last)
+        win_rate = np.nan_to_num(records['win_rate'], nan=-1.0)
+        score = np.nan_to_num(records['score'], nan=-np.inf)
+        order = np.lexsort((-score, -win_rate, -records['weight'].astype(np.int64), records['key']))
+        records = records[order]
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = BOOK_MAGIC
+    header['version'] = BOOK_VERSION
+    header['record_size'] = RECORD_DTYPE.itemsize
+    header['count'] = len(records)
+    header['positions'] = len(np.unique(records['key'])) if len(records) else 0
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(records.tobytes())
+    os.replace(tmp_path, output_path)
+
+    stats['positions'] = int(header['positions'][0])
+    stats['moves'] = len(records)
+    return stats
@@ -0,0 +1,491 @@
+"""
+Lightweight rollout simulator for Azul MCTS.
+
+This module provides:
+- A flat, mutable scratch representation of an AzulState
+- Random and heavy (greedy heuristic) playout policies
+- Playouts to the end of the round, optionally through scoring and refills
+- Allocation-free move counting, selection and application
+- Optional recording of played moves (packed like FastMove.bit_mask) for RAVE
+"""
+
+import random
+from typing import List, Optional
+
+from core.azul_model import AzulState
+
+
+FLOOR_SCORES = [-1, -1, -2, -2, -2, -3, -3]
+FLOOR_SIZE = 7
+GRID_SIZE = 5
+NUM_TILE_TYPES = 5
+NUM_ON_FACTORY = 4
+ROW_BONUS = 2
+COL_BONUS = 7
+SET_BONUS = 10
+
+# Wall column for (pattern line, tile type), identical to AgentState.grid_scheme
+WALL_COLUMN = [[(tile + line) % GRID_SIZE for tile in range(NUM_TILE_TYPES)]
+               for line in range(GRID_SIZE)]
+
+POLICY_RANDOM = "random"
+POLICY_HEAVY = "heavy"
+
+# Action types as packed into FastMove.bit_mask
+ACTION_TAKE_FROM_FACTORY = 1
+ACTION_TAKE_FROM_CENTRE = 2
+
+
+class RolloutSimulator:
+    """
+    Purpose-built playout engine used by the MCTS rollout policies.
+
+    The simulator copies a position into preallocated integer lists once per
+    rollout and then plays moves by mutating those lists in place, so the
+    inner loop creates no states, moves or tuples. Buffers are only
+    reallocated when the number of agents or factories changes.
+
+    The bag is modelled by its tile counts; refills draw uniformly from it,
+    which matches the information available to a player at the table.
+    """
+
+    def __init__(self, policy: str = POLICY_RANDOM, max_rounds: int = 1,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the simulator.
+
+        Args:
+            policy: Playout policy, "random" or "heavy"
+            max_rounds: Rounds to play; 1 stops after scoring the current round,
+                larger values continue through refills until the game ends
+            rng: Optional random generator (for reproducible playouts)
+        """
+        if policy not in (POLICY_RANDOM, POLICY_HEAVY):
+            raise ValueError(f"Unknown rollout policy: {policy}")
+        if max_rounds < 1:
+            raise ValueError(f"max_rounds must be >= 1, got {max_rounds}")
+
+        self.policy = policy
+        self.max_rounds = max_rounds
+        self.rng = rng or random.Random()
+
+        # Statistics of the most recent rollout
+        self.last_depth = 0
+        self.last_rounds = 0
+
+        # Played moves of the most recent rollout (when record_moves is set)
+        self.record_moves = False
+        self.played_moves = [0] * 256
+        self.played_agents = [0] * 256
+        self.num_played = 0
+
+        self._num_agents = 0
+        self._num_factories = 0
+        self.centre = [0] * NUM_TILE_TYPES
+        self.bag = [0] * NUM_TILE_TYPES
+        self.used = [0] * NUM_TILE_TYPES
+        self.legal_lines = [0] * NUM_TILE_TYPES
+        self._allocate(2, 5)
+
+    def _allocate(self, num_agents: int, num_factories: int):
+        """(Re)allocate per-agent and per-factory buffers."""
+        self._num_agents = num_agents
+        self._num_factories = num_factories
+        self.factories = [[0] * NUM_TILE_TYPES for _ in range(num_factories)]
+        self.factory_totals = [0] * num_factories
+        self.lines_number = [[0] * GRID_SIZE for _ in range(num_agents)]
+        self.lines_tile = [[-1] * GRID_SIZE for _ in range(num_agents)]
+        self.walls = [[0] * (GRID_SIZE * GRID_SIZE) for _ in range(num_agents)]
+        self.floors = [0] * num_agents
+        self.scores = [0] * num_agents
+
+    def load(self, state: AzulState):
+        """Copy a position into the scratch buffers."""
+        num_agents = len(state.agents)
+        num_factories = len(state.factories)
+        if num_agents != self._num_agents or num_factories != self._num_factories:
+            self._allocate(num_agents, num_factories)
+
+        for f, factory in enumerate(state.factories):
+            counts = self.factories[f]
+            total = 0
+            for tile in range(NUM_TILE_TYPES):
+                n = factory.tiles.get(tile, 0)
+                counts[tile] = n
+                total += n
+            self.factory_totals[f] = total
+
+        centre_tiles = state.centre_pool.tiles
+        total = 0
+        for tile in range(NUM_TILE_TYPES):
+            n = centre_tiles.get(tile, 0)
+            self.centre[tile] = n
+            total += n
+        self.centre_total = total
+
+        for tile in range(NUM_TILE_TYPES):
+            self.bag[tile] = 0
+            self.used[tile] = 0
+        for tile in state.bag:
+            self.bag[tile] += 1
+        for tile in state.bag_used:
+            self.used[tile] += 1
+        self.bag_total = len(state.bag)
+        self.used_total = len(state.bag_used)
+
+        for a, agent in enumerate(state.agents):
+            lines_number = self.lines_number[a]
+            lines_tile = self.lines_tile[a]
+            wall = self.walls[a]
+            for line in range(GRID_SIZE):
+                lines_number[line] = agent.lines_number[line]
+                lines_tile[line] = agent.lines_tile[line]
+                row = agent.grid_state[line]
+                for col in range(GRID_SIZE):
+                    wall[line * GRID_SIZE + col] = 1 if row[col] else 0
+            self.floors[a] = sum(1 for slot in agent.floor if slot)
+            self.used_total += len(agent.floor_tiles)
+            for tile in agent.floor_tiles:
+                self.used[tile] += 1
+            self.scores[a] = agent.score
+
+        self.first_agent_taken = state.first_agent_taken
+        self.next_first_agent = state.next_first_agent
+        if self.next_first_agent < 0:
+            self.next_first_agent = state.first_agent
+
+    def simulate(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
+        """
+        Play out a position and return the outcome for agent_id.
+
+        agent_id is both the agent to move and the perspective of the result,
+        matching the RolloutPolicyBase.rollout contract.
+
+        Args:
+            state: Position to play out (not modified)
+            agent_id: Agent to move first and to score for
+            max_depth: Maximum number of moves to play
+
+        Returns:
+            agent_id's score minus the best opponent score after round scoring
+        """
+        self.load(state)
+        self.num_played = 0
+
+        current = agent_id
+        depth = 0
+        rounds = 0
+        num_agents = self._num_agents
+
+        while True:
+            while depth < max_depth and (self.centre_total > 0 or any(self.factory_totals)):
+                if self.policy == POLICY_HEAVY:
+                    self._play_heavy_move(current)
+                else:
+                    self._play_random_move(current)
+                current = (current + 1) % num_agents
+                depth += 1
+
+            self._score_round()
+            rounds += 1
+
+            if self._game_over():
+                self._score_end_of_game()
+                break
+            if rounds >= self.max_rounds or depth >= max_depth:
+                break
+
+            self._refill()
+            current = self.next_first_agent
+
+        self.last_depth = depth
+        self.last_rounds = rounds
+
+        own = self.scores[agent_id]
+        best_other = max(self.scores[a] for a in range(num_agents) if a != agent_id) if num_agents > 1 else 0
+        return float(own - best_other)
+
+    def _compute_legal_lines(self, agent: int):
+        """Fill legal_lines[tile] with a bitmask of pattern lines accepting tile."""
+        lines_number = self.lines_number[agent]
+        lines_tile = self.lines_tile[agent]
+        wall = self.walls[agent]
+        legal_lines = self.legal_lines
+        for tile in range(NUM_TILE_TYPES):
+            mask = 0
+            for line in range(GRID_SIZE):
+                if lines_number[line] > line:
+                    continue
+                line_tile = lines_tile[line]
+                if line_tile != -1 and line_tile != tile:
+                    continue
+                if wall[line * GRID_SIZE + WALL_COLUMN[line][tile]]:
+                    continue
+                mask |= 1 << line
+            legal_lines[tile] = mask
+
+    def _play_random_move(self, agent: int):
+        """Play a move chosen uniformly from all legal moves."""
+        self._compute_legal_lines(agent)
+        legal_lines = self.legal_lines
+
+        # Each (source, tile) offers one move per legal line plus the floor
+        total_moves = 0
+        for f in range(self._num_factories):
+            if self.factory_totals[f]:
+                counts = self.factories[f]
+                for tile in range(NUM_TILE_TYPES):
+                    if counts[tile]:
+                        total_moves += 1 + bin(legal_lines[tile]).count("1")
+        for tile in range(NUM_TILE_TYPES):
+            if self.centre[tile]:
+                total_moves += 1 + bin(legal_lines[tile]).count("1")
+
+        pick = self.rng.randrange(total_moves)
+
+        for source in range(-1, self._num_factories):
+            counts = self.centre if source < 0 else self.factories[source]
+            for tile in range(NUM_TILE_TYPES):
+                if not counts[tile]:
+                    continue
+                if pick == 0:
+                    self._apply(agent, source, tile, -1)
+                    return
+                pick -= 1
+                mask = legal_lines[tile]
+                for line in range(GRID_SIZE):
+                    if mask & (1 << line):
+                        if pick == 0:
+                            self._apply(agent, source, tile, line)
+                            return
+                        pick -= 1
+
+    def _play_heavy_move(self, agent: int):
+        """Play the move with the best immediate heuristic value (random tie-break)."""
+        self._compute_legal_lines(agent)
+        legal_lines = self.legal_lines
+        lines_number = self.lines_number[agent]
+        floor = self.floors[agent]
+
+        best_value = None
+        best_source = best_tile = best_line = 0
+        ties = 0
+
+        for source in range(-1, self._num_factories):
+            counts = self.centre if source < 0 else self.factories[source]
+            token = 1 if source < 0 and not self.first_agent_taken else 0
+            for tile in range(NUM_TILE_TYPES):
+                count = counts[tile]
+                if not count:
+                    continue
+                mask = legal_lines[tile]
+                for line in range(-1, GRID_SIZE):
+                    if line >= 0:
+                        if not mask & (1 << line):
+                            continue
+                        free = line + 1 - lines_number[line]
+                        placed = count if count < free else free
+                        value = placed + (line + 1 if placed == free else 0)
+                    else:
+                        placed = 0
+                        value = 0
+
+                    # Penalty for the tiles (and token) that land on the floor
+                    slot = floor
+                    for _ in range(count - placed + token):
+                        if slot >= FLOOR_SIZE:
+                            break
+                        value += FLOOR_SCORES[slot]
+                        slot += 1
+
+                    if best_value is None or value > best_value:
+                        best_value = value
+                        best_source, best_tile, best_line = source, tile, line
+                        ties = 1
+                    elif value == best_value:
+                        ties += 1
+                        if self.rng.randrange(ties) == 0:
+                            best_source, best_tile, best_line = source, tile, line
+
+        self._apply(agent, best_source, best_tile, best_line)
+
+    def _apply(self, agent: int, source: int, tile: int, line: int):
+        """Take all tiles of one colour from a source and place them for agent."""
+        if source < 0:
+            count = self.centre[tile]
+            self.centre[tile] = 0
+            self.centre_total -= count
+            if not self.first_agent_taken:
+                self.first_agent_taken = True
+                self.next_first_agent = agent
+                if self.floors[agent] < FLOOR_SIZE:
+                    self.floors[agent] += 1
+        else:
+            counts = self.factories[source]
+            count = counts[tile]
+            counts[tile] = 0
+            for other in range(NUM_TILE_TYPES):
+                n = counts[other]
+                if n:
+                    self.centre[other] += n
+                    self.centre_total += n
+                    counts[other] = 0
+            self.factory_totals[source] = 0
+
+        rest = count
+        if line >= 0:
+            lines_number = self.lines_number[agent]
+            free = line + 1 - lines_number[line]
+            placed = count if count < free else free
+            lines_number[line] += placed
+            self.lines_tile[agent][line] = tile
+            rest -= placed
+
+        if rest:
+            # Floor tiles (and overflow) all end up in the used bag
+            self.floors[agent] = min(FLOOR_SIZE, self.floors[agent] + rest)
+            self.used[tile] += rest
+            self.used_total += rest
+
+        if self.record_moves:
+            self._record_move(agent, source, tile, line, count - rest, rest)
+
+    def _record_move(self, agent: int, source: int, tile: int, line: int,
+                     num_to_pattern_line: int, num_to_floor_line: int):
+        """Store the packed move key (same layout as FastMove.bit_mask)."""
+        action_type = ACTION_TAKE_FROM_CENTRE if source < 0 else ACTION_TAKE_FROM_FACTORY
+        key = ((action_type & 0x3) << 18 |
+               ((source + 1) & 0xF) << 14 |
+               (tile & 0x7) << 11 |
+               ((line + 1) & 0x7) << 8 |
+               (num_to_pattern_line & 0xF) << 4 |
+               (num_to_floor_line & 0xF))
+
+        index = self.num_played
+        if index == len(self.played_moves):
+            self.played_moves.extend([0] * index)
+            self.played_agents.extend([0] * index)
+        self.played_moves[index] = key
+        self.played_agents[index] = agent
+        self.num_played = index + 1
+
+    def _score_round(self):
+        """Move full pattern lines to the walls and apply floor penalties."""
+        for a in range(self._num_agents):
+            lines_number = self.lines_number[a]
+            lines_tile = self.lines_tile[a]
+            wall = self.walls[a]
+            gain = 0
+
+            for line in range(GRID_SIZE):
+                if lines_number[line] != line + 1:
+                    continue
+                tile = lines_tile[line]
+                col = WALL_COLUMN[line][tile]
+
+                self.used[tile] += line
+                self.used_total += line
+                lines_number[line] = 0
+                lines_tile[line] = -1
+
+                base = line * GRID_SIZE
+                wall[base + col] = 1
+
+                horizontal = 0
+                c = col - 1
+                while c >= 0 and wall[base + c]:
+                    horizontal += 1
+                    c -= 1
+                c = col + 1
+                while c < GRID_SIZE and wall[base + c]:
+                    horizontal += 1
+                    c += 1
+                vertical = 0
+                r = line - 1
+                while r >= 0 and wall[r * GRID_SIZE + col]:
+                    vertical += 1
+                    r -= 1
+                r = line + 1
+                while r < GRID_SIZE and wall[r * GRID_SIZE + col]:
+                    vertical += 1
+                    r += 1
+
+                if horizontal:
+                    gain += 1 + horizontal
+                if vertical:
+                    gain += 1 + vertical
+                if not horizontal and not vertical:
+                    gain += 1
+
+            for slot in range(self.floors[a]):
+                gain += FLOOR_SCORES[slot]
+            self.floors[a] = 0
+
+            # Agents cannot be assigned a negative score in any round
+            if gain < 0 and self.scores[a] < -gain:
+                gain = -self.scores[a]
+            self.scores[a] += gain
+
+    def _game_over(self) -> bool:
+        """Check whether any agent has completed a wall row."""
+        for wall in self.walls:
+            for line in range(GRID_SIZE):
+                base = line * GRID_SIZE
+                if (wall[base] and wall[base + 1] and wall[base + 2]
+                        and wall[base + 3] and wall[base + 4]):
+                    return True
+        return False
+
+    def _score_end_of_game(self):
+        """Add row, column and colour-set bonuses."""
+        for a in range(self._num_agents):
+            wall = self.walls[a]
+            bonus = 0
+            for i in range(GRID_SIZE):
+                row = 0
+                col = 0
+                colour = 0
+                for j in range(GRID_SIZE):
+                    row += wall[i * GRID_SIZE + j]
+                    col += wall[j * GRID_SIZE + i]
+                    colour += wall[j * GRID_SIZE + WALL_COLUMN[j][i]]
+                if row == GRID_SIZE:
+                    bonus += ROW_BONUS
+                if col == GRID_SIZE:
+                    bonus += COL_BONUS
+                if colour == GRID_SIZE:
+                    bonus += SET_BONUS
+            self.scores[a] += bonus
+
+    def _refill(self):
+        """Deal a new round onto the factories from the bag counts."""
+        for tile in range(NUM_TILE_TYPES):
+            self.centre[tile] = 0
+        self.centre_total = 0
+        self.first_agent_taken = False
+
+        for f in range(self._num_factories):
+            counts = self.factories[f]
+            if self.bag_total < NUM_ON_FACTORY and self.used_total > 0:
+                for tile in range(NUM_TILE_TYPES):
+                    self.bag[tile] += self.used[tile]
+                    self.used[tile] = 0
+                self.bag_total += self.used_total
+                self.used_total = 0
+
+            drawn = 0
+            while drawn < NUM_ON_FACTORY and self.bag_total > 0:
+                pick = self.rng.randrange(self.bag_total)
+                tile = 0
+                while pick >= self.bag[tile]:
+                    pick -= self.bag[tile]
+                    tile += 1
+                self.bag[tile] -= 1
+                self.bag_total -= 1
+                counts[tile] += 1
+                drawn += 1
+            self.factory_totals[f] = drawn
+
+    def get_scores(self) -> List[int]:
+        """Scores of all agents after the most recent rollout."""
+        return list(self.scores[:self._num_agents])
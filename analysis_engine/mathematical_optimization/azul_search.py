@@ -3,6 +3,11 @@ Azul Alpha-Beta Search - A5 Implementation with A8 Endgame Integration
 
 This module provides alpha-beta search for Azul with:
 - Iterative deepening with transposition tables
+- Multi-PV root search scoring every root move in one pass
+- Per-depth progress callbacks and cooperative stop for streaming clients
+- Paranoid alpha-beta and max-n with shallow pruning for 3- and 4-player games
+- Optional chance nodes averaging the next round over K sampled deals
+- Incremental leaf evaluation from terms updated per move
 - Move ordering heuristics (wall-completion >> penalty-free >> others)
 - Performance target: depth-3 < 4s
 - Integration with existing evaluator and move generator
@@ -11,14 +16,21 @@ This module provides alpha-beta search for Azul with:
 
 import time
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from core import azul_utils as utils
 from core.azul_model import AzulState, AzulGameRule
-from .azul_evaluator import AzulEvaluator
+from .azul_evaluator import AzulEvaluator, EvaluatorWeights
 from .azul_move_generator import FastMoveGenerator, FastMove
+from .azul_chance import ChanceSampler
 from analysis_engine.strategic_analysis.azul_endgame import EndgameDatabase
 
+# Search modes for games with more than two players
+MULTIPLAYER_MODES = ('paranoid', 'maxn')
+
+# Score difference (in points) that makes a max-n share e times larger
+MAXN_SCORE_SCALE = 10.0
+
 
 @dataclass
 class SearchResult:
@@ -33,6 +45,32 @@ class SearchResult:
     beta: float
 
 
+@dataclass
+class RootMoveScore:
+    """Score of one root move from a multi-PV search."""
+    move: FastMove
+    score: float
+    bound: str  # EXACT or UPPER_BOUND (searched with a raised alpha and failed low)
+    principal_variation: List[FastMove]
+
+
+@dataclass
+class MultiPVResult:
+    """Result of a multi-PV search, with root moves sorted best first."""
+    move_scores: List[RootMoveScore]
+    nodes_searched: int
+    search_time: float
+    depth_reached: int
+    
+    @property
+    def best_move(self) -> Optional[FastMove]:
+        return self.move_scores[0].move if self.move_scores else None
+    
+    @property
+    def best_score(self) -> float:
+        return self.move_scores[0].score if self.move_scores else float('-inf')
+
+
 class TranspositionTable:
     """Transposition table for caching search results."""
     
@@ -43,17 +81,32 @@ class TranspositionTable:
         self.misses = 0
     
     def get(self, hash_key: int, depth: int, alpha: float, beta: float) -> Optional[Tuple[float, FastMove]]:
-        """Get cached result if available and valid."""
+        """Get cached result if available and valid for the (alpha, beta) window."""
         if hash_key in self.table:
             entry = self.table[hash_key]
             if entry['depth'] >= depth:
+                node_type = entry['node_type']
+                score = entry['score']
+                if (node_type == 'EXACT'
+                        or (node_type == 'LOWER_BOUND' and score >= beta)
+                        or (node_type == 'UPPER_BOUND' and score <= alpha)):
+                    self.hits += 1
+                    return score, entry['best_move']
+        self.misses += 1
+        return None
+    
+    def get_scores(self, hash_key: int, depth: int) -> Optional[Tuple[float, Tuple[float, ...], FastMove]]:
+        """Get a cached max-n result: (score, per-player scores, best move)."""
+        if hash_key in self.table:
+            entry = self.table[hash_key]
+            if entry['depth'] >= depth and entry['scores'] is not None:
                 self.hits += 1
-                return entry['score'], entry['best_move']
+                return entry['score'], entry['scores'], entry['best_move']
         self.misses += 1
         return None
     
     def put(self, hash_key: int, depth: int, score: float, best_move: FastMove, 
-            alpha: float, beta: float, node_type: str):
+            alpha: float, beta: float, node_type: str, scores: Optional[Tuple[float, ...]] = None):
         """Store search result in transposition table."""
         if len(self.table) >= self.max_size:
             # Simple replacement: remove oldest entry
@@ -66,7 +119,8 @@ class TranspositionTable:
             'best_move': best_move,
             'alpha': alpha,
             'beta': beta,
-            'node_type': node_type  # EXACT, LOWER_BOUND, UPPER_BOUND
+            'node_type': node_type,  # EXACT, LOWER_BOUND, UPPER_BOUND
+            'scores': scores  # Per-player scores of max-n nodes
         }
     
     def clear(self):
@@ -95,26 +149,59 @@ class AzulAlphaBetaSearch:
     - Move ordering heuristics
     - Time management
     - Performance monitoring
+    
+    With more than two players, multiplayer_mode selects paranoid search
+    (every other agent minimizes the root agent's score) or max-n (every
+    agent maximizes its own share of per-player scores).
+    
+    With chance_samples > 0, a position whose round is over is scored and
+    valued as the average over chance_samples sampled deals of the next
+    round (one ply of depth), instead of being treated as terminal.
+    
+    With incremental_eval, each searched state carries its evaluation terms,
+    updated from its parent's for the one pattern line and floor the move
+    changed; check_incremental compares every such leaf score with a full
+    evaluation.
+    
+    Leaf evaluations are cached by the evaluator under the transposition
+    key (eval_cache_size entries, 0 disables the cache). evaluator_weights
+    overrides the evaluator's default weights (see load_evaluator_weights).
     """
     
-    def __init__(self, max_depth: int = 10, max_time: float = 4.0, use_endgame: bool = True):
+    def __init__(self, max_depth: int = 10, max_time: float = 4.0, use_endgame: bool = True,
+                 tablebase_path: Optional[str] = None, multiplayer_mode: str = 'paranoid',
+                 chance_samples: int = 0, chance_seed: int = 0,
+                 incremental_eval: bool = True, check_incremental: bool = False,
+                 eval_cache_size: int = 1 << 16, evaluator_weights: Optional[EvaluatorWeights] = None):
+        if multiplayer_mode not in MULTIPLAYER_MODES:
+            raise ValueError(f"multiplayer_mode must be one of {MULTIPLAYER_MODES}")
+        
         self.max_depth = max_depth
         self.max_time = max_time
         self.use_endgame = use_endgame
-        self.evaluator = AzulEvaluator()
+        self.multiplayer_mode = multiplayer_mode
+        self.incremental_eval = incremental_eval
+        self.evaluator = AzulEvaluator(check_incremental=check_incremental, cache_size=eval_cache_size,
+                                       weights=evaluator_weights)
         self.move_generator = FastMoveGenerator()
         self.transposition_table = TranspositionTable()
-        self.endgame_database = EndgameDatabase(max_tiles=10) if use_endgame else None
+        self.endgame_database = EndgameDatabase(max_tiles=10, tablebase_path=tablebase_path) if use_endgame else None
+        self.chance_sampler = ChanceSampler(chance_samples, seed=chance_seed) if chance_samples > 0 else None
         # Don't initialize game_rules here - we'll create it when needed
         
+        # Agent the search is run for; leaf scores are from its perspective
+        self.root_agent = 0
+        
         # Search statistics
         self.nodes_searched = 0
         self.search_start_time = 0
+        self.stop_requested = False
         self.killer_moves: List[List[FastMove]] = [[] for _ in range(max_depth)]
         self.history_table: Dict[Tuple[int, int], int] = {}  # (move_hash, depth) -> count
     
     def search(self, state: AzulState, agent_id: int, max_depth: Optional[int] = None, 
-               max_time: Optional[float] = None) -> SearchResult:
+               max_time: Optional[float] = None,
+               progress: Optional[Callable[[SearchResult], bool]] = None) -> SearchResult:
         """
         Perform iterative deepening alpha-beta search.
         
@@ -123,6 +210,8 @@ class AzulAlphaBetaSearch:
             agent_id: Agent to search for
             max_depth: Maximum search depth (overrides instance default)
             max_time: Maximum search time in seconds (overrides instance default)
+            progress: Called with the result of each completed depth; the
+                search stops early if it returns False
             
         Returns:
             SearchResult with best move and principal variation
@@ -136,7 +225,12 @@ class AzulAlphaBetaSearch:
         self.nodes_searched = 0
         self.search_start_time = time.time()
         self.max_time = max_time  # Update the instance max_time
+        self.root_agent = agent_id
+        self.stop_requested = False
         self.transposition_table.clear()
+        if self.incremental_eval:
+            # The caller may have changed the root in place since it was last searched
+            self.evaluator.attach_terms(state)
         
         # Initialize result
         best_move = None
@@ -147,11 +241,14 @@ class AzulAlphaBetaSearch:
         # Iterative deepening
         for depth in range(1, max_depth + 1):
             # Check time limit
-            if time.time() - self.search_start_time > max_time:
+            if self._should_stop():
                 break
             
             # Perform search at current depth
-            result = self._alpha_beta_search(state, agent_id, depth, float('-inf'), float('inf'), True)
+            if self.multiplayer_mode == 'maxn' and len(state.agents) > 2:
+                result = self._maxn_search(state, agent_id, depth, None, float('-inf'))
+            else:
+                result = self._alpha_beta_search(state, agent_id, depth, float('-inf'), float('inf'), True)
             
             if result is not None:
                 best_move = result['best_move']
@@ -159,6 +256,17 @@ class AzulAlphaBetaSearch:
                 principal_variation = result['pv']
                 depth_reached = depth
                 
+                if progress is not None and progress(SearchResult(
+                        best_move=best_move,
+                        best_score=best_score,
+                        principal_variation=principal_variation,
+                        nodes_searched=self.nodes_searched,
+                        search_time=time.time() - self.search_start_time,
+                        depth_reached=depth_reached,
+                        alpha=float('-inf'),
+                        beta=float('inf'))) is False:
+                    break
+                
                 # Early termination if we found a winning move
                 if best_score > 1000:
                     break
@@ -179,6 +287,115 @@ class AzulAlphaBetaSearch:
             beta=float('inf')
         )
     
+    def search_multipv(self, state: AzulState, agent_id: int, num_pv: Optional[int] = None,
+                       score_margin: Optional[float] = None, max_depth: Optional[int] = None,
+                       max_time: Optional[float] = None,
+                       root_moves: Optional[List[FastMove]] = None) -> MultiPVResult:
+        """
+        Score every root move (or the top num_pv) with one iterative-deepening search.
+        
+        Root moves share the transposition table, so the subtrees they have in
+        common are searched once. Each iteration searches moves in the order of
+        the previous iteration's scores. With num_pv set, moves outside the
+        current top num_pv are searched with alpha raised to the num_pv-th best
+        score; with score_margin set, alpha is at least the best score minus
+        the margin. Moves that fail low get an UPPER_BOUND score. With more
+        than two players the root moves are always scored by paranoid search.
+        
+        Args:
+            state: Current game state
+            agent_id: Agent to search for
+            num_pv: Number of exactly scored moves (None scores all moves exactly)
+            score_margin: Only score moves within this margin of the best exactly
+            max_depth: Maximum search depth (overrides instance default)
+            max_time: Maximum search time in seconds (overrides instance default)
+            root_moves: Only search these root moves (None searches every legal move)
+            
+        Returns:
+            MultiPVResult with root moves sorted best first
+        """
+        if max_depth is None:
+            max_depth = self.max_depth
+        if max_time is None:
+            max_time = self.max_time
+        
+        self.nodes_searched = 0
+        self.search_start_time = time.time()
+        self.max_time = max_time
+        self.root_agent = agent_id
+        self.stop_requested = False
+        self.transposition_table.clear()
+        if self.incremental_eval:
+            # The caller may have changed the root in place since it was last searched
+            self.evaluator.attach_terms(state)
+        
+        moves = self.move_generator.generate_moves_fast(state, agent_id)
+        if root_moves is not None:
+            allowed = {move.bit_mask for move in root_moves}
+            moves = [move for move in moves if move.bit_mask in allowed]
+        searched = []
+        for move in self._order_moves(state, agent_id, moves, 0):
+            new_state = self._apply_move(state, move, agent_id)
+            if new_state is not None:
+                searched.append((move, new_state))
+        
+        move_scores: List[RootMoveScore] = []
+        depth_reached = 0
+        
+        for depth in range(1, max_depth + 1):
+            if self._should_stop():
+                break
+            
+            iteration = self._search_root_moves(searched, depth, num_pv, score_margin)
+            if iteration is None:
+                break
+            
+            move_scores = iteration
+            depth_reached = depth
+            
+            # Search the next iteration in this iteration's order
+            order = {id(entry.move): i for i, entry in enumerate(move_scores)}
+            searched.sort(key=lambda item: order[id(item[0])])
+        
+        return MultiPVResult(
+            move_scores=move_scores,
+            nodes_searched=self.nodes_searched,
+            search_time=time.time() - self.search_start_time,
+            depth_reached=depth_reached
+        )
+    
+    def _search_root_moves(self, root_moves: List[Tuple[FastMove, AzulState]],
+                           depth: int, num_pv: Optional[int],
+                           score_margin: Optional[float]) -> Optional[List[RootMoveScore]]:
+        """Search all root moves at one depth. Returns None if the time limit is exceeded."""
+        exact_scores: List[float] = []
+        move_scores: List[RootMoveScore] = []
+        
+        for move, new_state in root_moves:
+            alpha = float('-inf')
+            if num_pv is not None and len(exact_scores) >= num_pv:
+                alpha = sorted(exact_scores, reverse=True)[num_pv - 1]
+            if score_margin is not None and exact_scores:
+                alpha = max(alpha, max(exact_scores) - score_margin)
+            
+            next_agent = self._get_next_agent(self.root_agent, new_state)
+            result = self._alpha_beta_search(new_state, next_agent, depth - 1, alpha, float('inf'),
+                                             next_agent == self.root_agent)
+            if result is None:
+                return None
+            
+            score = result['score']
+            if score <= alpha:
+                bound = 'UPPER_BOUND'
+            else:
+                bound = 'EXACT'
+                exact_scores.append(score)
+            move_scores.append(RootMoveScore(move, score, bound, [move] + result['pv']))
+        
+        # Exact scores first; the stable sort keeps the previous order on ties
+        move_scores.sort(key=lambda entry: (entry.bound == 'EXACT', entry.score), reverse=True)
+        return move_scores
+    
     def _alpha_beta_search(self, state: AzulState, agent_id: int, depth: int, 
                           alpha: float, beta: float, is_maximizing: bool) -> Optional[Dict]:
         """
@@ -190,29 +407,35 @@ class AzulAlphaBetaSearch:
             depth: Remaining search depth
             alpha: Alpha value for pruning
             beta: Beta value for pruning
-            is_maximizing: True if maximizing player's turn
+            is_maximizing: True if the root agent is to move; every other
+                agent minimizes (paranoid search with more than two players)
             
         Returns:
             Dictionary with search result or None if time limit exceeded
         """
         # Check time limit
-        if time.time() - self.search_start_time > self.max_time:
+        if self._should_stop():
             return None
         
         # Check for game end (simplified)
         if self._is_game_end(state):
-            return self._evaluate_terminal_state(state, agent_id)
-        
-        # A8: Check for endgame database solution
-        if self.use_endgame and self.endgame_database and self.endgame_database.has_solution(state):
-            endgame_solution = self.endgame_database.get_solution(state)
-            if endgame_solution and endgame_solution.get('exact', False):
-                return {
-                    'best_move': endgame_solution['best_move'],
-                    'score': endgame_solution['score'],
-                    'pv': [endgame_solution['best_move']] if endgame_solution['best_move'] else [],
-                    'exact': True
-                }
+            return self._evaluate_terminal_state(state, self.root_agent)
+        
+        # A8: Check for endgame database solution (two-player margins only)
+        endgame_solution = None
+        if self.use_endgame and self.endgame_database and len(state.agents) == 2:
+            endgame_solution = self.endgame_database.get_solution(state, agent_id)
+        if endgame_solution is not None and endgame_solution.get('exact', False):
+            # Solutions are scored for the side to move
+            score = endgame_solution['score']
+            if agent_id != self.root_agent:
+                score = -score
+            return {
+                'best_move': endgame_solution['best_move'],
+                'score': score,
+                'pv': [endgame_solution['best_move']] if endgame_solution['best_move'] else [],
+                'exact': True
+            }
         
         # Check transposition table
         hash_key = state.get_zobrist_hash()
@@ -227,12 +450,14 @@ class AzulAlphaBetaSearch:
         
         # If we've reached the search depth limit, evaluate the position
         if depth == 0:
-            return self._evaluate_position(state, agent_id)
+            return self._evaluate_position(state, self.root_agent, hash_key)
         
         # Generate moves
         moves = self.move_generator.generate_moves_fast(state, agent_id)
         if not moves:
-            return self._evaluate_terminal_state(state, agent_id)
+            if self.chance_sampler is not None:
+                return self._chance_search(state, depth)
+            return self._evaluate_terminal_state(state, self.root_agent)
         
         # Order moves for better pruning
         ordered_moves = self._order_moves(state, agent_id, moves, depth)
@@ -240,12 +465,13 @@ class AzulAlphaBetaSearch:
         best_move = None
         best_score = float('-inf') if is_maximizing else float('inf')
         principal_variation = []
+        alpha_orig, beta_orig = alpha, beta
         
         # Search each move
         valid_moves_searched = 0
         for move in ordered_moves:
             # Check time limit more frequently
-            if time.time() - self.search_start_time > self.max_time:
+            if self._should_stop():
                 return None
             
             # Apply move
@@ -256,13 +482,14 @@ class AzulAlphaBetaSearch:
             valid_moves_searched += 1
             
             # Recursive search
+            next_agent = self._get_next_agent(agent_id, new_state)
             result = self._alpha_beta_search(
                 new_state, 
-                self._get_next_agent(agent_id, state), 
+                next_agent, 
                 depth - 1, 
                 alpha, 
                 beta, 
-                not is_maximizing
+                next_agent == self.root_agent
             )
             
             if result is None:  # Time limit exceeded
@@ -296,19 +523,19 @@ class AzulAlphaBetaSearch:
         
         # If no valid moves were found, evaluate the current position
         if valid_moves_searched == 0:
-            return self._evaluate_position(state, agent_id)
+            return self._evaluate_position(state, self.root_agent, hash_key)
         
         # Update node count
         self.nodes_searched += 1
         
         # Store in transposition table
         node_type = 'EXACT'
-        if best_score <= alpha:
+        if best_score <= alpha_orig:
             node_type = 'UPPER_BOUND'
-        elif best_score >= beta:
+        elif best_score >= beta_orig:
             node_type = 'LOWER_BOUND'
         
-        self.transposition_table.put(hash_key, depth, best_score, best_move, alpha, beta, node_type)
+        self.transposition_table.put(hash_key, depth, best_score, best_move, alpha_orig, beta_orig, node_type)
         
         return {
             'score': best_score,
@@ -316,6 +543,176 @@ class AzulAlphaBetaSearch:
             'pv': principal_variation
         }
     
+    def _maxn_search(self, state: AzulState, agent_id: int, depth: int,
+                     parent_agent: Optional[int], parent_bound: float) -> Optional[Dict]:
+        """
+        Recursive max-n search for games with more than two players.
+        
+        Every node gets a vector of per-player scores and the agent to move
+        picks the child with the largest share for itself (see _maxn_shares).
+        Shares are positive and sum to one, so once the agent to move is sure
+        of more than 1 - parent_bound, the parent agent, already holding
+        parent_bound elsewhere, will never choose this node (shallow pruning).
+        
+        Args:
+            state: Current game state
+            agent_id: Agent to move
+            depth: Remaining search depth
+            parent_agent: Agent that moved into this node (None at the root)
+            parent_bound: Best share parent_agent has found among earlier siblings
+            
+        Returns:
+            Dictionary with search result or None if time limit exceeded.
+            'scores' holds the per-player scores, 'score' the root agent's
+            margin over the best opponent and 'cutoff' marks pruned nodes.
+        """
+        if self._should_stop():
+            return None
+        
+        if self._is_game_end(state):
+            return self._evaluate_terminal_vector(state)
+        
+        hash_key = state.get_zobrist_hash()
+        tt_result = self.transposition_table.get_scores(hash_key, depth)
+        if tt_result is not None:
+            score, scores, best_move = tt_result
+            return {
+                'score': score,
+                'scores': scores,
+                'best_move': best_move,
+                'pv': [best_move] if best_move else []
+            }
+        
+        if depth == 0:
+            return self._evaluate_vector(state, hash_key)
+        
+        # No moves means the round is over, not the game; round scoring is in the evaluator
+        moves = self.move_generator.generate_moves_fast(state, agent_id)
+        if not moves:
+            if self.chance_sampler is not None:
+                return self._chance_search(state, depth)
+            return self._evaluate_vector(state, hash_key)
+        
+        best = None
+        best_share = float('-inf')
+        cutoff = False
+        
+        for move in self._order_moves(state, agent_id, moves, depth):
+            if self._should_stop():
+                return None
+            
+            new_state = self._apply_move(state, move, agent_id)
+            if new_state is None:
+                continue
+            
+            result = self._maxn_search(new_state, self._get_next_agent(agent_id, new_state),
+                                       depth - 1, agent_id, best_share)
+            if result is None:
+                return None
+            if result.get('cutoff'):
+                # Pruned children are worth at most best_share to this agent
+                continue
+            
+            share = self._maxn_shares(result['scores'])[agent_id]
+            if share > best_share:
+                best_share = share
+                best = {
+                    'score': result['score'],
+                    'scores': result['scores'],
+                    'best_move': move,
+                    'pv': [move] + result['pv']
+                }
+            
+            if parent_agent is not None and parent_agent != agent_id and best_share >= 1.0 - parent_bound:
+                cutoff = True
+                break
+        
+        if best is None:
+            return self._evaluate_vector(state, hash_key)
+        
+        self.nodes_searched += 1
+        
+        if cutoff:
+            best['cutoff'] = True
+        else:
+            self.transposition_table.put(hash_key, depth, best['score'], best['best_move'],
+                                         float('-inf'), float('inf'), 'EXACT', scores=best['scores'])
+        return best
+    
+    def _chance_search(self, state: AzulState, depth: int) -> Optional[Dict]:
+        """
+        Expectimax chance node at a round boundary.
+        
+        The round is scored and the next round is searched once per sampled
+        deal, opened by the first-player token holder. The sampler caches deals
+        by bag composition, so sibling boundaries share the same samples.
+        Deals are searched with a full window, so the average is exact.
+        """
+        maxn = self.multiplayer_mode == 'maxn' and len(state.agents) > 2
+        scored, children = self.chance_sampler.next_round_states(state)
+        if not children:
+            if maxn:
+                return self._evaluate_terminal_vector(scored)
+            return self._evaluate_terminal_state(scored, self.root_agent)
+        
+        results = []
+        for child in children:
+            if maxn:
+                result = self._maxn_search(child, child.first_agent, depth - 1, None, float('-inf'))
+            else:
+                result = self._alpha_beta_search(child, child.first_agent, depth - 1, float('-inf'), float('inf'),
+                                                 child.first_agent == self.root_agent)
+            if result is None:
+                return None
+            results.append(result)
+        
+        if maxn:
+            return self._score_vector_result(tuple(
+                sum(scores) / len(results) for scores in zip(*(result['scores'] for result in results))
+            ))
+        return {
+            'score': sum(result['score'] for result in results) / len(results),
+            'best_move': None,
+            'pv': []
+        }
+    
+    @staticmethod
+    def _maxn_shares(scores: Tuple[float, ...]) -> List[float]:
+        """Turn per-player scores into positive shares summing to one (a softmax)."""
+        top = max(scores)
+        weights = [np.exp((score - top) / MAXN_SCORE_SCALE) for score in scores]
+        total = sum(weights)
+        return [weight / total for weight in weights]
+    
+    def _score_vector_result(self, scores: Tuple[float, ...]) -> Dict:
+        """Wrap per-player scores as a max-n leaf result."""
+        opponent_score = max(scores[i] for i in range(len(scores)) if i != self.root_agent)
+        return {
+            'score': scores[self.root_agent] - opponent_score,
+            'scores': scores,
+            'best_move': None,
+            'pv': []
+        }
+    
+    def _evaluate_vector(self, state: AzulState, hash_key: Optional[int] = None) -> Dict:
+        """Evaluate a non-terminal position for every agent."""
+        num_agents = len(state.agents)
+        if self.incremental_eval:
+            return self._score_vector_result(tuple(
+                self.evaluator.evaluate_incremental(state, i, hash_key) for i in range(num_agents)
+            ))
+        return self._score_vector_result(tuple(
+            self.evaluator.evaluate_positions([state] * num_agents, range(num_agents)).tolist()
+        ))
+    
+    def _evaluate_terminal_vector(self, state: AzulState) -> Dict:
+        """Evaluate a terminal state with every agent's final score."""
+        scores = []
+        for agent in state.agents:
+            agent.EndOfGameScore()
+            scores.append(float(agent.score))
+        return self._score_vector_result(tuple(scores))
+    
     def _evaluate_terminal_state(self, state: AzulState, agent_id: int) -> Dict:
         """Evaluate terminal state (game end)."""
         # Calculate final scores
@@ -343,9 +740,17 @@ class AzulAlphaBetaSearch:
                 return True
         return False
     
-    def _evaluate_position(self, state: AzulState, agent_id: int) -> Dict:
-        """Evaluate a non-terminal position using the heuristic evaluator."""
-        score = self.evaluator.evaluate_position(state, agent_id)
+    def _evaluate_position(self, state: AzulState, agent_id: int, hash_key: Optional[int] = None) -> Dict:
+        """
+        Evaluate a non-terminal position using the heuristic evaluator.
+        
+        hash_key is the transposition key already computed for state; it is
+        what lets the evaluator's cache be used without hashing again.
+        """
+        if self.incremental_eval:
+            score = self.evaluator.evaluate_incremental(state, agent_id, hash_key)
+        else:
+            score = self.evaluator.evaluate_position(state, agent_id, hash_key)
         return {
             'score': score,
             'best_move': None,
@@ -416,14 +821,32 @@ class AzulAlphaBetaSearch:
             game_rules = AzulGameRule(len(state.agents))
             game_rules.generateSuccessor(new_state, action, agent_id)
             
+            if self.incremental_eval:
+                self.evaluator.advance_terms(state, new_state, agent_id, move.pattern_line_dest)
+            
             return new_state
         except Exception as e:
             # Move was invalid, skip it
             return None
     
+    def stop(self):
+        """Ask a running search to stop; safe to call from another thread."""
+        self.stop_requested = True
+    
+    def _should_stop(self) -> bool:
+        """Check the time limit and for an outside stop request."""
+        return self.stop_requested or time.time() - self.search_start_time > self.max_time
+    
     def _get_next_agent(self, current_agent: int, state: AzulState) -> int:
-        """Get the next agent to play."""
-        # Simple round-robin for now
+        """
+        Get the agent to move after current_agent, as AzulGameRule.getNextAgentIndex does.
+        
+        state is the position after current_agent's move. If that move took the
+        last tiles, the round ends and the next round is opened by the agent
+        holding the first-player token.
+        """
+        if not state.TilesRemaining():
+            return state.next_first_agent if state.next_first_agent >= 0 else state.first_agent
         return (current_agent + 1) % len(state.agents)
     
     def get_search_stats(self) -> Dict[str, Any]:
@@ -436,7 +859,10 @@ class AzulAlphaBetaSearch:
             'nodes_per_second': self.nodes_searched / max(0.001, time.time() - self.search_start_time),
             'transposition_table': tt_stats,
             'killer_moves': [len(killers) for killers in self.killer_moves],
-            'history_table_size': len(self.history_table)
+            'history_table_size': len(self.history_table),
+            'chance_cache': self.chance_sampler.get_stats() if self.chance_sampler else None,
+            'incremental_eval': self.evaluator.get_incremental_stats() if self.incremental_eval else None,
+            'eval_cache': self.evaluator.get_cache_stats()
         }
     
     def clear_search_stats(self):
@@ -461,7 +887,11 @@ class AzulAlphaBetaSearch:
         if not self.use_endgame or not self.endgame_database:
             return None
         
-        return self.endgame_database.analyze_endgame(state, max_depth=10)
+        solution = self.endgame_database.solve_round(state, agent_id)
+        if solution is not None:
+            return solution
+        
+        return self.endgame_database.analyze_endgame(state, max_depth=10, agent_id=agent_id)
     
     def get_endgame_stats(self) -> Dict:
         """Get endgame database statistics."""
@@ -0,0 +1,336 @@
+"""
+Azul Evaluator Weight Tuning
+
+This module tunes AzulEvaluator's weights against stored move-quality analyses:
+- Labelled (position, move, quality) rows are loaded once from the move
+  quality databases into NumPy feature matrices
+- The evaluator's score is linear in its weights, so every candidate weight
+  vector scores all positions with one matrix product
+- Texel-style tuning: the logistic scale is fitted to the current weights,
+  then coordinate descent evaluates all of a step's candidate vectors at
+  once, split across worker processes
+
+The result is written with save_evaluator_weights, where AzulEvaluator
+picks it up at startup.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import azul_utils as utils
+from core.azul_model import AzulState, AzulGameRule
+from .azul_evaluator import EvaluationBatch, EvaluatorWeights
+from .azul_notation import parse_stored_move, state_from_fen
+
+
+DEFAULT_TUNING_DATABASES = (
+    "move_quality_analysis/data/simple_move_quality.db",
+    "move_quality_analysis/data/parallel_analysis_results.db",
+    "data/simple_move_quality.db",
+    "data/comprehensive_move_quality.db",
+)
+
+LABEL_COLUMNS = ('position_fen', 'move_data', 'quality_score')
+QUALITY_SCALE = 100.0  # quality_score runs from 0 to 100
+CANDIDATE_CHUNK = 256  # Candidate vectors scored per matrix product
+
+
+@dataclass
+class TuningSet:
+    """Labelled moves as a feature matrix."""
+    features: np.ndarray  # (N, NUM_WEIGHTS) change in the mover's features made by each move
+    labels: np.ndarray    # (N,) move quality in [0, 1]
+    sources: Dict[str, int] = field(default_factory=dict)  # Rows used per database table
+    skipped: int = 0      # Rows without a parseable position or legal move
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+@dataclass
+class TuningResult:
+    """Outcome of a tuning run."""
+    weights: EvaluatorWeights
+    scale: float           # Logistic scale K fitted to the initial weights
+    bias: float            # Logistic bias fitted with the scale
+    initial_error: float
+    final_error: float
+    iterations: int        # Accepted steps
+    candidates: int        # Candidate weight vectors evaluated
+    positions: int
+    tuning_time: float
+
+
+def position_features(batch: EvaluationBatch) -> np.ndarray:
+    """
+    Features of each position such that the evaluation is features @ weights.to_vector().
+
+    Columns follow EvaluatorWeights.to_vector: one per pattern line bonus
+    (full line plus half the fill ratio), one per floor slot (occupied plus
+    estimated), then completed rows, columns and colour sets.
+    """
+    count = len(batch)
+    features = np.zeros((count, EvaluatorWeights.NUM_WEIGHTS), dtype=np.float64)
+
+    lines = batch.lines_number
+    sizes = np.arange(1, 6)
+    features[:, :5] = (lines == sizes) + np.where(lines > 0, lines / sizes * 0.5, 0.0)
+
+    floor = batch.floor_count[:, None]
+    slots = np.arange(7)
+    estimated_end = floor + np.minimum(2, 7 - floor)
+    occupied = slots < floor
+    estimated = (floor > 0) & (slots >= floor) & (slots < estimated_end)
+    features[:, 5:12] = occupied.astype(np.float64) + estimated
+
+    grid = batch.grid_state.astype(bool)
+    features[:, 12] = grid.all(axis=2).sum(axis=1)
+    features[:, 13] = grid.all(axis=1).sum(axis=1)
+    features[:, 14] = (batch.tile_counts >= 5).sum(axis=1)
+    return features
+
+
+def load_tuning_set(paths: Sequence[str] = DEFAULT_TUNING_DATABASES) -> TuningSet:
+    """
+    Load every labelled move from the given databases and JSON datasets.
+
+    Database tables with position_fen, move_data and quality_score columns
+    are read; JSON datasets are read from their "moves" list. Each labelled
+    move becomes the change in the mover's features between the position
+    and the position after the move. Duplicate (position, move) rows are
+    averaged.
+    """
+    rows: Dict[Tuple[str, str], List[float]] = {}
+    sources: Dict[str, int] = {}
+    skipped = 0
+
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        if path.endswith('.json'):
+            with open(path) as f:
+                entries = json.load(f).get('moves', [])
+            found = 0
+            for entry in entries:
+                if not entry.get('position_fen') or entry.get('quality_score') is None:
+                    skipped += 1
+                    continue
+                move_data = entry['move_data']
+                key = (entry['position_fen'], move_data if isinstance(move_data, str) else json.dumps(move_data))
+                rows.setdefault(key, []).append(float(entry['quality_score']))
+                found += 1
+            sources[path] = found
+            continue
+
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            for table in tables:
+                columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+                if not set(LABEL_COLUMNS) <= columns:
+                    continue
+                found = 0
+                for fen_string, move_data, quality in conn.execute(
+                        f'SELECT position_fen, move_data, quality_score FROM "{table}"'):
+                    if not fen_string or move_data is None or quality is None:
+                        skipped += 1
+                        continue
+                    rows.setdefault((fen_string, move_data), []).append(float(quality))
+                    found += 1
+                sources[f"{path}:{table}"] = found
+        finally:
+            conn.close()
+
+    game_rule = AzulGameRule(2)
+    states: Dict[str, Optional[AzulState]] = {}
+    parents, children, agent_ids, labels = [], [], [], []
+    for (fen_string, move_data), qualities in rows.items():
+        if fen_string not in states:
+            states[fen_string] = state_from_fen(fen_string)
+            if states[fen_string] is not None:
+                _key_tiles_by_type(states[fen_string])
+        state = states[fen_string]
+        agent_id = getattr(state, 'current_player', 0) if state is not None else 0
+        move = parse_stored_move(state, agent_id, move_data) if state is not None else None
+        if move is None:
+            skipped += len(qualities)
+            continue
+
+        action = move.to_tuple()
+        action[2].tile_type = utils.Tile(action[2].tile_type)
+        child = state.clone()
+        try:
+            game_rule.generateSuccessor(child, action, agent_id)
+        except (AssertionError, KeyError, TypeError, ValueError):
+            skipped += len(qualities)
+            continue
+        parents.append(state)
+        children.append(child)
+        agent_ids.append(agent_id)
+        labels.append(sum(qualities) / len(qualities) / QUALITY_SCALE)
+
+    if not labels:
+        return TuningSet(np.zeros((0, EvaluatorWeights.NUM_WEIGHTS)), np.zeros(0), sources, skipped)
+
+    features = (position_features(EvaluationBatch.from_states(children, agent_ids))
+                - position_features(EvaluationBatch.from_states(parents, agent_ids)))
+    return TuningSet(features, np.clip(np.array(labels), 0.0, 1.0), sources, skipped)
+
+
+def _key_tiles_by_type(state: AzulState):
+    """Re-key displays parsed from a FEN (keyed by int) by Tile, as the game rules expect."""
+    for display in state.factories + [state.centre_pool]:
+        display.tiles = {utils.Tile(tile): count for tile, count in display.tiles.items()}
+
+
+def candidate_errors(features: np.ndarray, labels: np.ndarray, scale: float, bias: float,
+                     candidates: np.ndarray) -> np.ndarray:
+    """Mean squared error of sigmoid(scale * evaluation + bias) against the labels, per candidate row."""
+    errors = np.empty(len(candidates), dtype=np.float64)
+    for start in range(0, len(candidates), CANDIDATE_CHUNK):
+        chunk = candidates[start:start + CANDIDATE_CHUNK]
+        # The logistic function, written with tanh so large inputs do not overflow
+        predictions = 0.5 + 0.5 * np.tanh(0.5 * (scale * (features @ chunk.T) + bias))
+        errors[start:start + len(chunk)] = ((predictions - labels[:, None]) ** 2).mean(axis=0)
+    return errors
+
+
+def fit_scale(features: np.ndarray, labels: np.ndarray, weights: np.ndarray) -> Tuple[float, float]:
+    """
+    The logistic scale K and bias that best fit the labels with fixed weights (Texel's first step).
+
+    Move quality labels are not centred on 0.5 like game results, hence the bias.
+    """
+    scales = np.logspace(-5, 1, 121)
+    best = (float('inf'), 1.0, 0.0)
+    for bias in np.linspace(-4.0, 4.0, 33):
+        # Scaling the weights by K is the same as scaling the sigmoid's input
+        errors = candidate_errors(features, labels, 1.0, bias, scales[:, None] * weights[None, :])
+        index = int(np.argmin(errors))
+        if errors[index] < best[0]:
+            best = (float(errors[index]), float(scales[index]), float(bias))
+    return best[1], best[2]
+
+
+# Tuning data of each worker process, sent once by the pool initializer
+_worker_data: Optional[Tuple[np.ndarray, np.ndarray, float, float]] = None
+
+
+def _init_worker(features: np.ndarray, labels: np.ndarray, scale: float, bias: float):
+    global _worker_data
+    _worker_data = (features, labels, scale, bias)
+
+
+def _worker_errors(candidates: np.ndarray) -> np.ndarray:
+    features, labels, scale, bias = _worker_data
+    return candidate_errors(features, labels, scale, bias, candidates)
+
+
+def tune_evaluator_weights(tuning_set: TuningSet, initial: Optional[EvaluatorWeights] = None,
+                           workers: int = 1, max_iterations: int = 500, initial_step: float = 1.0,
+                           min_step: float = 1.0 / 64, regularization: float = 1e-5,
+                           tunable: Optional[Sequence[int]] = None) -> TuningResult:
+    """
+    Tune evaluator weights by coordinate descent on the Texel error.
+
+    Each iteration scores every +/- step change of every tunable weight and
+    takes the best improvement; when none improves, the step is halved until
+    it drops below min_step. The error includes regularization times the
+    squared distance from the initial weights, which keeps weights the
+    labels say little about near their hand-set values.
+
+    Args:
+        tuning_set: Labelled moves from load_tuning_set
+        initial: Starting weights (default: hand-set weights)
+        workers: Processes scoring candidates (1 scores them in this process)
+        max_iterations: Maximum accepted steps
+        initial_step: First step size
+        min_step: Stop once the step is smaller than this
+        regularization: Weight of the squared distance from the initial weights
+        tunable: Indices (in EvaluatorWeights.to_vector order) to tune; default all
+
+    Returns:
+        TuningResult with the tuned weights
+    """
+    if len(tuning_set) == 0:
+        raise ValueError("No labelled positions to tune on")
+
+    start_time = time.time()
+    initial = initial or EvaluatorWeights()
+    prior = initial.to_vector()
+    weights = prior.copy()
+    features, labels = tuning_set.features, tuning_set.labels
+    scale, bias = fit_scale(features, labels, weights)
+    tunable = list(range(len(weights))) if tunable is None else list(tunable)
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(features, labels, scale, bias))
+
+    def score(candidates: np.ndarray) -> np.ndarray:
+        if executor is None:
+            errors = candidate_errors(features, labels, scale, bias, candidates)
+        else:
+            chunks = np.array_split(candidates, min(workers, len(candidates)))
+            errors = np.concatenate(list(executor.map(_worker_errors, chunks)))
+        return errors + regularization * ((candidates - prior) ** 2).sum(axis=1)
+
+    try:
+        initial_error = error = float(score(weights[None, :])[0])
+        step = initial_step
+        iterations = 0
+        evaluated = 1
+        while iterations < max_iterations and step >= min_step:
+            candidates = np.repeat(weights[None, :], 2 * len(tunable), axis=0)
+            for i, index in enumerate(tunable):
+                candidates[2 * i, index] += step
+                candidates[2 * i + 1, index] -= step
+            errors = score(candidates)
+            evaluated += len(candidates)
+
+            best = int(np.argmin(errors))
+            if errors[best] < error:
+                weights, error = candidates[best], float(errors[best])
+                iterations += 1
+            else:
+                step /= 2
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return TuningResult(
+        weights=EvaluatorWeights.from_vector(weights, version='tuned'),
+        scale=scale,
+        bias=bias,
+        initial_error=initial_error,
+        final_error=error,
+        iterations=iterations,
+        candidates=evaluated,
+        positions=len(tuning_set),
+        tuning_time=time.time() - start_time
+    )
+
+
+def tuning_metadata(result: TuningResult, tuning_set: TuningSet) -> Dict[str, Any]:
+    """Weights-file metadata describing a tuning run."""
+    return {
+        'method': 'texel_coordinate_descent',
+        'positions': result.positions,
+        'skipped': tuning_set.skipped,
+        'sources': tuning_set.sources,
+        'scale': result.scale,
+        'bias': result.bias,
+        'initial_error': result.initial_error,
+        'final_error': result.final_error,
+        'iterations': result.iterations,
+        'candidates': result.candidates,
+        'tuning_time': result.tuning_time
+    }
@@ -10,6 +10,7 @@ from .azul_risk_reward import RiskRewardAnalyzer
 from .azul_factory_control import FactoryControlDetector
 from .azul_endgame_counting import EndgameCountingDetector
 from .azul_endgame import EndgameDetector, EndgameDatabase
+from .azul_tablebase import EndgameTablebase, RoundEndSolver
 
 __all__ = [
     'StrategicPatternDetector',
@@ -19,5 +20,7 @@ __all__ = [
     'FactoryControlDetector',
     'EndgameCountingDetector',
     'EndgameDetector',
-    'EndgameDatabase'
+    'EndgameDatabase',
+    'EndgameTablebase',
+    'RoundEndSolver'
 ] 
\ No newline at end of file
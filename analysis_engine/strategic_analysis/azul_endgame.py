@@ -3,18 +3,23 @@ Azul Endgame Solver - A8 Implementation
 
 This module provides exact endgame solving for Azul with:
 - Retrograde analysis for small positions (≤ N tiles)
+- Exact end-of-round solving backed by a persistent on-disk tablebase
 - Symmetry hashing for equivalent positions
 - Integration with existing search algorithms
 - Performance target: exact solutions for endgame positions
 """
 
 import numpy as np
+import os
 import time
 from typing import Dict, List, Optional, Tuple, Set
 from dataclasses import dataclass
 from core import azul_utils as utils
 from core.azul_model import AzulState, AzulGameRule
 from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator, FastMove
+from .azul_tablebase import (
+    DEFAULT_TABLEBASE_PATH, EndgameTablebase, RoundEndSolver, canonical_move, load_tablebase, position_key, resolve_move
+)
 
 
 @dataclass
@@ -98,12 +103,14 @@ class EndgameDetector:
         
         return total
     
-    def get_endgame_position(self, state: AzulState) -> Optional[EndgamePosition]:
+    def get_endgame_position(self, state: AzulState,
+                             agent_id: Optional[int] = None) -> Optional[EndgamePosition]:
         """
         Create an EndgamePosition object if this is an endgame position.
         
         Args:
             state: Current game state
+            agent_id: Side to move (defaults to state.current_player)
             
         Returns:
             EndgamePosition if endgame, None otherwise
@@ -112,7 +119,7 @@ class EndgameDetector:
             return None
         
         tile_count = self._count_remaining_tiles(state)
-        symmetry_hash = self._compute_symmetry_hash(state)
+        symmetry_hash = self._compute_symmetry_hash(state, agent_id)
         canonical_state = self._get_canonical_state(state)
         is_terminal = self._is_terminal_position(state)
         
@@ -123,35 +130,30 @@ class EndgameDetector:
             is_terminal=is_terminal
         )
     
-    def _compute_symmetry_hash(self, state: AzulState) -> int:
+    def _compute_symmetry_hash(self, state: AzulState, agent_id: Optional[int] = None) -> int:
         """
         Compute a hash that is invariant under board symmetries.
         
         This handles:
-        - Player order symmetry (for 2-player games)
-        - Board rotation/reflection symmetries
-        - Tile color symmetries (where colors are interchangeable)
+        - Player order symmetry (agents are listed starting from the side to move)
+        - Factory order symmetry (factories with the same tiles are interchangeable)
+        
+        The hash is stable across processes, unlike get_zobrist_hash.
+        agent_id is the side to move; without it state.current_player is used.
         """
-        # Start with the regular Zobrist hash
-        base_hash = state.get_zobrist_hash()
-        
-        # For 2-player games, we can swap players
-        if len(state.agents) == 2:
-            # Create a symmetric hash by considering both player orders
-            alt_hash = self._compute_swapped_player_hash(state)
-            base_hash = min(base_hash, alt_hash)
-        
-        # Consider board symmetries (rotation/reflection)
-        # For Azul, the main symmetry is that the board is roughly symmetric
-        # We'll use a simplified approach for now
-        return base_hash
+        return position_key(state, self._side_to_move(state, agent_id), cap_scores=False)
+    
+    def _compute_swapped_player_hash(self, state: AzulState, agent_id: Optional[int] = None) -> int:
+        """Compute hash of the same position with the other player to move (2-player games)."""
+        to_move = self._side_to_move(state, agent_id)
+        return position_key(state, (to_move + 1) % len(state.agents), cap_scores=False)
     
-    def _compute_swapped_player_hash(self, state: AzulState) -> int:
-        """Compute hash with players swapped (for 2-player games)."""
-        # This is a simplified implementation
-        # In practice, we'd need to create a new state with swapped players
-        # For now, we'll use a different approach
-        return hash(f"swapped_{state.get_zobrist_hash()}")
+    @staticmethod
+    def _side_to_move(state: AzulState, agent_id: Optional[int]) -> int:
+        """agent_id when given, else the state's current player."""
+        if agent_id is None:
+            agent_id = getattr(state, 'current_player', 0)
+        return agent_id % len(state.agents)
     
     def _get_canonical_state(self, state: AzulState) -> np.ndarray:
         """
@@ -234,12 +236,13 @@ class EndgameDetector:
         
         return False
     
-    def get_position_key(self, state: AzulState) -> str:
+    def get_position_key(self, state: AzulState, agent_id: Optional[int] = None) -> str:
         """
         Get a unique key for this position in the endgame database.
         
         Args:
             state: Current game state
+            agent_id: Side to move (defaults to state.current_player)
             
         Returns:
             String key for database lookup
@@ -247,7 +250,7 @@ class EndgameDetector:
         if not self.is_endgame_position(state):
             return None
         
-        endgame_pos = self.get_endgame_position(state)
+        endgame_pos = self.get_endgame_position(state, agent_id)
         return f"endgame_{endgame_pos.symmetry_hash}_{endgame_pos.tile_count}"
 
 
@@ -256,48 +259,122 @@ class EndgameDatabase:
     Database for storing exact endgame solutions.
     
     Uses retrograde analysis to compute perfect play for small positions.
+    Exact end-of-round solutions are also looked up in a memory-mapped
+    tablebase file: the given path, AZUL_TABLEBASE_PATH or the generator's
+    default location. Read-only tablebases are shared by every database in
+    the process; a writable one is written to as positions are solved.
     """
     
-    def __init__(self, max_tiles: int = 10):
+    def __init__(self, max_tiles: int = 10, tablebase_path: Optional[str] = None,
+                 readonly: bool = True):
         self.max_tiles = max_tiles
         self.detector = EndgameDetector(max_tiles)
         self.solutions: Dict[str, Dict] = {}
         self._analyzed_positions: Set[str] = set()
+        self.solver = RoundEndSolver(max_tiles=max_tiles)
+        self.tablebase = self._open_tablebase(tablebase_path, readonly)
+    
+    @staticmethod
+    def _open_tablebase(path: Optional[str], readonly: bool) -> Optional[EndgameTablebase]:
+        """Open the tablebase file, if one is available (writable ones are created)."""
+        if readonly:
+            return load_tablebase(path)
+        return EndgameTablebase(path or os.environ.get('AZUL_TABLEBASE_PATH', DEFAULT_TABLEBASE_PATH),
+                                readonly=False)
     
-    def has_solution(self, state: AzulState) -> bool:
-        """Check if we have an exact solution for this position."""
-        key = self.detector.get_position_key(state)
-        return key is not None and key in self.solutions
+    def has_solution(self, state: AzulState, agent_id: Optional[int] = None) -> bool:
+        """
+        Check if we have an exact solution for this position.
+        
+        The tablebase is only consulted when agent_id (the side to move) is given.
+        Callers that need the solution should call get_solution alone and check
+        for None, which probes the position once.
+        """
+        return self.get_solution(state, agent_id) is not None
     
-    def get_solution(self, state: AzulState) -> Optional[Dict]:
+    def get_solution(self, state: AzulState, agent_id: Optional[int] = None) -> Optional[Dict]:
         """
         Get exact solution for this position.
         
         Args:
             state: Current game state
+            agent_id: Side to move; enables the tablebase lookup
             
         Returns:
             Solution dict with 'best_move', 'score', 'depth' or None if not found
         """
-        key = self.detector.get_position_key(state)
-        if key is None or key not in self.solutions:
+        key = self.detector.get_position_key(state, agent_id)
+        if key is not None and key in self.solutions:
+            return self.solutions[key]
+        
+        if agent_id is None:
+            return None
+        return self._probe_tablebase(state, agent_id)
+    
+    def _probe_tablebase(self, state: AzulState, agent_id: int) -> Optional[Dict]:
+        """Look up an end-of-round solution in the tablebase."""
+        if self.tablebase is None or not self.solver.can_solve(state):
+            return None
+        
+        entry = self.tablebase.probe(position_key(state, agent_id))
+        if entry is None:
+            return None
+        
+        margin = state.agents[agent_id].score - state.agents[1 - agent_id].score
+        return {
+            'best_move': resolve_move(state, entry.best_move),
+            'score': margin + entry.value,
+            'round_margin': entry.value,
+            'depth': entry.depth,
+            'exact': entry.exact
+        }
+    
+    def solve_round(self, state: AzulState, agent_id: int) -> Optional[Dict]:
+        """
+        Solve the rest of the round exactly with agent_id to move.
+        
+        Solutions are read from the tablebase when present, and written to
+        it when the tablebase is writable.
+        
+        Args:
+            state: Current game state
+            agent_id: Side to move
+            
+        Returns:
+            Solution dict or None if the position is too large to solve
+        """
+        solution = self._probe_tablebase(state, agent_id)
+        if solution is not None:
+            return solution
+        
+        solution = self.solver.solve(state, agent_id)
+        if solution is None:
             return None
         
-        return self.solutions[key]
+        self._analyzed_positions.add(self.detector.get_position_key(state, agent_id))
+        if self.tablebase is not None and not self.tablebase.readonly:
+            best_move = solution['best_move']
+            if best_move is not None:
+                best_move = canonical_move(state, best_move)
+            self.tablebase.store(position_key(state, agent_id), solution['round_margin'],
+                                 best_move, solution['depth'])
+        return solution
     
-    def store_solution(self, state: AzulState, solution: Dict):
-        """Store an exact solution for this position."""
-        key = self.detector.get_position_key(state)
+    def store_solution(self, state: AzulState, solution: Dict, agent_id: Optional[int] = None):
+        """Store an exact solution for this position with agent_id (or the current player) to move."""
+        key = self.detector.get_position_key(state, agent_id)
         if key is not None:
             self.solutions[key] = solution
     
-    def analyze_endgame(self, state: AzulState, max_depth: int = 10) -> Optional[Dict]:
+    def analyze_endgame(self, state: AzulState, max_depth: int = 10,
+                        agent_id: Optional[int] = None) -> Optional[Dict]:
         """
         Perform retrograde analysis to find exact solution.
         
         Args:
             state: Current game state
             max_depth: Maximum search depth
+            agent_id: Side to move the solution is stored for (defaults to state.current_player)
             
         Returns:
             Solution dict or None if analysis fails
@@ -318,7 +395,7 @@ class EndgameDatabase:
             result = self._analyze_at_depth(state, depth, start_time, max_analysis_time)
             if result is not None:
                 # Store the solution for future use
-                self.store_solution(state, result)
+                self.store_solution(state, result, agent_id)
                 return result
         
         return None
@@ -632,8 +709,11 @@ class EndgameDatabase:
     
     def get_stats(self) -> Dict:
         """Get database statistics."""
-        return {
+        stats = {
             'total_solutions': len(self.solutions),
             'max_tiles': self.max_tiles,
             'analyzed_positions': len(self._analyzed_positions)
-        } 
\ No newline at end of file
+        }
+        if self.tablebase is not None:
+            stats['tablebase'] = self.tablebase.get_stats()
+        return stats
@@ -0,0 +1,768 @@
+"""
+Azul End-of-Round Solver and Persistent Tablebase
+
+This module provides:
+- Canonical, player-swap invariant position keys (stable across processes)
+- An exact end-of-round solver (negamax alpha-beta with make/unmake)
+- A memory-mapped, hash-indexed tablebase file shared across processes
+"""
+
+import hashlib
+import os
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core import azul_utils as utils
+from core.azul_model import AzulState
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove
+from analysis_engine.mathematical_optimization.azul_rollout import (
+    FLOOR_SCORES, FLOOR_SIZE, GRID_SIZE, NUM_TILE_TYPES, WALL_COLUMN,
+    ROW_BONUS, COL_BONUS, SET_BONUS
+)
+
+
+DEFAULT_TABLEBASE_PATH = "data/endgame_tablebase.bin"
+
+# Scores at or above the largest possible floor penalty never hit the
+# "no negative round score" clamp, so they can share tablebase entries.
+SCORE_CAP = -sum(FLOOR_SCORES)
+
+FLAG_EXACT = 1
+NO_MOVE = 0xFFFFFFFF
+
+TABLEBASE_MAGIC = b"AZULTB01"
+TABLEBASE_VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('record_size', '<u4'),
+    ('capacity', '<u8'),
+    ('count', '<u8'),
+    ('reserved', 'S32'),
+])
+RECORD_DTYPE = np.dtype([
+    ('key', '<u8'),
+    ('value', '<f4'),
+    ('move', '<u4'),
+    ('depth', '<u2'),
+    ('flags', '<u2'),
+    ('reserved', '<u4'),
+])
+MAX_LOAD_FACTOR = 0.7
+
+
+def _wall_bits(grid_state) -> int:
+    """Pack a 5x5 wall into a 25-bit integer."""
+    bits = 0
+    for row in range(GRID_SIZE):
+        for col in range(GRID_SIZE):
+            if grid_state[row][col]:
+                bits |= 1 << (row * GRID_SIZE + col)
+    return bits
+
+
+def canonical_position(state: AzulState, agent_id: int, cap_scores: bool = True) -> Tuple[int, ...]:
+    """
+    Canonical integer tuple of a position with agent_id to move.
+
+    Agents are listed in turn order starting from agent_id, so a position and
+    its player-swapped twin (with the other agent to move) map to the same
+    tuple. Factory order is irrelevant to play, so non-empty factories are
+    sorted. With cap_scores, scores are capped at SCORE_CAP because higher
+    scores cannot change the outcome of the round.
+
+    Args:
+        state: Position to describe
+        agent_id: Agent to move
+        cap_scores: Cap scores (tablebase keys) or keep them (whole-game keys)
+
+    Returns:
+        Tuple of ints describing the position
+    """
+    num_agents = len(state.agents)
+    parts: List[int] = [num_agents]
+
+    for offset in range(num_agents):
+        agent = state.agents[(agent_id + offset) % num_agents]
+        parts.extend(int(n) for n in agent.lines_number)
+        parts.extend(int(t) for t in agent.lines_tile)
+        parts.append(_wall_bits(agent.grid_state))
+        parts.append(sum(1 for slot in agent.floor if slot))
+        score = int(agent.score)  # Float once a round is scored from the numpy wall
+        parts.append(min(score, SCORE_CAP) if cap_scores else score)
+
+    parts.append(1 if state.first_agent_taken else 0)
+
+    factories = sorted(
+        counts for counts in (
+            tuple(int(factory.tiles.get(tile, 0)) for tile in range(NUM_TILE_TYPES))
+            for factory in state.factories
+        ) if any(counts)
+    )
+    parts.append(len(factories))
+    for counts in factories:
+        parts.extend(counts)
+    parts.extend(int(state.centre_pool.tiles.get(tile, 0)) for tile in range(NUM_TILE_TYPES))
+
+    return tuple(parts)
+
+
+def position_key(state: AzulState, agent_id: int, cap_scores: bool = True) -> int:
+    """
+    Stable 64-bit key of canonical_position (never 0, which marks empty slots).
+
+    Unlike AzulState.get_zobrist_hash, the key does not depend on Python's
+    per-process string hashing, so it can be persisted and shared.
+    """
+    data = array('q', canonical_position(state, agent_id, cap_scores)).tobytes()
+    key = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+    return key or 1
+
+
+def remaining_tiles(state: AzulState) -> int:
+    """Number of tiles left in the factories and centre this round."""
+    total = sum(int(state.centre_pool.tiles.get(tile, 0)) for tile in range(NUM_TILE_TYPES))
+    for factory in state.factories:
+        total += sum(int(factory.tiles.get(tile, 0)) for tile in range(NUM_TILE_TYPES))
+    return total
+
+
+def _canonical_factory_order(state: AzulState) -> List[int]:
+    """Indices of the non-empty factories in the order canonical_position lists them."""
+    contents = []
+    for index, factory in enumerate(state.factories):
+        counts = tuple(int(factory.tiles.get(tile, 0)) for tile in range(NUM_TILE_TYPES))
+        if any(counts):
+            contents.append((counts, index))
+    return [index for _, index in sorted(contents)]
+
+
+def canonical_move(state: AzulState, move: FastMove) -> FastMove:
+    """
+    Replace a factory move's source_id with the factory's canonical rank.
+
+    Positions that differ only in factory order share a key, so moves stored
+    against a key must not refer to concrete factory indices.
+    """
+    if move.source_id < 0:
+        return move
+    rank = _canonical_factory_order(state).index(move.source_id)
+    return FastMove(move.action_type, rank, move.tile_type, move.pattern_line_dest,
+                    move.num_to_pattern_line, move.num_to_floor_line)
+
+
+def resolve_move(state: AzulState, move: Optional[FastMove]) -> Optional[FastMove]:
+    """Inverse of canonical_move for a position with the same key."""
+    if move is None or move.source_id < 0:
+        return move
+    order = _canonical_factory_order(state)
+    if move.source_id >= len(order):
+        return None
+    return FastMove(move.action_type, order[move.source_id], move.tile_type, move.pattern_line_dest,
+                    move.num_to_pattern_line, move.num_to_floor_line)
+
+
+def move_from_key(key: int) -> Optional[FastMove]:
+    """Decode a packed move (FastMove.bit_mask layout) back into a FastMove."""
+    if key == NO_MOVE:
+        return None
+    return FastMove(
+        action_type=(key >> 18) & 0x3,
+        source_id=((key >> 14) & 0xF) - 1,
+        tile_type=utils.Tile((key >> 11) & 0x7),
+        pattern_line_dest=((key >> 8) & 0x7) - 1,
+        num_to_pattern_line=(key >> 4) & 0xF,
+        num_to_floor_line=key & 0xF
+    )
+
+
+@dataclass
+class TablebaseEntry:
+    """A stored end-of-round solution."""
+    key: int
+    value: float
+    best_move: Optional[FastMove]
+    depth: int
+    exact: bool
+
+
+class EndgameTablebase:
+    """
+    Memory-mapped, open-addressing hash table of solved positions.
+
+    The file is a fixed header followed by a power-of-two array of records
+    probed linearly from the key. Readers map it read-only, so any number of
+    API workers and search processes share one copy through the page cache.
+    A single writer inserts in place and grows the table by rebuilding into
+    a temporary file that atomically replaces the original; readers pick up
+    the new file on refresh().
+    """
+
+    def __init__(self, path: str = DEFAULT_TABLEBASE_PATH, readonly: bool = True,
+                 initial_capacity: int = 1 << 16):
+        """
+        Open (or, when writable, create) a tablebase file.
+
+        Args:
+            path: Tablebase file path
+            readonly: Map the file read-only
+            initial_capacity: Slot count for a newly created file (power of two)
+        """
+        self.path = path
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self._header = None
+        self._records = None
+        self._file_id = None
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(f"Tablebase not found: {path}")
+            self._create(path, initial_capacity)
+
+        self._open()
+
+    @staticmethod
+    def _create(path: str, capacity: int):
+        """Write an empty tablebase file."""
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Tablebase capacity must be a power of two, got {capacity}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = TABLEBASE_MAGIC
+        header['version'] = TABLEBASE_VERSION
+        header['record_size'] = RECORD_DTYPE.itemsize
+        header['capacity'] = capacity
+        with open(path, 'wb') as f:
+            f.write(header.tobytes())
+            f.truncate(HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize)
+
+    def _open(self):
+        """Map the header and records of the file."""
+        mode = 'r' if self.readonly else 'r+'
+        header = np.memmap(self.path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        if header['magic'][0] != TABLEBASE_MAGIC or header['version'][0] != TABLEBASE_VERSION:
+            raise ValueError(f"Not an Azul tablebase file: {self.path}")
+        if header['record_size'][0] != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Unsupported tablebase record size in {self.path}")
+
+        capacity = int(header['capacity'][0])
+        self._header = header
+        self._records = np.memmap(self.path, dtype=RECORD_DTYPE, mode=mode,
+                                  offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+        self._keys = self._records['key']
+        self._mask = capacity - 1
+        self._file_id = self._stat_id()
+
+    def _stat_id(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    @property
+    def capacity(self) -> int:
+        return int(self._header['capacity'][0])
+
+    def __len__(self) -> int:
+        return int(self._header['count'][0])
+
+    def refresh(self) -> bool:
+        """Re-map the file if a writer has replaced it. Returns True if reopened."""
+        if not self.readonly or self._stat_id() == self._file_id:
+            return False
+        self.close()
+        self._open()
+        return True
+
+    def _find_slot(self, key: int) -> int:
+        """Index of key's slot, or of the empty slot where it would go."""
+        index = key & self._mask
+        keys = self._keys
+        while True:
+            slot_key = int(keys[index])
+            if slot_key == key or slot_key == 0:
+                return index
+            index = (index + 1) & self._mask
+
+    def probe(self, key: int) -> Optional[TablebaseEntry]:
+        """Look up a position key."""
+        index = self._find_slot(key)
+        record = self._records[index]
+        if int(record['key']) != key:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return TablebaseEntry(
+            key=key,
+            value=float(record['value']),
+            best_move=move_from_key(int(record['move'])),
+            depth=int(record['depth']),
+            exact=bool(record['flags'] & FLAG_EXACT)
+        )
+
+    def store(self, key: int, value: float, best_move: Optional[FastMove] = None,
+              depth: int = 0, exact: bool = True):
+        """Insert or overwrite a solution."""
+        if self.readonly:
+            raise PermissionError("Tablebase is opened read-only")
+
+        if (len(self) + 1) > MAX_LOAD_FACTOR * self.capacity:
+            self._grow(self.capacity * 2)
+
+        index = self._find_slot(key)
+        record = self._records[index:index + 1]
+        if int(record['key'][0]) == 0:
+            self._header['count'] += 1
+        record['key'] = key
+        record['value'] = value
+        record['move'] = best_move.bit_mask if best_move is not None else NO_MOVE
+        record['depth'] = min(depth, 0xFFFF)
+        record['flags'] = FLAG_EXACT if exact else 0
+
+    def _grow(self, capacity: int):
+        """Rebuild into a larger file and atomically replace the original."""
+        old_records = np.array(self._records[self._keys != 0])
+        self.close()
+
+        tmp_path = f"{self.path}.tmp"
+        self._create(tmp_path, capacity)
+        self.path, final_path = tmp_path, self.path
+        self._open()
+        mask = self._mask
+        for record in old_records:
+            key = int(record['key'])
+            index = key & mask
+            while int(self._keys[index]) != 0:
+                index = (index + 1) & mask
+            self._records[index] = record
+        self._header['count'] = len(old_records)
+        self.flush()
+        self.close()
+
+        os.replace(tmp_path, final_path)
+        self.path = final_path
+        self._open()
+
+    def items(self) -> Iterator[np.void]:
+        """Iterate over the raw stored records."""
+        for record in self._records[self._keys != 0]:
+            yield record
+
+    def flush(self):
+        """Write dirty pages back to the file."""
+        if not self.readonly and self._records is not None:
+            self._records.flush()
+            self._header.flush()
+
+    def close(self):
+        """Flush and unmap the file."""
+        self.flush()
+        self._header = None
+        self._records = None
+        self._keys = None
+
+    def get_stats(self) -> Dict:
+        """Get tablebase statistics."""
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'entries': len(self),
+            'capacity': self.capacity,
+            'load_factor': len(self) / self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            'readonly': self.readonly
+        }
+
+
+class _SolverAbort(Exception):
+    """Raised when the solver exceeds its node or time budget."""
+
+
+class RoundEndSolver:
+    """
+    Exact solver for the remainder of a round in 2-player games.
+
+    Plays every move sequence to the end of the round with negamax
+    alpha-beta on a flat board using make/unmake, then applies the exact
+    round scoring (and end-of-game bonuses when a wall row is completed).
+    Factories holding identical tiles are searched once.
+
+    Values are the side to move's score gain this round minus the
+    opponent's, so they do not depend on score totals above SCORE_CAP.
+    """
+
+    def __init__(self, max_tiles: int = 10, max_nodes: int = 2_000_000,
+                 max_time: Optional[float] = None):
+        """
+        Initialize the solver.
+
+        Args:
+            max_tiles: Largest number of tiles left in factories and centre to solve
+            max_nodes: Node budget per solve
+            max_time: Optional time budget per solve in seconds
+        """
+        self.max_tiles = max_tiles
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.nodes = 0
+        self._root_side = 0
+        self._deadline = None
+        self._table: Dict[Tuple, Tuple[float, int, Optional[Tuple[int, int, int]]]] = {}
+
+    def can_solve(self, state: AzulState) -> bool:
+        """Check whether a position is small enough to solve exactly."""
+        if len(state.agents) != 2:
+            return False
+        return remaining_tiles(state) <= self.max_tiles
+
+    def solve(self, state: AzulState, agent_id: int) -> Optional[Dict]:
+        """
+        Solve the rest of the round with agent_id to move.
+
+        Returns:
+            Dict with 'best_move', 'round_margin' (agent_id's round gain minus
+            the opponent's), 'score' (current score margin plus round_margin),
+            'depth', 'nodes' and 'exact', or None if the position is too
+            large or the budget ran out
+        """
+        if not self.can_solve(state):
+            return None
+
+        self._load(state)
+        self._root_side = agent_id
+        self.nodes = 0
+        self._table.clear()
+        self._deadline = time.time() + self.max_time if self.max_time else None
+
+        try:
+            value, move = self._negamax(agent_id, float('-inf'), float('inf'), 0)
+        except _SolverAbort:
+            return None
+
+        best_move = None
+        if move is not None:
+            best_move = self._to_fast_move(state, *move)
+
+        margin = state.agents[agent_id].score - state.agents[1 - agent_id].score
+        return {
+            'best_move': best_move,
+            'score': margin + value,
+            'round_margin': value,
+            'depth': self._max_ply,
+            'nodes': self.nodes,
+            'exact': True
+        }
+
+    def _load(self, state: AzulState):
+        """Copy the position into flat lists."""
+        self.factories = [[int(f.tiles.get(t, 0)) for t in range(NUM_TILE_TYPES)] for f in state.factories]
+        self.centre = [int(state.centre_pool.tiles.get(t, 0)) for t in range(NUM_TILE_TYPES)]
+        self.lines_number = [list(a.lines_number) for a in state.agents]
+        self.lines_tile = [list(a.lines_tile) for a in state.agents]
+        self.walls = [[1 if a.grid_state[r][c] else 0 for r in range(GRID_SIZE) for c in range(GRID_SIZE)]
+                      for a in state.agents]
+        self.floors = [sum(1 for slot in a.floor if slot) for a in state.agents]
+        self.scores = [a.score for a in state.agents]
+        self.token_taken = bool(state.first_agent_taken)
+        self.tiles_left = sum(self.centre) + sum(sum(f) for f in self.factories)
+        self._max_ply = 0
+
+    def _node_key(self, side: int) -> Tuple:
+        """Key of the dynamic part of the position (walls and scores are fixed)."""
+        other = 1 - side
+        return (
+            tuple(self.lines_number[side]), tuple(self.lines_tile[side]), self.floors[side],
+            tuple(self.lines_number[other]), tuple(self.lines_tile[other]), self.floors[other],
+            self.token_taken,
+            tuple(sorted(tuple(f) for f in self.factories if any(f))),
+            tuple(self.centre)
+        )
+
+    def _negamax(self, side: int, alpha: float, beta: float, ply: int):
+        if self.tiles_left == 0:
+            if ply > self._max_ply:
+                self._max_ply = ply
+            return self._round_margin(side), None
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _SolverAbort()
+        if self._deadline is not None and self.nodes % 1024 == 0 and time.time() > self._deadline:
+            raise _SolverAbort()
+
+        key = self._node_key(side)
+        entry = self._table.get(key)
+        if entry is not None:
+            value, bound, move = entry
+            if bound == 0:
+                return value, move
+            if bound > 0 and value >= beta:
+                return value, move
+            if bound < 0 and value <= alpha:
+                return value, move
+
+        alpha_orig = alpha
+        best_value = float('-inf')
+        best_move = None
+
+        for move in self._ordered_moves(side):
+            undo = self._make(side, *move)
+            value = -self._negamax(1 - side, -beta, -alpha, ply + 1)[0]
+            self._unmake(side, undo)
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_orig:
+            bound = -1
+        elif best_value >= beta:
+            bound = 1
+        else:
+            bound = 0
+        self._table[key] = (best_value, bound, best_move)
+        return best_value, best_move
+
+    def _ordered_moves(self, side: int) -> List[Tuple[int, int, int]]:
+        """Legal (source, tile, line) moves, most promising first."""
+        lines_number = self.lines_number[side]
+        lines_tile = self.lines_tile[side]
+        wall = self.walls[side]
+
+        legal = []
+        for tile in range(NUM_TILE_TYPES):
+            lines = []
+            for line in range(GRID_SIZE):
+                if lines_number[line] > line:
+                    continue
+                if lines_tile[line] != -1 and lines_tile[line] != tile:
+                    continue
+                if wall[line * GRID_SIZE + WALL_COLUMN[line][tile]]:
+                    continue
+                lines.append(line)
+            legal.append(lines)
+
+        scored = []
+        seen_factories = set()
+        sources = [(-1, self.centre)]
+        for f, counts in enumerate(self.factories):
+            signature = tuple(counts)
+            if any(counts) and signature not in seen_factories:
+                seen_factories.add(signature)
+                sources.append((f, counts))
+
+        for source, counts in sources:
+            for tile in range(NUM_TILE_TYPES):
+                count = counts[tile]
+                if not count:
+                    continue
+                for line in legal[tile]:
+                    free = line + 1 - lines_number[line]
+                    placed = min(count, free)
+                    priority = placed * 2 - (count - placed) * 3 + (10 if placed == free else 0)
+                    scored.append((priority, source, tile, line))
+                scored.append((-count * 3, source, tile, -1))
+
+        scored.sort(reverse=True)
+        return [(source, tile, line) for _, source, tile, line in scored]
+
+    def _make(self, side: int, source: int, tile: int, line: int):
+        """Apply a move and return the information needed to undo it."""
+        token = False
+        moved = None
+        if source < 0:
+            count = self.centre[tile]
+            self.centre[tile] = 0
+            if not self.token_taken:
+                token = True
+                self.token_taken = True
+        else:
+            counts = self.factories[source]
+            moved = tuple(counts)
+            count = counts[tile]
+            for other in range(NUM_TILE_TYPES):
+                if other != tile:
+                    self.centre[other] += counts[other]
+                counts[other] = 0
+        self.tiles_left -= count
+
+        floor_before = self.floors[side]
+        placed = 0
+        previous_tile = -1
+        if line >= 0:
+            previous_tile = self.lines_tile[side][line]
+            free = line + 1 - self.lines_number[side][line]
+            placed = min(count, free)
+            self.lines_number[side][line] += placed
+            self.lines_tile[side][line] = tile
+
+        self.floors[side] = min(FLOOR_SIZE, floor_before + (1 if token else 0) + count - placed)
+        return (source, tile, line, count, placed, previous_tile, floor_before, token, moved)
+
+    def _unmake(self, side: int, undo):
+        """Revert a move made by _make."""
+        source, tile, line, count, placed, previous_tile, floor_before, token, moved = undo
+        self.floors[side] = floor_before
+        if line >= 0:
+            self.lines_number[side][line] -= placed
+            self.lines_tile[side][line] = previous_tile
+        if source < 0:
+            self.centre[tile] = count
+            if token:
+                self.token_taken = False
+        else:
+            counts = self.factories[source]
+            for other in range(NUM_TILE_TYPES):
+                counts[other] = moved[other]
+                if other != tile:
+                    self.centre[other] -= moved[other]
+        self.tiles_left += count
+
+    def _round_margin(self, side: int) -> float:
+        """Exact round (and game-end) score gain of side minus the opponent's."""
+        placed_cells = ([], [])
+        gains = [0, 0]
+        for agent in (0, 1):
+            gains[agent] = self._place_and_score(agent, placed_cells[agent])
+
+        game_over = any(self._has_full_row(agent) for agent in (0, 1))
+        if game_over:
+            for agent in (0, 1):
+                gains[agent] += self._end_of_game_bonus(agent)
+
+        for agent in (0, 1):
+            wall = self.walls[agent]
+            for cell in placed_cells[agent]:
+                wall[cell] = 0
+
+        return float(gains[side] - gains[1 - side])
+
+    def _place_and_score(self, agent: int, placed_cells: List[int]) -> int:
+        """Score full pattern lines onto the wall (as AgentState.ScoreRound), recording cells."""
+        wall = self.walls[agent]
+        lines_number = self.lines_number[agent]
+        lines_tile = self.lines_tile[agent]
+        gain = 0
+
+        for line in range(GRID_SIZE):
+            if lines_number[line] != line + 1:
+                continue
+            col = WALL_COLUMN[line][lines_tile[line]]
+            base = line * GRID_SIZE
+            wall[base + col] = 1
+            placed_cells.append(base + col)
+
+            horizontal = 0
+            c = col - 1
+            while c >= 0 and wall[base + c]:
+                horizontal += 1
+                c -= 1
+            c = col + 1
+            while c < GRID_SIZE and wall[base + c]:
+                horizontal += 1
+                c += 1
+            vertical = 0
+            r = line - 1
+            while r >= 0 and wall[r * GRID_SIZE + col]:
+                vertical += 1
+                r -= 1
+            r = line + 1
+            while r < GRID_SIZE and wall[r * GRID_SIZE + col]:
+                vertical += 1
+                r += 1
+
+            if horizontal:
+                gain += 1 + horizontal
+            if vertical:
+                gain += 1 + vertical
+            if not horizontal and not vertical:
+                gain += 1
+
+        for slot in range(self.floors[agent]):
+            gain += FLOOR_SCORES[slot]
+
+        # Agents cannot be assigned a negative score in any round
+        if gain < 0 and self.scores[agent] < -gain:
+            gain = -self.scores[agent]
+        return gain
+
+    def _has_full_row(self, agent: int) -> bool:
+        wall = self.walls[agent]
+        return any(all(wall[row * GRID_SIZE:(row + 1) * GRID_SIZE]) for row in range(GRID_SIZE))
+
+    def _end_of_game_bonus(self, agent: int) -> int:
+        wall = self.walls[agent]
+        bonus = 0
+        for i in range(GRID_SIZE):
+            if all(wall[i * GRID_SIZE + j] for j in range(GRID_SIZE)):
+                bonus += ROW_BONUS
+            if all(wall[j * GRID_SIZE + i] for j in range(GRID_SIZE)):
+                bonus += COL_BONUS
+            if all(wall[j * GRID_SIZE + WALL_COLUMN[j][i]] for j in range(GRID_SIZE)):
+                bonus += SET_BONUS
+        return bonus
+
+    def _to_fast_move(self, state: AzulState, source: int, tile: int, line: int) -> FastMove:
+        """Convert a solver move into the FastMove used by the search engines."""
+        if source < 0:
+            count = int(state.centre_pool.tiles.get(tile, 0))
+            action_type = utils.Action.TAKE_FROM_CENTRE
+        else:
+            count = int(state.factories[source].tiles.get(tile, 0))
+            action_type = utils.Action.TAKE_FROM_FACTORY
+
+        placed = 0
+        if line >= 0:
+            free = line + 1 - state.agents[self._root_side].lines_number[line]
+            placed = min(count, free)
+
+        return FastMove(
+            action_type=action_type,
+            source_id=source,
+            tile_type=utils.Tile(tile),
+            pattern_line_dest=line,
+            num_to_pattern_line=placed,
+            num_to_floor_line=count - placed
+        )
+
+
+# Read-only tablebases shared by every search in the process, by absolute path
+_shared_tablebases: Dict[str, EndgameTablebase] = {}
+
+
+def load_tablebase(path: Optional[str] = None) -> Optional[EndgameTablebase]:
+    """
+    Open the tablebase at path, AZUL_TABLEBASE_PATH or the default location, read-only.
+
+    The file is mapped once per process and shared by every caller. If a
+    generator has replaced the file since, a fresh mapping is opened; callers
+    holding the old one keep using it.
+
+    Returns:
+        EndgameTablebase, or None if no tablebase file exists
+    """
+    path = os.path.abspath(path or os.environ.get('AZUL_TABLEBASE_PATH', DEFAULT_TABLEBASE_PATH))
+    if not os.path.exists(path):
+        _shared_tablebases.pop(path, None)
+        return None
+
+    tablebase = _shared_tablebases.get(path)
+    if tablebase is None or tablebase._stat_id() != tablebase._file_id:
+        tablebase = EndgameTablebase(path)
+        _shared_tablebases[path] = tablebase
+    return tablebase
@@ -23,7 +23,9 @@ from .routes.move_quality import move_quality_bp
 from .routes.comprehensive_analysis import comprehensive_analysis_bp
 from .auth import auth_bp, session_manager
 from .rate_limiter import RateLimiter
+from .pondering import PonderConfig, PonderService
 from core.azul_database import AzulDatabase
+from analysis_engine.mathematical_optimization.azul_opening_book import load_opening_book
 
 
 def create_app(config=None):
@@ -45,6 +47,9 @@ def create_app(config=None):
         app.config.update({
             'SECRET_KEY': os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production'),
             'DATABASE_PATH': os.environ.get('DATABASE_PATH', None),
+            'OPENING_BOOK_PATH': os.environ.get('AZUL_OPENING_BOOK_PATH', None),
+            'PONDER_WORKERS': int(os.environ.get('AZUL_PONDER_WORKERS', '2')),
+            'PONDER_CPU_QUOTA': float(os.environ.get('AZUL_PONDER_CPU_QUOTA', '30')),
             'RATE_LIMIT_ENABLED': os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
             'DEBUG': os.environ.get('DEBUG', 'false').lower() == 'true'
         })
@@ -71,6 +76,20 @@ def create_app(config=None):
     else:
         app.database = None
     
+    # Open the opening book if one has been compiled
+    try:
+        app.opening_book = load_opening_book(app.config.get('OPENING_BOOK_PATH'))
+    except Exception as e:
+        app.logger.warning(f"Failed to open opening book: {e}")
+        app.opening_book = None
+    
+    # Background pondering for sessions that opt in (worker processes start on first use)
+    app.ponder_service = PonderService(PonderConfig(
+        workers=app.config.get('PONDER_WORKERS', 2),
+        cpu_quota=app.config.get('PONDER_CPU_QUOTA', 30.0),
+        idle_timeout=app.config.get('PONDER_IDLE_TIMEOUT', 30.0)
+    ))
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
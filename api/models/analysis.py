@@ -5,7 +5,7 @@ This module contains Pydantic models for analysis endpoints including
 position analysis, hints, and analysis caching.
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from pydantic import BaseModel
 
 
@@ -16,6 +16,9 @@ class AnalysisRequest(BaseModel):
     depth: Optional[int] = None
     time_budget: Optional[float] = None
     rollouts: Optional[int] = None
+    use_book: bool = True
+    ponder: bool = False  # Keep searching likely next positions in the background
+    multiplayer_mode: Literal['paranoid', 'maxn'] = 'paranoid'  # 3- and 4-player search
 
 
 class HintRequest(BaseModel):
@@ -24,6 +27,8 @@ class HintRequest(BaseModel):
     agent_id: int = 0
     budget: float = 0.2
     rollouts: int = 100
+    use_book: bool = True
+    progress_interval: int = 50  # Rollouts between /hint/stream events
 
 
 class AnalysisCacheRequest(BaseModel):
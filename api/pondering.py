@@ -0,0 +1,439 @@
+"""
+Background pondering for interactive analysis sessions.
+
+After /analyze answers a position, a session can opt in to pondering: the
+server plays the recommended move, picks the most likely opponent replies
+and searches the resulting positions in a background process pool. Results
+go into a cache shared by all sessions, so the next /analyze request for
+one of those positions is answered without searching.
+
+Each session has a CPU quota over a sliding window, and its queued work is
+cancelled when it goes idle or asks about a different position.
+"""
+
+import atexit
+import copy
+import logging
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from core.azul_model import AzulState
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove
+from analysis_engine.strategic_analysis.azul_tablebase import position_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PonderConfig:
+    """Configuration for background pondering."""
+    workers: int = 2  # Processes shared by all sessions
+    max_replies: int = 3  # Opponent replies pondered per analysis
+    cpu_quota: float = 30.0  # CPU seconds per session per window
+    quota_window: float = 60.0  # Sliding window for the CPU quota
+    idle_timeout: float = 30.0  # Cancel a session's work after this long without requests
+    min_task_time: float = 0.1  # Don't start searches with less quota than this
+    selection_time: float = 0.5  # CPU reserved for choosing the replies
+    cache_size: int = 10000  # Pondered positions kept in the shared cache
+
+
+@dataclass
+class PonderTask:
+    """A queued worker call; its time budget is appended to args when it starts."""
+    fn: Callable
+    args: Tuple
+    max_time: float  # Requested budget, capped by the remaining quota at dispatch
+    generation: int
+    on_done: Callable[["PonderSession", int, Any], None]
+
+
+@dataclass
+class PonderSession:
+    """Pondering state for one API session."""
+    session_id: str
+    last_activity: float
+    generation: int = 0  # Bumped when the session moves on to a new position
+    queue: Deque[PonderTask] = field(default_factory=deque)
+    running: Dict[Future, float] = field(default_factory=dict)  # Running future -> reserved CPU budget
+    cpu_history: Deque[Tuple[float, float]] = field(default_factory=deque)  # (finished at, CPU seconds)
+    positions_pondered: int = 0
+    cancelled: int = 0
+
+
+# (position key, agent to move, multiplayer search mode)
+PonderKey = Tuple[int, int, str]
+
+
+def _ponder_key(state: AzulState, agent_id: int, multiplayer_mode: str) -> PonderKey:
+    return position_key(state, agent_id, cap_scores=False), agent_id, multiplayer_mode
+
+
+def _run_task(fn: Callable, *args) -> Tuple[Any, float, Optional[str]]:
+    """
+    Worker: call fn(*args) and measure the CPU it used.
+
+    Returns (result, CPU seconds, None), or (None, CPU seconds, traceback)
+    if fn raised, so failed tasks are charged to the session too.
+    """
+    cpu_start = time.process_time()
+    try:
+        return fn(*args), time.process_time() - cpu_start, None
+    except Exception:
+        return None, time.process_time() - cpu_start, traceback.format_exc()
+
+
+def _select_replies(state: AzulState, agent_id: int, best_move: FastMove,
+                    max_replies: int, max_time: float) -> List[Tuple[AzulState, int]]:
+    """
+    Worker: play best_move and return the positions after the likeliest replies.
+
+    The replying agent and the agent to move after the reply follow the turn
+    order. Replies are ranked by the evaluator from the replying agent's point
+    of view; replies not scored within max_time are left out.
+    Returns (position, agent to move) pairs.
+    """
+    from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+
+    start_time = time.time()
+    search_engine = AzulAlphaBetaSearch(use_endgame=False)
+
+    positions = []
+    after_move = search_engine._apply_move(state, best_move, agent_id)
+    if after_move is not None and after_move.TilesRemaining():
+        replier = search_engine._get_next_agent(agent_id, after_move)
+        replies = []
+        for reply in search_engine.move_generator.generate_moves_fast(after_move, replier):
+            if time.time() - start_time > max_time:
+                break
+            after_reply = search_engine._apply_move(after_move, reply, replier)
+            if after_reply is not None:
+                replies.append((after_reply, search_engine._get_next_agent(replier, after_reply)))
+        scores = search_engine.evaluator.evaluate_positions([reply for reply, _ in replies], replier)
+        order = sorted(range(len(replies)), key=lambda i: scores[i], reverse=True)
+        positions = [replies[i] for i in order[:max_replies]]
+
+    return positions
+
+
+def _ponder_search(state: AzulState, agent_id: int, max_depth: int, multiplayer_mode: str,
+                   max_time: float) -> Dict[str, Any]:
+    """Worker: search one pondered position."""
+    from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+
+    search_engine = AzulAlphaBetaSearch(max_depth=max_depth, max_time=max_time,
+                                        multiplayer_mode=multiplayer_mode)
+    result = search_engine.search(state, agent_id, max_depth=max_depth, max_time=max_time)
+    return {
+        'best_move': result.best_move,
+        'best_score': result.best_score,
+        'principal_variation': result.principal_variation,
+        'search_time': result.search_time,
+        'nodes_searched': result.nodes_searched,
+        'depth_reached': result.depth_reached,
+        'max_depth': max_depth,
+        'max_time': max_time
+    }
+
+
+class PonderCache:
+    """Thread-safe LRU cache of pondered search results, shared by all sessions."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[PonderKey, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: PonderKey, max_depth: int, max_time: float) -> Optional[Dict[str, Any]]:
+        """
+        Get a result at least as thorough as a search with these limits.
+
+        A result qualifies if it reached max_depth, or if it was searched with
+        limits at least as generous as the request.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry['depth_reached'] >= max_depth or
+                                      (entry['max_depth'] >= max_depth and entry['max_time'] >= max_time)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def contains(self, key: PonderKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: PonderKey, entry: Dict[str, Any]):
+        """Store a result, keeping the deeper one if the position is already cached."""
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing['depth_reached'] > entry['depth_reached']:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+            }
+
+
+class PonderService:
+    """
+    Schedules pondering searches for sessions on a shared process pool.
+
+    Tasks wait in per-session queues and are handed to the pool only when a
+    worker is free, taking turns between sessions. A task's time budget is
+    capped by the session's remaining CPU quota when it starts, reserved while
+    it runs and replaced by the CPU it actually used when it finishes.
+    Queued tasks are dropped when the session goes idle or moves on to a new
+    position; a running task stops within its own budget.
+    """
+
+    def __init__(self, config: Optional[PonderConfig] = None):
+        self.config = config or PonderConfig()
+        self.cache = PonderCache(self.config.cache_size)
+        # Re-entrant: a future that is already done runs its callback immediately
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, PonderSession] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._running = 0
+        self._turn = 0
+        self.positions_pondered = 0
+        self.cpu_seconds = 0.0
+
+    def _ensure_started(self):
+        """Start the process pool and the idle reaper on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.config.workers)
+            self._reaper = threading.Thread(target=self._reap_idle_sessions, name="ponder-reaper", daemon=True)
+            self._reaper.start()
+            atexit.register(self.shutdown)
+
+    def _session(self, session_id: str) -> PonderSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = PonderSession(session_id=session_id, last_activity=time.time())
+            self._sessions[session_id] = session
+        return session
+
+    def _remaining_quota(self, session: PonderSession) -> float:
+        """CPU seconds the session may still reserve in the current window."""
+        cutoff = time.time() - self.config.quota_window
+        while session.cpu_history and session.cpu_history[0][0] < cutoff:
+            session.cpu_history.popleft()
+        used = sum(cpu for _, cpu in session.cpu_history)
+        return self.config.cpu_quota - used - sum(session.running.values())
+
+    def _drop_queue(self, session: PonderSession):
+        session.cancelled += len(session.queue)
+        session.queue.clear()
+
+    def _next_session(self) -> Optional[PonderSession]:
+        """Pick the next session with queued work, taking turns."""
+        waiting = [session for session in self._sessions.values() if session.queue]
+        if not waiting:
+            return None
+        self._turn = (self._turn + 1) % len(waiting)
+        return waiting[self._turn]
+
+    def _dispatch(self):
+        """Start queued tasks while workers are free."""
+        while self._executor is not None and not self._stop.is_set() and self._running < self.config.workers:
+            session = self._next_session()
+            if session is None:
+                return
+            task = session.queue.popleft()
+            budget = min(task.max_time, self._remaining_quota(session))
+            if budget < self.config.min_task_time:
+                # Out of quota: nothing else queued for this session can run either
+                session.cancelled += 1
+                self._drop_queue(session)
+                continue
+
+            future = self._executor.submit(_run_task, task.fn, *task.args, budget)
+            session.running[future] = budget
+            self._running += 1
+            future.add_done_callback(lambda done, session=session, task=task: self._on_done(session, task, done))
+
+    def _on_done(self, session: PonderSession, task: PonderTask, future: Future):
+        """Charge a finished task's CPU, hand its result on and start more work."""
+        with self._lock:
+            self._running -= 1
+            budget = session.running.pop(future, 0.0)
+            if not future.cancelled():
+                if future.exception() is not None:
+                    # The worker process died; charge the whole reservation
+                    result, cpu, error = None, budget, repr(future.exception())
+                else:
+                    result, cpu, error = future.result()
+                session.cpu_history.append((time.time(), cpu))
+                self.cpu_seconds += cpu
+                if error is None:
+                    task.on_done(session, task.generation, result)
+                else:
+                    logger.error("Ponder task %s failed for session %s: %s",
+                                 task.fn.__name__, session.session_id, error)
+            self._dispatch()
+
+    def touch(self, session_id: Optional[str]):
+        """Record activity for a session so its pondering is kept alive."""
+        if not session_id:
+            return
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_activity = time.time()
+
+    def lookup(self, state: AzulState, agent_id: int, max_depth: int, max_time: float,
+               session_id: Optional[str] = None, multiplayer_mode: str = 'paranoid') -> Optional[Dict[str, Any]]:
+        """Get a pondered result for a position, if one is good enough for the request."""
+        self.touch(session_id)
+        return self.cache.get(_ponder_key(state, agent_id, multiplayer_mode), max_depth, max_time)
+
+    def start(self, session_id: str, state: AzulState, agent_id: int, best_move: Optional[FastMove],
+              max_depth: int, max_time: float, multiplayer_mode: str = 'paranoid') -> bool:
+        """
+        Start pondering the replies to best_move for a session.
+
+        Work still queued for the session's previous position is dropped.
+
+        Returns:
+            True if pondering was scheduled, False if there was nothing to do
+            or the session is out of quota
+        """
+        if best_move is None or self._stop.is_set():
+            return False
+
+        with self._lock:
+            self._ensure_started()
+            session = self._session(session_id)
+            session.last_activity = time.time()
+            session.generation += 1
+            self._drop_queue(session)
+            if self._remaining_quota(session) < self.config.min_task_time:
+                return False
+
+            def on_replies(session, generation, positions):
+                self._queue_searches(session, generation, positions, max_depth, max_time, multiplayer_mode)
+
+            session.queue.append(PonderTask(
+                fn=_select_replies,
+                args=(copy.deepcopy(state), agent_id, best_move, self.config.max_replies),
+                max_time=self.config.selection_time,
+                generation=session.generation,
+                on_done=on_replies
+            ))
+            self._dispatch()
+        return True
+
+    def _queue_searches(self, session: PonderSession, generation: int, positions: List[Tuple[AzulState, int]],
+                        max_depth: int, max_time: float, multiplayer_mode: str):
+        """Queue a search for each selected reply the cache does not already have."""
+        if session.generation != generation or time.time() - session.last_activity > self.config.idle_timeout:
+            return
+
+        for position, agent_id in positions:
+            key = _ponder_key(position, agent_id, multiplayer_mode)
+            if self.cache.contains(key):
+                continue
+
+            def on_search(session, generation, result, key=key):
+                # Finished searches are kept even if the session has moved on
+                if result['best_move'] is None:
+                    return
+                session.positions_pondered += 1
+                self.positions_pondered += 1
+                self.cache.put(key, result)
+
+            session.queue.append(PonderTask(
+                fn=_ponder_search,
+                args=(position, agent_id, max_depth, multiplayer_mode),
+                max_time=max_time,
+                generation=generation,
+                on_done=on_search
+            ))
+
+    def cancel(self, session_id: str) -> int:
+        """Drop a session's queued work. Returns the number of tasks dropped."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            dropped = len(session.queue)
+            session.generation += 1
+            self._drop_queue(session)
+            return dropped
+
+    def _reap_idle_sessions(self):
+        """Drop work for idle sessions and forget them once nothing of theirs is running."""
+        interval = max(0.1, min(1.0, self.config.idle_timeout / 4))
+        while not self._stop.wait(interval):
+            now = time.time()
+            with self._lock:
+                for session_id, session in list(self._sessions.items()):
+                    if now - session.last_activity <= self.config.idle_timeout:
+                        continue
+                    self._drop_queue(session)
+                    if not session.running:
+                        del self._sessions[session_id]
+
+    def get_stats(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get pondering statistics, including the given session's quota usage."""
+        with self._lock:
+            stats = {
+                'workers': self.config.workers,
+                'running_tasks': self._running,
+                'active_sessions': len(self._sessions),
+                'pending_tasks': sum(len(s.queue) + len(s.running) for s in self._sessions.values()),
+                'positions_pondered': self.positions_pondered,
+                'cpu_seconds': self.cpu_seconds,
+                'cache': self.cache.get_stats()
+            }
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                remaining = self._remaining_quota(session)
+                reserved = sum(session.running.values())
+                stats['session'] = {
+                    'pending_tasks': len(session.queue) + len(session.running),
+                    'positions_pondered': session.positions_pondered,
+                    'cancelled_tasks': session.cancelled,
+                    'cpu_quota': self.config.cpu_quota,
+                    'cpu_used': self.config.cpu_quota - remaining - reserved,
+                    'cpu_remaining': max(0.0, remaining),
+                    'idle_seconds': time.time() - session.last_activity
+                }
+            return stats
+
+    def shutdown(self):
+        """Drop all queued work and stop the process pool."""
+        self._stop.set()
+        with self._lock:
+            for session in self._sessions.values():
+                self._drop_queue(session)
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -5,18 +5,150 @@ This module contains all analysis-related endpoints for the Azul Solver & Analys
 """
 
 import json
+import math
+import time
+from types import SimpleNamespace
 from typing import Dict, Any, Optional, List
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from pydantic import ValidationError
 
 from ..auth import require_session
 from ..models import AnalysisRequest, HintRequest, AnalysisCacheRequest, AnalysisSearchRequest
-from ..utils import parse_fen_string, format_move
+from ..utils import parse_fen_string, format_move, format_sse, stream_search
 
 # Create Flask blueprint for analysis endpoints
 analysis_bp = Blueprint('analysis', __name__)
 
 
+def probe_opening_book(state, agent_id: int) -> Optional[List]:
+    """Look up book moves for a position. Returns None if there is no book or no entry."""
+    opening_book = getattr(current_app, 'opening_book', None)
+    if opening_book is None:
+        return None
+    try:
+        book_moves = opening_book.probe(state, agent_id)
+    except Exception as e:
+        current_app.logger.warning(f"Opening book probe failed: {e}")
+        return None
+    return book_moves or None
+
+
+def format_book_move(book_move) -> Dict[str, Any]:
+    """Format a book move for a JSON response (NaN statistics become None)."""
+    return {
+        'move': format_move(book_move.move),
+        'weight': book_move.weight,
+        'score': None if math.isnan(book_move.score) else book_move.score,
+        'win_rate': None if math.isnan(book_move.win_rate) else book_move.win_rate
+    }
+
+
+def book_analysis(book_moves: List, start_time: float) -> Dict[str, Any]:
+    """Format opening book moves as an /analyze result."""
+    formatted = [format_book_move(book_move) for book_move in book_moves]
+    best = formatted[0]
+    return {
+        'best_move': best['move'],
+        'best_score': best['score'] if best['score'] is not None else 0.0,
+        'principal_variation': [best['move']],
+        'search_time': time.time() - start_time,
+        'nodes_searched': 0,
+        'depth_reached': 0,
+        'source': 'opening_book',
+        'book_moves': formatted
+    }
+
+
+def book_hint(book_moves: List, start_time: float) -> Dict[str, Any]:
+    """Format opening book moves as a /hint result."""
+    formatted = [format_book_move(book_move) for book_move in book_moves]
+    best = formatted[0]
+    return {
+        'best_move': best['move'],
+        'expected_value': best['score'] if best['score'] is not None else 0.0,
+        'confidence': 1.0,
+        'search_time': time.time() - start_time,
+        'rollouts_performed': 0,
+        'source': 'opening_book',
+        'top_moves': [
+            {
+                'move': entry['move'],
+                'score': entry['score'] if entry['score'] is not None else 0.0,
+                'visits': entry['weight']
+            }
+            for entry in formatted[:3]
+        ]
+    }
+
+
+def search_analysis(result, source: str = 'search') -> Dict[str, Any]:
+    """Format an alpha-beta search result (or pondered result dict) as an /analyze result."""
+    if isinstance(result, dict):
+        result = SimpleNamespace(**result)
+    return {
+        'best_move': format_move(result.best_move) if result.best_move else None,
+        'best_score': result.best_score,
+        'principal_variation': [format_move(move) for move in result.principal_variation],
+        'search_time': result.search_time,
+        'nodes_searched': result.nodes_searched,
+        'depth_reached': result.depth_reached,
+        'source': source
+    }
+
+
+def mcts_hint(result) -> Dict[str, Any]:
+    """Format an MCTS result as a /hint result."""
+    return {
+        'best_move': format_move(result.best_move) if result.best_move else None,
+        'expected_value': result.best_score,
+        'confidence': min(1.0, result.nodes_searched / 100.0),  # Simple confidence based on nodes
+        'search_time': result.search_time,
+        'rollouts_performed': result.rollout_count,
+        'source': 'search',
+        'top_moves': [
+            {
+                'move': format_move(result.best_move),
+                'score': result.best_score,
+                'visits': result.nodes_searched
+            }
+        ] if result.best_move else []
+    }
+
+
+def cache_search_result(fen_string: str, player_count: int, agent_id: int, result):
+    """Store an alpha-beta search result in the analysis cache, if there is a database."""
+    if not getattr(current_app, 'database', None):
+        return
+    try:
+        position_id = current_app.database.cache_position(fen_string, player_count)
+        current_app.database.cache_analysis(position_id, agent_id, 'alpha_beta', {
+            'best_move': str(result.best_move) if result.best_move else None,
+            'best_score': result.best_score,
+            'search_time': result.search_time,
+            'nodes_searched': result.nodes_searched,
+            'depth_reached': result.depth_reached,
+            'principal_variation': [str(move) for move in result.principal_variation]
+        })
+    except Exception as e:
+        current_app.logger.warning(f"Failed to cache analysis: {e}")
+
+
+def streamed_analysis(result) -> Dict[str, Any]:
+    """/analyze result plus search speed, for /analyze/stream events."""
+    analysis = search_analysis(result)
+    analysis['nodes_per_second'] = result.nodes_searched / max(0.001, result.search_time)
+    return analysis
+
+
+def streamed_hint(result) -> Dict[str, Any]:
+    """/hint result plus principal variation and search speed, for /hint/stream events."""
+    hint = mcts_hint(result)
+    hint['principal_variation'] = [format_move(move) for move in result.principal_variation]
+    hint['nodes_per_second'] = result.nodes_searched / max(0.001, result.search_time)
+    hint['rollouts_per_second'] = result.rollouts_per_second
+    return hint
+
+
 @analysis_bp.route('/analyses/<path:fen_string>', methods=['GET'])
 @require_session
 def get_analysis(fen_string: str):
@@ -512,56 +644,65 @@ def analyze_position():
             if state is None:
                 return jsonify({'error': 'Failed to create initial game state'}), 500
         
-        # Import search components
-        from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
-        
-        # Create search engine
-        search_engine = AzulAlphaBetaSearch(
-            max_depth=analysis_req.depth or 3,
-            max_time=analysis_req.time_budget or 4.0
-        )
+        # Answer book positions without searching
+        start_time = time.time()
+        max_depth = analysis_req.depth or 3
+        max_time = analysis_req.time_budget or 4.0
+        book_moves = probe_opening_book(state, analysis_req.agent_id) if analysis_req.use_book else None
+        ponder_service = getattr(current_app, 'ponder_service', None)
+        analysis = None
+        if book_moves:
+            analysis = book_analysis(book_moves, start_time)
+            best_move = book_moves[0].move
+        elif ponder_service is not None:
+            # Answer positions already searched by pondering
+            pondered = ponder_service.lookup(state, analysis_req.agent_id, max_depth, max_time,
+                                             session_id, analysis_req.multiplayer_mode)
+            if pondered is not None:
+                analysis = search_analysis(pondered, source='ponder')
+                best_move = pondered['best_move']
+        
+        if analysis is None:
+            # Import search components
+            from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+            
+            # Create search engine
+            search_engine = AzulAlphaBetaSearch(
+                max_depth=max_depth,
+                max_time=max_time,
+                multiplayer_mode=analysis_req.multiplayer_mode
+            )
+            
+            # Perform search
+            result = search_engine.search(
+                state, 
+                analysis_req.agent_id, 
+                max_depth=max_depth,
+                max_time=max_time
+            )
+            analysis = search_analysis(result)
+            best_move = result.best_move
+            
+            # Cache result if database is available
+            cache_search_result(analysis_req.fen_string, len(state.agents), analysis_req.agent_id, result)
         
-        # Perform search
-        result = search_engine.search(
-            state, 
-            analysis_req.agent_id, 
-            max_depth=analysis_req.depth or 3,
-            max_time=analysis_req.time_budget or 4.0
-        )
-        search_time = getattr(result, 'search_time', 0.0)
+        # Search the likely next positions while the user thinks, however this one was answered
+        if analysis_req.ponder and session_id and ponder_service is not None:
+            analysis['pondering'] = ponder_service.start(
+                session_id, state, analysis_req.agent_id, best_move,
+                max_depth, max_time, analysis_req.multiplayer_mode
+            )
         
         # Format response
         response = {
             'success': True,
-            'analysis': {
-                'best_move': format_move(result.best_move) if result.best_move else None,
-                'best_score': result.best_score,
-                'principal_variation': [format_move(move) for move in result.principal_variation],
-                'search_time': search_time,
-                'nodes_searched': result.nodes_searched,
-                'depth_reached': result.depth_reached
-            },
+            'analysis': analysis,
             'position': {
                 'fen_string': analysis_req.fen_string,
                 'agent_id': analysis_req.agent_id
             }
         }
         
-        # Cache result if database is available
-        if hasattr(current_app, 'database') and current_app.database:
-            try:
-                position_id = current_app.database.cache_position(analysis_req.fen_string, len(state.agents))
-                current_app.database.cache_analysis(position_id, analysis_req.agent_id, 'alpha_beta', {
-                    'best_move': str(result.best_move) if result.best_move else None,
-                    'best_score': result.best_score,
-                    'search_time': result.search_time,
-                    'nodes_searched': result.nodes_searched,
-                    'depth_reached': result.depth_reached,
-                    'principal_variation': [str(move) for move in result.principal_variation]
-                })
-            except Exception as e:
-                current_app.logger.warning(f"Failed to cache analysis: {e}")
-        
         return jsonify(response)
         
     except ValidationError as e:
@@ -601,9 +742,26 @@ def get_hint():
         
         hint_req = HintRequest(**data)
         
+        # Hints count as activity for the session's pondering
+        if getattr(current_app, 'ponder_service', None) is not None:
+            current_app.ponder_service.touch(request.headers.get('X-Session-ID'))
+        
         # Parse game state
         state = parse_fen_string(hint_req.fen_string)
         
+        # Answer book positions without searching
+        start_time = time.time()
+        book_moves = probe_opening_book(state, hint_req.agent_id) if hint_req.use_book else None
+        if book_moves:
+            return jsonify({
+                'success': True,
+                'hint': book_hint(book_moves, start_time),
+                'position': {
+                    'fen_string': hint_req.fen_string,
+                    'agent_id': hint_req.agent_id
+                }
+            })
+        
         # Import MCTS components
         from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS
         
@@ -621,20 +779,7 @@ def get_hint():
         # Format response
         response = {
             'success': True,
-            'hint': {
-                'best_move': format_move(result.best_move) if result.best_move else None,
-                'expected_value': result.best_score,
-                'confidence': min(1.0, result.nodes_searched / 100.0),  # Simple confidence based on nodes
-                'search_time': search_time,
-                'rollouts_performed': result.rollout_count,
-                'top_moves': [
-                    {
-                        'move': format_move(result.best_move),
-                        'score': result.best_score,
-                        'visits': result.nodes_searched
-                    }
-                ] if result.best_move else []
-            },
+            'hint': mcts_hint(result),
             'position': {
                 'fen_string': hint_req.fen_string,
                 'agent_id': hint_req.agent_id
@@ -677,4 +822,176 @@ def get_hint():
     except ValueError as e:
         return jsonify({'error': 'Invalid position', 'message': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': 'Hint generation failed', 'message': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Hint generation failed', 'message': str(e)}), 500 
+
+
+@analysis_bp.route('/analyze/stream', methods=['POST'])
+def stream_analysis():
+    """
+    Stream an exact analysis as Server-Sent Events.
+    
+    POST /api/v1/analyze/stream
+    (same body as /analyze)
+    
+    Events:
+        depth: result after each completed iterative-deepening depth
+        done:  final result, shaped like the /analyze "analysis" object
+        error: the search failed
+    
+    The search stops as soon as the client disconnects.
+    """
+    try:
+        session_id = request.headers.get('X-Session-ID')
+        if current_app.rate_limiter and not current_app.rate_limiter.check_rate_limit(session_id, "heavy"):
+            return jsonify({
+                'error': 'Rate limit exceeded',
+                'message': 'Too many heavy analysis requests'
+            }), 429
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        analysis_req = AnalysisRequest(**data)
+        state = parse_fen_string(analysis_req.fen_string)
+        if state is None:
+            return jsonify({'error': 'Invalid position', 'message': analysis_req.fen_string}), 400
+        max_depth = analysis_req.depth or 3
+        max_time = analysis_req.time_budget or 4.0
+        
+        # Book and pondered positions need no search: send the answer as the only event
+        start_time = time.time()
+        book_moves = probe_opening_book(state, analysis_req.agent_id) if analysis_req.use_book else None
+        if book_moves:
+            return Response(format_sse('done', book_analysis(book_moves, start_time)),
+                            mimetype='text/event-stream')
+        ponder_service = getattr(current_app, 'ponder_service', None)
+        if ponder_service is not None:
+            pondered = ponder_service.lookup(state, analysis_req.agent_id, max_depth, max_time, session_id,
+                                             analysis_req.multiplayer_mode)
+            if pondered is not None:
+                return Response(format_sse('done', search_analysis(pondered, source='ponder')),
+                                mimetype='text/event-stream')
+        
+        from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+        
+        search_engine = AzulAlphaBetaSearch(max_depth=max_depth, max_time=max_time,
+                                            multiplayer_mode=analysis_req.multiplayer_mode)
+        final = {}
+        
+        def run_search(emit):
+            result = search_engine.search(
+                state, analysis_req.agent_id, max_depth=max_depth, max_time=max_time,
+                progress=lambda partial: emit('depth', streamed_analysis(partial))
+            )
+            final['result'] = result
+            return streamed_analysis(result)
+        
+        def on_done(payload):
+            cache_search_result(analysis_req.fen_string, len(state.agents), analysis_req.agent_id,
+                                final['result'])
+        
+        return stream_search(run_search, stop=search_engine.stop, on_done=on_done)
+        
+    except ValidationError as e:
+        return jsonify({'error': 'Invalid request data', 'details': e.errors()}), 400
+    except ValueError as e:
+        return jsonify({'error': 'Invalid position', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Analysis failed', 'message': str(e)}), 500
+
+
+@analysis_bp.route('/hint/stream', methods=['POST'])
+def stream_hint():
+    """
+    Stream a fast hint as Server-Sent Events.
+    
+    POST /api/v1/hint/stream
+    (same body as /hint, plus optional "progress_interval" rollouts between events)
+    
+    Events:
+        rollouts: current best move every progress_interval rollouts
+        done:     final result, shaped like the /hint "hint" object
+        error:    the search failed
+    
+    The search stops as soon as the client disconnects.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        hint_req = HintRequest(**data)
+        state = parse_fen_string(hint_req.fen_string)
+        if state is None:
+            return jsonify({'error': 'Invalid position', 'message': hint_req.fen_string}), 400
+        
+        if getattr(current_app, 'ponder_service', None) is not None:
+            current_app.ponder_service.touch(request.headers.get('X-Session-ID'))
+        
+        start_time = time.time()
+        book_moves = probe_opening_book(state, hint_req.agent_id) if hint_req.use_book else None
+        if book_moves:
+            return Response(format_sse('done', book_hint(book_moves, start_time)),
+                            mimetype='text/event-stream')
+        
+        from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS
+        
+        mcts_engine = AzulMCTS(max_time=hint_req.budget, max_rollouts=hint_req.rollouts)
+        
+        def run_search(emit):
+            result = mcts_engine.search(
+                state, hint_req.agent_id,
+                progress=lambda partial: emit('rollouts', streamed_hint(partial)),
+                progress_interval=hint_req.progress_interval
+            )
+            return streamed_hint(result)
+        
+        return stream_search(run_search, stop=mcts_engine.stop)
+        
+    except ValidationError as e:
+        return jsonify({'error': 'Invalid request data', 'details': e.errors()}), 400
+    except ValueError as e:
+        return jsonify({'error': 'Invalid position', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Hint generation failed', 'message': str(e)}), 500
+
+
+@analysis_bp.route('/ponder', methods=['GET'])
+def get_ponder_status():
+    """
+    Get pondering statistics and the calling session's CPU quota usage.
+    
+    GET /api/v1/ponder
+    """
+    ponder_service = getattr(current_app, 'ponder_service', None)
+    if ponder_service is None:
+        return jsonify({'error': 'Pondering not available'}), 503
+    
+    session_id = request.headers.get('X-Session-ID')
+    ponder_service.touch(session_id)
+    return jsonify({
+        'success': True,
+        'ponder': ponder_service.get_stats(session_id)
+    })
+
+
+@analysis_bp.route('/ponder', methods=['DELETE'])
+def stop_pondering():
+    """
+    Cancel the calling session's queued pondering work.
+    
+    DELETE /api/v1/ponder
+    """
+    ponder_service = getattr(current_app, 'ponder_service', None)
+    if ponder_service is None:
+        return jsonify({'error': 'Pondering not available'}), 503
+    
+    session_id = request.headers.get('X-Session-ID')
+    if not session_id:
+        return jsonify({'error': 'Session ID required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'cancelled_tasks': ponder_service.cancel(session_id)
+    })
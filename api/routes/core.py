@@ -17,6 +17,19 @@ from ..utils import parse_fen_string, format_move
 core_bp = Blueprint('core', __name__)
 
 
+def inference_server_config():
+    """Settings of the shared inference server from the app config (used when it starts)."""
+    from neural.inference_server import InferenceServerConfig
+    
+    defaults = InferenceServerConfig()
+    return InferenceServerConfig(
+        model_path=current_app.config.get('NEURAL_MODEL_PATH', defaults.model_path),
+        device=current_app.config.get('NEURAL_DEVICE', defaults.device),
+        cpu_backend=current_app.config.get('NEURAL_CPU_BACKEND', defaults.cpu_backend),
+        cache_bytes=current_app.config.get('NEURAL_CACHE_BYTES', defaults.cache_bytes)
+    )
+
+
 @core_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -59,6 +72,7 @@ def analyze_neural():
         agent_id = data.get('agent_id', 0)
         time_budget = data.get('time_budget', 2.0)
         max_rollouts = data.get('max_rollouts', 100)
+        leaf_batch_size = data.get('leaf_batch_size', 8)
         
         # Parse FEN and create state
         state = parse_fen_string(fen_string)
@@ -68,14 +82,17 @@ def analyze_neural():
         # Check if neural components are available
         try:
             from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS, RolloutPolicy
-            from neural.azul_net import create_azul_net, AzulNeuralRolloutPolicy
+            from neural.inference_server import get_inference_server
             
-            # Create neural MCTS
+            # Create neural MCTS on the shared, already loaded model; its
+            # forward passes are batched with those of concurrent requests
             mcts = AzulMCTS(
                 rollout_policy=RolloutPolicy.NEURAL,
                 max_time=time_budget,
                 max_rollouts=max_rollouts,
-                database=getattr(current_app, 'database', None)
+                database=getattr(current_app, 'database', None),
+                leaf_batch_size=leaf_batch_size,
+                inference_server=get_inference_server(inference_server_config())
             )
             
             # Perform search
@@ -39,6 +39,9 @@ from ..utils import (
 # Create Flask blueprint for game endpoints
 game_bp = Blueprint('game', __name__)
 
+# Score loss (versus the best move) at which a move counts as a blunder
+BLUNDER_THRESHOLD = 3.0
+
 
 @game_bp.route('/execute_move', methods=['POST'])
 # @require_session # Removed for local development
@@ -481,8 +484,6 @@ def analyze_game():
         moves = game_data.get('moves', [])
         analysis_results = []
         
-        print(f"DEBUG: Analyzing game with {len(moves)} moves")
-        
         for i, move_data in enumerate(moves):
             # Get position before move
             position = move_data.get('position_before', 'initial')
@@ -492,8 +493,15 @@ def analyze_game():
                 analysis = analyze_position_internal(position, move_data['player'], request_model.analysis_depth)
                 
                 # Calculate blunder severity
-                actual_move_score = analysis.get('move_scores', {}).get(str(move_data['move']), 0)
                 best_move_score = analysis.get('best_score', 0)
+                key = move_score_key(move_data['move'])
+                actual_move_score = analysis.get('move_scores', {}).get(key)
+                if actual_move_score is None:
+                    # The multi-PV search did not score the played move; search it on its own
+                    actual_move_score = score_move_internal(position, move_data['player'], key,
+                                                            request_model.analysis_depth)
+                if actual_move_score is None:
+                    raise ValueError(f"Move {key} is not legal in this position")
                 blunder_severity = best_move_score - actual_move_score
                 
                 analysis_results.append({
@@ -503,13 +511,11 @@ def analyze_game():
                     'position': position,
                     'analysis': analysis,
                     'blunder_severity': blunder_severity,
-                    'is_blunder': blunder_severity >= 3.0
+                    'is_blunder': blunder_severity >= BLUNDER_THRESHOLD
                 })
                 
-                print(f"DEBUG: Move {i+1} - Blunder severity: {blunder_severity:.2f}")
-                
             except Exception as e:
-                print(f"DEBUG: Error analyzing move {i+1}: {e}")
+                current_app.logger.warning(f"Error analyzing move {i+1}: {e}")
                 analysis_results.append({
                     'move_index': i,
                     'player': move_data['player'],
@@ -821,32 +827,32 @@ def analyze_position_internal(fen_string: str, agent_id: int, depth: int = 3) ->
         # Parse position
         state = parse_fen_string(fen_string)
         
-        # Get legal moves
-        from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
-        generator = FastMoveGenerator()
-        legal_moves = generator.generate_moves_fast(state, agent_id)
-        
-        # Analyze with alpha-beta search
+        # Score every legal move with one multi-PV alpha-beta search. Moves more
+        # than BLUNDER_THRESHOLD below the best only get an upper bound, which is
+        # enough to flag them as blunders.
         from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
         searcher = AzulAlphaBetaSearch()
         
         start_time = time.time()
-        result = searcher.search(state, depth, agent_id)
+        result = searcher.search_multipv(state, agent_id, score_margin=BLUNDER_THRESHOLD, max_depth=depth)
         search_time = time.time() - start_time
         
         # Format move scores
         move_scores = {}
-        for move in legal_moves:
-            move_key = f"{move.source_id}_{move.tile_type}_{move.pattern_line_dest}_{move.num_to_pattern_line}_{move.num_to_floor_line}"
-            move_scores[move_key] = 0  # Placeholder - would need to evaluate each move
+        move_bounds = {}
+        for entry in result.move_scores:
+            key = move_score_key(entry.move)
+            move_scores[key] = entry.score
+            move_bounds[key] = entry.bound
         
         return {
             'best_move': format_move(result.best_move) if result.best_move else None,
-            'best_score': result.best_score,
+            'best_score': result.best_score if result.best_move else 0,
             'search_time': search_time,
             'nodes_searched': result.nodes_searched,
             'depth_reached': result.depth_reached,
-            'move_scores': move_scores
+            'move_scores': move_scores,
+            'move_bounds': move_bounds
         }
         
     except Exception as e:
@@ -862,6 +868,37 @@ def analyze_position_internal(fen_string: str, agent_id: int, depth: int = 3) ->
         }
 
 
+def score_move_internal(fen_string: str, agent_id: int, move_key: str, depth: int = 3) -> Optional[float]:
+    """Exact search score of one move (a move_score_key), or None if it is not legal."""
+    state = parse_fen_string(fen_string)
+    
+    from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+    searcher = AzulAlphaBetaSearch()
+    moves = [move for move in searcher.move_generator.generate_moves_fast(state, agent_id)
+             if move_score_key(move) == move_key]
+    if not moves:
+        return None
+    
+    result = searcher.search_multipv(state, agent_id, max_depth=depth, root_moves=moves)
+    return result.best_score if result.best_move else None
+
+
+def move_score_key(move) -> str:
+    """Key of a move in analysis move_scores, from a FastMove, a move dict or a key string."""
+    if isinstance(move, str):
+        return move
+    if isinstance(move, dict):
+        fields = [move.get(name, -1) for name in
+                  ('source_id', 'tile_type', 'pattern_line_dest', 'num_to_pattern_line', 'num_to_floor_line')]
+        # Game logs may name tiles ("blue") rather than number them
+        if isinstance(fields[1], str) and not fields[1].lstrip('-').isdigit():
+            fields[1] = convert_tile_string_to_type(fields[1])
+    else:
+        fields = [move.source_id, move.tile_type, move.pattern_line_dest,
+                  move.num_to_pattern_line, move.num_to_floor_line]
+    return "_".join(str(int(field)) for field in fields)
+
+
 def parse_game_log(content: str, format_type: str) -> Dict[str, Any]:
     """Parse game log content based on format."""
     if format_type == 'json':
@@ -20,11 +20,52 @@ db = None
 # Global evaluation sessions storage (temporary until database integration)
 evaluation_sessions = {}
 
+# Supervisor of out-of-process training jobs (created on first use)
+training_supervisor = None
+
 def init_neural_routes(database):
     """Initialize neural routes with database reference."""
     global db
     db = database
 
+
+def get_training_supervisor():
+    """Get the training job supervisor, creating it on first use."""
+    global training_supervisor
+    if training_supervisor is None:
+        from neural.training_jobs import TrainingJobSupervisor
+        training_supervisor = TrainingJobSupervisor(db)
+    elif training_supervisor.db is not db:
+        # Keep the running jobs; only their reports go to the new database
+        training_supervisor.db = db
+    return training_supervisor
+
+
+def _training_config(training_request: NeuralTrainingRequest):
+    """TrainingConfig for a validated training request."""
+    from neural.train import TrainingConfig
+    
+    # Configuration based on size
+    if training_request.config == 'small':
+        hidden_size = 64
+        num_layers = 2
+    elif training_request.config == 'medium':
+        hidden_size = 128
+        num_layers = 3
+    else:  # large
+        hidden_size = 256
+        num_layers = 4
+    
+    return TrainingConfig(
+        batch_size=training_request.batch_size,
+        learning_rate=training_request.learning_rate,
+        num_epochs=training_request.epochs,
+        num_samples=training_request.samples,
+        hidden_size=hidden_size,
+        num_layers=num_layers,
+        device=training_request.device
+    )
+
 @neural_bp.route('/neural/train', methods=['POST'])
 def start_neural_training():
     """Start neural network training in background with enhanced monitoring."""
@@ -83,156 +124,18 @@ def start_neural_training():
         )
         db.save_neural_training_session(db_session)
         
-        # Start training in background thread
-        def train_in_background():
-            try:
-                # Update status to running
-                db_session = db.get_neural_training_session(session_id)
-                if not db_session:
-                    return
-                
-                db_session.status = 'running'
-                db_session.logs.append('Training started')
-                db.save_neural_training_session(db_session)
-                
-                # Configuration based on size
-                if training_request.config == 'small':
-                    hidden_size = 64
-                    num_layers = 2
-                elif training_request.config == 'medium':
-                    hidden_size = 128
-                    num_layers = 3
-                else:  # large
-                    hidden_size = 256
-                    num_layers = 4
-                
-                # Create training config
-                train_config = TrainingConfig(
-                    batch_size=training_request.batch_size,
-                    learning_rate=training_request.learning_rate,
-                    num_epochs=training_request.epochs,
-                    num_samples=training_request.samples,
-                    hidden_size=hidden_size,
-                    num_layers=num_layers,
-                    device=training_request.device
-                )
-                
-                # Create custom trainer with progress callbacks
-                class MonitoredTrainer(AzulNetTrainer):
-                    def __init__(self, config, session_id, db):
-                        super().__init__(config)
-                        self.session_id = session_id
-                        self.db = db
-                        self.epoch_count = 0
-                    
-                    def _train_epoch(self, states, policy_targets, value_targets):
-                        """Override to add progress monitoring."""
-                        # Get current session from database
-                        db_session = self.db.get_neural_training_session(self.session_id)
-                        if not db_session:
-                            raise InterruptedError("Session not found")
-                        
-                        # Check if stop requested
-                        if db_session.status == 'stopped':
-                            raise InterruptedError("Training stopped by user")
-                        
-                        # Get resource usage
-                        resources = get_process_resources()
-                        db_session.cpu_usage.append(resources['cpu_percent'])
-                        db_session.memory_usage.append(resources['memory_percent'])
-                        
-                        # Train epoch
-                        loss = super()._train_epoch(states, policy_targets, value_targets)
-                        
-                        # Update progress
-                        self.epoch_count += 1
-                        progress = min(80, (self.epoch_count / train_config.num_epochs) * 80)
-                        
-                        # Update database session with progress
-                        db_session.progress = int(progress)
-                        db_session.current_epoch = self.epoch_count
-                        db_session.loss_history.append(loss)
-                        db_session.epoch_history.append(self.epoch_count)
-                        db_session.timestamp_history.append(datetime.now().isoformat())
-                        
-                        # Save progress to database
-                        self.db.save_neural_training_session(db_session)
-                        
-                        return loss
-                
-                # Train model with monitoring
-                trainer = MonitoredTrainer(train_config, session_id, db)
-                losses = trainer.train()
-                
-                # Get final session and update with completion
-                db_session = db.get_neural_training_session(session_id)
-                if db_session:
-                    db_session.logs.append(f'Training completed with {len(losses)} epochs')
-                    db_session.progress = 80
-                    db.save_neural_training_session(db_session)
-                
-                # Evaluate
-                eval_results = trainer.evaluate(num_samples=50)
-                if db_session:
-                    db_session.logs.append('Evaluation completed')
-                    db_session.progress = 90
-                    db.save_neural_training_session(db_session)
-                
-                # Save model
-                import os
-                os.makedirs("models", exist_ok=True)
-                model_path = f"models/azul_net_{training_request.config}.pth"
-                trainer.save_model(model_path)
-                
-                # Final update with completed status
-                if db_session:
-                    db_session.logs.append(f'Model saved to {model_path}')
-                    db_session.progress = 100
-                    db_session.status = 'completed'
-                    db_session.end_time = datetime.now()
-                    db_session.results = {
-                        'final_loss': losses[-1] if losses else 0.0,
-                        'evaluation_error': eval_results.get('avg_value_error', 0.0),
-                        'model_path': model_path,
-                        'config': training_request.config,
-                        'epochs': training_request.epochs,
-                        'samples': training_request.samples
-                    }
-                    
-                    # Update metadata with final results
-                    if not db_session.metadata:
-                        db_session.metadata = {}
-                    db_session.metadata.update({
-                        'final_loss': losses[-1] if losses else 0.0,
-                        'evaluation_error': eval_results.get('avg_value_error', 0.0),
-                        'model_path': model_path
-                    })
-                    
-                    db.save_neural_training_session(db_session)
-                
-            except InterruptedError:
-                # Update database with stopped status
-                db_session = db.get_neural_training_session(session_id)
-                if db_session:
-                    db_session.status = 'stopped'
-                    db_session.logs.append('Training stopped by user')
-                    db_session.end_time = datetime.now()
-                    db.save_neural_training_session(db_session)
-                
-            except Exception as e:
-                # Update database with failed status
-                db_session = db.get_neural_training_session(session_id)
-                if db_session:
-                    db_session.status = 'failed'
-                    db_session.error = str(e)
-                    db_session.logs.append(f'Error: {str(e)}')
-                    db_session.end_time = datetime.now()
-                    db.save_neural_training_session(db_session)
-        
-        # Start background thread
-        thread = threading.Thread(target=train_in_background)
-        thread.daemon = True
-        thread.start()
+        # Train in a separate process so training does not compete with requests for the GIL
+        try:
+            get_training_supervisor().start(
+                session_id, _training_config(training_request),
+                f"models/azul_net_{training_request.config}.pth"
+            )
+        except RuntimeError as e:
+            db_session.status = 'failed'
+            db_session.error = str(e)
+            db_session.end_time = datetime.now()
+            db.save_neural_training_session(db_session)
+            return jsonify({'error': 'Training not started', 'message': str(e)}), 409
         
         return jsonify({
             'success': True,
@@ -299,12 +202,13 @@ def stop_training(session_id):
         if not db_session:
             return jsonify({'error': 'Session not found'}), 404
         
-        # Update session status to stopped
-        db_session.status = 'stopped'
-        db_session.logs.append('Stop requested - training will terminate gracefully')
-        
-        # Save updated session to database
-        db.save_neural_training_session(db_session)
+        # A running job stops after its current epoch and reports 'stopped' itself
+        if not get_training_supervisor().stop(session_id):
+            if db_session.status in ('starting', 'running'):
+                db_session.status = 'stopped'
+                db_session.end_time = datetime.now()
+            db_session.logs.append('Stop requested - no training process is running')
+            db.save_neural_training_session(db_session)
         
         return jsonify({
             'success': True,
@@ -319,6 +223,56 @@ def stop_training(session_id):
         }), 500
 
 
+@neural_bp.route('/neural/resume/<session_id>', methods=['POST'])
+def resume_training(session_id):
+    """Resume a stopped, failed or interrupted training session from its last checkpoint."""
+    try:
+        db_session = db.get_neural_training_session(session_id)
+        if not db_session:
+            return jsonify({'error': 'Session not found'}), 404
+        
+        supervisor = get_training_supervisor()
+        if supervisor.is_running(session_id):
+            return jsonify({'error': 'Training is already running', 'session_id': session_id}), 409
+        if db_session.status == 'completed':
+            return jsonify({'error': 'Training already completed', 'session_id': session_id}), 409
+        if not supervisor.has_checkpoint(session_id):
+            return jsonify({
+                'error': 'No checkpoint',
+                'message': 'The session has no checkpoint to resume from'
+            }), 404
+        
+        training_request = NeuralTrainingRequest(**db_session.config)
+        db_session.status = 'starting'
+        db_session.error = None
+        db_session.end_time = None
+        db_session.logs.append('Resume requested')
+        db.save_neural_training_session(db_session)
+        
+        try:
+            supervisor.start(session_id, _training_config(training_request),
+                             f"models/azul_net_{training_request.config}.pth")
+        except RuntimeError as e:
+            db_session.status = 'failed'
+            db_session.error = str(e)
+            db_session.end_time = datetime.now()
+            db.save_neural_training_session(db_session)
+            return jsonify({'error': 'Training not resumed', 'message': str(e)}), 409
+        
+        return jsonify({
+            'success': True,
+            'message': 'Training resumed from checkpoint',
+            'session_id': session_id,
+            'status': 'starting'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Failed to resume training',
+            'message': str(e)
+        }), 500
+
+
 # Neural Evaluation Endpoints
 
 @neural_bp.route('/neural/evaluate', methods=['POST'])
@@ -1002,6 +956,7 @@ def get_neural_status():
             'model_count': len(available_models),
             'process_resources': process_resources,
             'system_resources': system_resources,
+            'training_jobs': training_supervisor.get_stats() if training_supervisor is not None else {'running_jobs': 0},
             'timestamp': time.time()
         }
         
@@ -104,6 +104,7 @@ def get_performance_stats():
             'search_performance': search_performance,
             'cache_analytics': cache_analytics,
             'index_usage': index_usage,
+            'neural_inference': get_neural_inference_stats(),
             'timestamp': time.time()
         }
         
@@ -440,6 +441,7 @@ def get_monitoring_data():
             'index_usage': index_usage,
             'database_metrics': db_monitoring,
             'system_metrics': system_metrics,
+            'neural_inference': get_neural_inference_stats(),
             'timestamp': time.time()
         }
         
@@ -450,6 +452,15 @@ def get_monitoring_data():
         return jsonify({'error': 'Failed to get monitoring data', 'message': str(e)}), 500
 
 
+def get_neural_inference_stats():
+    """Get queue depth, batch sizes and latency of the shared neural inference server."""
+    try:
+        from neural.inference_server import get_inference_server_stats
+    except ImportError:
+        return {'running': False, 'available': False}
+    return get_inference_server_stats()
+
+
 def get_system_resources():
     """Get system resource usage."""
     try:
@@ -36,6 +36,11 @@ from .performance import (
     get_system_resources
 )
 
+from .sse import (
+    format_sse,
+    stream_search
+)
+
 # Export all utilities
 __all__ = [
     # State parsing utilities
@@ -62,4 +67,8 @@ __all__ = [
     # Performance utilities
     'get_process_resources',
     'get_system_resources',
+    
+    # Server-Sent Events utilities
+    'format_sse',
+    'stream_search',
 ] 
\ No newline at end of file
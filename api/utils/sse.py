@@ -0,0 +1,84 @@
+"""
+Server-Sent Events utilities for the API.
+
+This module runs anytime searches on a worker thread and streams their
+progress to the client, stopping the search when the client goes away.
+"""
+
+import json
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response, stream_with_context
+
+# Seconds between keep-alive comments; writing them is how a disconnect is noticed
+SSE_KEEPALIVE_SECONDS = 1.0
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_search(run_search: Callable[[Callable[[str, Dict[str, Any]], bool]], Dict[str, Any]],
+                  stop: Callable[[], None],
+                  on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> Response:
+    """
+    Stream a search's progress as Server-Sent Events.
+
+    run_search(emit) runs on a worker thread. It calls emit(event, data) for
+    each update, which returns False once the client has disconnected, and
+    returns the final payload, sent as a "done" event. Errors are sent as an
+    "error" event. When the stream is closed early, stop() is called so the
+    search stops instead of running out its budget.
+
+    Args:
+        run_search: Search runner taking the emit callback
+        stop: Stops the running search; must be safe to call from another thread
+        on_done: Called with the final payload in the request context (e.g. to cache it)
+
+    Returns:
+        Streaming text/event-stream response
+    """
+    events: "queue.Queue" = queue.Queue()
+    disconnected = threading.Event()
+
+    def emit(event: str, data: Dict[str, Any]) -> bool:
+        if disconnected.is_set():
+            return False
+        events.put((event, data))
+        return True
+
+    def worker():
+        try:
+            events.put(('done', run_search(emit)))
+        except Exception as e:
+            events.put(('error', {'error': 'Search failed', 'message': str(e)}))
+
+    def generate():
+        thread = threading.Thread(target=worker, name="sse-search", daemon=True)
+        thread.start()
+        try:
+            while True:
+                try:
+                    event, data = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event == 'done' and on_done is not None:
+                    on_done(data)
+                yield format_sse(event, data)
+                if event in ('done', 'error'):
+                    return
+        finally:
+            # Runs when the search finishes and when the client closes the stream early
+            disconnected.set()
+            stop()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
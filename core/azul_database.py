@@ -1257,37 +1257,7 @@ class AzulDatabase:
         """
         try:
             with self.get_connection() as conn:
-                # Convert lists to JSON strings for storage
-                config_json = json.dumps(session.config) if session.config else None
-                logs_json = json.dumps(session.logs) if session.logs else None
-                results_json = json.dumps(session.results) if session.results else None
-                loss_history_json = json.dumps(session.loss_history) if session.loss_history else None
-                epoch_history_json = json.dumps(session.epoch_history) if session.epoch_history else None
-                timestamp_history_json = json.dumps(session.timestamp_history) if session.timestamp_history else None
-                cpu_usage_json = json.dumps(session.cpu_usage) if session.cpu_usage else None
-                memory_usage_json = json.dumps(session.memory_usage) if session.memory_usage else None
-                gpu_usage_json = json.dumps(session.gpu_usage) if session.gpu_usage else None
-                
-                metadata_json = json.dumps(session.metadata) if session.metadata else None
-                
-                cursor = self._execute_with_monitoring(conn, """
-                    INSERT OR REPLACE INTO neural_training_sessions (
-                        session_id, status, progress, start_time, end_time,
-                        config, logs, results, error, loss_history, epoch_history,
-                        timestamp_history, cpu_usage, memory_usage, gpu_usage,
-                        estimated_total_time, current_epoch, total_epochs, created_at, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    session.session_id, session.status, session.progress,
-                    session.start_time.isoformat() if session.start_time else None,
-                    session.end_time.isoformat() if session.end_time else None,
-                    config_json, logs_json, results_json, session.error,
-                    loss_history_json, epoch_history_json, timestamp_history_json,
-                    cpu_usage_json, memory_usage_json, gpu_usage_json,
-                    session.estimated_total_time, session.current_epoch, session.total_epochs,
-                    session.created_at.isoformat() if session.created_at else datetime.now().isoformat(),
-                    metadata_json
-                ), "save_neural_training_session")
+                self._write_neural_training_session(conn, session)
                 
                 # Explicitly commit the transaction
                 conn.commit()
@@ -1297,6 +1267,110 @@ class AzulDatabase:
             print(f"Error saving neural training session: {e}")
             return False
 
+    def save_neural_training_progress(self, session: NeuralTrainingSession,
+                                      progress: List[NeuralTrainingProgress]) -> bool:
+        """
+        Save a training session and its new per-epoch progress rows in one transaction.
+        
+        Args:
+            session: NeuralTrainingSession object to save
+            progress: Epoch records to append to neural_training_progress
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self.get_connection() as conn:
+                self._write_neural_training_session(conn, session)
+                if progress:
+                    start_time = time.time()
+                    conn.executemany("""
+                        INSERT INTO neural_training_progress (session_id, epoch, loss, timestamp)
+                        VALUES (?, ?, ?, ?)
+                    """, [(record.session_id, record.epoch, record.loss, record.timestamp.isoformat())
+                          for record in progress])
+                    self._log_query_performance("save_neural_training_progress",
+                                                (time.time() - start_time) * 1000, 0)
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error saving neural training progress: {e}")
+            return False
+
+    def get_neural_training_progress(self, session_id: str) -> List[NeuralTrainingProgress]:
+        """
+        Get the per-epoch progress rows of a training session, oldest first.
+        
+        Args:
+            session_id: Session ID to retrieve
+            
+        Returns:
+            List of NeuralTrainingProgress records
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = self._execute_with_monitoring(conn, """
+                    SELECT session_id, epoch, loss, timestamp FROM neural_training_progress
+                    WHERE session_id = ? ORDER BY id
+                """, (session_id,), "get_neural_training_progress")
+                return [
+                    NeuralTrainingProgress(
+                        session_id=row['session_id'],
+                        epoch=row['epoch'],
+                        loss=row['loss'],
+                        timestamp=datetime.fromisoformat(row['timestamp'])
+                    )
+                    for row in cursor.fetchall()
+                ]
+        except Exception as e:
+            print(f"Error getting neural training progress: {e}")
+            return []
+
+    def _write_neural_training_session(self, conn: sqlite3.Connection, session: NeuralTrainingSession):
+        """Insert or replace a session row on an open connection (the caller commits)."""
+        # Convert lists to JSON strings for storage
+        config_json = json.dumps(session.config) if session.config else None
+        logs_json = json.dumps(session.logs) if session.logs else None
+        results_json = json.dumps(session.results) if session.results else None
+        loss_history_json = json.dumps(session.loss_history) if session.loss_history else None
+        epoch_history_json = json.dumps(session.epoch_history) if session.epoch_history else None
+        timestamp_history_json = json.dumps(session.timestamp_history) if session.timestamp_history else None
+        cpu_usage_json = json.dumps(session.cpu_usage) if session.cpu_usage else None
+        memory_usage_json = json.dumps(session.memory_usage) if session.memory_usage else None
+        gpu_usage_json = json.dumps(session.gpu_usage) if session.gpu_usage else None
+        
+        metadata_json = json.dumps(session.metadata) if session.metadata else None
+        
+        # An upsert rather than INSERT OR REPLACE, whose delete would cascade to the progress rows
+        self._execute_with_monitoring(conn, """
+            INSERT INTO neural_training_sessions (
+                session_id, status, progress, start_time, end_time,
+                config, logs, results, error, loss_history, epoch_history,
+                timestamp_history, cpu_usage, memory_usage, gpu_usage,
+                estimated_total_time, current_epoch, total_epochs, created_at, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                status = excluded.status, progress = excluded.progress,
+                start_time = excluded.start_time, end_time = excluded.end_time,
+                config = excluded.config, logs = excluded.logs, results = excluded.results,
+                error = excluded.error, loss_history = excluded.loss_history,
+                epoch_history = excluded.epoch_history, timestamp_history = excluded.timestamp_history,
+                cpu_usage = excluded.cpu_usage, memory_usage = excluded.memory_usage,
+                gpu_usage = excluded.gpu_usage, estimated_total_time = excluded.estimated_total_time,
+                current_epoch = excluded.current_epoch, total_epochs = excluded.total_epochs,
+                created_at = excluded.created_at, metadata = excluded.metadata
+        """, (
+            session.session_id, session.status, session.progress,
+            session.start_time.isoformat() if session.start_time else None,
+            session.end_time.isoformat() if session.end_time else None,
+            config_json, logs_json, results_json, session.error,
+            loss_history_json, epoch_history_json, timestamp_history_json,
+            cpu_usage_json, memory_usage_json, gpu_usage_json,
+            session.estimated_total_time, session.current_epoch, session.total_epochs,
+            session.created_at.isoformat() if session.created_at else datetime.now().isoformat(),
+            metadata_json
+        ), "save_neural_training_session")
+
     def get_neural_training_session(self, session_id: str) -> Optional[NeuralTrainingSession]:
         """
         Get a neural training session from the database.
@@ -34,7 +34,9 @@ def cli():
 @click.option('--timeout', '-t', default=4.0, help='Timeout in seconds')
 @click.option('--agent', '-a', default=0, help='Agent ID to analyze for (default: 0)')
 @click.option('--database', '-db', help='Path to SQLite database for caching')
-def exact(fen_string, depth, timeout, agent, database):
+@click.option('--book', help='Opening book file (default: data/opening_book.bin)')
+@click.option('--no-book', is_flag=True, help='Search even if the position is in the opening book')
+def exact(fen_string, depth, timeout, agent, database, book, no_book):
     """Perform exact analysis of a game position.
     
     FEN_STRING: The game position in FEN-like notation
@@ -47,7 +49,7 @@ def exact(fen_string, depth, timeout, agent, database):
     
     try:
         # Import search components
-        from core.azul_search import AzulAlphaBetaSearch
+        from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
         from core.azul_model import AzulState
         
         # Initialize database if provided
@@ -60,6 +62,10 @@ def exact(fen_string, depth, timeout, agent, database):
         # Parse FEN string to create game state
         state = parse_fen_string(fen_string)
         
+        # Book positions are answered without searching
+        if not no_book and show_book_moves(state, agent, book):
+            return
+        
         # Create search engine
         search_engine = AzulAlphaBetaSearch(max_depth=depth, max_time=timeout)
         
@@ -111,7 +117,9 @@ def exact(fen_string, depth, timeout, agent, database):
 @click.option('--rollouts', '-r', default=100, help='Number of MCTS rollouts')
 @click.option('--agent', '-a', default=0, help='Agent ID to analyze for (default: 0)')
 @click.option('--database', '-d', help='Path to SQLite database for caching')
-def hint(fen_string, budget, rollouts, agent, database):
+@click.option('--book', help='Opening book file (default: data/opening_book.bin)')
+@click.option('--no-book', is_flag=True, help='Search even if the position is in the opening book')
+def hint(fen_string, budget, rollouts, agent, database, book, no_book):
     """Generate fast hints for a game position.
     
     FEN_STRING: The game position in FEN-like notation
@@ -124,7 +132,7 @@ def hint(fen_string, budget, rollouts, agent, database):
     
     try:
         # Import MCTS components
-        from core.azul_mcts import AzulMCTS
+        from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS
         from core.azul_model import AzulState
         
         # Initialize database if provided
@@ -137,6 +145,10 @@ def hint(fen_string, budget, rollouts, agent, database):
         # Parse FEN string to create game state
         state = parse_fen_string(fen_string)
         
+        # Book positions are answered without searching
+        if not no_book and show_book_moves(state, agent, book):
+            return
+        
         # Create MCTS engine
         mcts_engine = AzulMCTS(
             max_time=budget,
@@ -150,15 +162,12 @@ def hint(fen_string, budget, rollouts, agent, database):
         
         # Display results
         click.echo(f"Search completed in {result.search_time:.3f}s")
-        click.echo(f"   Rollouts performed: {result.rollouts_performed}")
-        click.echo(f"   Expected value: {result.expected_value:.2f}")
-        click.echo(f"   Confidence: {result.confidence:.2f}")
+        click.echo(f"   Rollouts performed: {result.rollout_count}")
+        click.echo(f"   Expected value: {result.best_score:.2f}")
         
         if result.best_move:
             click.echo(f"   Best move: {format_move(result.best_move)}")
-            click.echo(f"   Top moves:")
-            for i, (move, score, visits) in enumerate(result.top_moves[:3]):
-                click.echo(f"     {i+1}. {format_move(move)} (score: {score:.2f}, visits: {visits})")
+            click.echo(f"   Principal variation: {len(result.principal_variation)} moves")
         else:
             click.echo("   No best move found (terminal position)")
             
@@ -219,6 +228,62 @@ def serve(host, port, debug, database):
         sys.exit(1)
 
 
+@cli.command('build-book')
+@click.option('--database', '-d', default='data/azul_research.db', help='Research database to compile from')
+@click.option('--output', '-o', default='data/opening_book.bin', help='Opening book file to write')
+@click.option('--min-weight', default=1, help='Drop moves seen fewer times than this')
+def build_book(database, output, min_weight):
+    """Compile the opening book from stored continuations and analyses."""
+    click.echo(f"📖 Compiling opening book from {database}...")
+    
+    try:
+        from analysis_engine.mathematical_optimization.azul_opening_book import compile_opening_book
+        
+        stats = compile_opening_book(database, output, min_weight=min_weight)
+        
+        click.echo(f"✅ Opening book written to {output}")
+        click.echo(f"   Positions: {stats['positions']}, Moves: {stats['moves']}")
+        click.echo(f"   Continuations: {stats['continuations']}, Analyses: {stats['analyses']}, "
+                   f"Skipped: {stats['skipped']}")
+        
+    except Exception as e:
+        click.echo(f"❌ Failed to build opening book: {e}")
+        sys.exit(1)
+
+
+@cli.command('tune-weights')
+@click.option('--database', '-d', multiple=True,
+              help='Move quality database or JSON dataset (repeatable; default: the stored analyses)')
+@click.option('--output', '-o', default='data/evaluator_weights.json', help='Weights file to write')
+@click.option('--workers', '-w', default=1, help='Processes scoring candidate weights')
+@click.option('--max-iterations', default=500, help='Maximum accepted coordinate descent steps')
+@click.option('--regularization', default=1e-5, help='Pull towards the hand-set weights')
+def tune_weights(database, output, workers, max_iterations, regularization):
+    """Tune the evaluator weights against stored move quality analyses."""
+    try:
+        from analysis_engine.mathematical_optimization.azul_evaluator import save_evaluator_weights
+        from analysis_engine.mathematical_optimization.azul_weight_tuning import (
+            DEFAULT_TUNING_DATABASES, load_tuning_set, tune_evaluator_weights, tuning_metadata
+        )
+
+        paths = list(database) or list(DEFAULT_TUNING_DATABASES)
+        click.echo(f"⚖️  Loading labelled moves from {len(paths)} sources...")
+        tuning_set = load_tuning_set(paths)
+        click.echo(f"   Moves: {len(tuning_set)}, Skipped: {tuning_set.skipped}")
+
+        result = tune_evaluator_weights(tuning_set, workers=workers, max_iterations=max_iterations,
+                                        regularization=regularization)
+        weights = save_evaluator_weights(result.weights, output, tuning_metadata(result, tuning_set))
+
+        click.echo(f"✅ Weights {weights.version} written to {output}")
+        click.echo(f"   Error: {result.initial_error:.6f} -> {result.final_error:.6f} "
+                   f"({result.iterations} steps, {result.candidates} candidates, {result.tuning_time:.1f}s)")
+
+    except Exception as e:
+        click.echo(f"❌ Failed to tune weights: {e}")
+        sys.exit(1)
+
+
 @cli.command()
 def test():
     """Run basic engine tests to verify functionality."""
@@ -305,7 +370,9 @@ def status():
               help='Device to use for training')
 @click.option('--epochs', default=5, help='Number of training epochs')
 @click.option('--samples', default=500, help='Number of training samples')
-def train(config: str, device: str, epochs: int, samples: int):
+@click.option('--data', default=None, help='Self-play shard directory to train on (default: synthetic data)')
+@click.option('--workers', default=0, help='Data loader worker processes for --data')
+def train(config: str, device: str, epochs: int, samples: int, data: str, workers: int):
     """Train the neural network for Azul analysis."""
     click.echo(f"🧠 Training AzulNet neural network")
     click.echo(f"   Config: {config}, Device: {device}, Epochs: {epochs}, Samples: {samples}")
@@ -332,6 +399,8 @@ def train(config: str, device: str, epochs: int, samples: int):
             num_samples=samples,
             hidden_size=hidden_size,
             num_layers=num_layers,
+            data_dir=data,
+            num_workers=workers,
             device=device
         )
         
@@ -343,6 +412,7 @@ def train(config: str, device: str, epochs: int, samples: int):
         eval_results = trainer.evaluate(num_samples=50)
         click.echo(f"✅ Training complete!")
         click.echo(f"   Final loss: {losses[-1]:.4f}")
+        click.echo(f"   Throughput: {trainer.epoch_stats[-1]['samples_per_second']:.0f} samples/s")
         click.echo(f"   Evaluation error: {eval_results['avg_value_error']:.4f}")
         
         # Save model
@@ -420,6 +490,203 @@ def evaluate(model, positions, games, device):
     return 0
 
 
+@cli.command('export-model')
+@click.option('--model', default='models/azul_net_small.pth', help='Path to trained model')
+@click.option('--output', '-o', default=None, help='Artefact path (default: next to the model)')
+@click.option('--format', 'export_format', default='torchscript', type=click.Choice(['torchscript', 'onnx']),
+              help='Artefact format')
+@click.option('--no-quantize', is_flag=True, help='Keep fp32 linear layers in the TorchScript artefact')
+@click.option('--benchmark/--no-benchmark', default=True, help='Compare CPU backends on random positions')
+@click.option('--positions', default=256, help='Positions used by the benchmark')
+def export_model(model, output, export_format, no_quantize, benchmark, positions):
+    """Export AzulNet for CPU serving (TorchScript with int8 linear layers, or ONNX)."""
+    try:
+        import random
+        from neural.azul_net import load_azul_net
+        from neural.cpu_inference import benchmark_cpu_inference, export_onnx, export_torchscript
+        from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+
+        net, encoder = load_azul_net(model)
+        stem = str(Path(model).with_suffix(''))
+        if export_format == 'onnx':
+            path = export_onnx(net, output or f"{stem}.onnx")
+        else:
+            suffix = "" if no_quantize else "_int8"
+            path = export_torchscript(net, output or f"{stem}{suffix}.pt", quantize=not no_quantize)
+        click.echo(f"✅ Exported {model} to {path}")
+
+        if benchmark:
+            # Positions from random games, so the features look like real inputs
+            generator = FastMoveGenerator()
+            states = []
+            while len(states) < positions:
+                state = AzulState(2)
+                game_rule = AzulGameRule(2)
+                agent = 0
+                while state.TilesRemaining() and len(states) < positions:
+                    move = random.choice(generator.generate_moves_fast(state, agent))
+                    game_rule.generateSuccessor(state, move.to_tuple(), agent)
+                    agent = 1 - agent
+                    states.append(state.clone())
+
+            results = benchmark_cpu_inference(net, encoder, states)
+            threads = results['threads']
+            click.echo(f"\n📊 CPU BACKENDS ({threads['num_threads']} threads, "
+                       f"{threads['interop_threads']} inter-op)")
+            for backend, stats in results['backends'].items():
+                throughput = ", ".join(f"{size}: {rate:,.0f}/s" for size, rate in stats['states_per_second'].items())
+                click.echo(f"   {backend:<12} {throughput}")
+                click.echo(f"   {'':<12} value Δ {stats['max_value_delta']:.4f}, "
+                           f"policy Δ {stats['max_policy_delta']:.4f}, "
+                           f"top action agreement {stats['top_action_agreement']:.1%}")
+
+    except ImportError as e:
+        click.echo(f"❌ Model export requires PyTorch (and onnx for --format onnx): {e}")
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"❌ Export failed: {e}")
+        sys.exit(1)
+
+
+@cli.command('tune-inference')
+@click.option('--model', default=None, help='Trained model to tune (default: untrained models of --sizes)')
+@click.option('--sizes', default='small,medium,large', help='Model sizes to tune without --model')
+@click.option('--backend', default='eager', type=click.Choice(['eager', 'torchscript', 'int8']),
+              help='CPU backend to tune')
+@click.option('--batch-sizes', default='1,4,8,16,32,64,128', help='Batch sizes to time')
+@click.option('--threads', default=None, help='Thread counts to time (default: 1 up to the core count)')
+@click.option('--positions', default=256, help='Benchmark positions')
+@click.option('--max-latency', default=None, type=float, help='Latency budget per batch in ms')
+@click.option('--output', '-o', default='data/inference_tuning.json', help='Tuning file')
+def tune_inference(model, sizes, backend, batch_sizes, threads, positions, max_latency, output):
+    """Benchmark CPU inference and save the best batch size and thread count for this host."""
+    try:
+        from neural.azul_net import AzulNetConfig, create_azul_net, load_azul_net
+        from neural.inference_tuning import MODEL_SIZES, autotune_cpu_inference, load_benchmark_positions
+
+        if model:
+            nets = [load_azul_net(model)]
+        else:
+            nets = [create_azul_net(AzulNetConfig(**MODEL_SIZES[size.strip()])) for size in sizes.split(',')]
+        states = load_benchmark_positions(positions)
+        thread_counts = [int(n) for n in threads.split(',')] if threads else None
+
+        for net, encoder in nets:
+            net.eval()
+            results = autotune_cpu_inference(
+                net, encoder, states, path=output, backend=backend,
+                batch_sizes=[int(n) for n in batch_sizes.split(',')], thread_counts=thread_counts,
+                max_latency_ms=max_latency
+            )
+            click.echo(f"\n📊 {results['model_size']} ({backend}) on {results['host']}")
+            for c in results['configurations']:
+                click.echo(f"   batch {c['batch_size']:>4} × {c['num_threads']:>2} threads: "
+                           f"{c['states_per_second']:>9,.0f}/s  encode {c['encode_ms']:.2f} ms, "
+                           f"forward {c['forward_ms']:.2f} ms, decode {c['decode_ms']:.2f} ms, "
+                           f"p95 {c['latency_p95_ms']:.2f} ms")
+            best = results['best']
+            click.echo(f"   ✅ Best: batch {best['batch_size']}, {best['num_threads']} threads "
+                       f"({best['states_per_second']:,.0f} states/s)")
+        click.echo(f"\nSaved to {output}")
+
+    except ImportError as e:
+        click.echo(f"❌ Inference tuning requires PyTorch: {e}")
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"❌ Tuning failed: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--engine', '-e', 'engines', multiple=True, required=True,
+              help='Engine as name=kind:key=value,... (kinds: alpha_beta, mcts, neural, random; '
+                   'keys: depth, time, rollouts, policy, model, weights); give two or more')
+@click.option('--pairs', '-p', default=50, help='Opening pairs per match (two games each)')
+@click.option('--workers', '-w', default=1, help='Worker processes')
+@click.option('--opening-moves', default=2, help='Random moves at the start of every opening')
+@click.option('--sprt', default=None, help='Stop matches early with an SPRT of elo0,elo1 (e.g. -20,0)')
+@click.option('--seed', default=0, help='Seed for the openings')
+@click.option('--output', '-o', default=None, help='Write the results as JSON')
+def tournament(engines, pairs, workers, opening_moves, sprt, seed, output):
+    """Play engine configurations against each other and rate them."""
+    try:
+        import json
+        from neural.tournament import SPRTConfig, TournamentConfig, parse_engine_spec, run_tournament
+
+        specs = [parse_engine_spec(text) for text in engines]
+        if len(specs) < 2:
+            raise click.BadParameter("give at least two engines", param_hint='--engine')
+        sprt_config = None
+        if sprt:
+            elo0, elo1 = (float(value) for value in sprt.split(','))
+            sprt_config = SPRTConfig(elo0=elo0, elo1=elo1)
+        config = TournamentConfig(pairs=pairs, workers=workers, opening_moves=opening_moves,
+                                  seed=seed, sprt=sprt_config)
+
+        def report(match):
+            low, high = match['elo_interval']
+            line = (f"   {match['engines'][0]} vs {match['engines'][1]}: +{match['wins']} ={match['draws']} "
+                    f"-{match['losses']}  Elo {match['elo']:+.0f} [{low:+.0f}, {high:+.0f}]  "
+                    f"{match['games_per_second']:.2f} games/s")
+            if 'sprt' in match:
+                line += f"  LLR {match['sprt']['llr']:.2f} ({match['sprt']['decision'] or 'undecided'})"
+            click.echo(line)
+
+        click.echo(f"🏆 {len(specs)} engines, {pairs} opening pairs per match on {workers} workers")
+        results = run_tournament(specs, config, progress=report)
+
+        click.echo("\n📊 RATINGS")
+        for name, rating in sorted(results['ratings'].items(), key=lambda item: -item[1]):
+            click.echo(f"   {name:<16} {rating:+7.0f}")
+        click.echo(f"\n✅ {results['games']} games at {results['games_per_second']:.2f} games/s")
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump(results, f, indent=2)
+            click.echo(f"   Results written to {output}")
+
+    except click.BadParameter:
+        raise
+    except ImportError as e:
+        click.echo(f"❌ Tournaments require PyTorch: {e}")
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"❌ Tournament failed: {e}")
+        sys.exit(1)
+
+
+@cli.command('self-play')
+@click.option('--output', '-o', default='data/self_play', help='Directory for the shards and manifest')
+@click.option('--games', '-g', default=100, help='Number of games to play')
+@click.option('--engine', default='mcts', type=click.Choice(['mcts', 'alpha_beta']), help='Search engine')
+@click.option('--workers', '-w', default=1, help='Worker processes')
+@click.option('--rollouts', '-r', default=200, help='MCTS rollouts per move')
+@click.option('--depth', default=2, help='Alpha-beta depth per move')
+@click.option('--budget', '-b', default=1.0, help='Time budget per move in seconds')
+@click.option('--shard-size', default=4096, help='Samples per shard')
+@click.option('--seed', default=0, help='Seed for the deals and move sampling')
+def self_play(output, games, engine, workers, rollouts, depth, budget, shard_size, seed):
+    """Generate self-play training data as memory-mapped shards."""
+    try:
+        from neural.self_play import SelfPlayConfig, generate_self_play_data
+
+        config = SelfPlayConfig(engine=engine, num_games=games, workers=workers, shard_size=shard_size,
+                                max_rollouts=rollouts, search_depth=depth, search_time=budget, seed=seed)
+        click.echo(f"♟️  Playing {games} {engine} games on {workers} workers...")
+        manifest = generate_self_play_data(config, output)
+
+        elapsed = manifest['generation_time']
+        click.echo(f"✅ {manifest['samples']} samples in {len(manifest['shards'])} shards written to {output}")
+        click.echo(f"   {manifest['games'] / elapsed:.2f} games/s, {manifest['samples'] / elapsed:.1f} samples/s")
+
+    except ImportError as e:
+        click.echo(f"❌ Self-play requires PyTorch: {e}")
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"❌ Self-play failed: {e}")
+        sys.exit(1)
+
+
 @cli.command()
 @click.option('--state', type=click.Choice(['initial', 'mid', 'late']), 
               default='initial', help='Test state to use')
@@ -490,6 +757,28 @@ def parse_fen_string(fen_string):
         raise ValueError(f"Unsupported FEN format: {fen_string}. Use 'initial' for now.")
 
 
+def show_book_moves(state, agent, book_path=None):
+    """Print the opening book moves for a position. Returns True if it was in book."""
+    from analysis_engine.mathematical_optimization.azul_opening_book import load_opening_book
+    
+    book = load_opening_book(book_path)
+    book_moves = book.probe(state, agent) if book else []
+    if not book_moves:
+        return False
+    
+    click.echo(f"Position found in opening book ({book.path})")
+    click.echo(f"   Best move: {format_move(book_moves[0].move)}")
+    click.echo(f"   Book moves:")
+    for i, book_move in enumerate(book_moves[:3]):
+        details = f"weight: {book_move.weight}"
+        if book_move.score == book_move.score:  # Skip NaN
+            details += f", score: {book_move.score:.1f}"
+        if book_move.win_rate == book_move.win_rate:
+            details += f", win rate: {book_move.win_rate:.0%}"
+        click.echo(f"     {i+1}. {format_move(book_move.move)} ({details})")
+    return True
+
+
 def format_move(move):
     """Format a move for display."""
     if move is None:
@@ -12,7 +12,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Sequence, Union
 from dataclasses import dataclass
 
 try:
@@ -26,6 +26,8 @@ except ImportError:
     from core.azul_model import AzulState
     from core.azul_utils import Tile, Action
 
+from neural.result_cache import DEFAULT_CACHE_BYTES, NeuralResultCache, mask_logits, position_key
+
 
 @dataclass
 class AzulNetConfig:
@@ -50,8 +52,118 @@ class AzulNetConfig:
 class AzulTensorEncoder:
     """Encodes Azul game states into tensors for neural networks."""
     
-    def __init__(self, config: AzulNetConfig):
+    def __init__(self, config: AzulNetConfig, pin_memory: bool = False):
+        """
+        Args:
+            config: Network configuration (encoding sizes)
+            pin_memory: Allocate the reusable encode_batch buffer in pinned
+                memory (only with CUDA available) for faster host-to-device copies
+        """
         self.config = config
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._buffer: Optional[torch.Tensor] = None
+        
+        # Feature offsets, in encode_state's concatenation order
+        c = config
+        self._factory_size = c.max_factories * 6 * c.num_tile_types
+        self._center_size = c.max_center_tiles * c.num_tile_types
+        self._wall_size = c.max_wall_size * c.max_wall_size
+        self._pattern_size = c.max_pattern_lines * c.num_tile_types
+        self._floor_size = c.max_floor_size * c.num_tile_types
+        self._board_size = self._wall_size + self._pattern_size + self._floor_size
+        self.feature_size = self._factory_size + self._center_size + 2 * self._board_size + 2
+    
+    def encode_batch(self, states: Sequence[AzulState], agent_ids: Union[int, Sequence[int]] = 0,
+                     reuse_buffer: bool = False) -> torch.Tensor:
+        """
+        Encode many states into one [N, feature_dim] tensor.
+        
+        Gives the same features as stacking encode_state's rows, written with
+        vectorized indexing into one NumPy array that the tensor shares
+        (torch.from_numpy, no copy).
+        
+        Args:
+            states: Game states
+            agent_ids: Agent to encode for in each state (or one for all)
+            reuse_buffer: Write into a buffer kept by the encoder instead of a
+                new array; the result is overwritten by the next such call
+            
+        Returns:
+            Float tensor of shape [N, feature_dim]
+        """
+        if isinstance(agent_ids, (int, np.integer)):
+            agent_ids = [agent_ids] * len(states)
+        if len(agent_ids) != len(states):
+            raise ValueError(f"Got {len(agent_ids)} agent ids for {len(states)} states")
+        
+        count = len(states)
+        if reuse_buffer:
+            if self._buffer is None or self._buffer.shape[0] < count:
+                self._buffer = torch.zeros(max(count, 1), self.feature_size, pin_memory=self.pin_memory)
+            tensor = self._buffer[:count]
+            out = tensor.numpy()
+            out.fill(0.0)
+        else:
+            out = np.zeros((count, self.feature_size), dtype=np.float32)
+            tensor = torch.from_numpy(out)
+        if count == 0:
+            return tensor
+        
+        c = self.config
+        num_tiles = c.num_tile_types
+        factory_counts = np.zeros((count, c.max_factories, num_tiles), dtype=np.int64)
+        center_counts = np.zeros((count, num_tiles), dtype=np.int64)
+        walls = np.zeros((count, 2, c.max_wall_size, c.max_wall_size), dtype=bool)
+        pattern_tiles = np.full((count, 2, c.max_pattern_lines), -1, dtype=np.int64)
+        floor_tiles = np.full((count, 2, c.max_floor_size), -1, dtype=np.int64)
+        scores = np.zeros((count, 2), dtype=np.float32)
+        
+        # Gather the board contents as small integer arrays (the only per-state Python work)
+        for n, (state, agent_id) in enumerate(zip(states, agent_ids)):
+            for i, factory in enumerate(state.factories[:c.max_factories]):
+                for tile_type, tile_count in factory.tiles.items():
+                    if 0 <= tile_type < num_tiles:
+                        factory_counts[n, i, tile_type] = tile_count
+            for tile_type, tile_count in state.centre_pool.tiles.items():
+                if 0 <= tile_type < num_tiles:
+                    center_counts[n, tile_type] = tile_count
+            
+            opponent_id = (agent_id + 1) % len(state.agents)
+            for side, board_agent in enumerate((agent_id, opponent_id)):
+                agent = state.agents[board_agent]
+                grid = np.asarray(agent.grid_state)[:c.max_wall_size, :c.max_wall_size]
+                walls[n, side, :grid.shape[0], :grid.shape[1]] = grid != 0
+                lines = agent.lines_tile[:c.max_pattern_lines]
+                pattern_tiles[n, side, :len(lines)] = lines
+                floor = agent.floor_tiles[:c.max_floor_size]
+                floor_tiles[n, side, :len(floor)] = floor
+            for i, agent in enumerate(state.agents[:2]):
+                scores[n, i] = float(agent.score)
+        
+        offset = 0
+        # Factories: the first min(count, 6) slots of each present tile type
+        slots = np.arange(6)[None, None, :, None]
+        factories = out[:, offset:offset + self._factory_size].reshape(count, c.max_factories, 6, num_tiles)
+        factories[...] = slots < np.minimum(factory_counts, 6)[:, :, None, :]
+        offset += self._factory_size
+        
+        center = out[:, offset:offset + self._center_size].reshape(count, c.max_center_tiles, num_tiles)
+        center[...] = np.arange(c.max_center_tiles)[None, :, None] < center_counts[:, None, :]
+        offset += self._center_size
+        
+        tile_range = np.arange(num_tiles)
+        for side in range(2):
+            out[:, offset:offset + self._wall_size] = walls[:, side].reshape(count, -1)
+            offset += self._wall_size
+            pattern = out[:, offset:offset + self._pattern_size].reshape(count, c.max_pattern_lines, num_tiles)
+            pattern[...] = pattern_tiles[:, side, :, None] == tile_range
+            offset += self._pattern_size
+            floor = out[:, offset:offset + self._floor_size].reshape(count, c.max_floor_size, num_tiles)
+            floor[...] = floor_tiles[:, side, :, None] == tile_range
+            offset += self._floor_size
+        
+        out[:, offset:offset + 2] = scores
+        return tensor
         
     def encode_state(self, state: AzulState, agent_id: int = 0) -> torch.Tensor:
         """
@@ -59,7 +171,8 @@ class AzulTensorEncoder:
         
         Args:
             state: The Azul game state
-            agent_id: The agent to encode for (0 or 1)
+            agent_id: The agent to encode for; the agent moving after it is
+                encoded as the opponent
             
         Returns:
             Tensor of shape [batch_size, feature_dim]
@@ -80,8 +193,8 @@ class AzulTensorEncoder:
         floor_features = self._encode_floor(state.agents[agent_id].floor_tiles)
         features.extend([grid_features, pattern_features, floor_features])
         
-        # Encode opponent board (simplified)
-        opponent_id = 1 - agent_id
+        # Encode opponent board (simplified): the next agent in turn order
+        opponent_id = (agent_id + 1) % len(state.agents)
         opponent_grid = self._encode_wall(state.agents[opponent_id].grid_state)
         opponent_pattern = self._encode_pattern_lines(state.agents[opponent_id].lines_tile)
         opponent_floor = self._encode_floor(state.agents[opponent_id].floor_tiles)
@@ -273,16 +386,26 @@ class AzulNeuralRolloutPolicy:
     """Neural network-based rollout policy for MCTS."""
     
     def __init__(self, model: AzulNet, encoder: AzulTensorEncoder, 
-                 evaluator, move_generator, device: str = "cpu"):
+                 evaluator, move_generator, device: str = "cpu",
+                 inference_server=None, cache_bytes: int = DEFAULT_CACHE_BYTES):
         self.model = model
         self.encoder = encoder
         self.evaluator = evaluator
         self.move_generator = move_generator
         self.device = device
+        # Optional NeuralInferenceServer; when set, forward passes are batched with other callers
+        self.inference_server = inference_server
+        # Results of positions seen before (0 disables); the server has its own cache
+        self.result_cache = (
+            NeuralResultCache(cache_bytes) if cache_bytes > 0 and inference_server is None else None
+        )
+        self._move_encoder = None
+        self._policy_mapper = None
         
-        # Move model to device
-        self.model.to(device)
-        self.model.eval()
+        # Move model to device, unless an inference server owns (and has placed) it
+        if inference_server is None:
+            self.model.to(device)
+            self.model.eval()
     
     def rollout(self, state: AzulState, agent_id: int, max_depth: int = 50) -> float:
         """Perform a neural-guided rollout."""
@@ -320,16 +443,14 @@ class AzulNeuralRolloutPolicy:
         if not moves:
             return None
             
-        # Encode state
-        state_tensor = self.encoder.encode_state(state, agent_id).to(self.device)
-        
         # Get policy probabilities
-        with torch.no_grad():
-            policy_probs, _ = self.model.get_policy_and_value(state_tensor)
+        policy_probs, _ = self._policy_and_value(state, agent_id, moves)
         
         # Use policy mapper to select move from policy
         from neural.policy_mapping import create_policy_mapper, SelectionMethod
-        policy_mapper = create_policy_mapper()
+        if self._policy_mapper is None:
+            self._policy_mapper = create_policy_mapper()
+        policy_mapper = self._policy_mapper
         
         # Select move using policy probabilities
         selected_move = policy_mapper.select_move(
@@ -390,14 +511,51 @@ class AzulNeuralRolloutPolicy:
     
     def _evaluate_neural(self, state: AzulState, agent_id: int) -> float:
         """Evaluate position using neural network."""
-        # Encode state
-        state_tensor = self.encoder.encode_state(state, agent_id).to(self.device)
-        
-        # Get value prediction
-        with torch.no_grad():
-            _, value = self.model.get_policy_and_value(state_tensor)
+        _, value = self._policy_and_value(state, agent_id)
+        return float(value)
+    
+    def _policy_and_value(self, state: AzulState, agent_id: int, moves: Optional[list] = None):
+        """
+        Policy probabilities [1, num_actions] and value, through the inference server if set.
         
-        return value.item()
+        With the result cache, a position seen before skips encoding and the
+        forward pass. Once its legal moves are given, the cached logits are
+        masked to them, so the policy is renormalised over the legal moves.
+        """
+        if self.inference_server is not None:
+            result = self.inference_server.evaluate(state, agent_id)
+            return result.policy, result.value
+        
+        if self.result_cache is None:
+            state_tensor = self.encoder.encode_state(state, agent_id).to(self.device)
+            with torch.no_grad():
+                policy_probs, value = self.model.get_policy_and_value(state_tensor)
+            return policy_probs, value.item()
+        
+        self.result_cache.check_model(self.model)
+        key = position_key(state, agent_id)
+        result = self.result_cache.get(key, agent_id)
+        if result is None:
+            state_tensor = self.encoder.encode_state(state, agent_id).to(self.device)
+            with torch.no_grad():
+                policy_logits, value = self.model(state_tensor)
+            result = self.result_cache.put(key, agent_id, value.item(), policy_logits.cpu())
+        if moves is not None and not result.masked:
+            if self._move_encoder is None:
+                from neural.move_encoding import create_move_encoder
+                self._move_encoder = create_move_encoder()
+            legal_mask = self._move_encoder.create_policy_mask(moves, result.policy_logits.shape[-1])
+            result = self.result_cache.put(key, agent_id, result.value,
+                                           mask_logits(result.policy_logits, legal_mask), masked=True)
+        return result.policy, result.value
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics (the inference server's when one is used)."""
+        if self.inference_server is not None:
+            return self.inference_server.get_stats()['cache']
+        if self.result_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.result_cache.get_stats()}
     
     def _is_terminal(self, state: AzulState) -> bool:
         """Check if state is terminal."""
@@ -440,6 +598,26 @@ def create_azul_net(config: Optional[AzulNetConfig] = None,
     return model, encoder
 
 
+def load_azul_net(path: str, device: str = "cpu") -> Tuple[AzulNet, AzulTensorEncoder]:
+    """
+    Load a model saved by AzulNetTrainer.save_model.
+
+    Args:
+        path: Checkpoint path
+        device: Device to place model on
+
+    Returns:
+        Tuple of (model, encoder), with the model in eval mode
+    """
+    # Checkpoints pickle their configs, so they need weights_only=False
+    checkpoint = torch.load(path, map_location=device, weights_only=False)
+    model, encoder = create_azul_net(checkpoint.get('encoder_config', AzulNetConfig()), device=device)
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.to(device)
+    model.eval()
+    return model, encoder
+
+
 def count_parameters(model: nn.Module) -> int:
     """Count the number of parameters in a model."""
     return sum(p.numel() for p in model.parameters() if p.requires_grad) 
\ No newline at end of file
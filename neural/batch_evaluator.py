@@ -10,13 +10,16 @@ import torch.nn as nn
 import time
 import psutil
 from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import numpy as np
 
 from core.azul_model import AzulState
 from neural.azul_net import AzulNet, AzulTensorEncoder, create_azul_net
+from neural.cpu_inference import build_cpu_backend, configure_cpu_threads
+from neural.inference_tuning import DEFAULT_TUNING_PATH, load_tuned_config, model_size_name
 from neural.move_encoding import MoveEncoder
 from neural.policy_mapping import PolicyMapper, SelectionMethod
+from neural.result_cache import DEFAULT_CACHE_BYTES, NeuralResultCache, position_key
 
 
 @dataclass
@@ -44,6 +47,16 @@ class BatchConfig:
     # Fallback parameters
     enable_cpu_fallback: bool = True
     cpu_fallback_threshold: float = 0.1  # Use CPU if GPU is 10% slower
+    
+    # CPU inference parameters (see neural.cpu_inference)
+    cpu_backend: str = "eager"  # "eager", "torchscript", "int8"
+    tune_cpu_threads: bool = False
+    
+    # Autotuned CPU batch size and threads (see neural.inference_tuning; None disables)
+    tuning_path: Optional[str] = DEFAULT_TUNING_PATH
+    
+    # Result cache budget in bytes (0 disables; see neural.result_cache)
+    cache_bytes: int = DEFAULT_CACHE_BYTES
 
 
 class BatchNeuralEvaluator:
@@ -55,8 +68,18 @@ class BatchNeuralEvaluator:
     """
     
     def __init__(self, model: AzulNet, encoder: AzulTensorEncoder, 
-                 config: Optional[BatchConfig] = None):
-        """Initialize the batch evaluator."""
+                 config: Optional[BatchConfig] = None,
+                 result_cache: Optional[NeuralResultCache] = None):
+        """
+        Initialize the batch evaluator.
+        
+        Args:
+            model: Model to evaluate with
+            encoder: Encoder matching model
+            config: Batch configuration
+            result_cache: Cache to share with other users of the same model
+                (default: a new one of config.cache_bytes)
+        """
         self.model = model
         self.encoder = encoder
         self.config = config or BatchConfig()
@@ -64,6 +87,9 @@ class BatchNeuralEvaluator:
         # Initialize components
         self.move_encoder = MoveEncoder()
         self.policy_mapper = PolicyMapper()
+        if result_cache is None and self.config.cache_bytes > 0:
+            result_cache = NeuralResultCache(self.config.cache_bytes)
+        self.result_cache = result_cache
         
         # Performance tracking
         self._inference_times: List[float] = []
@@ -73,6 +99,17 @@ class BatchNeuralEvaluator:
         # Device setup
         self.device = self._setup_device()
         self.model.to(self.device)
+        self.tuned_config = None
+        if self.device.type == 'cpu':
+            if self.config.tuning_path and hasattr(model, 'config'):
+                self.tuned_config = load_tuned_config(model_size_name(model.config), self.config.cpu_backend,
+                                                      self.config.tuning_path)
+            if self.tuned_config is not None:
+                configure_cpu_threads(self.tuned_config['num_threads'])
+            elif self.config.tune_cpu_threads:
+                configure_cpu_threads()
+            if self.config.cpu_backend != "eager":
+                self.model = build_cpu_backend(model, self.config.cpu_backend)
         
         # Memory optimization
         if self.config.enable_mixed_precision and self.device.type == 'cuda':
@@ -98,6 +135,9 @@ class BatchNeuralEvaluator:
     def _find_optimal_batch_size(self) -> int:
         """Find the optimal batch size for the current device."""
         if self.device.type == 'cpu':
+            if self.tuned_config is not None:
+                return max(self.config.min_batch_size,
+                           min(self.tuned_config['batch_size'], self.config.max_batch_size))
             return min(self.config.default_batch_size, 16)
         
         # Test different batch sizes
@@ -162,14 +202,25 @@ class BatchNeuralEvaluator:
         
         start_time = time.time()
         
+        # Serve repeated positions from the cache; only the rest reach the model
+        results: List[Optional[float]] = [None] * len(states)
+        keys = self._cache_keys(states, agent_ids)
+        pending = []
+        for i, agent_id in enumerate(agent_ids):
+            cached = self.result_cache.get(keys[i], agent_id) if keys is not None else None
+            if cached is None:
+                pending.append(i)
+            else:
+                results[i] = cached.value
+        
         # Process in optimal batch sizes
-        results = []
-        for i in range(0, len(states), self._optimal_batch_size):
-            batch_states = states[i:i + self._optimal_batch_size]
-            batch_agent_ids = agent_ids[i:i + self._optimal_batch_size]
-            
-            batch_results = self._evaluate_batch_internal(batch_states, batch_agent_ids)
-            results.extend(batch_results)
+        for start in range(0, len(pending), self._optimal_batch_size):
+            chunk = pending[start:start + self._optimal_batch_size]
+            logits, values = self._forward([states[i] for i in chunk], [agent_ids[i] for i in chunk])
+            for j, i in enumerate(chunk):
+                results[i] = values[j]
+                if keys is not None:
+                    self.result_cache.put(keys[i], agent_ids[i], values[j], logits[j])
         
         # Record performance metrics
         end_time = time.time()
@@ -182,31 +233,34 @@ class BatchNeuralEvaluator:
         
         return results
     
+    def _cache_keys(self, states: List[AzulState], agent_ids: List[int]) -> Optional[List[int]]:
+        """Result cache keys of states, or None without a cache."""
+        if self.result_cache is None:
+            return None
+        self.result_cache.check_model(self.model)
+        return [position_key(state, agent_id) for state, agent_id in zip(states, agent_ids)]
+    
     def _evaluate_batch_internal(self, states: List[AzulState], agent_ids: List[int]) -> List[float]:
         """Internal batch evaluation with GPU optimization."""
-        # Encode states
-        state_tensors = []
-        for state, agent_id in zip(states, agent_ids):
-            tensor = self.encoder.encode_state(state, agent_id)
-            state_tensors.append(tensor)
-        
-        # Stack into batch
-        batch_tensor = torch.stack(state_tensors).to(self.device)
+        return self._forward(states, agent_ids)[1]
+    
+    def _forward(self, states: List[AzulState], agent_ids: List[int]) -> Tuple[torch.Tensor, List[float]]:
+        """Policy logits [N, num_actions] on the CPU and values of states, in one forward pass."""
+        # Encode states straight into one batch (reusing the staging buffer
+        # when the batch is copied to the GPU right away)
+        batch_tensor = self.encoder.encode_batch(
+            states, agent_ids, reuse_buffer=self.device.type == 'cuda'
+        ).unsqueeze(1).to(self.device)
         
         # Run inference with mixed precision if available
         with torch.no_grad():
             if self.config.enable_mixed_precision and self.device.type == 'cuda':
                 with torch.cuda.amp.autocast():
-                    _, values = self.model(batch_tensor)
+                    logits, values = self.model(batch_tensor)
             else:
-                _, values = self.model(batch_tensor)
+                logits, values = self.model(batch_tensor)
         
-        # Convert to list of scores - values is [batch_size, 1], so we need to squeeze
-        scores = values.cpu().numpy().squeeze().tolist()
-        # Ensure scores is a list even if batch_size is 1
-        if not isinstance(scores, list):
-            scores = [scores]
-        return scores
+        return logits.reshape(len(states), -1).float().cpu(), values.reshape(-1).float().cpu().tolist()
     
     def get_policy_batch(self, states: List[AzulState], agent_ids: List[int]) -> List[torch.Tensor]:
         """
@@ -225,30 +279,30 @@ class BatchNeuralEvaluator:
         if len(states) == 0:
             raise ValueError("States list cannot be empty")
         
-        # Encode states
-        state_tensors = []
-        for state, agent_id in zip(states, agent_ids):
-            tensor = self.encoder.encode_state(state, agent_id)
-            state_tensors.append(tensor)
-        
-        # Stack into batch
-        batch_tensor = torch.stack(state_tensors).to(self.device)
-        
-        # Run inference
-        with torch.no_grad():
-            if self.config.enable_mixed_precision and self.device.type == 'cuda':
-                with torch.cuda.amp.autocast():
-                    policies, _ = self.model(batch_tensor)
-            else:
-                policies, _ = self.model(batch_tensor)
-        
-        # Split into individual policies
-        policy_list = []
-        for i in range(policies.shape[0]):
-            policy_list.append(policies[i].cpu())
+        keys = self._cache_keys(states, agent_ids)
+        cached = [None] * len(states)
+        if keys is not None:
+            cached = [self.result_cache.get(key, agent_id) for key, agent_id in zip(keys, agent_ids)]
+        pending = [i for i, result in enumerate(cached) if result is None]
+        
+        policy_list: List[Optional[torch.Tensor]] = [
+            result.policy_logits.unsqueeze(0) if result is not None else None for result in cached
+        ]
+        if pending:
+            logits, values = self._forward([states[i] for i in pending], [agent_ids[i] for i in pending])
+            for j, i in enumerate(pending):
+                policy_list[i] = logits[j:j + 1]
+                if keys is not None:
+                    self.result_cache.put(keys[i], agent_ids[i], values[j], logits[j])
         
         return policy_list
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics."""
+        if self.result_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.result_cache.get_stats()}
+    
     def select_moves_batch(self, states: List[AzulState], agent_ids: List[int],
                           legal_moves_list: List[List], 
                           method: SelectionMethod = SelectionMethod.STOCHASTIC,
@@ -269,13 +323,20 @@ class BatchNeuralEvaluator:
         # Get policy outputs
         policies = self.get_policy_batch(states, agent_ids)
         
-        # Select moves for each state
-        selected_moves = []
+        if method in (SelectionMethod.GREEDY, SelectionMethod.STOCHASTIC):
+            # Masking, argmax/sampling and decoding run once for the whole batch
+            logits = torch.cat(policies).float()
+            batch_temperature = temperature if method == SelectionMethod.STOCHASTIC else 0.0
+            selected_moves = self.move_encoder.select_moves_batch(logits, legal_moves_list, batch_temperature)
+        else:
+            selected_moves = [None] * len(policies)
+        
+        # Other methods, and positions whose legal moves are all outside the policy head
         for i, (policy, legal_moves) in enumerate(zip(policies, legal_moves_list)):
-            move = self.policy_mapper.select_move(
-                policy, legal_moves, method, temperature
-            )
-            selected_moves.append(move)
+            if selected_moves[i] is None and legal_moves:
+                selected_moves[i] = self.policy_mapper.select_move(
+                    policy, legal_moves, method, temperature
+                )
         
         return selected_moves
     
@@ -295,6 +356,7 @@ class BatchNeuralEvaluator:
             'total_inferences': len(self._inference_times),
             'optimal_batch_size': self._optimal_batch_size,
             'device': str(self.device),
+            'tuned': self.tuned_config is not None,
         }
         
         if self._memory_usage:
@@ -333,12 +395,22 @@ class BatchNeuralEvaluator:
 
 def create_batch_evaluator(model: Optional[AzulNet] = None,
                           encoder: Optional[AzulTensorEncoder] = None,
-                          config: Optional[BatchConfig] = None) -> BatchNeuralEvaluator:
-    """Create a batch neural evaluator with optional model and encoder."""
+                          config: Optional[BatchConfig] = None,
+                          cpu_backend: Optional[str] = None,
+                          result_cache: Optional[NeuralResultCache] = None) -> BatchNeuralEvaluator:
+    """
+    Create a batch neural evaluator with optional model and encoder.
+    
+    cpu_backend, when given, overrides config.cpu_backend; result_cache,
+    when given, is shared instead of creating one.
+    """
     if model is None or encoder is None:
         model, encoder = create_azul_net(device="cpu")  # Will be moved to optimal device
     
-    return BatchNeuralEvaluator(model, encoder, config)
+    if cpu_backend is not None:
+        config = replace(config or BatchConfig(), cpu_backend=cpu_backend)
+    
+    return BatchNeuralEvaluator(model, encoder, config, result_cache)
 
 
 def test_batch_evaluator():
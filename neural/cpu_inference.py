@@ -0,0 +1,195 @@
+"""
+CPU Inference Backend
+
+This module provides the CPU counterpart of gpu_optimizer:
+- Dynamic int8 quantization of AzulNet's linear layers
+- TorchScript export (optionally quantized) and ONNX export of AzulNet
+- Automatic intra-op / inter-op thread configuration
+- A benchmark of throughput and accuracy against the fp32 model
+"""
+
+import copy
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+import torch
+import torch.nn as nn
+
+from neural.azul_net import AzulNet, AzulTensorEncoder
+
+CPU_BACKENDS = ("eager", "torchscript", "int8")
+
+
+def configure_cpu_threads(num_threads: Optional[int] = None,
+                          interop_threads: Optional[int] = None) -> Dict[str, int]:
+    """
+    Set torch's intra-op and inter-op thread counts.
+
+    By default intra-op threads match the physical cores (hyper-threads only
+    contend for the same FMA units in these small GEMMs) and inter-op
+    parallelism is off, since AzulNet is a single chain of layers.
+
+    Returns:
+        The thread counts in effect afterwards
+    """
+    if num_threads is None:
+        num_threads = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    if interop_threads is None:
+        interop_threads = 1
+
+    torch.set_num_threads(num_threads)
+    if torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel work in the process
+            pass
+
+    return {
+        'num_threads': torch.get_num_threads(),
+        'interop_threads': torch.get_num_interop_threads()
+    }
+
+
+def quantize_model(model: AzulNet) -> nn.Module:
+    """Copy of model in eval mode with int8 dynamically quantized linear layers."""
+    fp32 = copy.deepcopy(model).cpu().eval()
+    return torch.ao.quantization.quantize_dynamic(fp32, {nn.Linear}, dtype=torch.qint8)
+
+
+def build_cpu_backend(model: AzulNet, backend: str = "int8") -> nn.Module:
+    """
+    CPU inference module for one of CPU_BACKENDS.
+
+    "eager" is the model itself in eval mode (a CPU copy if it lives on
+    another device), "torchscript" a traced fp32 copy and "int8" a traced
+    copy with quantized linear layers. Every backend returns
+    (policy_logits, value) like AzulNet.forward.
+    """
+    if backend not in CPU_BACKENDS:
+        raise ValueError(f"Unknown CPU backend {backend!r}; expected one of {CPU_BACKENDS}")
+    if backend == "eager":
+        if any(parameter.device.type != "cpu" for parameter in model.parameters()):
+            return copy.deepcopy(model).cpu().eval()
+        return model.eval()
+
+    module = quantize_model(model) if backend == "int8" else copy.deepcopy(model).cpu().eval()
+    example = torch.zeros(1, model.input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example)
+    return torch.jit.freeze(traced) if backend == "torchscript" else traced
+
+
+def export_torchscript(model: AzulNet, path: str, quantize: bool = True) -> str:
+    """
+    Save a TorchScript artefact of model for CPU serving.
+
+    Args:
+        model: Model to export
+        path: Output path (.pt)
+        quantize: Quantize the linear layers to int8 first
+
+    Returns:
+        path
+    """
+    module = build_cpu_backend(model, "int8" if quantize else "torchscript")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(module, path)
+    return path
+
+
+def export_onnx(model: AzulNet, path: str, opset_version: int = 17) -> str:
+    """
+    Save an fp32 ONNX artefact of model with a dynamic batch dimension.
+
+    Quantize it with onnxruntime's tools if needed; dynamically quantized
+    torch modules do not export to ONNX.
+    """
+    try:
+        import onnx  # noqa: F401 - the exporter needs it
+    except ImportError as e:
+        raise ImportError("ONNX export requires the onnx package. Install with: pip install onnx") from e
+
+    fp32 = copy.deepcopy(model).cpu().eval()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.onnx.export(
+        fp32, torch.zeros(1, model.input_size), path,
+        input_names=['state'], output_names=['policy_logits', 'value'],
+        dynamic_axes={'state': {0: 'batch'}, 'policy_logits': {0: 'batch'}, 'value': {0: 'batch'}},
+        opset_version=opset_version
+    )
+    return path
+
+
+def load_torchscript(path: str) -> torch.jit.ScriptModule:
+    """Load an artefact saved by export_torchscript onto the CPU."""
+    module = torch.jit.load(path, map_location="cpu")
+    module.eval()
+    return module
+
+
+def benchmark_cpu_inference(model: AzulNet, encoder: AzulTensorEncoder, states: List,
+                            batch_sizes: Optional[List[int]] = None,
+                            backends: Optional[List[str]] = None,
+                            repeats: int = 20) -> Dict[str, Any]:
+    """
+    Compare CPU backends on real positions.
+
+    Args:
+        model: fp32 reference model
+        encoder: Encoder for states
+        states: Positions to encode (agent 0); batches cycle through them
+        batch_sizes: Batch sizes to time
+        backends: Backends to compare (default: all of CPU_BACKENDS)
+        repeats: Timed forward passes per batch size
+
+    Returns:
+        Per backend: throughput per batch size and the largest value and
+        policy probability differences from the eager fp32 model, plus how
+        often the policy's top action agrees with it
+    """
+    if batch_sizes is None:
+        batch_sizes = [1, 8, 32, 128]
+    if backends is None:
+        backends = list(CPU_BACKENDS)
+
+    saved_threads = torch.get_num_threads()
+    saved_interop_threads = torch.get_num_interop_threads()
+    try:
+        threads = configure_cpu_threads()
+        reference = build_cpu_backend(model, "eager")
+        inputs = encoder.encode_batch(states, 0)
+        with torch.no_grad():
+            reference_logits, reference_values = reference(inputs)
+        reference_policy = torch.softmax(reference_logits, dim=-1)
+
+        results: Dict[str, Any] = {'threads': threads, 'positions': len(states), 'backends': {}}
+        for backend in backends:
+            module = build_cpu_backend(model, backend)
+            with torch.no_grad():
+                logits, values = module(inputs)
+            policy = torch.softmax(logits, dim=-1)
+
+            throughput = {}
+            for batch_size in batch_sizes:
+                batch = inputs[torch.arange(batch_size) % len(states)]
+                with torch.no_grad():
+                    for _ in range(3):
+                        module(batch)
+                    start = time.perf_counter()
+                    for _ in range(repeats):
+                        module(batch)
+                    elapsed = time.perf_counter() - start
+                throughput[batch_size] = batch_size * repeats / elapsed
+
+            results['backends'][backend] = {
+                'states_per_second': throughput,
+                'max_value_delta': float((values - reference_values).abs().max()),
+                'max_policy_delta': float((policy - reference_policy).abs().max()),
+                'top_action_agreement': float((logits.argmax(-1) == reference_logits.argmax(-1)).float().mean())
+            }
+    finally:
+        configure_cpu_threads(saved_threads, saved_interop_threads)
+    return results
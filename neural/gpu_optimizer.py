@@ -293,14 +293,10 @@ class OptimizedBatchProcessor:
         if len(states) != len(agent_ids):
             raise ValueError("States and agent_ids must have the same length")
         
-        # Encode states
-        state_tensors = []
-        for state, agent_id in zip(states, agent_ids):
-            tensor = self.encoder.encode_state(state, agent_id)
-            state_tensors.append(tensor)
-        
-        # Stack into batch
-        batch_tensor = torch.stack(state_tensors).to(self.device)
+        # Encode states straight into one batch
+        batch_tensor = self.encoder.encode_batch(
+            states, agent_ids, reuse_buffer=self.device.type == 'cuda'
+        ).unsqueeze(1).to(self.device)
         
         # Use CUDA graph if enabled and input size matches
         if use_cuda_graph and self.device.type == 'cuda' and self._can_use_cuda_graph(batch_tensor):
@@ -0,0 +1,343 @@
+"""
+Neural Inference Server
+
+This module provides a process-wide inference service for AzulNet:
+- The model is loaded once from the model registry and warmed up
+- Requests from concurrent API threads and MCTS searches share one queue
+- A worker thread flushes the queue as one forward pass when it holds
+  max_batch_size requests, the oldest request has waited max_latency_ms,
+  or every caller blocked on the server is already in the batch
+- Queue depth, batch size histogram and latency percentiles for the
+  performance endpoints
+- An optional result cache that answers repeated positions without
+  queueing them (see neural.result_cache)
+"""
+
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from core.azul_model import AzulState
+from neural.azul_net import AzulNet, AzulTensorEncoder, create_azul_net, load_azul_net
+from neural.cpu_inference import build_cpu_backend
+from neural.result_cache import CachedResult, NeuralResultCache, position_key
+
+logger = logging.getLogger(__name__)
+
+# Where trained models are saved (see the /neural/train endpoint)
+MODEL_REGISTRY_DIR = "models"
+MODEL_PATH_ENV = "AZUL_NEURAL_MODEL_PATH"
+
+# How often the batching worker re-checks for waiting callers while a batch fills
+POLL_INTERVAL = 0.0002
+
+
+@dataclass
+class InferenceServerConfig:
+    """Configuration for the inference server."""
+    model_path: Optional[str] = None  # Default: $AZUL_NEURAL_MODEL_PATH, then the newest registry model
+    device: str = "cpu"
+    cpu_backend: str = "eager"  # "eager", "torchscript" or "int8" (see neural.cpu_inference)
+    max_batch_size: int = 64
+    max_latency_ms: float = 2.0  # Longest a request waits for its batch to fill
+    warmup_batches: int = 2
+    latency_window: int = 10000  # Recent requests kept for latency percentiles
+    cache_bytes: int = 0  # Result cache budget; 0 disables it, so every request is batched
+
+
+@dataclass
+class InferenceResult:
+    """Network output for one state."""
+    policy: torch.Tensor  # Policy probabilities, shape [1, num_actions]
+    value: float
+
+
+@dataclass
+class _InferenceRequest:
+    state: AzulState
+    agent_id: int
+    future: Future
+    enqueued: float
+    key: Optional[int] = None  # Result cache key, when the result should be cached
+
+
+def resolve_model_path(model_path: Optional[str] = None) -> Optional[str]:
+    """
+    Model to serve: model_path, else $AZUL_NEURAL_MODEL_PATH, else the most
+    recently saved .pth in the model registry; None when there is none.
+    """
+    path = model_path or os.environ.get(MODEL_PATH_ENV)
+    if path:
+        return path
+    candidates = glob.glob(os.path.join(MODEL_REGISTRY_DIR, "*.pth"))
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+
+class NeuralInferenceServer:
+    """
+    Dynamic micro-batching in front of one shared AzulNet.
+
+    submit() queues a state and returns a Future; a single worker thread runs
+    every forward pass, so callers on any thread can share the model.
+    """
+
+    def __init__(self, config: Optional[InferenceServerConfig] = None,
+                 model: Optional[AzulNet] = None, encoder: Optional[AzulTensorEncoder] = None):
+        """
+        Initialize the server and load its model.
+
+        Args:
+            config: Server configuration
+            model: Model to serve instead of loading one (needs encoder too)
+            encoder: Encoder matching model
+        """
+        self.config = config or InferenceServerConfig()
+        if self.config.max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, got {self.config.max_batch_size}")
+        self.device = torch.device(self.config.device)
+
+        if model is not None:
+            self.model, self.encoder = model, encoder
+            self.model_path = None
+        else:
+            self.model_path = resolve_model_path(self.config.model_path)
+            if self.model_path is not None:
+                self.model, self.encoder = load_azul_net(self.model_path, device=self.config.device)
+            else:
+                logger.warning("No trained model in %s; serving an untrained AzulNet", MODEL_REGISTRY_DIR)
+                self.model, self.encoder = create_azul_net(device=self.config.device)
+        self.model.to(self.device)
+        self.model.eval()
+        # Module that runs the forward passes; self.model stays the fp32 reference
+        self._net = self.model
+        if self.device.type == 'cpu' and self.config.cpu_backend != "eager":
+            self._net = build_cpu_backend(self.model, self.config.cpu_backend)
+
+        self.result_cache = NeuralResultCache(self.config.cache_bytes) if self.config.cache_bytes > 0 else None
+
+        self._queue: "queue.Queue[Optional[_InferenceRequest]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Callers inside evaluate_many, and how many of those have queued all their states;
+        # when the two match nothing more can arrive before someone is served
+        self._callers_lock = threading.Lock()
+        self._active_callers = 0
+        self._waiting_callers = 0
+
+        # Statistics
+        self._latencies: deque = deque(maxlen=self.config.latency_window)
+        self._batch_histogram: Counter = Counter()
+        self.requests_served = 0
+        self.batches_run = 0
+        self.forward_time = 0.0
+
+    def start(self) -> "NeuralInferenceServer":
+        """Warm the model up and start the batching worker (idempotent)."""
+        with self._lock:
+            if self._worker is not None:
+                return self
+            self._warmup()
+            self._worker = threading.Thread(target=self._run, name="neural-inference", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Stop the worker after it has served the requests already queued."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def submit(self, state: AzulState, agent_id: int = 0, key: Optional[int] = None) -> Future:
+        """Queue one state; the Future resolves to an InferenceResult (cached under key if given)."""
+        if not self.running:
+            raise RuntimeError("Inference server is not running")
+        future: Future = Future()
+        self._queue.put(_InferenceRequest(state, agent_id, future, time.perf_counter(), key))
+        return future
+
+    def evaluate(self, state: AzulState, agent_id: int = 0,
+                 timeout: Optional[float] = None) -> InferenceResult:
+        """Policy and value of one state (blocks until its batch has run)."""
+        return self.evaluate_many([state], [agent_id], timeout)[0]
+
+    def evaluate_many(self, states: Sequence[AzulState], agent_ids: Sequence[int],
+                      timeout: Optional[float] = None) -> List[InferenceResult]:
+        """Queue several states at once so they can share batches with other callers."""
+        if len(states) != len(agent_ids):
+            raise ValueError("States and agent_ids must have the same length")
+        keys: List[Optional[int]] = [None] * len(states)
+        cached: List[Optional[CachedResult]] = [None] * len(states)
+        if self.result_cache is not None:
+            self.result_cache.check_model(self.model)
+            for i, (state, agent_id) in enumerate(zip(states, agent_ids)):
+                keys[i] = position_key(state, agent_id)
+                cached[i] = self.result_cache.get(keys[i], agent_id)
+            if all(result is not None for result in cached):
+                return [InferenceResult(result.policy, result.value) for result in cached]
+
+        with self._callers_lock:
+            self._active_callers += 1
+        waiting = False
+        try:
+            futures = [
+                self.submit(state, agent_id, key) if result is None else None
+                for state, agent_id, key, result in zip(states, agent_ids, keys, cached)
+            ]
+            with self._callers_lock:
+                self._waiting_callers += 1
+            waiting = True
+            return [
+                future.result(timeout) if future is not None else InferenceResult(result.policy, result.value)
+                for future, result in zip(futures, cached)
+            ]
+        finally:
+            with self._callers_lock:
+                self._active_callers -= 1
+                if waiting:
+                    self._waiting_callers -= 1
+
+    def evaluate_batch(self, states: Sequence[AzulState], agent_ids: Sequence[int]) -> List[float]:
+        """Values only, with BatchNeuralEvaluator.evaluate_batch's interface."""
+        return [result.value for result in self.evaluate_many(states, agent_ids)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, batch size histogram and request latency percentiles (ms)."""
+        latencies = np.array(self._latencies) * 1000.0
+        histogram = dict(sorted(self._batch_histogram.items()))
+        return {
+            'running': self.running,
+            'model_path': self.model_path,
+            'device': str(self.device),
+            'cpu_backend': self.config.cpu_backend if self.device.type == 'cpu' else None,
+            'max_batch_size': self.config.max_batch_size,
+            'max_latency_ms': self.config.max_latency_ms,
+            'queue_depth': self._queue.qsize(),
+            'requests': self.requests_served,
+            'batches': self.batches_run,
+            'average_batch_size': self.requests_served / self.batches_run if self.batches_run > 0 else 0.0,
+            'batch_size_histogram': {str(size): count for size, count in histogram.items()},
+            'latency_ms': {
+                'p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p99': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                'max': float(latencies.max()) if len(latencies) else 0.0
+            },
+            'forward_time': self.forward_time,
+            'cache': ({'enabled': True, **self.result_cache.get_stats()} if self.result_cache is not None
+                      else {'enabled': False})
+        }
+
+    def _warmup(self):
+        """Run a few full-size batches so the first real requests are not slowed by lazy initialisation."""
+        state = AzulState(2)
+        states = [state] * self.config.max_batch_size
+        for _ in range(self.config.warmup_batches):
+            self._forward(states, [0] * len(states))
+
+    def _run(self):
+        """Worker loop: gather a batch, run it, resolve its futures."""
+        max_latency = self.config.max_latency_ms / 1000.0
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = first.enqueued + max_latency
+            while len(batch) < self.config.max_batch_size:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or self._all_callers_waiting():
+                        break
+                    try:
+                        request = self._queue.get(timeout=min(remaining, POLL_INTERVAL))
+                    except queue.Empty:
+                        continue
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._serve(batch)
+
+    def _all_callers_waiting(self) -> bool:
+        with self._callers_lock:
+            return 0 < self._active_callers <= self._waiting_callers
+
+    def _serve(self, batch: List[_InferenceRequest]):
+        try:
+            logits, values = self._forward([r.state for r in batch], [r.agent_id for r in batch])
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        policies = torch.softmax(logits, dim=-1)
+        done = time.perf_counter()
+        for i, request in enumerate(batch):
+            if request.key is not None:
+                self.result_cache.put(request.key, request.agent_id, float(values[i]), logits[i])
+            request.future.set_result(InferenceResult(policies[i:i + 1], float(values[i])))
+            self._latencies.append(done - request.enqueued)
+        self._batch_histogram[len(batch)] += 1
+        self.requests_served += len(batch)
+        self.batches_run += 1
+
+    def _forward(self, states: Sequence[AzulState], agent_ids: Sequence[int]) -> Tuple[torch.Tensor, np.ndarray]:
+        start = time.perf_counter()
+        batch = self.encoder.encode_batch(states, agent_ids).to(self.device)
+        with torch.no_grad():
+            logits, values = self._net(batch)
+        self.forward_time += time.perf_counter() - start
+        return logits.cpu(), values.reshape(-1).cpu().numpy()
+
+
+_server: Optional[NeuralInferenceServer] = None
+_server_lock = threading.Lock()
+
+
+def get_inference_server(config: Optional[InferenceServerConfig] = None) -> NeuralInferenceServer:
+    """
+    The process-wide inference server, created and started on first use.
+
+    config only applies to that first call.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = NeuralInferenceServer(config).start()
+        return _server
+
+
+def get_inference_server_stats() -> Dict[str, Any]:
+    """Stats of the process-wide server, without starting one."""
+    server = _server
+    return server.get_stats() if server is not None else {'running': False}
+
+
+def shutdown_inference_server():
+    """Stop and drop the process-wide server."""
+    global _server
+    with _server_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.stop()
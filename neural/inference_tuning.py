@@ -0,0 +1,338 @@
+"""
+CPU Inference Autotuning
+
+This module benchmarks the whole CPU inference path of AzulNet and keeps the
+best settings for the machine it runs on:
+- Benchmark positions drawn from the analysis databases (stored FENs),
+  topped up with positions from random games
+- Encode, forward and decode (legal-move masking and selection) latency and
+  throughput for every batch size and thread count
+- A JSON file of the best configuration per host and per model size, which
+  BatchNeuralEvaluator loads at startup
+"""
+
+import json
+import os
+import platform
+import random
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import psutil
+import torch
+
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from analysis_engine.mathematical_optimization.azul_notation import state_from_fen
+from core.azul_model import AzulGameRule, AzulState
+from neural.azul_net import AzulNet, AzulNetConfig, AzulTensorEncoder
+from neural.cpu_inference import build_cpu_backend, configure_cpu_threads
+from neural.move_encoding import MoveEncoder
+
+DEFAULT_TUNING_PATH = "data/inference_tuning.json"
+TUNING_FORMAT_VERSION = 1
+
+# The model sizes offered by training (hidden size, layers)
+MODEL_SIZES = {
+    'small': {'hidden_size': 64, 'num_layers': 2},
+    'medium': {'hidden_size': 128, 'num_layers': 3},
+    'large': {'hidden_size': 256, 'num_layers': 4},
+}
+
+DEFAULT_POSITION_DATABASES = (
+    "data/azul_research.db",
+    "data/simple_move_quality.db",
+    "data/comprehensive_move_quality.db",
+    "data/comprehensive_exhaustive_analysis.db",
+    "data/robust_exhaustive_analysis.db",
+    "move_quality_analysis/data/simple_move_quality.db",
+)
+
+FEN_COLUMNS = ('position_fen', 'fen_string')
+
+DEFAULT_BATCH_SIZES = [1, 4, 8, 16, 32, 64, 128]
+
+
+def model_size_name(config: AzulNetConfig) -> str:
+    """Name of config's size in MODEL_SIZES, or 'h<hidden>_l<layers>' for other shapes."""
+    for name, shape in MODEL_SIZES.items():
+        if config.hidden_size == shape['hidden_size'] and config.num_layers == shape['num_layers']:
+            return name
+    return f"h{config.hidden_size}_l{config.num_layers}"
+
+
+def host_key() -> str:
+    """Key of this machine in the tuning file: host name, architecture and core count."""
+    return f"{platform.node() or 'unknown'}/{platform.machine() or 'unknown'}/{os.cpu_count() or 1}cpu"
+
+
+def default_thread_counts() -> List[int]:
+    """1, the powers of two below the logical core count, the physical and the logical core count."""
+    logical = os.cpu_count() or 1
+    physical = psutil.cpu_count(logical=False) or logical
+    counts = {1, physical, logical}
+    counts.update(2 ** i for i in range(1, logical.bit_length()) if 2 ** i < logical)
+    return sorted(counts)
+
+
+def _states_from_database(path: str, limit: int) -> List[AzulState]:
+    """States of the distinct FENs stored in any table of a database."""
+    fens: List[str] = []
+    seen = set()
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        for table in tables:
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+            for column in FEN_COLUMNS:
+                if column not in columns:
+                    continue
+                for (fen_string,) in conn.execute(f'SELECT DISTINCT "{column}" FROM "{table}"'):
+                    if fen_string and fen_string not in seen:
+                        seen.add(fen_string)
+                        fens.append(fen_string)
+    except sqlite3.DatabaseError:
+        pass
+    finally:
+        conn.close()
+
+    states = []
+    for fen_string in fens[:limit]:
+        state = state_from_fen(fen_string)
+        if state is not None:
+            states.append(state)
+    return states
+
+
+def random_game_positions(count: int, seed: int = 0) -> List[AzulState]:
+    """Positions of the first rounds of random 2-player games."""
+    # AzulState shuffles its bag with the random module
+    saved = random.getstate()
+    random.seed(seed)
+    try:
+        generator = FastMoveGenerator()
+        states: List[AzulState] = []
+        while len(states) < count:
+            state = AzulState(2)
+            game_rule = AzulGameRule(2)
+            agent = 0
+            while state.TilesRemaining() and len(states) < count:
+                move = random.choice(generator.generate_moves_fast(state, agent))
+                game_rule.generateSuccessor(state, move.to_tuple(), agent)
+                agent = 1 - agent
+                states.append(state.clone())
+        return states
+    finally:
+        random.setstate(saved)
+
+
+def load_benchmark_positions(count: int = 256, paths: Sequence[str] = DEFAULT_POSITION_DATABASES,
+                             seed: int = 0) -> List[AzulState]:
+    """
+    Positions for benchmarking inference.
+
+    Stored positions (any table with a position_fen or fen_string column)
+    come first; when the databases hold fewer than count, the rest are
+    positions from random games, so that every phase of a round is present.
+    """
+    states: List[AzulState] = []
+    for path in paths:
+        if len(states) >= count:
+            break
+        if os.path.exists(path):
+            states.extend(_states_from_database(path, count - len(states)))
+    if len(states) < count:
+        states.extend(random_game_positions(count - len(states), seed))
+    return states[:count]
+
+
+def _percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q) * 1000.0)
+
+
+def benchmark_inference(model: AzulNet, encoder: AzulTensorEncoder, states: List[AzulState],
+                        batch_sizes: Optional[List[int]] = None,
+                        thread_counts: Optional[List[int]] = None,
+                        backend: str = "eager", repeats: int = 20) -> Dict[str, Any]:
+    """
+    Time encode, forward and decode for every batch size and thread count.
+
+    Batches cycle through states, encoded for the player to move. Decode is
+    legal-move masking and greedy selection (MoveEncoder.select_moves_batch);
+    the legal moves are generated beforehand, as search has them already.
+    Torch's thread counts are restored afterwards.
+
+    Args:
+        model: Model to benchmark
+        encoder: Encoder matching model
+        states: Benchmark positions (see load_benchmark_positions)
+        batch_sizes: Batch sizes to time (default: DEFAULT_BATCH_SIZES)
+        thread_counts: Intra-op thread counts to time (default: default_thread_counts())
+        backend: CPU backend of neural.cpu_inference to run the model with
+        repeats: Timed batches per configuration
+
+    Returns:
+        The measured configurations, each with per-stage median latencies in
+        milliseconds, the p50/p95 batch latency and states per second
+    """
+    if not states:
+        raise ValueError("Benchmark needs at least one position")
+    if batch_sizes is None:
+        batch_sizes = DEFAULT_BATCH_SIZES
+    if thread_counts is None:
+        thread_counts = default_thread_counts()
+
+    module = build_cpu_backend(model, backend)
+    move_encoder = MoveEncoder()
+    generator = FastMoveGenerator()
+    agent_ids = [getattr(state, 'current_player', 0) for state in states]
+    legal_moves = [generator.generate_moves_fast(state, agent_id) for state, agent_id in zip(states, agent_ids)]
+
+    saved_threads = torch.get_num_threads()
+    saved_interop_threads = torch.get_num_interop_threads()
+    configurations = []
+    try:
+        for num_threads in thread_counts:
+            threads = configure_cpu_threads(num_threads)
+            for batch_size in batch_sizes:
+                timings = {'encode': [], 'forward': [], 'decode': [], 'total': []}
+                for step in range(repeats + 2):
+                    rows = [(step * batch_size + i) % len(states) for i in range(batch_size)]
+                    batch_states = [states[i] for i in rows]
+                    batch_agents = [agent_ids[i] for i in rows]
+                    batch_moves = [legal_moves[i] for i in rows]
+
+                    start = time.perf_counter()
+                    inputs = encoder.encode_batch(batch_states, batch_agents)
+                    encoded = time.perf_counter()
+                    with torch.no_grad():
+                        logits, _ = module(inputs)
+                    forwarded = time.perf_counter()
+                    move_encoder.select_moves_batch(logits.reshape(batch_size, -1).float(), batch_moves)
+                    decoded = time.perf_counter()
+
+                    if step >= 2:  # The first batches warm up allocators and caches
+                        timings['encode'].append(encoded - start)
+                        timings['forward'].append(forwarded - encoded)
+                        timings['decode'].append(decoded - forwarded)
+                        timings['total'].append(decoded - start)
+
+                configurations.append({
+                    'batch_size': batch_size,
+                    'num_threads': threads['num_threads'],
+                    'encode_ms': _percentile_ms(timings['encode'], 50),
+                    'forward_ms': _percentile_ms(timings['forward'], 50),
+                    'decode_ms': _percentile_ms(timings['decode'], 50),
+                    'latency_p50_ms': _percentile_ms(timings['total'], 50),
+                    'latency_p95_ms': _percentile_ms(timings['total'], 95),
+                    'states_per_second': batch_size * len(timings['total']) / sum(timings['total'])
+                })
+    finally:
+        configure_cpu_threads(saved_threads, saved_interop_threads)
+
+    return {
+        'host': host_key(),
+        'model_size': model_size_name(model.config),
+        'backend': backend,
+        'positions': len(states),
+        'configurations': configurations
+    }
+
+
+def select_best_config(results: Dict[str, Any], max_latency_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Highest-throughput configuration of benchmark_inference's results.
+
+    With max_latency_ms, only configurations whose p95 batch latency is
+    within it are considered (the smallest batch if none is).
+    """
+    configurations = results['configurations']
+    if not configurations:
+        raise ValueError("No benchmarked configurations")
+    candidates = configurations
+    if max_latency_ms is not None:
+        candidates = [c for c in configurations if c['latency_p95_ms'] <= max_latency_ms]
+        if not candidates:
+            smallest = min(c['batch_size'] for c in configurations)
+            candidates = [c for c in configurations if c['batch_size'] == smallest]
+    return max(candidates, key=lambda c: c['states_per_second'])
+
+
+def _read_tuning_file(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {'version': TUNING_FORMAT_VERSION, 'hosts': {}}
+    if not isinstance(data, dict) or data.get('version') != TUNING_FORMAT_VERSION:
+        return {'version': TUNING_FORMAT_VERSION, 'hosts': {}}
+    data.setdefault('hosts', {})
+    return data
+
+
+def save_tuned_config(config: Dict[str, Any], model_size: str, backend: str = "eager",
+                      path: str = DEFAULT_TUNING_PATH, host: Optional[str] = None) -> str:
+    """
+    Store the best configuration of a model size and backend for a host.
+
+    Entries of other hosts, sizes and backends in the file are kept.
+
+    Returns:
+        path
+    """
+    data = _read_tuning_file(path)
+    host = host or host_key()
+    entry = dict(config, measured_at=datetime.now().isoformat())
+    data['hosts'].setdefault(host, {}).setdefault(model_size, {})[backend] = entry
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+    return path
+
+
+def load_tuned_config(model_size: str, backend: str = "eager", path: str = DEFAULT_TUNING_PATH,
+                      host: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Tuned configuration of a model size and backend on a host (default: this one), or None."""
+    if not path or not os.path.exists(path):
+        return None
+    entry = _read_tuning_file(path)['hosts'].get(host or host_key(), {}).get(model_size, {}).get(backend)
+    if not entry or 'batch_size' not in entry or 'num_threads' not in entry:
+        return None
+    return entry
+
+
+def autotune_cpu_inference(model: AzulNet, encoder: AzulTensorEncoder,
+                           states: Optional[List[AzulState]] = None,
+                           path: str = DEFAULT_TUNING_PATH, backend: str = "eager",
+                           batch_sizes: Optional[List[int]] = None,
+                           thread_counts: Optional[List[int]] = None,
+                           max_latency_ms: Optional[float] = None,
+                           repeats: int = 20) -> Dict[str, Any]:
+    """
+    Benchmark model on this host and save its best configuration to path.
+
+    Args:
+        model: Model to tune for; its size names the entry
+        encoder: Encoder matching model
+        states: Benchmark positions (default: load_benchmark_positions())
+        path: Tuning file
+        backend: CPU backend to tune
+        batch_sizes: Batch sizes to time
+        thread_counts: Thread counts to time
+        max_latency_ms: Latency budget per batch (see select_best_config)
+        repeats: Timed batches per configuration
+
+    Returns:
+        The benchmark results with the chosen configuration under 'best'
+    """
+    if states is None:
+        states = load_benchmark_positions()
+    results = benchmark_inference(model, encoder, states, batch_sizes, thread_counts, backend, repeats)
+    results['best'] = select_best_config(results, max_latency_ms)
+    save_tuned_config(results['best'], results['model_size'], backend, path)
+    return results
@@ -4,10 +4,14 @@ Neural Move Encoding System
 This module provides comprehensive move encoding for neural policy mapping.
 It handles the conversion between FastMove objects and policy indices,
 with support for dynamic move spaces and validation.
+
+Legal-move masks are built from packed moves (FastMove.bit_mask layout)
+with one vectorized index computation per batch, and masked softmax,
+argmax and sampling run over a whole batch of positions at once.
 """
 
 import torch
-from typing import List, Dict, Optional, Tuple, Set
+from typing import List, Dict, Optional, Sequence, Tuple, Set
 from dataclasses import dataclass
 import numpy as np
 
@@ -36,6 +40,52 @@ class MoveEncodingConfig:
     enable_caching: bool = True  # Enable move encoding caching
 
 
+def pack_moves(moves: Sequence[FastMove]) -> np.ndarray:
+    """
+    Moves packed in the FastMove.bit_mask layout, as an int64 array.
+    
+    Moves without an integer bit_mask are packed as -1, which encodes to no
+    policy index.
+    """
+    try:
+        return np.fromiter((move.bit_mask for move in moves), dtype=np.int64, count=len(moves))
+    except (AttributeError, TypeError):
+        return np.array([
+            move.bit_mask if isinstance(getattr(move, 'bit_mask', None), (int, np.integer)) else -1
+            for move in moves
+        ], dtype=np.int64)
+
+
+def masked_softmax(logits: torch.Tensor, mask: torch.Tensor, temperature: float = 1.0) -> torch.Tensor:
+    """
+    Softmax of logits / temperature over the legal entries of each row.
+    
+    Illegal entries get probability 0, as does every entry of a row with
+    no legal entry.
+    """
+    probs = torch.softmax(logits.masked_fill(~mask, float('-inf')) / temperature, dim=-1)
+    return torch.nan_to_num(probs, nan=0.0)
+
+
+def select_policy_indices(logits: torch.Tensor, mask: torch.Tensor, temperature: float = 0.0,
+                          generator: Optional[torch.Generator] = None) -> torch.Tensor:
+    """
+    One policy index per row of logits [N, policy_size].
+    
+    With temperature 0 this is the legal argmax; otherwise a sample from
+    masked_softmax(logits, mask, temperature), drawn with the Gumbel-max
+    trick so the whole batch is a single argmax. Rows with no legal entry
+    get -1.
+    """
+    scores = logits.masked_fill(~mask, float('-inf'))
+    if temperature > 0:
+        uniform = torch.rand(scores.shape, generator=generator, dtype=scores.dtype, device=scores.device)
+        uniform.clamp_(min=torch.finfo(scores.dtype).tiny)
+        scores = scores / temperature - torch.log(-torch.log(uniform))
+    indices = scores.argmax(dim=-1)
+    return torch.where(mask.any(dim=-1), indices, torch.full_like(indices, -1))
+
+
 class MoveEncoder:
     """
     Comprehensive move encoding system for neural policy mapping.
@@ -51,6 +101,10 @@ class MoveEncoder:
         self._index_cache: Dict[int, FastMove] = {}  # policy_index -> move
         self._legal_moves_cache: Dict[int, List[FastMove]] = {}  # state_hash -> legal_moves
         
+        # Reusable create_policy_mask_batch outputs
+        self._mask_buffer: Optional[torch.Tensor] = None
+        self._move_index_buffer: Optional[torch.Tensor] = None
+        
         # Pre-compute move space size
         self._total_move_space = self._calculate_move_space_size()
         
@@ -160,6 +214,58 @@ class MoveEncoder:
         """Get the total size of the move space."""
         return self._total_move_space
     
+    def encode_packed_moves(self, packed_moves: np.ndarray) -> np.ndarray:
+        """
+        Policy indices of packed moves (FastMove.bit_mask layout), vectorized.
+        
+        Gives the same index as encode_move for every move; negative packed
+        values, and with validation enabled moves encode_move would reject,
+        get -1.
+        
+        Args:
+            packed_moves: Integer array of packed moves
+            
+        Returns:
+            int64 array of policy indices
+        """
+        packed = np.asarray(packed_moves, dtype=np.int64)
+        action_type = (packed >> 18) & 0x3
+        source_id = ((packed >> 14) & 0xF) - 1
+        tile_type = (packed >> 11) & 0x7
+        pattern_line = ((packed >> 8) & 0x7) - 1
+        num_to_pattern_line = (packed >> 4) & 0xF
+        num_to_floor_line = packed & 0xF
+        
+        c = self.config
+        tile_stride = (c.max_pattern_lines + 1) * 2
+        source_stride = c.max_tile_types * tile_stride
+        from_factory = action_type == Action.TAKE_FROM_FACTORY
+        from_centre = action_type == Action.TAKE_FROM_CENTRE
+        
+        # _calculate_policy_index, with its table lookups' defaults of 0
+        indices = (
+            np.where(from_centre, self._action_type_offsets[Action.TAKE_FROM_CENTRE], 0)
+            + np.where(from_factory, source_id * source_stride, 0)
+            + np.where(tile_type < c.max_tile_types, tile_type * tile_stride, 0)
+            + np.where((pattern_line >= 0) & (pattern_line <= c.max_pattern_lines), pattern_line * 2, 0)
+            + (num_to_pattern_line == 0)
+        )
+        
+        if c.enable_validation:
+            total_tiles = num_to_pattern_line + num_to_floor_line
+            valid = (
+                ((from_factory & (source_id >= 0) & (source_id < c.max_factories)) |
+                 (from_centre & (source_id == -1)))
+                & (tile_type < c.max_tile_types)
+                & (pattern_line < c.max_pattern_lines)
+                & (num_to_pattern_line <= c.max_tiles_per_move)
+                & (num_to_floor_line <= c.max_tiles_per_move)
+                & (total_tiles > 0) & (total_tiles <= c.max_tiles_per_move)
+            )
+            indices = np.where(valid, indices, -1)
+        
+        return np.where(packed >= 0, indices, -1)
+    
     def get_legal_move_indices(self, legal_moves: List[FastMove]) -> List[int]:
         """
         Get policy indices for all legal moves.
@@ -168,17 +274,11 @@ class MoveEncoder:
             legal_moves: List of legal moves
             
         Returns:
-            List of policy indices for legal moves
+            List of policy indices for legal moves (moves that fail
+            validation are skipped)
         """
-        indices = []
-        for move in legal_moves:
-            try:
-                index = self.encode_move(move)
-                indices.append(index)
-            except ValueError:
-                # Skip invalid moves
-                continue
-        return indices
+        indices = self.encode_packed_moves(pack_moves(legal_moves))
+        return indices[indices >= 0].tolist()
     
     def create_policy_mask(self, legal_moves: List[FastMove], policy_size: int) -> torch.Tensor:
         """
@@ -192,13 +292,56 @@ class MoveEncoder:
             Boolean tensor mask for legal moves
         """
         mask = torch.zeros(policy_size, dtype=torch.bool)
-        legal_indices = self.get_legal_move_indices(legal_moves)
+        indices = self.encode_packed_moves(pack_moves(legal_moves))
+        mask[torch.from_numpy(indices[(indices >= 0) & (indices < policy_size)])] = True
+        return mask
+    
+    def create_policy_mask_batch(self, packed_moves: Sequence[np.ndarray], policy_size: int,
+                                 reuse_buffer: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Legal-move masks for a batch of positions.
         
-        for index in legal_indices:
-            if 0 <= index < policy_size:
-                mask[index] = True
+        The moves of every position are encoded in one vectorized pass and
+        scattered into the outputs.
         
-        return mask
+        Args:
+            packed_moves: Packed legal moves of each position (see pack_moves)
+            policy_size: Size of the policy output
+            reuse_buffer: Write into buffers kept by the encoder instead of
+                new tensors; the results are overwritten by the next such call
+            
+        Returns:
+            Tuple of (mask, move_index): a bool tensor [N, policy_size] of
+            legal entries, and a long tensor [N, policy_size] holding each
+            legal entry's position in its move list (-1 elsewhere)
+        """
+        count = len(packed_moves)
+        if reuse_buffer:
+            if (self._mask_buffer is None or self._mask_buffer.shape[0] < count
+                    or self._mask_buffer.shape[1] != policy_size):
+                self._mask_buffer = torch.empty(max(count, 1), policy_size, dtype=torch.bool)
+                self._move_index_buffer = torch.empty(max(count, 1), policy_size, dtype=torch.long)
+            mask = self._mask_buffer[:count]
+            move_index = self._move_index_buffer[:count]
+            mask.fill_(False)
+            move_index.fill_(-1)
+        else:
+            mask = torch.zeros(count, policy_size, dtype=torch.bool)
+            move_index = torch.full((count, policy_size), -1, dtype=torch.long)
+        
+        lengths = np.fromiter((len(moves) for moves in packed_moves), dtype=np.int64, count=count)
+        if lengths.sum() == 0:
+            return mask, move_index
+        
+        indices = self.encode_packed_moves(np.concatenate([np.asarray(moves) for moves in packed_moves]))
+        rows = np.repeat(np.arange(count), lengths)
+        positions = np.arange(len(indices)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        keep = (indices >= 0) & (indices < policy_size)
+        rows = torch.from_numpy(rows[keep])
+        columns = torch.from_numpy(indices[keep])
+        mask[rows, columns] = True
+        move_index[rows, columns] = torch.from_numpy(positions[keep])
+        return mask, move_index
     
     def apply_policy_mask(self, policy: torch.Tensor, legal_moves: List[FastMove]) -> torch.Tensor:
         """
@@ -209,21 +352,38 @@ class MoveEncoder:
             legal_moves: List of legal moves
             
         Returns:
-            Masked policy tensor
+            Masked policy tensor ([policy_size] or [batch_size, policy_size])
         """
         mask = self.create_policy_mask(legal_moves, policy.size(-1))
-        masked_policy = policy.clone()
+        return policy.masked_fill(~mask, float('-inf'))
+    
+    def select_moves_batch(self, logits: torch.Tensor, legal_moves_list: Sequence[List[FastMove]],
+                           temperature: float = 0.0,
+                           generator: Optional[torch.Generator] = None) -> List[Optional[FastMove]]:
+        """
+        Select one legal move per position from a batch of policy logits.
         
-        # Handle different tensor shapes
-        if policy.dim() == 2:
-            # Policy has shape [batch_size, policy_size]
-            mask = mask.unsqueeze(0)  # Add batch dimension
-            masked_policy[~mask] = float('-inf')
-        else:
-            # Policy has shape [policy_size]
-            masked_policy[~mask] = float('-inf')
+        Masks, masked argmax or sampling and the mapping back to moves each
+        run once for the whole batch (see select_policy_indices).
         
-        return masked_policy
+        Args:
+            logits: Policy logits [N, policy_size]
+            legal_moves_list: Legal moves of each position
+            temperature: 0 for the most likely legal move, else the sampling temperature
+            generator: Random generator for sampling
+            
+        Returns:
+            The selected move of each position; None where no legal move
+            has a policy index below policy_size
+        """
+        mask, move_index = self.create_policy_mask_batch(
+            [pack_moves(moves) for moves in legal_moves_list], logits.shape[-1], reuse_buffer=True
+        )
+        selected = select_policy_indices(logits, mask, temperature, generator)
+        positions = move_index.gather(1, selected.clamp(min=0).unsqueeze(1)).squeeze(1)
+        positions = torch.where(selected >= 0, positions, torch.full_like(positions, -1))
+        return [moves[position] if position >= 0 else None
+                for moves, position in zip(legal_moves_list, positions.tolist())]
     
     def select_move_from_policy(self, policy: torch.Tensor, legal_moves: List[FastMove], 
                               temperature: float = 1.0, method: str = 'greedy') -> Optional[FastMove]:
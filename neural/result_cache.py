@@ -0,0 +1,190 @@
+"""
+Neural Result Cache
+
+This module provides an LRU cache in front of AzulNet inference:
+- Entries are keyed by (position key, agent_id) and hold the value and the
+  policy logits, masked to the legal moves once they are known
+- The cache is bounded by a byte budget rather than an entry count
+- Hit-rate statistics for the performance endpoints
+- Every entry is dropped when the model's weights change
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+from core.azul_model import AzulState
+
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+TILE_TYPES = range(5)
+
+# Approximate cost of an entry besides its logits: key tuple, dict slot and tensor header
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def position_key(state: AzulState, agent_id: int) -> int:
+    """
+    Key of everything the network and the legal moves of agent_id depend on.
+
+    Covers what AzulTensorEncoder reads (factories in index order, centre,
+    the two encoded boards and the first two scores) plus the pattern line
+    counts, which decide the legal moves. Unlike
+    azul_tablebase.position_key, factories are not sorted: policy indices
+    refer to concrete factory indices.
+    """
+    parts = []
+    for factory in state.factories:
+        parts.extend(factory.tiles.get(tile, 0) for tile in TILE_TYPES)
+    parts.extend(state.centre_pool.tiles.get(tile, 0) for tile in TILE_TYPES)
+    opponent_id = (agent_id + 1) % len(state.agents)
+    for board_agent in (agent_id, opponent_id):
+        agent = state.agents[board_agent]
+        parts.extend(agent.lines_tile)
+        parts.extend(agent.lines_number)
+        parts.append(len(agent.floor_tiles))
+        parts.extend(agent.floor_tiles)
+        parts.append(agent.grid_state.tobytes())
+    for agent in state.agents[:2]:
+        parts.append(float(agent.score))
+    return hash(tuple(parts))
+
+
+def mask_logits(logits: torch.Tensor, legal_mask: torch.Tensor) -> torch.Tensor:
+    """
+    Logits with every entry outside legal_mask set to -inf.
+
+    When no legal move has a policy index (the policy head is smaller than
+    the move space), the logits are returned unmasked rather than all -inf.
+    """
+    if not legal_mask.any():
+        return logits
+    return logits.masked_fill(~legal_mask, float('-inf'))
+
+
+@dataclass
+class CachedResult:
+    """Network output for one (position, agent)."""
+    value: float
+    policy_logits: torch.Tensor  # Shape [num_actions]; -inf outside the legal moves when masked
+    masked: bool = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.policy_logits.element_size() * self.policy_logits.numel() + ENTRY_OVERHEAD_BYTES
+
+    @property
+    def policy(self) -> torch.Tensor:
+        """Policy probabilities, shape [1, num_actions]."""
+        return torch.softmax(self.policy_logits, dim=-1).unsqueeze(0)
+
+
+class NeuralResultCache:
+    """
+    LRU cache of AzulNet results bounded by max_bytes.
+
+    Callers pass their model to check_model before lookups; when its weights
+    have changed since the entries were stored (load_state_dict, an
+    optimizer step or another model), the cache is cleared. Weight changes
+    are detected from the parameters' in-place version counters, so the
+    check costs a few microseconds.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be >= 1, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, int], CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+
+        self._model: Optional[nn.Module] = None
+        self._parameters: list = []
+        self.model_version: Optional[Tuple[int, int]] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_model(self, model: nn.Module) -> bool:
+        """Clear the cache if model's weights differ from the cached results'; True if cleared."""
+        if model is not self._model:
+            self._model = model
+            self._parameters = list(model.parameters())
+        version = (id(model), sum(parameter._version for parameter in self._parameters))
+        if version == self.model_version:
+            return False
+        invalidated = self.model_version is not None
+        self.model_version = version
+        if invalidated:
+            with self._lock:
+                self._drop_entries()
+                self.invalidations += 1
+        return invalidated
+
+    def get(self, key: int, agent_id: int) -> Optional[CachedResult]:
+        """Get a cached result (and mark it recently used), or None."""
+        with self._lock:
+            result = self._entries.get((key, agent_id))
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((key, agent_id))
+            self.hits += 1
+            return result
+
+    def put(self, key: int, agent_id: int, value: float, policy_logits: torch.Tensor,
+            masked: bool = False) -> CachedResult:
+        """Store a result, evicting least recently used entries to stay within max_bytes."""
+        result = CachedResult(float(value), policy_logits.detach().reshape(-1), masked)
+        with self._lock:
+            previous = self._entries.pop((key, agent_id), None)
+            if previous is not None:
+                self.bytes_used -= previous.nbytes
+            self._entries[(key, agent_id)] = result
+            self.bytes_used += result.nbytes
+            self.stores += 1
+            while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted.nbytes
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._drop_entries()
+            self.hits = 0
+            self.misses = 0
+            self.stores = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def _drop_entries(self):
+        self._entries.clear()
+        self.bytes_used = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0
+        }
@@ -0,0 +1,330 @@
+"""
+Self-Play Data Generation
+
+This module provides:
+- Complete games played by MCTS or alpha-beta, through round scoring and
+  refills to the end-of-game bonuses
+- Policy targets from MCTS root visit counts (or the alpha-beta best move)
+  and value targets from the game outcome
+- Fixed-dtype .npy shards written by each worker process, indexed by a JSON
+  manifest, so datasets grow past RAM and are read back as memory maps
+
+Shards are written independently by every worker, so generation scales with
+the number of processes; only the manifest is written by the parent.
+"""
+
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from core.azul_model import AzulState, AzulGameRule
+from analysis_engine.mathematical_optimization.azul_chance import score_round
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove, FastMoveGenerator
+from neural.azul_net import AzulNetConfig, AzulTensorEncoder
+from neural.move_encoding import MoveEncoder, MoveEncodingConfig
+
+MANIFEST_NAME = "manifest.json"
+SHARD_FORMAT_VERSION = 1
+
+# Features are 0/1 indicators plus integer scores, all exact in float16
+SHARD_DTYPES = {
+    'features': np.float16,
+    'policy': np.float32,
+    'value': np.float32,
+    'agent_id': np.int8,
+}
+
+ENGINES = ("mcts", "alpha_beta")
+
+
+@dataclass
+class SelfPlayConfig:
+    """Configuration for self-play generation."""
+    engine: str = "mcts"  # "mcts" or "alpha_beta"
+    num_games: int = 100
+    num_players: int = 2
+    workers: int = 1
+    shard_size: int = 4096  # Samples per shard file
+
+    # Search per move
+    max_rollouts: int = 200  # MCTS
+    search_depth: int = 2  # Alpha-beta
+    search_time: float = 1.0
+
+    # Moves sampled in proportion to visit counts before playing the most visited
+    temperature_moves: int = 8
+    max_moves: int = 300  # Safety limit per game
+    seed: int = 0
+
+
+@dataclass
+class GameRecord:
+    """Samples of one finished game."""
+    features: np.ndarray  # [moves, feature_size]
+    policies: np.ndarray  # [moves, policy_size]
+    agent_ids: np.ndarray  # [moves] agent to move
+    final_scores: List[int]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Outcome for the agent to move: 1 win, 0 shared win, -1 loss."""
+        scores = np.asarray(self.final_scores)
+        winners = np.flatnonzero(scores == scores.max())
+        outcome = np.full(len(scores), -1.0, dtype=np.float32)
+        outcome[winners] = 1.0 if len(winners) == 1 else 0.0
+        return outcome[self.agent_ids]
+
+
+class ShardWriter:
+    """Buffers samples and writes them as fixed-dtype .npy shards."""
+
+    def __init__(self, directory: str, prefix: str, feature_size: int, policy_size: int,
+                 shard_size: int = 4096):
+        if shard_size < 1:
+            raise ValueError(f"shard_size must be >= 1, got {shard_size}")
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shards: List[Dict[str, Any]] = []
+        self._buffers = {
+            'features': np.zeros((shard_size, feature_size), dtype=SHARD_DTYPES['features']),
+            'policy': np.zeros((shard_size, policy_size), dtype=SHARD_DTYPES['policy']),
+            'value': np.zeros(shard_size, dtype=SHARD_DTYPES['value']),
+            'agent_id': np.zeros(shard_size, dtype=SHARD_DTYPES['agent_id']),
+        }
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def add_game(self, record: GameRecord):
+        """Append every sample of a game, flushing full shards."""
+        arrays = {
+            'features': record.features,
+            'policy': record.policies,
+            'value': record.values,
+            'agent_id': record.agent_ids,
+        }
+        start = 0
+        total = len(record.agent_ids)
+        while start < total:
+            take = min(self.shard_size - self._count, total - start)
+            for key, buffer in self._buffers.items():
+                buffer[self._count:self._count + take] = arrays[key][start:start + take]
+            self._count += take
+            start += take
+            if self._count == self.shard_size:
+                self._flush()
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Write the last partial shard; returns the manifest entries of every shard."""
+        if self._count > 0:
+            self._flush()
+        return self.shards
+
+    def _flush(self):
+        name = f"{self.prefix}_{len(self.shards):05d}"
+        files = {}
+        for key, buffer in self._buffers.items():
+            filename = f"{name}_{key}.npy"
+            out = np.lib.format.open_memmap(
+                os.path.join(self.directory, filename), mode='w+',
+                dtype=buffer.dtype, shape=(self._count,) + buffer.shape[1:]
+            )
+            out[:] = buffer[:self._count]
+            out.flush()
+            del out
+            files[key] = filename
+        self.shards.append({'name': name, 'samples': self._count, 'files': files})
+        self._count = 0
+
+
+def finish_round(state: AzulState, game_rule: AzulGameRule) -> bool:
+    """Score the round, then either apply the end-of-game bonuses (True) or deal the next round."""
+    score_round(state, game_rule)
+
+    if any(agent.GetCompletedRows() > 0 for agent in state.agents) or not (state.bag or state.bag_used):
+        for agent in state.agents:
+            agent.EndOfGameScore()
+        return True
+
+    game_rule.generateSuccessor(state, "STARTROUND", None)
+    return False
+
+
+class SelfPlayGenerator:
+    """Plays self-play games with one search engine."""
+
+    def __init__(self, config: SelfPlayConfig):
+        if config.engine not in ENGINES:
+            raise ValueError(f"Unknown engine {config.engine!r}; expected one of {ENGINES}")
+        self.config = config
+        self.encoder = AzulTensorEncoder(AzulNetConfig())
+        # Generated moves are legal; the encoder's check caps moves at 4 tiles, which centre moves exceed
+        self.move_encoder = MoveEncoder(MoveEncodingConfig(enable_validation=False))
+        self.move_generator = FastMoveGenerator()
+        self.policy_size = self.move_encoder.get_move_space_size()
+
+        if config.engine == "mcts":
+            from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS
+            self.search = AzulMCTS(max_time=config.search_time, max_rollouts=config.max_rollouts)
+        else:
+            from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+            self.search = AzulAlphaBetaSearch(max_depth=config.search_depth, max_time=config.search_time)
+
+    def play_game(self, seed: int) -> GameRecord:
+        """Play one complete game; seed fixes the bag draws and move sampling."""
+        random.seed(seed)  # AzulState deals from the global generator
+        rng = np.random.default_rng(seed)
+        num_players = self.config.num_players
+        state = AzulState(num_players)
+        game_rule = AzulGameRule(num_players)
+        agent_id = state.first_agent
+
+        features, policies, agent_ids = [], [], []
+        for _ in range(self.config.max_moves):
+            if not state.TilesRemaining():
+                if finish_round(state, game_rule):
+                    break
+                agent_id = state.first_agent
+                continue
+
+            sample = len(agent_ids) < self.config.temperature_moves
+            move, policy = self._choose_move(state, agent_id, rng, sample)
+            if move is None:
+                break
+            features.append(self.encoder.encode_batch([state], agent_id).numpy()[0])
+            policies.append(policy)
+            agent_ids.append(agent_id)
+
+            game_rule.generateSuccessor(state, move.to_tuple(), agent_id)
+            agent_id = (agent_id + 1) % num_players
+
+        return GameRecord(
+            features=np.array(features, dtype=np.float32).reshape(-1, self.encoder.feature_size),
+            policies=np.array(policies, dtype=np.float32).reshape(-1, self.policy_size),
+            agent_ids=np.array(agent_ids, dtype=np.int64),
+            final_scores=[int(agent.score) for agent in state.agents]
+        )
+
+    def _choose_move(self, state: AzulState, agent_id: int, rng: np.random.Generator,
+                     sample: bool) -> Tuple[Optional[FastMove], np.ndarray]:
+        """Move to play and its policy target."""
+        policy = np.zeros(self.policy_size, dtype=np.float32)
+        if self.config.engine == "mcts":
+            result = self.search.search(state, agent_id)
+            if not result.move_visits:
+                return None, policy
+            moves = [move for move, _ in result.move_visits]
+            visits = np.array([count for _, count in result.move_visits], dtype=np.float64)
+            probabilities = visits / visits.sum()
+            for move, probability in zip(moves, probabilities):
+                policy[self._policy_index(move)] += probability
+            if sample:
+                return moves[rng.choice(len(moves), p=probabilities)], policy
+            return result.best_move, policy
+
+        result = self.search.search(state, agent_id)
+        move = result.best_move
+        if move is None:
+            moves = self.move_generator.generate_moves_fast(state, agent_id)
+            if not moves:
+                return None, policy
+            move = moves[0]
+        policy[self._policy_index(move)] = 1.0
+        if sample:
+            # Alpha-beta has no visit counts; vary openings with uniformly random moves
+            moves = self.move_generator.generate_moves_fast(state, agent_id)
+            move = moves[rng.integers(len(moves))]
+        return move, policy
+
+    def _policy_index(self, move: FastMove) -> int:
+        return self.move_encoder.encode_move(move)
+
+
+def init_worker_process():
+    """Process pool initializer: one core per worker process."""
+    torch.set_num_threads(1)
+
+
+def _play_games(config: SelfPlayConfig, directory: str, task_index: int,
+                game_indices: List[int]) -> Dict[str, Any]:
+    """Worker task: play games and write them to this task's own shards."""
+    generator = SelfPlayGenerator(config)
+    writer = ShardWriter(directory, f"shard_t{task_index:04d}", generator.encoder.feature_size,
+                         generator.policy_size, config.shard_size)
+    samples = 0
+    for game_index in game_indices:
+        record = generator.play_game(config.seed * 1_000_003 + game_index)
+        writer.add_game(record)
+        samples += len(record.agent_ids)
+    return {
+        'shards': writer.close(),
+        'games': len(game_indices),
+        'samples': samples,
+        'feature_size': generator.encoder.feature_size,
+        'policy_size': generator.policy_size
+    }
+
+
+def generate_self_play_data(config: SelfPlayConfig, directory: str) -> Dict[str, Any]:
+    """
+    Play config.num_games games across config.workers processes into directory.
+
+    Returns:
+        The manifest, also written to directory/manifest.json
+    """
+    if config.num_games < 1:
+        raise ValueError(f"num_games must be >= 1, got {config.num_games}")
+    start = time.time()
+    os.makedirs(directory, exist_ok=True)
+
+    # Several small tasks per worker keep the processes busy to the end
+    num_tasks = min(config.num_games, max(1, config.workers) * 4)
+    tasks = [list(range(i, config.num_games, num_tasks)) for i in range(num_tasks)]
+
+    if config.workers <= 1:
+        results = [_play_games(config, directory, i, games) for i, games in enumerate(tasks)]
+    else:
+        with ProcessPoolExecutor(max_workers=config.workers, initializer=init_worker_process) as pool:
+            futures = [pool.submit(_play_games, config, directory, i, games) for i, games in enumerate(tasks)]
+            results = [future.result() for future in futures]
+
+    shards = [shard for result in results for shard in result['shards']]
+    manifest = {
+        'format_version': SHARD_FORMAT_VERSION,
+        'feature_size': results[0]['feature_size'],
+        'policy_size': results[0]['policy_size'],
+        'dtypes': {key: np.dtype(dtype).name for key, dtype in SHARD_DTYPES.items()},
+        'games': sum(result['games'] for result in results),
+        'samples': sum(shard['samples'] for shard in shards),
+        'shards': shards,
+        'config': asdict(config),
+        'generation_time': time.time() - start,
+        'created_at': time.time()
+    }
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Manifest of a shard directory."""
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != SHARD_FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard format {manifest.get('format_version')} in {directory}")
+    return manifest
+
+
+def open_shard(directory: str, shard: Dict[str, Any], mmap_mode: Optional[str] = 'r') -> Dict[str, np.ndarray]:
+    """Arrays of one manifest shard, memory-mapped by default."""
+    return {key: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+            for key, filename in shard['files'].items()}
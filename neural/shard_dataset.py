@@ -0,0 +1,156 @@
+"""
+Shard Datasets for AzulNet Training
+
+This module provides:
+- A map-style Dataset over the memory-mapped shards of neural.self_play
+- A streaming IterableDataset that visits shard blocks in a shuffled order,
+  shuffles samples within a buffer and yields whole batches
+- A DataLoader factory that splits the blocks across worker processes
+
+Batches are sliced from NumPy arrays in the loader workers, so the training
+loop only moves finished tensors to the device.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, IterableDataset, get_worker_info
+
+from neural.self_play import open_shard, read_manifest
+
+Batch = Tuple[torch.Tensor, torch.Tensor, torch.Tensor]
+
+
+def _to_tensors(features: np.ndarray, policy: np.ndarray, value: np.ndarray) -> Batch:
+    """(features, policy, value) tensors in float32, value shaped [N, 1]."""
+    # Copies, since slices of read-only memory maps cannot back tensors
+    return (
+        torch.from_numpy(np.array(features, dtype=np.float32)),
+        torch.from_numpy(np.array(policy, dtype=np.float32)),
+        torch.from_numpy(np.array(value, dtype=np.float32).reshape(-1, 1))
+    )
+
+
+class ShardDataset(Dataset):
+    """Random access to every sample of a shard directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self.offsets = np.cumsum([0] + [shard['samples'] for shard in self.manifest['shards']])
+        self._arrays: Optional[List[Dict[str, np.ndarray]]] = None
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index: int) -> Batch:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Sample {index} out of range for {len(self)} samples")
+        if self._arrays is None:
+            # Opened lazily so each loader worker maps the files itself
+            self._arrays = [open_shard(self.directory, shard) for shard in self.manifest['shards']]
+
+        shard_index = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        arrays = self._arrays[shard_index]
+        row = index - int(self.offsets[shard_index])
+        features, policy, value = _to_tensors(arrays['features'][row:row + 1], arrays['policy'][row:row + 1],
+                                              arrays['value'][row:row + 1])
+        return features[0], policy[0], value[0]
+
+
+class ShardIterableDataset(IterableDataset):
+    """
+    Streams shuffled batches from a shard directory.
+
+    Each shard is cut into blocks of shuffle_buffer samples. Every epoch the
+    blocks are visited in a new random order and split across loader
+    workers. Each block is read from its memory map in one slice and
+    shuffled, together with the samples left over from the previous block.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 32, shuffle: bool = True,
+                 shuffle_buffer: int = 8192, drop_last: bool = False, seed: int = 0):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, got {batch_size}")
+        if shuffle_buffer < 1:
+            raise ValueError(f"shuffle_buffer must be >= 1, got {shuffle_buffer}")
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self.blocks = [
+            (shard_index, start, min(start + shuffle_buffer, shard['samples']))
+            for shard_index, shard in enumerate(self.manifest['shards'])
+            for start in range(0, shard['samples'], shuffle_buffer)
+        ]
+
+    @property
+    def num_samples(self) -> int:
+        return self.manifest['samples']
+
+    def set_epoch(self, epoch: int):
+        """Reshuffle for another epoch; call before iterating the loader again."""
+        self.epoch = epoch
+
+    def _worker_blocks(self, rng: np.random.Generator) -> List[Tuple[int, int, int]]:
+        order = rng.permutation(len(self.blocks)) if self.shuffle else np.arange(len(self.blocks))
+        worker = get_worker_info()
+        if worker is not None:
+            order = order[worker.id::worker.num_workers]
+        return [self.blocks[i] for i in order]
+
+    def __iter__(self) -> Iterator[Batch]:
+        # Same block order in every worker; the sample shuffle differs per worker
+        rng = np.random.default_rng((self.seed, self.epoch))
+        blocks = self._worker_blocks(rng)
+        worker = get_worker_info()
+        if worker is not None:
+            rng = np.random.default_rng((self.seed, self.epoch, worker.id))
+
+        shards: Dict[int, Dict[str, np.ndarray]] = {}
+        pending: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        for shard_index, start, stop in blocks:
+            if shard_index not in shards:
+                shards[shard_index] = open_shard(self.directory, self.manifest['shards'][shard_index])
+            arrays = shards[shard_index]
+            block = (np.asarray(arrays['features'][start:stop]), np.asarray(arrays['policy'][start:stop]),
+                     np.asarray(arrays['value'][start:stop]))
+            if pending is not None:
+                block = tuple(np.concatenate([left, right]) for left, right in zip(pending, block))
+            if self.shuffle:
+                permutation = rng.permutation(len(block[0]))
+                block = tuple(array[permutation] for array in block)
+
+            full = len(block[0]) - len(block[0]) % self.batch_size
+            for i in range(0, full, self.batch_size):
+                yield _to_tensors(*(array[i:i + self.batch_size] for array in block))
+            pending = tuple(array[full:] for array in block) if full < len(block[0]) else None
+
+        if pending is not None and not self.drop_last:
+            yield _to_tensors(*pending)
+
+
+def create_shard_loader(directory: str, batch_size: int = 32, num_workers: int = 0,
+                        shuffle: bool = True, shuffle_buffer: int = 8192, drop_last: bool = False,
+                        seed: int = 0, pin_memory: bool = False) -> DataLoader:
+    """
+    DataLoader streaming (features, policy, value) batches from a shard directory.
+
+    The dataset yields whole batches, so the loader runs with batch_size=None
+    and no per-sample collation. Call loader.dataset.set_epoch(epoch) before
+    each epoch to get a new order.
+    """
+    dataset = ShardIterableDataset(directory, batch_size=batch_size, shuffle=shuffle,
+                                   shuffle_buffer=shuffle_buffer, drop_last=drop_last, seed=seed)
+    return DataLoader(
+        dataset, batch_size=None, num_workers=num_workers, pin_memory=pin_memory,
+        prefetch_factor=4 if num_workers > 0 else None
+    )
+
@@ -0,0 +1,459 @@
+"""
+Engine Tournaments
+
+This module plays engine configurations against each other:
+- Engines: alpha-beta (depth and/or time), MCTS (rollout budget and policy),
+  neural MCTS (a trained AzulNet) and a random mover, each optionally with
+  an evaluator weights file
+- Paired openings: every deal (and its random opening moves) is played
+  twice with the seats swapped, and later deals follow the opening's seed
+  rather than the engines' own use of the random generator
+- Games in a process pool, played with the self-play game loop
+- Elo with a confidence interval from the pair scores, a round-robin
+  rating fit, and SPRT early stopping for quick strength checks
+"""
+
+import math
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, replace
+from itertools import combinations
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove, FastMoveGenerator
+from core.azul_model import AzulGameRule, AzulState
+from neural.self_play import finish_round, init_worker_process
+
+ENGINE_KINDS = ("alpha_beta", "mcts", "neural", "random")
+
+# Pair scores of engine A: 0, 0.5, 1, 1.5 or 2 points from two games, as a fraction
+PAIR_SCORES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+
+@dataclass(frozen=True)
+class EngineSpec:
+    """One engine configuration."""
+    name: str
+    kind: str = "alpha_beta"  # One of ENGINE_KINDS
+    depth: int = 3  # Alpha-beta depth
+    time_limit: float = 1.0  # Seconds per move
+    rollouts: int = 200  # MCTS and neural rollouts per move
+    rollout_policy: str = "random"  # MCTS rollout policy: "random" or "heavy"
+    model_path: Optional[str] = None  # Neural model (default: an untrained AzulNet)
+    weights_path: Optional[str] = None  # Evaluator weights file (default: the evaluator's own)
+
+    def __post_init__(self):
+        if self.kind not in ENGINE_KINDS:
+            raise ValueError(f"Unknown engine kind {self.kind!r}; expected one of {ENGINE_KINDS}")
+
+
+# Keys of parse_engine_spec and the EngineSpec fields they set
+_SPEC_KEYS = {
+    'depth': ('depth', int),
+    'time': ('time_limit', float),
+    'rollouts': ('rollouts', int),
+    'policy': ('rollout_policy', str),
+    'model': ('model_path', str),
+    'weights': ('weights_path', str),
+}
+
+
+def parse_engine_spec(text: str) -> EngineSpec:
+    """
+    Parse "name=kind:key=value,..." (or "kind:...", named after the kind).
+
+    Keys: depth, time, rollouts, policy, model, weights; for example
+    "ab3=alpha_beta:depth=3,time=0.5" or "net=neural:model=models/azul_net_small.pth".
+    """
+    head, _, options = text.partition(':')
+    name, _, kind = head.partition('=')
+    if not kind:
+        name, kind = head, head
+    settings: Dict[str, Any] = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key not in _SPEC_KEYS or not value:
+            raise ValueError(f"Bad engine option {option!r} in {text!r}; keys are {sorted(_SPEC_KEYS)}")
+        attribute, convert = _SPEC_KEYS[key]
+        settings[attribute] = convert(value)
+    return EngineSpec(name=name.strip(), kind=kind.strip(), **settings)
+
+
+@dataclass
+class SPRTConfig:
+    """Sequential probability ratio test of H0: elo <= elo0 against H1: elo >= elo1."""
+    elo0: float = 0.0
+    elo1: float = 10.0
+    alpha: float = 0.05  # False positive rate
+    beta: float = 0.05  # False negative rate
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        """(lower, upper) log-likelihood ratio bounds: accept H0 below, H1 above."""
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+
+@dataclass
+class TournamentConfig:
+    """Configuration for matches and tournaments."""
+    pairs: int = 50  # Opening pairs per match (two games each)
+    workers: int = 1
+    opening_moves: int = 2  # Random moves at the start of every opening
+    max_moves: int = 300  # Safety limit per game
+    seed: int = 0
+
+    # SPRT early stopping (None plays every pair)
+    sprt: Optional[SPRTConfig] = None
+    min_pairs: int = 10  # Pairs before SPRT may stop a match
+
+
+def expected_score(elo: float) -> float:
+    """Expected score of a player elo points stronger than its opponent."""
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+def elo_from_score(score: float) -> float:
+    """Elo difference giving an expected score; scores are clamped to ±1200 Elo."""
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return 400.0 * math.log10(score / (1.0 - score))
+
+
+class TournamentEngine:
+    """A search engine built from an EngineSpec, choosing one move per call."""
+
+    def __init__(self, spec: EngineSpec):
+        from analysis_engine.mathematical_optimization.azul_evaluator import load_evaluator_weights
+        from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS, RolloutPolicy
+        from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+
+        self.spec = spec
+        weights = None
+        if spec.weights_path:
+            weights = load_evaluator_weights(spec.weights_path)
+            if weights is None:
+                raise ValueError(f"No evaluator weights file at {spec.weights_path}")
+
+        if spec.kind == "alpha_beta":
+            self.search = AzulAlphaBetaSearch(max_depth=spec.depth, max_time=spec.time_limit,
+                                              evaluator_weights=weights)
+        elif spec.kind == "mcts":
+            self.search = AzulMCTS(max_time=spec.time_limit, max_rollouts=spec.rollouts,
+                                   rollout_policy=RolloutPolicy(spec.rollout_policy), evaluator_weights=weights)
+        elif spec.kind == "neural":
+            neural_net = None
+            if spec.model_path:
+                from neural.azul_net import load_azul_net
+                neural_net = load_azul_net(spec.model_path)
+            self.search = AzulMCTS(max_time=spec.time_limit, max_rollouts=spec.rollouts,
+                                   rollout_policy=RolloutPolicy.NEURAL, neural_net=neural_net,
+                                   evaluator_weights=weights)
+        else:
+            self.search = None
+
+    def select_move(self, state: AzulState, agent_id: int, legal_moves: List[FastMove]) -> FastMove:
+        """Move to play; the first legal move if the search returns none."""
+        if self.search is None:
+            return random.choice(legal_moves)
+        move = self.search.search(state, agent_id).best_move
+        return move if move is not None else legal_moves[0]
+
+
+def play_game(engines: Sequence[TournamentEngine], seed: int, opening_moves: int = 0,
+              max_moves: int = 300) -> Dict[str, Any]:
+    """
+    Play one 2-player game, engines[i] in seat i.
+
+    seed fixes the first deal and the random opening moves; every later
+    deal is drawn right after reseeding from seed and the round number, so
+    two games of the same seed get the same draws whatever the engines do.
+
+    Returns:
+        Final scores, completed rows (the tie-break) and the number of moves
+    """
+    random.seed(seed)  # AzulState deals from the global generator
+    state = AzulState(2)
+    game_rule = AzulGameRule(2)
+    move_generator = FastMoveGenerator()
+    agent_id = state.first_agent
+    moves = 0
+    round_number = 0
+
+    for _ in range(max_moves):
+        if not state.TilesRemaining():
+            round_number += 1
+            random.seed(seed * 1009 + round_number)
+            if finish_round(state, game_rule):
+                break
+            agent_id = state.first_agent
+            continue
+
+        legal_moves = move_generator.generate_moves_fast(state, agent_id)
+        if not legal_moves:
+            break
+        if moves < opening_moves:
+            move = random.choice(legal_moves)
+        else:
+            move = engines[agent_id].select_move(state, agent_id, legal_moves)
+        game_rule.generateSuccessor(state, move.to_tuple(), agent_id)
+        moves += 1
+        agent_id = (agent_id + 1) % 2
+
+    return {
+        'scores': [int(agent.score) for agent in state.agents],
+        'completed_rows': [agent.GetCompletedRows() for agent in state.agents],
+        'moves': moves
+    }
+
+
+def game_points(game: Dict[str, Any], seat: int) -> float:
+    """1 for a win, 0.5 for a draw, 0 for a loss of seat; completed rows break score ties."""
+    mine = (game['scores'][seat], game['completed_rows'][seat])
+    theirs = (game['scores'][1 - seat], game['completed_rows'][1 - seat])
+    return 1.0 if mine > theirs else 0.5 if mine == theirs else 0.0
+
+
+# Engines of a worker process, built once per spec
+_ENGINES: Dict[EngineSpec, TournamentEngine] = {}
+
+
+def _engine(spec: EngineSpec) -> TournamentEngine:
+    if spec not in _ENGINES:
+        _ENGINES[spec] = TournamentEngine(spec)
+    return _ENGINES[spec]
+
+
+def _play_pair(spec_a: EngineSpec, spec_b: EngineSpec, seed: int, opening_moves: int,
+               max_moves: int) -> Dict[str, Any]:
+    """Worker task: play an opening twice, A in seat 0 then in seat 1."""
+    engine_a, engine_b = _engine(spec_a), _engine(spec_b)
+    start = time.time()
+    first = play_game([engine_a, engine_b], seed, opening_moves, max_moves)
+    second = play_game([engine_b, engine_a], seed, opening_moves, max_moves)
+    return {
+        'seed': seed,
+        'points': game_points(first, 0) + game_points(second, 1),
+        'games': [first, second],
+        'time': time.time() - start
+    }
+
+
+@dataclass
+class MatchStats:
+    """Results of engine A against engine B, by opening pair."""
+    pair_counts: List[int] = field(default_factory=lambda: [0] * len(PAIR_SCORES))
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+
+    def add_pair(self, pair: Dict[str, Any]):
+        self.pair_counts[int(round(pair['points'] * 2))] += 1
+        for game, seat in zip(pair['games'], (0, 1)):
+            points = game_points(game, seat)
+            if points == 1.0:
+                self.wins += 1
+            elif points == 0.5:
+                self.draws += 1
+            else:
+                self.losses += 1
+
+    @property
+    def pairs(self) -> int:
+        return sum(self.pair_counts)
+
+    def _mean_and_variance(self, regularize: bool = False) -> Tuple[float, float]:
+        # Regularized counts keep the variance positive when only one outcome was seen
+        counts = [count or 1e-3 for count in self.pair_counts] if regularize else self.pair_counts
+        total = sum(counts)
+        mean = sum(c * s for c, s in zip(counts, PAIR_SCORES)) / total
+        variance = sum(c * (s - mean) ** 2 for c, s in zip(counts, PAIR_SCORES)) / total
+        return mean, variance
+
+    @property
+    def score(self) -> float:
+        """A's mean score per game."""
+        return self._mean_and_variance()[0] if self.pairs else 0.5
+
+    def elo(self, z: float = 1.96) -> Tuple[float, float, float]:
+        """A's Elo difference over B and its confidence interval (low, high) at z standard errors."""
+        if not self.pairs:
+            return 0.0, -math.inf, math.inf
+        mean, variance = self._mean_and_variance()
+        error = z * math.sqrt(variance / self.pairs)
+        return elo_from_score(mean), elo_from_score(mean - error), elo_from_score(mean + error)
+
+    def llr(self, sprt: SPRTConfig) -> float:
+        """Log-likelihood ratio of H1 over H0 (normal approximation over pair scores)."""
+        if not self.pairs:
+            return 0.0
+        mean, variance = self._mean_and_variance(regularize=True)
+        s0, s1 = expected_score(sprt.elo0), expected_score(sprt.elo1)
+        return self.pairs * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def sprt_decision(self, sprt: SPRTConfig) -> Optional[str]:
+        """'H0', 'H1', or None while the test is undecided."""
+        lower, upper = sprt.bounds
+        llr = self.llr(sprt)
+        if llr >= upper:
+            return 'H1'
+        if llr <= lower:
+            return 'H0'
+        return None
+
+
+def run_match(spec_a: EngineSpec, spec_b: EngineSpec, config: Optional[TournamentConfig] = None,
+              progress: Optional[Callable[[MatchStats], None]] = None) -> Dict[str, Any]:
+    """
+    Play opening pairs of A against B until config.pairs or an SPRT decision.
+
+    With config.workers > 1 the pairs run in a process pool, at most two per
+    worker in flight, so an SPRT stop wastes little work.
+
+    Returns:
+        Wins/draws/losses of A, the pentanomial pair counts, Elo with its
+        95% interval, the SPRT state and games per second
+    """
+    config = config or TournamentConfig()
+    if config.pairs < 1:
+        raise ValueError(f"pairs must be >= 1, got {config.pairs}")
+    stats = MatchStats()
+    decision = None
+    seeds = iter(config.seed * 1_000_003 + i for i in range(config.pairs))
+    start = time.time()
+
+    def record(pair: Dict[str, Any]) -> bool:
+        """Add a pair; True when the match is over."""
+        nonlocal decision
+        stats.add_pair(pair)
+        if progress:
+            progress(stats)
+        if config.sprt is not None and stats.pairs >= config.min_pairs:
+            decision = stats.sprt_decision(config.sprt)
+        return decision is not None
+
+    if config.workers <= 1:
+        for seed in seeds:
+            if record(_play_pair(spec_a, spec_b, seed, config.opening_moves, config.max_moves)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=config.workers, initializer=init_worker_process) as pool:
+            def submit() -> bool:
+                seed = next(seeds, None)
+                if seed is None:
+                    return False
+                pending.add(pool.submit(_play_pair, spec_a, spec_b, seed, config.opening_moves,
+                                        config.max_moves))
+                return True
+
+            pending: set = set()
+            for _ in range(config.workers * 2):
+                submit()
+            finished = False
+            while pending and not finished:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished = record(future.result()) or finished
+                    if not finished:
+                        submit()
+            for future in pending:
+                future.cancel()
+
+    elapsed = time.time() - start
+    elo, elo_low, elo_high = stats.elo()
+    result = {
+        'engines': [spec_a.name, spec_b.name],
+        'pairs': stats.pairs,
+        'games': 2 * stats.pairs,
+        'wins': stats.wins,
+        'draws': stats.draws,
+        'losses': stats.losses,
+        'pair_counts': list(stats.pair_counts),
+        'score': stats.score,
+        'elo': elo,
+        'elo_interval': [elo_low, elo_high],
+        'time': elapsed,
+        'games_per_second': 2 * stats.pairs / elapsed if elapsed > 0 else 0.0
+    }
+    if config.sprt is not None:
+        result['sprt'] = {**asdict(config.sprt), 'llr': stats.llr(config.sprt),
+                          'bounds': list(config.sprt.bounds), 'decision': decision}
+    return result
+
+
+def fit_ratings(names: Sequence[str], matches: Sequence[Dict[str, Any]], iterations: int = 200) -> Dict[str, float]:
+    """
+    Bradley-Terry ratings from match results, in Elo relative to names[0].
+
+    Draws count half a win each way, and every pairing gets one virtual
+    draw so that unbeaten or winless engines keep finite ratings.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    count = len(names)
+    points = [0.0] * count
+    games = [[0.0] * count for _ in range(count)]
+    for match in matches:
+        a, b = (index[name] for name in match['engines'])
+        score_a = match['wins'] + 0.5 * match['draws'] + 0.5
+        score_b = match['losses'] + 0.5 * match['draws'] + 0.5
+        points[a] += score_a
+        points[b] += score_b
+        games[a][b] += match['games'] + 1
+        games[b][a] += match['games'] + 1
+
+    strengths = [1.0] * count
+    for _ in range(iterations):
+        for i in range(count):
+            denominator = sum(games[i][j] / (strengths[i] + strengths[j]) for j in range(count) if games[i][j])
+            if denominator > 0:
+                strengths[i] = points[i] / denominator
+    return {name: 400.0 * math.log10(strengths[i] / strengths[0]) for name, i in index.items()}
+
+
+def run_tournament(specs: Sequence[EngineSpec], config: Optional[TournamentConfig] = None,
+                   progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Round robin: a match between every two engines, then ratings fitted to all of them.
+
+    Returns:
+        The matches, the ratings (Elo relative to the first engine), total
+        games and games per second
+    """
+    config = config or TournamentConfig()
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Engine names must be unique: {names}")
+    start = time.time()
+    matches = []
+    for spec_a, spec_b in combinations(specs, 2):
+        matches.append(run_match(spec_a, spec_b, config))
+        if progress:
+            progress(matches[-1])
+    elapsed = time.time() - start
+    games = sum(match['games'] for match in matches)
+    return {
+        'engines': [asdict(spec) for spec in specs],
+        'matches': matches,
+        'ratings': fit_ratings(names, matches),
+        'games': games,
+        'time': elapsed,
+        'games_per_second': games / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def strength_check(candidate: EngineSpec, baseline: EngineSpec, config: Optional[TournamentConfig] = None,
+                   elo0: float = -20.0, elo1: float = 0.0) -> Dict[str, Any]:
+    """
+    Non-regression check of an optimised engine against its baseline.
+
+    Runs an SPRT of H0: candidate is elo0 or more weaker against H1: it is
+    no weaker (elo1); with the default limit of 100 pairs of fast engines it
+    finishes in minutes. 'passed' is True when H1 is accepted, False when H0
+    is, and None when the pairs ran out first.
+    """
+    config = config or TournamentConfig(pairs=100)
+    if config.sprt is None:
+        config = replace(config, sprt=SPRTConfig(elo0=elo0, elo1=elo1))
+    result = run_match(candidate, baseline, config)
+    decision = result['sprt']['decision']
+    result['passed'] = None if decision is None else decision == 'H1'
+    return result
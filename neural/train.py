@@ -3,8 +3,8 @@ Training script for AzulNet.
 
 This module provides:
 - Synthetic data generation for training
-- Training loop for AzulNet
-- Model saving and loading
+- Training loop for AzulNet, on synthetic data or streamed self-play shards
+- Model saving and loading, and checkpoints to resume training from
 - Performance evaluation
 """
 
@@ -13,7 +13,7 @@ import torch.nn as nn
 import torch.optim as optim
 import numpy as np
 import random
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 from dataclasses import dataclass
 import time
 import os
@@ -21,8 +21,10 @@ import os
 try:
     from .azul_net import AzulNet, AzulNetConfig, AzulTensorEncoder, create_azul_net
     from ..core.azul_model import AzulState
-    from ..core.azul_evaluator import AzulEvaluator
-    from ..core.azul_move_generator import FastMoveGenerator
+    from ..analysis_engine.mathematical_optimization.azul_evaluator import AzulEvaluator
+    from ..analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+    from .self_play import read_manifest
+    from .shard_dataset import create_shard_loader
 except ImportError:
     # Fallback for direct import
     import sys
@@ -30,8 +32,10 @@ except ImportError:
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from neural.azul_net import AzulNet, AzulNetConfig, AzulTensorEncoder, create_azul_net
     from core.azul_model import AzulState
-    from core.azul_evaluator import AzulEvaluator
-    from core.azul_move_generator import FastMoveGenerator
+    from analysis_engine.mathematical_optimization.azul_evaluator import AzulEvaluator
+    from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+    from neural.self_play import read_manifest
+    from neural.shard_dataset import create_shard_loader
 
 
 @dataclass
@@ -53,6 +57,12 @@ class TrainingConfig:
     min_score: float = -50.0
     max_score: float = 50.0
     
+    # Self-play shards (neural.self_play); synthetic data is generated when None
+    data_dir: Optional[str] = None
+    num_workers: int = 0  # Loader worker processes
+    shuffle_buffer: int = 8192  # Samples shuffled together
+    seed: int = 0
+    
     # Device
     device: str = "cpu"
 
@@ -150,15 +160,22 @@ class AzulNetTrainer:
         self.config = config
         self.device = torch.device(config.device)
         
-        # Create model and move to device
-        self.model, self.encoder = create_azul_net(
-            AzulNetConfig(
-                hidden_size=config.hidden_size,
-                num_layers=config.num_layers,
-                dropout_rate=config.dropout_rate
-            ),
-            device=config.device
+        net_config = AzulNetConfig(
+            hidden_size=config.hidden_size,
+            num_layers=config.num_layers,
+            dropout_rate=config.dropout_rate
         )
+        self.manifest = None
+        if config.data_dir:
+            # Shards fix the policy size (the move encoder's action space)
+            self.manifest = read_manifest(config.data_dir)
+            net_config.num_actions = self.manifest['policy_size']
+        
+        # Create model and move to device
+        self.model, self.encoder = create_azul_net(net_config, device=config.device)
+        if self.manifest and self.manifest['feature_size'] != self.encoder.feature_size:
+            raise ValueError(f"Shards in {config.data_dir} have {self.manifest['feature_size']} features, "
+                             f"the encoder produces {self.encoder.feature_size}")
         
         # Setup optimizer and loss functions
         self.optimizer = optim.Adam(self.model.parameters(), lr=config.learning_rate)
@@ -167,59 +184,120 @@ class AzulNetTrainer:
         
         # Data generator
         self.data_generator = SyntheticDataGenerator(config)
+        
+        # Per-epoch loss, samples and samples/second of the last train()
+        self.epoch_stats: List[Dict[str, float]] = []
+        self._epoch_samples = 0
+        self.stopped = False  # Set when on_epoch_end asked train() to stop early
     
-    def train(self) -> List[float]:
+    def train(self, checkpoint_path: Optional[str] = None, checkpoint_every: int = 1,
+              on_epoch_end: Optional[Callable[[Dict[str, float]], bool]] = None) -> List[float]:
         """
         Train the model.
         
+        Args:
+            checkpoint_path: Checkpoint to resume from if it exists and to
+                save to every checkpoint_every epochs, at the end and on stop
+            checkpoint_every: Epochs between checkpoints
+            on_epoch_end: Called with each epoch's stats; returning True stops
+                training after the epoch (and its checkpoint)
+        
         Returns:
-            List of training losses
+            List of training losses, including epochs before a resume
         """
         print(f"Starting training on {self.device}")
         print(f"Model parameters: {sum(p.numel() for p in self.model.parameters())}")
         
-        # Generate training data
-        states, policy_targets, value_targets = self.data_generator.generate_training_data()
+        # Seeded so a resumed run regenerates the same synthetic data
+        random.seed(self.config.seed)
+        np.random.seed(self.config.seed)
+        torch.manual_seed(self.config.seed)
         
-        # Move data to device
-        states = states.to(self.device)
-        policy_targets = policy_targets.to(self.device)
-        value_targets = value_targets.to(self.device)
+        if self.manifest:
+            loader = create_shard_loader(
+                self.config.data_dir, batch_size=self.config.batch_size, num_workers=self.config.num_workers,
+                shuffle_buffer=self.config.shuffle_buffer, seed=self.config.seed,
+                pin_memory=self.device.type == 'cuda'
+            )
+            print(f"Streaming {self.manifest['samples']} samples from {len(self.manifest['shards'])} shards")
+        else:
+            # Generate training data
+            states, policy_targets, value_targets = self.data_generator.generate_training_data()
+            
+            # Move data to device
+            states = states.to(self.device)
+            policy_targets = policy_targets.to(self.device)
+            value_targets = value_targets.to(self.device)
         
         losses = []
+        self.epoch_stats = []
+        self.stopped = False
+        start_epoch = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            start_epoch = self.load_checkpoint(checkpoint_path)
+            losses = [stats['loss'] for stats in self.epoch_stats]
+            print(f"Resuming from {checkpoint_path} at epoch {start_epoch + 1}")
         
-        for epoch in range(self.config.num_epochs):
-            epoch_loss = self._train_epoch(states, policy_targets, value_targets)
+        for epoch in range(start_epoch, self.config.num_epochs):
+            if self.manifest:
+                loader.dataset.set_epoch(epoch)
+                batches = loader
+            else:
+                batches = self._tensor_batches(states, policy_targets, value_targets)
+            
+            start = time.perf_counter()
+            self._epoch_samples = 0
+            epoch_loss = self._train_epoch(batches)
+            elapsed = time.perf_counter() - start
             losses.append(epoch_loss)
             
-            print(f"Epoch {epoch + 1}/{self.config.num_epochs}, Loss: {epoch_loss:.4f}")
+            samples_per_second = self._epoch_samples / max(elapsed, 1e-9)
+            self.epoch_stats.append({
+                'epoch': epoch + 1,
+                'loss': epoch_loss,
+                'samples': self._epoch_samples,
+                'seconds': elapsed,
+                'samples_per_second': samples_per_second
+            })
+            print(f"Epoch {epoch + 1}/{self.config.num_epochs}, Loss: {epoch_loss:.4f}, "
+                  f"{samples_per_second:.0f} samples/s")
+            
+            self.stopped = bool(on_epoch_end(self.epoch_stats[-1])) if on_epoch_end else False
+            last_epoch = epoch + 1 == self.config.num_epochs
+            if checkpoint_path and (self.stopped or last_epoch or (epoch + 1) % checkpoint_every == 0):
+                self.save_checkpoint(checkpoint_path, epoch + 1)
+            if self.stopped:
+                print(f"Training stopped after epoch {epoch + 1}")
+                break
         
         return losses
     
-    def _train_epoch(self, states: torch.Tensor, policy_targets: torch.Tensor, 
-                     value_targets: torch.Tensor) -> float:
-        """Train for one epoch."""
+    def _tensor_batches(self, states: torch.Tensor, policy_targets: torch.Tensor,
+                        value_targets: torch.Tensor) -> Iterable[Tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+        """Shuffled batches of in-memory training data."""
+        indices = torch.randperm(len(states))
+        for i in range(0, len(states), self.config.batch_size):
+            batch_indices = indices[i:i + self.config.batch_size]
+            yield states[batch_indices], policy_targets[batch_indices], value_targets[batch_indices]
+    
+    def _train_epoch(self, batches: Iterable[Tuple[torch.Tensor, torch.Tensor, torch.Tensor]]) -> float:
+        """Train for one epoch over (states, policy targets, value targets) batches."""
         self.model.train()
         total_loss = 0.0
         num_batches = 0
         
-        # Create batches
-        dataset_size = len(states)
-        indices = torch.randperm(dataset_size)
-        
-        for i in range(0, dataset_size, self.config.batch_size):
-            batch_indices = indices[i:i + self.config.batch_size]
-            
-            batch_states = states[batch_indices]
-            batch_policy_targets = policy_targets[batch_indices]
-            batch_value_targets = value_targets[batch_indices]
+        for batch_states, batch_policy_targets, batch_value_targets in batches:
+            non_blocking = self.device.type == 'cuda'
+            batch_states = batch_states.to(self.device, non_blocking=non_blocking)
+            batch_policy_targets = batch_policy_targets.to(self.device, non_blocking=non_blocking)
+            batch_value_targets = batch_value_targets.to(self.device, non_blocking=non_blocking)
             
             # Forward pass
             policy_logits, value_pred = self.model(batch_states)
             
-            # Calculate losses
-            policy_loss = self.policy_loss_fn(policy_logits, batch_policy_targets.argmax(dim=1))
-            value_loss = self.value_loss_fn(value_pred.squeeze(), batch_value_targets.squeeze())
+            # Calculate losses (policy targets are distributions, e.g. MCTS visit counts)
+            policy_loss = self.policy_loss_fn(policy_logits, batch_policy_targets)
+            value_loss = self.value_loss_fn(value_pred.reshape(-1), batch_value_targets.reshape(-1))
             
             total_loss_batch = policy_loss + value_loss
             
@@ -230,8 +308,9 @@ class AzulNetTrainer:
             
             total_loss += total_loss_batch.item()
             num_batches += 1
+            self._epoch_samples += len(batch_states)
         
-        return total_loss / num_batches
+        return total_loss / max(num_batches, 1)
     
     def evaluate(self, num_samples: int = 100) -> dict:
         """Evaluate the trained model."""
@@ -279,6 +358,52 @@ class AzulNetTrainer:
         
         print(f"Model saved to {path}")
     
+    def save_checkpoint(self, path: str, epoch: int):
+        """
+        Save everything needed to continue training after epoch.
+        
+        The file is replaced atomically, so a crash mid-save leaves the
+        previous checkpoint intact.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        checkpoint = {
+            'epoch': epoch,
+            'model_state_dict': self.model.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'epoch_stats': self.epoch_stats,
+            'config': self.config,
+            'encoder_config': self.encoder.config,
+            'rng_state': {
+                'python': random.getstate(),
+                'numpy': np.random.get_state(),
+                'torch': torch.get_rng_state(),
+                'cuda': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+            }
+        }
+        torch.save(checkpoint, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    
+    def load_checkpoint(self, path: str) -> int:
+        """
+        Restore a checkpoint saved by save_checkpoint.
+        
+        Returns:
+            Number of epochs already trained
+        """
+        # Checkpoints pickle their configs and RNG states, so they need weights_only=False
+        checkpoint = torch.load(path, map_location=self.device, weights_only=False)
+        self.model.load_state_dict(checkpoint['model_state_dict'])
+        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.epoch_stats = list(checkpoint.get('epoch_stats', []))
+        
+        rng_state = checkpoint['rng_state']
+        random.setstate(rng_state['python'])
+        np.random.set_state(rng_state['numpy'])
+        torch.set_rng_state(rng_state['torch'].cpu())
+        if rng_state.get('cuda') is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(rng_state['cuda'])
+        return checkpoint['epoch']
+    
     def load_model(self, path: str):
         """Load a trained model."""
         checkpoint = torch.load(path, map_location=self.device)
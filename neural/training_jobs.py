@@ -0,0 +1,428 @@
+"""
+Out-of-Process Training Jobs
+
+This module provides:
+- A worker entry point that runs AzulNetTrainer in its own process, with
+  periodic checkpoints and a cooperative stop at epoch boundaries
+- A supervisor that starts, stops and resumes those processes and notices
+  when one dies without reporting
+- A progress writer that batches the workers' reports into one database
+  write per session per flush interval
+
+Workers never touch the database; they send progress messages over a
+multiprocessing queue that only the supervisor reads.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from core.azul_database import NeuralTrainingProgress
+
+CHECKPOINT_DIR = os.path.join("models", "checkpoints")
+TERMINAL_STATUSES = ("completed", "failed", "stopped")
+
+
+def checkpoint_path_for(session_id: str, checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+    """Checkpoint file of a training session."""
+    return os.path.join(checkpoint_dir, f"{session_id}.pt")
+
+
+def run_training_job(session_id: str, config: Any, checkpoint_path: str, model_path: str,
+                     progress_queue: Any, stop_event: Any, checkpoint_every: int = 1,
+                     evaluation_samples: int = 50):
+    """
+    Worker process: train (resuming from checkpoint_path if it exists), evaluate and save.
+
+    Every report is a dict put on progress_queue with the session id, a
+    type ('status' or 'epoch') and a timestamp. The last report always has
+    a terminal status.
+    """
+    process = psutil.Process()
+    process.cpu_percent()  # The first reading is always 0
+
+    def report(kind: str, **fields):
+        progress_queue.put({'session_id': session_id, 'type': kind,
+                            'timestamp': datetime.now().isoformat(), **fields})
+
+    try:
+        from neural.train import AzulNetTrainer
+
+        trainer = AzulNetTrainer(config)
+        resuming = os.path.exists(checkpoint_path)
+        report('status', status='running',
+               log='Training resumed from checkpoint' if resuming else 'Training started')
+
+        def on_epoch_end(stats: Dict[str, float]) -> bool:
+            report('epoch', epoch=stats['epoch'], loss=stats['loss'],
+                   samples_per_second=stats['samples_per_second'],
+                   cpu_percent=process.cpu_percent(), memory_percent=process.memory_percent(),
+                   progress=int(min(80, stats['epoch'] / config.num_epochs * 80)))
+            return stop_event.is_set()
+
+        losses = trainer.train(checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every,
+                               on_epoch_end=on_epoch_end)
+        if trainer.stopped:
+            report('status', status='stopped',
+                   log=f'Training stopped after epoch {len(losses)}; checkpoint saved for resume')
+            return
+
+        report('status', progress=80, log=f'Training completed with {len(losses)} epochs')
+        eval_results = trainer.evaluate(num_samples=evaluation_samples)
+        report('status', progress=90, log='Evaluation completed')
+
+        trainer.save_model(model_path)
+        final_loss = losses[-1] if losses else 0.0
+        report('status', status='completed', progress=100, log=f'Model saved to {model_path}',
+               results={
+                   'final_loss': final_loss,
+                   'evaluation_error': eval_results.get('avg_value_error', 0.0),
+                   'model_path': model_path,
+                   'epochs': len(losses),
+                   'samples_per_second': trainer.epoch_stats[-1]['samples_per_second'] if trainer.epoch_stats else 0.0
+               })
+    except Exception as e:
+        report('status', status='failed', error=str(e), log=f'Error: {str(e)}')
+
+
+@dataclass
+class _PendingUpdate:
+    """Reports of one session received since the last flush."""
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    terminal: bool = False
+
+
+class TrainingProgressWriter:
+    """
+    Applies worker reports to training sessions in batches.
+
+    Reports are buffered per session; each flush reads a session once,
+    applies all of its reports and writes it back together with its new
+    epoch rows in one transaction. Terminal statuses should be flushed at once.
+    """
+
+    def __init__(self, db, flush_interval: float = 2.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Held while a flush writes
+        self._pending: Dict[str, _PendingUpdate] = {}
+        self._last_flush = time.time()
+        self.flushes = 0
+        self.messages_written = 0
+
+    def add(self, message: Dict[str, Any]) -> bool:
+        """Buffer a report. Returns True if it ends its session's job."""
+        with self._lock:
+            pending = self._pending.setdefault(message['session_id'], _PendingUpdate())
+            pending.messages.append(message)
+            if message.get('status') in TERMINAL_STATUSES:
+                pending.terminal = True
+            return pending.terminal
+
+    def has_pending(self, session_id: str) -> bool:
+        """Whether reports of a session are buffered or being written."""
+        with self._flush_lock, self._lock:
+            return session_id in self._pending
+
+    def due(self) -> bool:
+        with self._lock:
+            return bool(self._pending) and (time.time() - self._last_flush >= self.flush_interval or
+                                            any(p.terminal for p in self._pending.values()))
+
+    def flush(self) -> int:
+        """Write every buffered report. Returns the number of sessions written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = time.time()
+            if self.db is None:
+                return 0
+
+            written = 0
+            for session_id, update in pending.items():
+                session = self.db.get_neural_training_session(session_id)
+                if session is None:
+                    continue
+                progress = [self._apply(session, message) for message in update.messages]
+                if self.db.save_neural_training_progress(session, [record for record in progress if record]):
+                    written += 1
+                    self.messages_written += len(update.messages)
+            self.flushes += 1
+            return written
+
+    @staticmethod
+    def _apply(session, message: Dict[str, Any]) -> Optional[NeuralTrainingProgress]:
+        """Apply one report to a session; returns the epoch row it adds, if any."""
+        for name in ('logs', 'loss_history', 'epoch_history', 'timestamp_history', 'cpu_usage', 'memory_usage'):
+            if getattr(session, name) is None:
+                setattr(session, name, [])
+        timestamp = datetime.fromisoformat(message['timestamp'])
+
+        if 'progress' in message:
+            session.progress = message['progress']
+        if message['type'] == 'epoch':
+            session.current_epoch = message['epoch']
+            session.loss_history.append(message['loss'])
+            session.epoch_history.append(message['epoch'])
+            session.timestamp_history.append(message['timestamp'])
+            session.cpu_usage.append(message['cpu_percent'])
+            session.memory_usage.append(message['memory_percent'])
+            session.metadata = {**(session.metadata or {}), 'samples_per_second': message['samples_per_second']}
+            return NeuralTrainingProgress(session_id=session.session_id, epoch=message['epoch'],
+                                          loss=message['loss'], timestamp=timestamp)
+
+        if message.get('log'):
+            session.logs.append(message['log'])
+        if message.get('status'):
+            session.status = message['status']
+            if session.status in TERMINAL_STATUSES:
+                session.end_time = timestamp
+        if message.get('error'):
+            session.error = message['error']
+        if message.get('results'):
+            session.results = dict(message['results'])
+            if isinstance(session.config, dict):
+                session.results.update(config=session.config.get('config'), samples=session.config.get('samples'))
+            session.metadata = {**(session.metadata or {}), 'final_loss': message['results']['final_loss'],
+                                'evaluation_error': message['results']['evaluation_error'],
+                                'model_path': message['results']['model_path']}
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pending_sessions': len(self._pending),
+                'pending_messages': sum(len(p.messages) for p in self._pending.values()),
+                'flushes': self.flushes,
+                'messages_written': self.messages_written,
+                'flush_interval': self.flush_interval
+            }
+
+
+@dataclass
+class TrainingJob:
+    """A running training process."""
+    session_id: str
+    process: Any  # multiprocessing Process
+    stop_event: Any  # multiprocessing Event
+    checkpoint_path: str
+    model_path: str
+    started_at: float
+    resumed: bool
+    finished: bool = False  # A terminal status was reported
+
+
+class TrainingJobSupervisor:
+    """
+    Runs training jobs in separate processes and records their progress.
+
+    Jobs are spawned rather than forked, since the API process has threads
+    (and possibly CUDA) that a fork would copy in an unknown state. A
+    monitor thread reads reports, flushes them through the progress writer
+    and marks jobs whose process died without a terminal report as failed;
+    their last checkpoint is kept so they can be resumed. Checkpoints of
+    completed jobs are deleted.
+    """
+
+    def __init__(self, db, checkpoint_dir: str = CHECKPOINT_DIR, max_jobs: int = 2,
+                 flush_interval: float = 2.0, checkpoint_every: int = 1):
+        self.checkpoint_dir = checkpoint_dir
+        self.max_jobs = max_jobs
+        self.checkpoint_every = checkpoint_every
+        self.writer = TrainingProgressWriter(db, flush_interval)
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._queue = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.jobs_started = 0
+        self.jobs_crashed = 0
+
+    @property
+    def db(self):
+        """Database the job reports are written to."""
+        return self.writer.db
+
+    @db.setter
+    def db(self, db):
+        self.writer.db = db
+
+    def _ensure_started(self):
+        """Create the report queue and the monitor thread on first use."""
+        if self._monitor is None:
+            self._queue = self._context.Queue()
+            self._monitor = threading.Thread(target=self._monitor_jobs, name="training-monitor", daemon=True)
+            self._monitor.start()
+            atexit.register(self.shutdown)
+
+    def checkpoint_path(self, session_id: str) -> str:
+        return checkpoint_path_for(session_id, self.checkpoint_dir)
+
+    def start(self, session_id: str, config: Any, model_path: str) -> TrainingJob:
+        """
+        Start (or resume, if the session has a checkpoint) a training job.
+
+        Raises:
+            RuntimeError: If the session is already running or max_jobs are running
+        """
+        with self._lock:
+            if self._stop.is_set():
+                raise RuntimeError("Training supervisor is shut down")
+            if self.is_running(session_id):
+                raise RuntimeError(f"Training session {session_id} is already running")
+            if sum(1 for job in self._jobs.values() if job.process.is_alive()) >= self.max_jobs:
+                raise RuntimeError(f"{self.max_jobs} training jobs are already running")
+            self._ensure_started()
+
+            checkpoint_path = self.checkpoint_path(session_id)
+            stop_event = self._context.Event()
+            process = self._context.Process(
+                target=run_training_job,
+                args=(session_id, config, checkpoint_path, model_path, self._queue, stop_event,
+                      self.checkpoint_every),
+                name=f"training-{session_id[:8]}"
+            )
+            process.start()
+            job = TrainingJob(session_id=session_id, process=process, stop_event=stop_event,
+                              checkpoint_path=checkpoint_path, model_path=model_path,
+                              started_at=time.time(), resumed=os.path.exists(checkpoint_path))
+            self._jobs[session_id] = job
+            self.jobs_started += 1
+            return job
+
+    def is_running(self, session_id: str) -> bool:
+        job = self._jobs.get(session_id)
+        return job is not None and not job.finished and job.process.is_alive()
+
+    def has_checkpoint(self, session_id: str) -> bool:
+        return os.path.exists(self.checkpoint_path(session_id))
+
+    def stop(self, session_id: str) -> bool:
+        """Ask a job to stop after its current epoch. Returns False if it is not running."""
+        with self._lock:
+            if not self.is_running(session_id):
+                return False
+            self._jobs[session_id].stop_event.set()
+        # Through the writer, so it is not lost to a flush of the same session
+        self.writer.add({'session_id': session_id, 'type': 'status', 'timestamp': datetime.now().isoformat(),
+                         'log': 'Stop requested - training will stop after the current epoch'})
+        return True
+
+    def wait(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait until a job's final report is written. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self._jobs.get(session_id)
+            if job is None or (job.finished and not job.process.is_alive()
+                               and not self.writer.has_pending(session_id)):
+                return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def _monitor_jobs(self):
+        """Read reports, flush them when due and detect dead workers."""
+        poll = max(0.05, min(0.5, self.writer.flush_interval / 4))
+        while True:
+            try:
+                message = self._queue.get(timeout=poll)
+                if self.writer.add(message):
+                    self._finish_job(message)
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break
+
+            self._check_processes()
+            if self.writer.due():
+                self.writer.flush()
+            if self._stop.is_set() and not any(job.process.is_alive() for job in self._jobs.values()):
+                break
+        self._drain()
+        self.writer.flush()
+
+    def _drain(self):
+        """Read every report already queued."""
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                return
+            if self.writer.add(message):
+                self._finish_job(message)
+
+    def _finish_job(self, message: Dict[str, Any]):
+        """Mark a job finished on its terminal report; a completed job's checkpoint is no longer needed."""
+        session_id = message['session_id']
+        if message.get('status') == 'completed':
+            try:
+                os.remove(self.checkpoint_path(session_id))
+            except FileNotFoundError:
+                pass
+        job = self._jobs.get(session_id)
+        if job is not None:
+            job.finished = True
+
+    def _check_processes(self):
+        """Fail jobs whose process exited without a terminal report."""
+        with self._lock:
+            dead = [job for job in self._jobs.values() if not job.finished and not job.process.is_alive()]
+        if not dead:
+            return
+        # Reports sent just before exiting may still be queued
+        self._drain()
+        for job in dead:
+            if job.finished:
+                continue
+            job.finished = True
+            self.jobs_crashed += 1
+            resumable = os.path.exists(job.checkpoint_path)
+            self.writer.add({
+                'session_id': job.session_id, 'type': 'status', 'status': 'failed',
+                'timestamp': datetime.now().isoformat(),
+                'error': f"Training process exited unexpectedly (exit code {job.process.exitcode})",
+                'log': 'Training process died' + ('; resume from the last checkpoint' if resumable else '')
+            })
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.process.is_alive()]
+            return {
+                'max_jobs': self.max_jobs,
+                'running_jobs': len(running),
+                'jobs': {job.session_id: {
+                    'pid': job.process.pid,
+                    'resumed': job.resumed,
+                    'uptime_seconds': time.time() - job.started_at,
+                    'stop_requested': job.stop_event.is_set()
+                } for job in running},
+                'jobs_started': self.jobs_started,
+                'jobs_crashed': self.jobs_crashed,
+                'writer': self.writer.get_stats()
+            }
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop every job (each saves a checkpoint), then terminate any that do not exit in time."""
+        self._stop.set()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.stop_event.set()
+        deadline = time.time() + timeout
+        for job in jobs:
+            job.process.join(max(0.0, deadline - time.time()))
+            if job.process.is_alive():
+                job.process.terminate()
+                job.process.join(1.0)
+        if self._monitor is not None:
+            self._monitor.join(timeout=5.0)
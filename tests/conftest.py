@@ -0,0 +1,26 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def azul_net(request):
+    """
+    Seeded AzulNet and its encoder in eval mode.
+
+    The default size is used unless the test parametrizes the fixture
+    indirectly with a name from MODEL_SIZES.
+    """
+    # Imported here so tests that do not need PyTorch still collect without it
+    import torch
+    from neural.azul_net import AzulNetConfig, create_azul_net
+    from neural.inference_tuning import MODEL_SIZES
+
+    size = getattr(request, 'param', None)
+    config = AzulNetConfig(**MODEL_SIZES[size]) if size is not None else None
+    torch.manual_seed(0)
+    model, encoder = create_azul_net(config)
+    model.eval()
+    return model, encoder
@@ -0,0 +1,141 @@
+"""
+Tests for sampled chance nodes at round boundaries.
+"""
+
+from collections import Counter
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_chance import ChanceSampler
+from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS, MCTSNode
+from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+from core.azul_model import AzulState
+from core.azul_utils import Tile
+
+
+def _last_tiles_state(num_agents: int = 2) -> AzulState:
+    """A position whose only tiles are two reds in the centre, so any move ends the round."""
+    state = AzulState(num_agents)
+    for display in state.factories + [state.centre_pool]:
+        display.tiles = {tile: 0 for tile in Tile}
+        display.total = 0
+    state.centre_pool.tiles[Tile.RED] = 2
+    state.centre_pool.total = 2
+    state.first_agent_taken = True
+    state.next_first_agent = 1
+    return state
+
+
+def _bag_and_factories(state: AzulState) -> Counter:
+    tiles = Counter(state.bag)
+    for factory in state.factories:
+        for tile, count in factory.tiles.items():
+            tiles[tile] += count
+    return tiles
+
+
+class TestChanceSampler:
+    """Test sampling and caching of next-round deals."""
+
+    def test_deals_are_seeded_and_cached_by_composition(self):
+        """Test that equal bag compositions share one cached set of deals."""
+        sampler = ChanceSampler(num_samples=4, seed=7)
+        state = AzulState(2)
+        shuffled = state.clone()
+        shuffled.bag.reverse()
+
+        deals = sampler.sample_deals(state)
+        assert len(deals) == 4
+        assert sampler.sample_deals(shuffled) is deals
+        assert sampler.get_stats()['hits'] == 1
+        assert ChanceSampler(num_samples=4, seed=7).sample_deals(state) == deals
+
+    def test_deals_come_from_the_bag(self):
+        """Test that every deal fills each factory from the bag's tiles."""
+        sampler = ChanceSampler(num_samples=8)
+        state = AzulState(3)
+        bag = Counter(state.bag)
+
+        for deal in sampler.sample_deals(state):
+            assert not deal.refilled
+            assert all(sum(counts) == 4 for counts in deal.factories)
+            drawn = Counter()
+            for counts in deal.factories:
+                for tile, count in enumerate(counts):
+                    drawn[tile] += count
+            assert all(drawn[tile] <= bag[tile] for tile in drawn)
+
+    def test_short_bag_refills_from_used_tiles(self):
+        """Test that the used tiles are poured in when the bag runs short."""
+        sampler = ChanceSampler(num_samples=2)
+        state = AzulState(2)
+        state.bag_used = state.bag[6:]
+        state.bag = state.bag[:6]
+
+        for deal in sampler.sample_deals(state):
+            assert deal.refilled
+            dealt = sampler.start_round(state, deal)
+            assert dealt.bag_used == []
+            assert _bag_and_factories(dealt) == Counter(state.bag + state.bag_used)
+
+    def test_next_round_states(self):
+        """Test that the round is scored and each sample starts a fresh round."""
+        sampler = ChanceSampler(num_samples=3)
+        state = _last_tiles_state()
+        state.agents[0].lines_number[0] = 1
+        state.agents[0].lines_tile[0] = Tile.BLUE
+
+        scored, next_rounds = sampler.next_round_states(state)
+        assert scored.agents[0].score == 1
+        assert scored.first_agent == 1
+        assert len(next_rounds) == 3
+        for dealt in next_rounds:
+            assert dealt.TilesRemaining()
+            assert _bag_and_factories(dealt) == Counter(scored.bag)
+
+
+class TestChanceNodes:
+    """Test chance nodes in alpha-beta and MCTS."""
+
+    def test_search_averages_sampled_deals(self):
+        """Test that a move ending the round is valued over the sampled next rounds."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False, chance_samples=3)
+        state = _last_tiles_state()
+
+        result = search.search(state, 0, max_depth=2)
+        assert result.best_move is not None
+
+        child = search._apply_move(state, result.best_move, 0)
+        _, next_rounds = search.chance_sampler.next_round_states(child)
+        expected = sum(search.evaluator.evaluate_position(dealt, 0) for dealt in next_rounds) / len(next_rounds)
+        assert result.best_score == pytest.approx(expected)
+        assert search.get_search_stats()['chance_cache']['hits'] > 0
+
+    def test_maxn_chance_nodes(self):
+        """Test chance nodes under max-n search."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, multiplayer_mode='maxn', chance_samples=2)
+        result = search.search(_last_tiles_state(3), 0, max_depth=2)
+        assert result.best_move is not None
+        assert result.depth_reached == 2
+
+    def test_mcts_visits_deals_evenly(self):
+        """Test that MCTS expands a round boundary into equally visited deals."""
+        mcts = AzulMCTS(max_time=30.0, max_rollouts=40, chance_samples=4)
+        state = _last_tiles_state()
+        result = mcts.search(state, 0)
+        assert result.best_move is not None
+
+        root = MCTSNode(state=state, agent_id=0)
+        for _ in range(40):
+            mcts._backpropagate(mcts._select_and_expand(root), 0.0)
+        chance_nodes = [child for child in root.children if child.chance]
+        assert chance_nodes
+        for node in chance_nodes:
+            visits = [child.visits for child in node.children]
+            assert len(visits) == 4
+            assert max(visits) - min(visits) <= 1
+        assert mcts.get_search_stats()['chance_cache']['size'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
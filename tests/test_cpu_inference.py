@@ -0,0 +1,138 @@
+"""
+Tests for the CPU inference backends, model export and thread configuration.
+"""
+
+import pytest
+import torch
+
+from core.azul_model import AzulState
+from neural.batch_evaluator import BatchConfig, create_batch_evaluator
+from neural.cpu_inference import (
+    CPU_BACKENDS, benchmark_cpu_inference, build_cpu_backend, configure_cpu_threads,
+    export_onnx, export_torchscript, load_torchscript
+)
+from neural.inference_server import InferenceServerConfig, NeuralInferenceServer
+
+
+@pytest.fixture
+def net(azul_net):
+    model, encoder = azul_net
+    states = [AzulState(2) for _ in range(6)] + [AzulState(3), AzulState(4)]
+    return model, encoder, states
+
+
+class TestCPUBackends:
+    """Test that every backend computes AzulNet's outputs."""
+
+    def test_backends_match_fp32(self, net):
+        """Test that TorchScript is exact and int8 stays close, for 2-D and 3-D batches."""
+        model, encoder, states = net
+        inputs = encoder.encode_batch(states, 0)
+        with torch.no_grad():
+            reference_logits, reference_values = model(inputs)
+
+            for backend in CPU_BACKENDS:
+                module = build_cpu_backend(model, backend)
+                logits, values = module(inputs)
+                tolerance = 0.05 if backend == "int8" else 1e-5
+                assert torch.allclose(values, reference_values, atol=tolerance)
+                assert torch.allclose(torch.softmax(logits, -1), torch.softmax(reference_logits, -1), atol=tolerance)
+
+                batched_logits, _ = module(inputs.unsqueeze(1))
+                assert batched_logits.shape == (len(states), 1, model.config.num_actions)
+
+    def test_int8_quantizes_linear_layers(self, net):
+        """Test that the int8 backend leaves the reference model in fp32."""
+        model, _, _ = net
+        build_cpu_backend(model, "int8")
+        assert all(layer.weight.dtype == torch.float32 for layer in model.shared_layers)
+        with pytest.raises(ValueError):
+            build_cpu_backend(model, "fp16")
+
+    def test_eager_backend_leaves_model_in_place(self, net):
+        """Test that eager serving uses a CPU model as is and copies one on another device."""
+        model, _, _ = net
+        assert build_cpu_backend(model, "eager") is model
+        if torch.cuda.is_available():
+            model.cuda()
+            eager = build_cpu_backend(model, "eager")
+            assert eager is not model
+            assert next(eager.parameters()).device.type == "cpu"
+            assert next(model.parameters()).device.type == "cuda"
+
+    def test_torchscript_round_trip(self, net, tmp_path):
+        """Test that an exported artefact loads back with the same outputs."""
+        model, encoder, states = net
+        inputs = encoder.encode_batch(states, 0)
+        for quantize in (False, True):
+            path = export_torchscript(model, str(tmp_path / f"model_{quantize}.pt"), quantize=quantize)
+            with torch.no_grad():
+                expected = build_cpu_backend(model, "int8" if quantize else "torchscript")(inputs)
+                loaded = load_torchscript(path)(inputs)
+            assert torch.allclose(loaded[0], expected[0])
+            assert torch.allclose(loaded[1], expected[1])
+
+    def test_onnx_export(self, net, tmp_path):
+        """Test that ONNX export writes a model with a dynamic batch dimension."""
+        onnx = pytest.importorskip("onnx")
+        model, _, _ = net
+        path = export_onnx(model, str(tmp_path / "model.onnx"))
+        graph = onnx.load(path).graph
+        assert graph.input[0].type.tensor_type.shape.dim[0].dim_param == 'batch'
+
+    def test_thread_configuration(self):
+        """Test that explicit thread counts are applied."""
+        threads = configure_cpu_threads(num_threads=1)
+        assert threads['num_threads'] == 1
+        assert torch.get_num_threads() == 1
+        assert configure_cpu_threads()['num_threads'] >= 1
+
+    def test_benchmark_reports_throughput_and_accuracy(self, net):
+        """Test that the benchmark covers each backend and batch size."""
+        model, encoder, states = net
+        torch.set_num_threads(2)
+        results = benchmark_cpu_inference(model, encoder, states, batch_sizes=[1, 16], repeats=2)
+        # The benchmark's thread configuration does not leak into the process
+        assert torch.get_num_threads() == 2
+        assert set(results['backends']) == set(CPU_BACKENDS)
+        for backend, stats in results['backends'].items():
+            assert set(stats['states_per_second']) == {1, 16}
+            assert all(rate > 0 for rate in stats['states_per_second'].values())
+        assert results['backends']['eager']['max_value_delta'] == 0.0
+        assert results['backends']['int8']['max_value_delta'] < 0.05
+
+
+class TestCPUBackendSelection:
+    """Test choosing a CPU backend where models are served."""
+
+    def test_batch_evaluator_backend(self, net):
+        """Test that create_batch_evaluator serves through the chosen backend."""
+        model, encoder, states = net
+        config = BatchConfig(auto_device_selection=False, preferred_device="cpu", tune_cpu_threads=True)
+        eager = create_batch_evaluator(model, encoder, config)
+        quantized = create_batch_evaluator(model, encoder, config, cpu_backend="int8")
+
+        assert isinstance(quantized.model, torch.jit.ScriptModule)
+        assert config.cpu_backend == "eager"
+        expected = eager.evaluate_batch(states, [0] * len(states))
+        values = quantized.evaluate_batch(states, [0] * len(states))
+        assert values == pytest.approx(expected, abs=0.05)
+        assert len(quantized.get_policy_batch(states, [0] * len(states))) == len(states)
+
+    def test_inference_server_backend(self, net):
+        """Test that the inference server can run the int8 backend."""
+        model, encoder, states = net
+        server = NeuralInferenceServer(InferenceServerConfig(cpu_backend="int8"), model=model, encoder=encoder)
+        server.start()
+        try:
+            values = server.evaluate_batch(states, [0] * len(states))
+        finally:
+            server.stop()
+        with torch.no_grad():
+            _, expected = model(encoder.encode_batch(states, 0))
+        assert values == pytest.approx(expected.reshape(-1).tolist(), abs=0.05)
+        assert server.get_stats()['cpu_backend'] == "int8"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
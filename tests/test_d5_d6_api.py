@@ -193,6 +193,47 @@ class TestD5ReplayAnnotatorAPI:
         assert data['success'] is False
         assert 'error' in data
     
+    @patch('api.routes.game.score_move_internal', return_value=2.0)
+    @patch('api.routes.game.analyze_position_internal')
+    def test_analyze_game_scores_unlisted_move(self, mock_analyze, mock_score, client, auth_headers):
+        """Test that a played move missing from move_scores is searched, not given the best score."""
+        mock_analyze.return_value = {'best_score': 10.0, 'move_scores': {'1_0_0_1_0': 10.0}}
+        move = {"source_id": 0, "tile_type": "blue", "pattern_line_dest": 4,
+                "num_to_pattern_line": 1, "num_to_floor_line": 0}
+        game_data = {"moves": [{"player": 0, "move": move, "position_before": "initial"}]}
+        
+        response = client.post('/api/v1/analyze_game', headers=auth_headers,
+                               json={"game_data": game_data, "analysis_depth": 2})
+        
+        assert response.status_code == 200
+        result = json.loads(response.data)['analysis_results'][0]
+        mock_score.assert_called_once_with("initial", 0, "0_0_4_1_0", 2)
+        assert result['blunder_severity'] == 8.0
+        assert result['is_blunder'] is True
+    
+    def test_score_move_internal_matches_full_search(self):
+        """Test that one move searched alone scores as in the full multi-PV search."""
+        from api.routes.game import analyze_position_internal, score_move_internal
+        
+        analysis = analyze_position_internal("initial", 0, 1)
+        key, score = min(analysis['move_scores'].items(), key=lambda item: item[1])
+        
+        assert score_move_internal("initial", 0, key, 1) == score
+        assert score_move_internal("initial", 0, "9_0_0_1_0", 1) is None
+    
+    def test_move_score_key(self):
+        """Test that move dicts with tile names key like the FastMoves they describe."""
+        from api.routes.game import move_score_key
+        from analysis_engine.mathematical_optimization.azul_move_generator import FastMove
+        
+        move = FastMove(1, 2, 3, -1, 0, 2)
+        assert move_score_key(move) == "2_3_-1_0_2"
+        assert move_score_key({"source_id": 2, "tile_type": "black", "pattern_line_dest": -1,
+                               "num_to_pattern_line": 0, "num_to_floor_line": 2}) == "2_3_-1_0_2"
+        assert move_score_key({"source_id": "2", "tile_type": "3", "pattern_line_dest": "-1",
+                               "num_to_pattern_line": 0, "num_to_floor_line": 2}) == "2_3_-1_0_2"
+        assert move_score_key("2_3_-1_0_2") == "2_3_-1_0_2"
+    
     def test_get_game_analysis_success(self, client, auth_headers):
         """Test retrieving stored game analysis."""
         # First upload a game log
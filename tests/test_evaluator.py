@@ -12,9 +12,9 @@ This module tests the heuristic evaluation functionality including:
 import pytest
 import time
 import numpy as np
-from analysis_engine.mathematical_optimization.azul_evaluator import AzulEvaluator
-from core.azul_model import AzulState
-from analysis_engine.mathematical_optimization.azul_move_generator import AzulMoveGenerator, Move
+from analysis_engine.mathematical_optimization.azul_evaluator import AzulEvaluator, EvaluationBatch, EvaluationCache
+from core.azul_model import AzulState, AzulGameRule
+from analysis_engine.mathematical_optimization.azul_move_generator import AzulMoveGenerator, Move, FastMoveGenerator
 from core import azul_utils as utils
 
 
@@ -263,6 +263,173 @@ class TestAzulEvaluator:
         assert score0 == score1
 
 
+class TestBatchEvaluation:
+    """Test that batch evaluation matches the scalar path exactly."""
+    
+    @pytest.fixture
+    def evaluator(self):
+        return AzulEvaluator()
+    
+    @pytest.fixture
+    def random_states(self):
+        """Boards with random pattern lines, floors and walls for every agent."""
+        rng = np.random.default_rng(0)
+        states = []
+        for i in range(60):
+            state = AzulState(2 + i % 3)
+            for agent in state.agents:
+                for line in range(5):
+                    agent.lines_number[line] = int(rng.integers(0, line + 2))
+                agent.floor_tiles = [utils.Tile.RED] * int(rng.integers(0, 10))
+                agent.grid_state = (rng.random((5, 5)) < rng.random()).astype(int)
+                for tile in utils.Tile:
+                    agent.number_of[tile] = int(rng.integers(0, 6))
+            states.append(state)
+        return states
+    
+    def test_matches_scalar_evaluation(self, evaluator, random_states):
+        """Test identical scores for every agent of every state."""
+        states = [state for state in random_states for _ in state.agents]
+        agent_ids = [agent_id for state in random_states for agent_id in range(len(state.agents))]
+        
+        scores = evaluator.evaluate_positions(states, agent_ids)
+        expected = [evaluator.evaluate_position(state, agent_id) for state, agent_id in zip(states, agent_ids)]
+        assert scores.tolist() == expected
+    
+    def test_batch_arrays_and_single_agent(self, evaluator, random_states):
+        """Test gathering features once and evaluating one agent for all states."""
+        batch = EvaluationBatch.from_states(random_states, 1)
+        assert len(batch) == len(random_states)
+        assert evaluator.evaluate_positions(batch).tolist() == \
+            [evaluator.evaluate_position(state, 1) for state in random_states]
+        assert evaluator.evaluate_positions([]).shape == (0,)
+        
+        with pytest.raises(ValueError):
+            evaluator.evaluate_positions(random_states, [0])
+    
+    def test_move_scores_match_evaluate_move(self, evaluator, random_states):
+        """Test that the vectorized move scores equal evaluate_move."""
+        generator = FastMoveGenerator()
+        for state in random_states[:10]:
+            for line in range(5):
+                state.agents[0].lines_number[line] = 0
+            moves = generator.generate_moves_fast(state, 0)
+            assert evaluator.get_move_scores(state, 0, moves) == \
+                [evaluator.evaluate_move(state, 0, move) for move in moves]
+
+
+class TestIncrementalEvaluation:
+    """Test evaluation terms updated move by move."""
+    
+    def test_terms_follow_a_game(self):
+        """Test that terms advanced along random moves give the full evaluation."""
+        evaluator = AzulEvaluator(check_incremental=True)
+        generator = FastMoveGenerator()
+        game_rule = AzulGameRule(3)
+        rng = np.random.default_rng(1)
+        state = AzulState(3)
+        evaluator.attach_terms(state)
+        
+        agent = 0
+        while state.TilesRemaining():
+            moves = generator.generate_moves_fast(state, agent)
+            move = moves[int(rng.integers(len(moves)))]
+            child = state.clone()
+            game_rule.generateSuccessor(child, move.to_tuple(), agent)
+            evaluator.advance_terms(state, child, agent, move.pattern_line_dest)
+            for agent_id in range(3):
+                assert evaluator.evaluate_incremental(child, agent_id) == evaluator.evaluate_position(child, agent_id)
+            state, agent = child, (agent + 1) % 3
+        
+        stats = evaluator.get_incremental_stats()
+        assert stats['full_term_computations'] == 3
+        assert stats['term_updates'] > 0
+    
+    def test_check_mode_catches_stale_terms(self):
+        """Test that the consistency check reports terms out of step with the board."""
+        state = AzulState(2)
+        AzulEvaluator().attach_terms(state)
+        state.agents[0].floor_tiles = [utils.Tile.RED] * 3
+        
+        assert AzulEvaluator().evaluate_incremental(state, 0) != AzulEvaluator().evaluate_position(state, 0)
+        with pytest.raises(RuntimeError):
+            AzulEvaluator(check_incremental=True).evaluate_incremental(state, 0)
+    
+    def test_states_without_terms_are_evaluated_in_full(self):
+        """Test the fallback for states that never had terms attached."""
+        evaluator = AzulEvaluator()
+        state = AzulState(2)
+        assert evaluator.evaluate_incremental(state, 1) == evaluator.evaluate_position(state, 1)
+        assert evaluator.get_incremental_stats()['incremental_evaluations'] == 0
+
+
+class TestEvaluationCache:
+    """Test the fixed-size evaluation cache."""
+    
+    def test_keyed_by_position_and_agent(self):
+        """Test hits for the same (key, agent) and misses for another agent."""
+        cache = EvaluationCache(max_entries=64)
+        cache.put(12345, 0, 1.5)
+        assert cache.get(12345, 0) == 1.5
+        assert cache.get(12345, 1) is None
+        
+        stats = cache.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+    
+    def test_always_replace(self):
+        """Test that a one-way bucket keeps only the newest entry."""
+        cache = EvaluationCache(max_entries=1, replacement='always')
+        cache.put(1, 0, 1.0)
+        cache.put(2, 0, 2.0)
+        assert cache.get(1, 0) is None
+        assert cache.get(2, 0) == 2.0
+        assert cache.get_stats()['size'] == 1
+    
+    def test_two_tier_protects_entries_that_were_hit(self):
+        """Test that an entry hit in the replaceable slot survives later stores."""
+        cache = EvaluationCache(max_entries=2, replacement='two_tier')
+        cache.put(1, 0, 1.0)
+        assert cache.get(1, 0) == 1.0  # Promoted to the protected slot
+        for key in range(2, 10):
+            cache.put(key, 0, float(key))
+        assert cache.get(1, 0) == 1.0
+        assert cache.get(9, 0) == 9.0
+        assert cache.get(8, 0) is None
+        assert cache.get_stats()['max_entries'] == 2
+    
+    def test_invalid_configuration(self):
+        """Test that unknown policies and empty caches are rejected."""
+        with pytest.raises(ValueError):
+            EvaluationCache(replacement='lru')
+        with pytest.raises(ValueError):
+            EvaluationCache(max_entries=0)
+    
+    def test_evaluator_uses_cache_only_with_a_key(self):
+        """Test that evaluations are cached under a given key and match uncached ones."""
+        evaluator = AzulEvaluator()
+        state = AzulState(2)
+        state.agents[0].lines_number[2] = 3
+        state.agents[0].lines_tile[2] = utils.Tile.RED
+        expected = AzulEvaluator(cache_size=0).evaluate_position(state, 0)
+        
+        assert evaluator.evaluate_position(state, 0) == expected
+        assert evaluator.get_cache_stats()['misses'] == 0
+        
+        key = state.get_zobrist_hash()
+        assert evaluator.evaluate_position(state, 0, key) == expected
+        evaluator.attach_terms(state)
+        assert evaluator.evaluate_incremental(state, 0, key) == expected
+        stats = evaluator.get_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        
+        evaluator.clear_cache()
+        assert evaluator.get_cache_stats()['size'] == 0
+        assert AzulEvaluator(cache_size=0).get_cache_stats() == {'enabled': False}
+
+
 class TestEvaluatorPerformance:
     """Test performance of the evaluator."""
     
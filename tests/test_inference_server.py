@@ -0,0 +1,159 @@
+"""
+Tests for the shared neural inference server and its micro-batching.
+"""
+
+import threading
+import time
+
+import pytest
+import torch
+
+from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS, RolloutPolicy
+from core.azul_model import AzulState
+from neural import inference_server as server_module
+from neural.azul_net import create_azul_net, load_azul_net
+from neural.inference_server import (
+    InferenceServerConfig, NeuralInferenceServer, get_inference_server, get_inference_server_stats,
+    resolve_model_path, shutdown_inference_server
+)
+
+
+@pytest.fixture
+def server(azul_net):
+    model, encoder = azul_net
+    server = NeuralInferenceServer(
+        InferenceServerConfig(max_batch_size=16, max_latency_ms=20.0), model=model, encoder=encoder
+    ).start()
+    yield server
+    server.stop()
+
+
+class TestNeuralInferenceServer:
+    """Test batching, results and statistics."""
+
+    def test_results_match_direct_forward(self, server):
+        """Test that batched results are the model's single-state outputs."""
+        states = [AzulState(2) for _ in range(5)]
+        results = server.evaluate_many(states, [0, 1, 0, 1, 0])
+
+        for state, agent_id, result in zip(states, [0, 1, 0, 1, 0], results):
+            with torch.no_grad():
+                policy, value = server.model.get_policy_and_value(server.encoder.encode_state(state, agent_id))
+            assert result.policy.shape == policy.shape
+            assert torch.allclose(result.policy, policy, atol=1e-6)
+            assert result.value == pytest.approx(value.item(), abs=1e-6)
+
+    def test_concurrent_callers_share_batches(self, server):
+        """Test that requests from several threads are served in common batches."""
+        state = AzulState(2)
+        values = []
+
+        def worker():
+            values.extend(server.evaluate_batch([state] * 4, [0] * 4))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = server.get_stats()
+        assert len(values) == 32
+        assert stats['requests'] == 32
+        assert stats['batches'] <= 8
+        assert min(int(size) for size in stats['batch_size_histogram']) >= 4
+        assert stats['queue_depth'] == 0
+        assert stats['latency_ms']['p99'] >= stats['latency_ms']['p50'] > 0
+
+    def test_lone_caller_does_not_wait_for_deadline(self, server):
+        """Test that a batch is run at once when its only caller is waiting on it."""
+        start = time.perf_counter()
+        for _ in range(20):
+            server.evaluate(AzulState(2), 0, timeout=5.0)
+        # 20 deadlines would take 400 ms
+        assert time.perf_counter() - start < 0.3
+        assert server.get_stats()['batch_size_histogram'] == {'1': 20}
+
+    def test_submitted_request_flushes_at_deadline(self, server):
+        """Test that a queued request nobody blocks on is served after max_latency_ms."""
+        future = server.submit(AzulState(2), 0)
+        assert future.result(timeout=5.0).policy.shape[0] == 1
+        assert server.get_stats()['latency_ms']['max'] >= server.config.max_latency_ms
+
+    def test_stopped_server_rejects_requests(self, server):
+        """Test that submitting after stop fails instead of hanging."""
+        server.stop()
+        with pytest.raises(RuntimeError):
+            server.submit(AzulState(2), 0)
+
+    def test_neural_mcts_uses_server(self, server, monkeypatch):
+        """Test that neural MCTS sends rollouts and leaf batches through the server."""
+        # The server's model is placed and warmed up once; searches must not move it
+        monkeypatch.setattr(server.model, 'to', lambda *args, **kwargs: pytest.fail("model moved"))
+        for leaf_batch_size in (1, 4):
+            mcts = AzulMCTS(rollout_policy=RolloutPolicy.NEURAL, max_time=30.0, max_rollouts=8,
+                            leaf_batch_size=leaf_batch_size, inference_server=server)
+            result = mcts.search(AzulState(2), 0)
+            assert result.best_move is not None
+            assert mcts._rollout_policy_instance.model is server.model
+        assert server.get_stats()['requests'] >= 8
+
+
+class TestModelRegistry:
+    """Test model resolution and the process-wide server."""
+
+    def test_resolve_and_load_model(self, tmp_path, monkeypatch):
+        """Test that the environment path wins and saved weights load back."""
+        model, encoder = create_azul_net()
+        path = str(tmp_path / "model.pth")
+        torch.save({'model_state_dict': model.state_dict(), 'encoder_config': encoder.config}, path)
+
+        monkeypatch.setenv(server_module.MODEL_PATH_ENV, path)
+        assert resolve_model_path() == path
+        assert resolve_model_path("other.pth") == "other.pth"
+
+        loaded, _ = load_azul_net(path)
+        for name, tensor in model.state_dict().items():
+            assert torch.equal(loaded.state_dict()[name], tensor)
+
+        monkeypatch.delenv(server_module.MODEL_PATH_ENV)
+        monkeypatch.setattr(server_module, 'MODEL_REGISTRY_DIR', str(tmp_path / "empty"))
+        assert resolve_model_path() is None
+
+    def test_process_wide_server(self, tmp_path, monkeypatch):
+        """Test that every caller gets the same loaded server until shutdown."""
+        model, encoder = create_azul_net()
+        path = str(tmp_path / "model.pth")
+        torch.save({'model_state_dict': model.state_dict(), 'encoder_config': encoder.config}, path)
+        monkeypatch.setenv(server_module.MODEL_PATH_ENV, path)
+
+        shutdown_inference_server()
+        assert get_inference_server_stats() == {'running': False}
+        try:
+            server = get_inference_server()
+            assert get_inference_server() is server
+            assert server.model_path == path
+            assert get_inference_server_stats()['running']
+        finally:
+            shutdown_inference_server()
+        assert not server.running
+
+    def test_server_config_from_app(self):
+        """Test that the app config sets up the shared server used by /analyze_neural."""
+        from api.app import create_test_app
+        from api.routes.core import inference_server_config
+
+        app = create_test_app()
+        app.config.update(NEURAL_DEVICE="cuda", NEURAL_CPU_BACKEND="int8", NEURAL_CACHE_BYTES=1 << 20)
+        try:
+            with app.app_context():
+                config = inference_server_config()
+            assert (config.device, config.cpu_backend, config.cache_bytes) == ("cuda", "int8", 1 << 20)
+            assert config.max_batch_size == InferenceServerConfig().max_batch_size
+        finally:
+            app.ponder_service.shutdown()
+            app.cleanup()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,129 @@
+"""
+Tests for CPU inference benchmarking and autotuning.
+"""
+
+import json
+import sqlite3
+
+import pytest
+import torch
+
+from core.azul_model import AzulState
+from neural.azul_net import AzulNetConfig
+from neural.batch_evaluator import BatchConfig, BatchNeuralEvaluator
+from neural.inference_tuning import (
+    autotune_cpu_inference, benchmark_inference, host_key, load_benchmark_positions,
+    load_tuned_config, model_size_name, save_tuned_config, select_best_config
+)
+
+FEN = ("BBBB|BYYY|YYRR|BBBY|BBBB/-/-----|-----|-----|-----|-----/-|--|---|----|-----/-/"
+       "-----|-----|-----|-----|-----/-|--|---|----|-----/-/0,0/1/0")
+
+
+@pytest.fixture(autouse=True)
+def restore_threads():
+    threads = torch.get_num_threads()
+    yield
+    torch.set_num_threads(threads)
+
+
+def _cpu_config(**overrides) -> BatchConfig:
+    return BatchConfig(auto_device_selection=False, preferred_device="cpu", **overrides)
+
+
+class TestBenchmarkPositions:
+    """Test drawing benchmark positions from the databases."""
+
+    def test_database_positions_come_first(self, tmp_path):
+        """Test that stored FENs are used, deduplicated, and topped up with random games."""
+        path = str(tmp_path / "positions.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE move_quality_data (id INTEGER PRIMARY KEY, position_fen TEXT)")
+        conn.executemany("INSERT INTO move_quality_data (position_fen) VALUES (?)", [(FEN,), (FEN,), (None,)])
+        conn.commit()
+        conn.close()
+
+        states = load_benchmark_positions(10, paths=[path, str(tmp_path / "missing.db")])
+        assert len(states) == 10
+        assert states[0].to_fen() == AzulState.from_fen(FEN).to_fen()
+        # The rest are successive positions of random games
+        assert len({state.to_fen() for state in states[1:]}) == 9
+
+        assert [s.to_fen() for s in load_benchmark_positions(5, paths=[], seed=3)] == \
+            [s.to_fen() for s in load_benchmark_positions(5, paths=[], seed=3)]
+
+
+class TestInferenceTuning:
+    """Test benchmarking, selection and the tuning file."""
+
+    @pytest.mark.parametrize('azul_net', ['small'], indirect=True)
+    def test_benchmark_and_select(self, azul_net):
+        """Test that every configuration is timed by stage and the fastest is chosen."""
+        model, encoder = azul_net
+        states = load_benchmark_positions(16, paths=[])
+        results = benchmark_inference(model, encoder, states, batch_sizes=[1, 8], thread_counts=[1], repeats=3)
+
+        assert results['model_size'] == 'small' and results['host'] == host_key()
+        assert [(c['batch_size'], c['num_threads']) for c in results['configurations']] == [(1, 1), (8, 1)]
+        for c in results['configurations']:
+            assert c['states_per_second'] > 0
+            assert c['latency_p50_ms'] >= c['forward_ms'] > 0
+            assert c['encode_ms'] > 0 and c['decode_ms'] > 0
+
+        fast = {'batch_size': 64, 'num_threads': 1, 'states_per_second': 900.0, 'latency_p95_ms': 50.0}
+        slow = {'batch_size': 1, 'num_threads': 1, 'states_per_second': 100.0, 'latency_p95_ms': 1.0}
+        assert select_best_config({'configurations': [slow, fast]}) is fast
+        assert select_best_config({'configurations': [slow, fast]}, max_latency_ms=10.0) is slow
+        assert select_best_config({'configurations': [fast]}, max_latency_ms=10.0) is fast
+
+    def test_tuning_file_per_host_and_size(self, tmp_path):
+        """Test that entries of other hosts, sizes and backends are kept."""
+        path = str(tmp_path / "tuning.json")
+        save_tuned_config({'batch_size': 8, 'num_threads': 2}, 'small', path=path, host='a')
+        save_tuned_config({'batch_size': 32, 'num_threads': 4}, 'large', path=path, host='a')
+        save_tuned_config({'batch_size': 16, 'num_threads': 1}, 'small', backend='int8', path=path, host='b')
+
+        assert load_tuned_config('small', path=path, host='a')['batch_size'] == 8
+        assert load_tuned_config('large', path=path, host='a')['num_threads'] == 4
+        assert load_tuned_config('small', 'int8', path=path, host='b')['batch_size'] == 16
+        assert load_tuned_config('small', path=path, host='b') is None
+        assert load_tuned_config('medium', path=path, host='a') is None
+
+        with open(path, 'w') as f:
+            f.write("not json")
+        assert load_tuned_config('small', path=path, host='a') is None
+
+    def test_model_size_name(self):
+        """Test that training sizes are named and other shapes described."""
+        assert model_size_name(AzulNetConfig()) == 'medium'
+        assert model_size_name(AzulNetConfig(hidden_size=256, num_layers=4)) == 'large'
+        assert model_size_name(AzulNetConfig(hidden_size=32, num_layers=1)) == 'h32_l1'
+
+    @pytest.mark.parametrize('azul_net', ['small'], indirect=True)
+    def test_evaluator_loads_tuned_config(self, azul_net, tmp_path):
+        """Test that the batch evaluator starts with the autotuned batch size and threads."""
+        model, encoder = azul_net
+        path = str(tmp_path / "tuning.json")
+
+        untuned = BatchNeuralEvaluator(model, encoder, _cpu_config(tuning_path=path))
+        assert untuned.tuned_config is None and untuned._optimal_batch_size == 16
+
+        results = autotune_cpu_inference(model, encoder, load_benchmark_positions(8, paths=[]), path=path,
+                                         batch_sizes=[2, 4], thread_counts=[1], repeats=2)
+        with open(path) as f:
+            assert json.load(f)['hosts'][host_key()]['small']['eager']['batch_size'] == results['best']['batch_size']
+
+        torch.set_num_threads(2)
+        tuned = BatchNeuralEvaluator(model, encoder, _cpu_config(tuning_path=path))
+        assert tuned._optimal_batch_size == results['best']['batch_size']
+        assert torch.get_num_threads() == 1
+        tuned.evaluate_batch([AzulState(2)], [0])
+        assert tuned.get_performance_stats()['tuned']
+
+        # Another backend has no entry yet
+        other = BatchNeuralEvaluator(model, encoder, _cpu_config(tuning_path=path, cpu_backend="torchscript"))
+        assert other.tuned_config is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
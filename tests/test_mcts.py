@@ -5,11 +5,12 @@ Tests for the MCTS (Monte Carlo Tree Search) module.
 import pytest
 import time
 import math
+import random
 from unittest.mock import Mock, patch
 
 from analysis_engine.mathematical_optimization.azul_mcts import (
     AzulMCTS, MCTSNode, MCTSResult, RolloutPolicy,
-    RandomRolloutPolicy, HeavyRolloutPolicy
+    RandomRolloutPolicy, HeavyRolloutPolicy, NEURAL_AVAILABLE
 )
 from core.azul_model import AzulState
 from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator, FastMove
@@ -161,6 +162,7 @@ class TestAzulMCTS:
         assert 'search_time' in stats
         assert 'rollouts_per_second' in stats
         assert stats['rollout_count'] <= 10
+        assert 'eval_cache' not in stats  # MCTS leaves are not keyed, so there is no cache to report
         assert stats['search_time'] <= 0.1
     
     def test_mcts_performance_target(self):
@@ -325,6 +327,18 @@ class TestMCTSPerformance:
         # Should achieve reasonable rollouts per second
         assert stats['rollouts_per_second'] > 0
     
+    def test_mcts_rollout_depth_reported(self):
+        """Test that rollouts play real moves and their depth is reported."""
+        mcts = AzulMCTS(max_time=1.0, max_rollouts=20)
+        state = AzulState(2)
+        
+        result = mcts.search(state, 0)
+        stats = mcts.get_search_stats()
+        
+        assert result.average_rollout_depth > 0
+        assert result.rollouts_per_second > 0
+        assert stats['average_rollout_depth'] == result.average_rollout_depth
+    
     def test_mcts_memory_efficiency(self):
         """Test memory efficiency."""
         mcts = AzulMCTS(max_time=0.1, max_rollouts=20)
@@ -336,6 +350,187 @@ class TestMCTSPerformance:
             assert result is not None
 
 
+class TestMCTSRaveAndWidening:
+    """Test RAVE/AMAF statistics and progressive widening."""
+    
+    def test_widening_limit_grows_with_visits(self):
+        """Test the progressive widening schedule."""
+        mcts = AzulMCTS(progressive_widening=True, widening_constant=2.0, widening_exponent=0.5)
+        
+        assert mcts._widening_limit(0) == 1
+        assert mcts._widening_limit(1) == 2
+        assert mcts._widening_limit(16) == 8
+        assert mcts._widening_limit(100) == 20
+    
+    def test_widening_expands_best_ranked_move_first(self):
+        """Test that the first child is the evaluator's top-ranked move."""
+        mcts = AzulMCTS(progressive_widening=True)
+        state = AzulState(2)
+        root = MCTSNode(state=state, agent_id=0)
+        
+        child = mcts._expand(root)
+        moves = mcts._get_moves(state, 0)
+        best_index = mcts.evaluator.get_best_move(state, 0, moves)
+        
+        assert child.move == moves[best_index]
+        assert len(root.untried_moves) == len(moves) - 1
+    
+    def test_widening_bounds_root_children(self):
+        """Test that a widened root does not expand every legal move."""
+        mcts = AzulMCTS(max_time=5.0, max_rollouts=50, progressive_widening=True)
+        state = AzulState(2)
+        root = MCTSNode(state=state, agent_id=0)
+        
+        for _ in range(50):
+            node = mcts._select_and_expand(root)
+            mcts._backpropagate(node, mcts._rollout_policy_instance.rollout(node.state, node.agent_id))
+        
+        assert len(root.children) <= mcts._widening_limit(root.visits)
+        assert len(root.children) < len(mcts._get_moves(state, 0))
+    
+    def test_rave_records_amaf_statistics(self):
+        """Test that playout moves update AMAF statistics of their agent's nodes."""
+        mcts = AzulMCTS(use_rave=True)
+        state = AzulState(2)
+        root = MCTSNode(state=state, agent_id=0)
+        child = mcts._expand(root)
+        
+        playout = [(0, 123), (1, 456), (0, 123)]
+        mcts._backpropagate(child, 2.0, playout, perspective=0)
+        
+        # child.move was played by the root agent and counts once
+        assert root.amaf_visits[child.move.bit_mask] == 1
+        assert root.amaf_visits[123] == 1
+        assert root.amaf_score[123] == 2.0
+        assert 456 not in root.amaf_visits
+        # Agent 1's moves below child score for agent 1
+        assert child.amaf_visits == {456: 1}
+        assert child.amaf_score == {456: -2.0}
+        assert child.total_score == 2.0
+    
+    def test_rave_blends_amaf_value(self):
+        """Test that AMAF values change the UCT value of a child."""
+        mcts = AzulMCTS(use_rave=True)
+        state = AzulState(2)
+        root = MCTSNode(state=state, agent_id=0)
+        child = mcts._expand(root)
+        child.visits = 1
+        child.total_score = 0.0
+        root.visits = 10
+        
+        plain = mcts._calculate_uct(child, root.visits)
+        root.amaf_visits[child.move.bit_mask] = 10
+        root.amaf_score[child.move.bit_mask] = 50.0
+        
+        assert mcts._calculate_uct(child, root.visits) > plain
+    
+    def test_rave_search_uses_rollout_moves(self):
+        """Test a full RAVE + widening search."""
+        mcts = AzulMCTS(max_time=5.0, max_rollouts=30, use_rave=True, progressive_widening=True)
+        result = mcts.search(AzulState(2), 0)
+        
+        assert mcts._rollout_simulator.record_moves
+        assert result.rollout_count == 30
+        assert isinstance(result.best_move, FastMove)
+        assert mcts.get_search_stats()['rave_enabled']
+
+    
+    def test_progress_callback_and_stop(self):
+        """Test periodic progress snapshots and early stopping."""
+        mcts = AzulMCTS(max_time=5.0, max_rollouts=40)
+        snapshots = []
+        result = mcts.search(AzulState(2), 0, progress=lambda partial: snapshots.append(partial) or True,
+                             progress_interval=10)
+        
+        assert [snapshot.rollout_count for snapshot in snapshots] == [10, 20, 30]
+        assert result.rollout_count == 40
+        
+        result = mcts.search(AzulState(2), 0, progress=lambda partial: False, progress_interval=10)
+        assert result.rollout_count == 10
+        
+        result = mcts.search(AzulState(2), 0, progress=lambda partial: mcts.stop(), progress_interval=5)
+        assert result.rollout_count == 5
+
+@pytest.mark.skipif(not NEURAL_AVAILABLE, reason="PyTorch not available")
+class TestMCTSLeafBatching:
+    """Test batched neural leaf evaluation."""
+    
+    def test_invalid_leaf_batch_size(self):
+        """Test that a non-positive batch size is rejected."""
+        with pytest.raises(ValueError):
+            AzulMCTS(leaf_batch_size=0)
+    
+    def test_virtual_loss_lowers_uct(self):
+        """Test that pending evaluations make a node less attractive."""
+        mcts = AzulMCTS()
+        node = MCTSNode(state=AzulState(2))
+        node.visits = 5
+        node.total_score = 25.0
+        
+        uct_before = mcts._calculate_uct(node, 10)
+        node.virtual_loss = 2
+        uct_after = mcts._calculate_uct(node, 10)
+        
+        assert uct_after < uct_before
+    
+    def test_batched_search_uses_one_pass_per_batch(self):
+        """Test that leaves are evaluated together and virtual loss is cleared."""
+        mcts = AzulMCTS(max_time=5.0, max_rollouts=16,
+                        rollout_policy=RolloutPolicy.NEURAL, leaf_batch_size=4)
+        state = AzulState(2)
+        
+        with patch.object(mcts._batch_evaluator, 'evaluate_batch',
+                          wraps=mcts._batch_evaluator.evaluate_batch) as evaluate_batch:
+            result = mcts.search(state, 0)
+        
+        assert result.rollout_count == 16
+        assert evaluate_batch.call_count == 4
+        assert all(len(call.args[0]) == 4 for call in evaluate_batch.call_args_list)
+        assert isinstance(result.best_move, FastMove)
+        
+        stats = mcts.get_search_stats()
+        assert stats['leaf_batches'] == 4
+        assert stats['average_leaf_batch'] == 4.0
+    
+    def test_batched_search_respects_rollout_budget(self):
+        """Test that the last batch is trimmed to the remaining budget."""
+        mcts = AzulMCTS(max_time=5.0, max_rollouts=10,
+                        rollout_policy=RolloutPolicy.NEURAL, leaf_batch_size=4)
+        result = mcts.search(AzulState(2), 0)
+        
+        assert result.rollout_count == 10
+        assert mcts.leaf_batch_count == 3
+    
+    def test_batched_and_sequential_agree(self):
+        """Test that batched and sequential leaves are valued from the same perspective."""
+        evaluator = AzulEvaluator(cache_size=0)
+        
+        def margin(state, agent_id):
+            return (evaluator.evaluate_position(state, agent_id)
+                    - evaluator.evaluate_position(state, 1 - agent_id))
+        
+        random.seed(1)
+        state = AzulState(2)
+        best_moves = []
+        for leaf_batch_size in (1, 4):
+            mcts = AzulMCTS(max_time=60.0, max_rollouts=200,
+                            rollout_policy=RolloutPolicy.NEURAL, leaf_batch_size=leaf_batch_size)
+            with patch.object(mcts._rollout_policy_instance, 'rollout',
+                              side_effect=lambda leaf, agent_id, *args: margin(leaf, agent_id)):
+                if mcts._batch_evaluator is not None:
+                    with patch.object(mcts._batch_evaluator, 'evaluate_batch',
+                                      side_effect=lambda leaves, agent_ids: list(map(margin, leaves, agent_ids))):
+                        result = mcts.search(state, 0)
+                else:
+                    result = mcts.search(state, 0)
+            best_moves.append(result.best_move)
+        
+        # The greedy move is clearly best under this evaluation
+        moves = mcts._get_moves(state, 0)
+        greedy = max(moves, key=lambda move: margin(mcts._apply_move(state, move, 0), 0))
+        assert best_moves == [greedy, greedy]
+
+
 class TestMCTSEdgeCases:
     """Test MCTS edge cases."""
     
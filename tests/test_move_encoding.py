@@ -5,13 +5,16 @@ This module tests the MoveEncoder class and related functionality
 for converting between FastMove objects and policy indices.
 """
 
+import random
 import unittest
 import torch
 import numpy as np
 from typing import List
 
-from neural.move_encoding import MoveEncoder, MoveEncodingConfig, create_move_encoder
-from analysis_engine.mathematical_optimization.azul_move_generator import FastMove
+from neural.move_encoding import (
+    MoveEncoder, MoveEncodingConfig, create_move_encoder, masked_softmax, pack_moves, select_policy_indices
+)
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove, FastMoveGenerator
 from core.azul_utils import Action, Tile
 from core.azul_model import AzulState
 
@@ -286,6 +289,87 @@ class TestMoveEncoding(unittest.TestCase):
             self.assertIsNone(decoded_move)
 
 
+class TestBatchMoveSelection(unittest.TestCase):
+    """Test cases for vectorized masking and batch move selection."""
+    
+    def setUp(self):
+        """Set up legal moves of a few positions."""
+        self.encoder = create_move_encoder()
+        self.policy_size = self.encoder.get_move_space_size()
+        generator = FastMoveGenerator()
+        self.legal_moves_list = []
+        for seed in range(4):
+            random.seed(seed)  # AzulState shuffles the bag with random
+            state = AzulState(2)
+            self.legal_moves_list.append(generator.generate_moves_fast(state, seed % 2))
+        self.legal_moves_list.append([])
+    
+    def test_packed_encoding_matches_encode_move(self):
+        """Test that packed moves get the indices encode_move gives."""
+        moves = [move for moves in self.legal_moves_list for move in moves]
+        indices = self.encoder.encode_packed_moves(pack_moves(moves))
+        self.assertEqual(indices.tolist(), [self.encoder.encode_move(move) for move in moves])
+        
+        invalid = FastMove(Action.TAKE_FROM_FACTORY, 0, Tile.BLUE, 0, 0, 0)
+        self.assertEqual(self.encoder.encode_packed_moves(pack_moves([invalid])).tolist(), [-1])
+        self.assertEqual(self.encoder.get_legal_move_indices([invalid]), [])
+        # Objects that are not FastMoves never get an index
+        self.assertEqual(self.encoder.encode_packed_moves(pack_moves([object(), moves[0]])).tolist(),
+                         [-1, indices[0]])
+    
+    def test_batch_mask_matches_single_masks(self):
+        """Test that batch masks equal per-position masks and map back to the moves."""
+        packed = [pack_moves(moves) for moves in self.legal_moves_list]
+        mask, move_index = self.encoder.create_policy_mask_batch(packed, self.policy_size)
+        self.assertEqual(mask.shape, (len(packed), self.policy_size))
+        
+        for row, moves in enumerate(self.legal_moves_list):
+            expected = self.encoder.create_policy_mask(moves, self.policy_size)
+            self.assertTrue(torch.equal(mask[row], expected))
+            self.assertTrue(torch.all(move_index[row][~mask[row]] == -1))
+            for column in torch.nonzero(mask[row]).flatten().tolist():
+                self.assertEqual(self.encoder.encode_move(moves[move_index[row, column]]), column)
+        self.assertFalse(mask[-1].any())
+    
+    def test_reused_buffer(self):
+        """Test that reuse_buffer writes into the same storage and resets it."""
+        packed = [pack_moves(moves) for moves in self.legal_moves_list]
+        first, _ = self.encoder.create_policy_mask_batch(packed, self.policy_size, reuse_buffer=True)
+        pointer = first.data_ptr()
+        second, _ = self.encoder.create_policy_mask_batch(packed[-1:], self.policy_size, reuse_buffer=True)
+        self.assertEqual(second.data_ptr(), pointer)
+        self.assertFalse(second.any())
+    
+    def test_greedy_selection(self):
+        """Test that temperature 0 selects the legal move with the highest logit."""
+        torch.manual_seed(0)
+        logits = torch.randn(len(self.legal_moves_list), self.policy_size)
+        selected = self.encoder.select_moves_batch(logits, self.legal_moves_list)
+        
+        for row, moves in enumerate(self.legal_moves_list[:-1]):
+            best = max(moves, key=lambda move: logits[row, self.encoder.encode_move(move)].item())
+            self.assertEqual(selected[row], best)
+        self.assertIsNone(selected[-1])
+    
+    def test_sampling_follows_masked_softmax(self):
+        """Test that sampled indices follow the masked softmax."""
+        torch.manual_seed(0)
+        logits = torch.randn(1, 8)
+        mask = torch.tensor([[True, True, False, True, False, False, True, False]])
+        probs = masked_softmax(logits, mask, temperature=0.5)
+        self.assertAlmostEqual(probs.sum().item(), 1.0, places=5)
+        self.assertTrue(torch.all(probs[~mask] == 0))
+        
+        generator = torch.Generator().manual_seed(1)
+        draws = select_policy_indices(logits.expand(20000, 8), mask.expand(20000, 8), 0.5, generator)
+        frequencies = torch.bincount(draws, minlength=8).float() / len(draws)
+        self.assertTrue(torch.allclose(frequencies, probs[0], atol=0.02))
+        
+        empty = torch.zeros(1, 8, dtype=torch.bool)
+        self.assertEqual(select_policy_indices(logits, empty, 1.0, generator).tolist(), [-1])
+        self.assertTrue(torch.all(masked_softmax(logits, empty) == 0))
+
+
 class TestMoveEncodingPerformance(unittest.TestCase):
     """Performance tests for move encoding."""
     
@@ -195,6 +195,51 @@ class TestAzulTensorEncoder:
         
         # Check that all values are finite
         assert torch.all(torch.isfinite(encoded))
+    
+    def test_encode_state_multiplayer(self):
+        """Test that every seat of a 4-player game encodes the next agent as its opponent."""
+        state = AzulState(4)
+        state.agents[0].grid_state[0, 0] = 1
+        two_player = self.encoder.encode_state(self.state, agent_id=0)
+        
+        encoded = [self.encoder.encode_state(state, agent_id=agent_id) for agent_id in range(4)]
+        assert all(tensor.shape == two_player.shape for tensor in encoded)
+        
+        # Only agent 3 sees agent 0's wall tile, as its opponent
+        assert encoded[3].sum() - encoded[1].sum() == 1
+
+    def test_encode_batch_matches_encode_state(self):
+        """Test that batch encoding gives exactly the stacked single-state features."""
+        states, agent_ids = [], []
+        for num_agents in (2, 3, 4):
+            state = AzulState(num_agents)
+            state.agents[0].grid_state[2, 3] = 1
+            state.agents[1].lines_tile[4] = Tile.RED
+            state.agents[1].lines_number[4] = 3
+            state.agents[num_agents - 1].floor_tiles = [Tile.BLUE, -1, Tile.WHITE]
+            state.agents[0].score = 12
+            state.factories[0].tiles[Tile.YELLOW] = 4
+            state.centre_pool.tiles[Tile.BLACK] = 25
+            for agent_id in range(num_agents):
+                states.append(state)
+                agent_ids.append(agent_id)
+
+        expected = torch.cat([self.encoder.encode_state(s, a) for s, a in zip(states, agent_ids)])
+        batch = self.encoder.encode_batch(states, agent_ids)
+        assert batch.shape == (len(states), self.encoder.feature_size)
+        assert batch.dtype == expected.dtype
+        assert torch.equal(batch, expected)
+
+        # The reused buffer is cleared between calls
+        assert torch.equal(self.encoder.encode_batch(states, agent_ids, reuse_buffer=True), expected)
+        reused = self.encoder.encode_batch([self.state], 0, reuse_buffer=True)
+        assert torch.equal(reused, self.encoder.encode_state(self.state, 0))
+
+    def test_encode_batch_errors(self):
+        """Test empty batches and mismatched agent ids."""
+        assert self.encoder.encode_batch([]).shape == (0, self.encoder.feature_size)
+        with pytest.raises(ValueError):
+            self.encoder.encode_batch([self.state, self.state], [0])
 
 
 class TestAzulNet:
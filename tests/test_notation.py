@@ -0,0 +1,43 @@
+"""
+Tests for parsing stored positions and moves.
+"""
+
+import json
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from analysis_engine.mathematical_optimization.azul_notation import (
+    MOVE_FIELDS, parse_stored_move, state_from_fen
+)
+from core.azul_model import AzulState
+
+
+class TestNotation:
+    """Test FEN and stored move parsing."""
+
+    def test_state_from_fen(self):
+        """Test that full FENs parse and anything else is skipped."""
+        state = AzulState(2)
+        parsed = state_from_fen(state.to_fen())
+        assert parsed is not None
+        assert parsed.to_fen() == state.to_fen()
+        assert state_from_fen("") is None
+        assert state_from_fen("not a fen") is None
+
+    def test_parse_stored_move_formats(self):
+        """Test that dicts, JSON and FastMove strings resolve to the same legal move."""
+        state = AzulState(2)
+        move = FastMoveGenerator().generate_moves_fast(state, 0)[0]
+        data = {field: int(getattr(move, field)) for field in MOVE_FIELDS}
+
+        for move_data in (data, json.dumps(data), str(move)):
+            assert parse_stored_move(state, 0, move_data) == move
+
+        assert parse_stored_move(state, 0, "{not json") is None
+        assert parse_stored_move(state, 0, {'source_id': 0}) is None
+        assert parse_stored_move(state, 0, dict(data, num_to_floor_line=9)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,186 @@
+"""
+Tests for the memory-mapped opening book and its API integration.
+"""
+
+import copy
+import json
+import math
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMove, FastMoveGenerator
+from analysis_engine.mathematical_optimization.azul_opening_book import (
+    OpeningBook, compile_opening_book, load_opening_book
+)
+from analysis_engine.strategic_analysis.azul_tablebase import canonical_move, resolve_move
+from api.app import create_test_app
+from core.azul_database import AzulDatabase
+from core.azul_model import AzulState
+
+
+def _move_data(move: FastMove) -> str:
+    return json.dumps({
+        'source_id': move.source_id,
+        'tile_type': int(move.tile_type),
+        'pattern_line_dest': move.pattern_line_dest,
+        'num_to_pattern_line': move.num_to_pattern_line,
+        'num_to_floor_line': move.num_to_floor_line
+    })
+
+
+def _build_research_db(db_path: str):
+    """Store one opening position with two continuations and one cached analysis."""
+    fen = AzulState(2).to_fen()
+    state = AzulState.from_fen(fen)
+    moves = FastMoveGenerator().generate_moves_fast(state, 0)
+    popular, rare, analysed = moves[0], moves[1], moves[2]
+
+    db = AzulDatabase(db_path)
+    with db.get_connection() as conn:
+        cursor = conn.execute("INSERT INTO position_database (fen_string) VALUES (?)", (fen,))
+        position_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO position_continuations (position_id, move_data, frequency, win_rate) VALUES (?, ?, ?, ?)",
+            [(position_id, _move_data(popular), 5, 0.6), (position_id, _move_data(rare), 1, 0.4),
+             (position_id, "not a move", 3, 0.5)]
+        )
+        conn.commit()
+
+    position_id = db.cache_position(fen, 2)
+    db.cache_analysis(position_id, 0, 'alpha_beta', {
+        'best_move': str(analysed),
+        'best_score': 4.5,
+        'search_time': 0.1,
+        'nodes_searched': 10
+    })
+    return fen, popular, rare, analysed
+
+
+class TestOpeningBook:
+    """Test compiling and probing the opening book file."""
+
+    def test_compile_and_probe(self, tmp_path):
+        """Test that stored continuations and analyses become ranked book moves."""
+        db_path = str(tmp_path / "research.db")
+        book_path = str(tmp_path / "book.bin")
+        fen, popular, rare, analysed = _build_research_db(db_path)
+
+        stats = compile_opening_book(db_path, book_path)
+        assert stats['continuations'] == 2
+        assert stats['analyses'] == 1
+        assert stats['skipped'] == 1
+        assert stats['positions'] == 1
+        assert stats['moves'] == 3
+
+        book = OpeningBook(book_path)
+        book_moves = book.probe(AzulState.from_fen(fen), 0)
+
+        assert [m.move for m in book_moves] == [popular, rare, analysed]
+        assert book_moves[0].weight == 5
+        assert book_moves[0].win_rate == pytest.approx(0.6)
+        assert math.isnan(book_moves[0].score)
+        assert book_moves[2].score == pytest.approx(4.5)
+        assert len(book) == 1
+
+    def test_probe_misses(self, tmp_path):
+        """Test that positions differing from the stored one are out of book."""
+        db_path = str(tmp_path / "research.db")
+        book_path = str(tmp_path / "book.bin")
+        fen, _, _, _ = _build_research_db(db_path)
+        compile_opening_book(db_path, book_path)
+
+        scored = AzulState.from_fen(fen)
+        scored.agents[0].score = 7
+        dealt = AzulState.from_fen(fen)
+        dealt.factories[0].tiles = {tile: 0 for tile in dealt.factories[0].tiles}
+
+        book = OpeningBook(book_path)
+        assert book.probe(scored, 0) == []
+        assert book.best_move(dealt, 0) is None
+        assert book.get_stats()['misses'] == 2
+        assert book.get_stats()['hit_rate'] == 0.0
+
+    def test_min_weight_filters_moves(self, tmp_path):
+        """Test that rarely seen moves can be left out of the book."""
+        db_path = str(tmp_path / "research.db")
+        book_path = str(tmp_path / "book.bin")
+        fen, popular, _, _ = _build_research_db(db_path)
+
+        stats = compile_opening_book(db_path, book_path, min_weight=2)
+        assert stats['moves'] == 1
+        assert OpeningBook(book_path).best_move(AzulState.from_fen(fen), 0).move == popular
+
+    def test_invalid_and_missing_files(self, tmp_path):
+        """Test that foreign files are rejected and a missing book is optional."""
+        bogus = tmp_path / "bogus.bin"
+        bogus.write_bytes(b"\0" * 128)
+        with pytest.raises(ValueError):
+            OpeningBook(str(bogus))
+        with pytest.raises(FileNotFoundError):
+            OpeningBook(str(tmp_path / "missing.bin"))
+        assert load_opening_book(str(tmp_path / "missing.bin")) is None
+
+    def test_fast_move_repr_round_trip(self):
+        """Test that cached move strings parse back to the same move."""
+        for move in FastMoveGenerator().generate_moves_fast(AzulState(2), 0):
+            assert FastMove.from_string(str(move)) == move
+
+
+class TestCanonicalMoves:
+    """Test factory-order independent move encoding."""
+
+    def test_permuted_factories_resolve_to_same_tiles(self):
+        """Test that a stored move resolves to the matching factory after a permutation."""
+        state = AzulState(2)
+        permuted = copy.deepcopy(state)
+        permuted.factories.reverse()
+
+        for move in FastMoveGenerator().generate_moves_fast(state, 0):
+            resolved = resolve_move(permuted, canonical_move(state, move))
+            assert resolved in FastMoveGenerator().generate_moves_fast(permuted, 0)
+            if move.source_id >= 0:
+                assert permuted.factories[resolved.source_id].tiles == state.factories[move.source_id].tiles
+            else:
+                assert resolved.source_id == move.source_id
+
+
+class TestOpeningBookAPI:
+    """Test that /analyze and /hint answer book positions without searching."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.app = create_test_app()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/session')
+        self.headers = {'X-Session-ID': json.loads(response.data)['session_id']}
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.app.cleanup()
+
+    def test_analyze_and_hint_use_book(self, tmp_path):
+        """Test book answers and the use_book opt-out."""
+        db_path = str(tmp_path / "research.db")
+        book_path = str(tmp_path / "book.bin")
+        fen, _, _, _ = _build_research_db(db_path)
+        compile_opening_book(db_path, book_path)
+        self.app.opening_book = OpeningBook(book_path)
+
+        response = self.client.post('/api/v1/analyze', headers=self.headers, json={'fen_string': fen})
+        analysis = json.loads(response.data)['analysis']
+        assert analysis['source'] == 'opening_book'
+        assert analysis['nodes_searched'] == 0
+        assert len(analysis['book_moves']) == 3
+
+        response = self.client.post('/api/v1/hint', headers=self.headers, json={'fen_string': fen})
+        hint = json.loads(response.data)['hint']
+        assert hint['source'] == 'opening_book'
+        assert hint['top_moves'][0]['visits'] == 5
+
+        response = self.client.post('/api/v1/hint', headers=self.headers,
+                                    json={'fen_string': fen, 'use_book': False, 'budget': 0.05})
+        assert json.loads(response.data)['hint']['source'] == 'search'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,225 @@
+"""
+Tests for background pondering of likely next positions.
+"""
+
+import copy
+import json
+import time
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+from api.app import create_test_app
+from api.pondering import PonderCache, PonderConfig, PonderService, PonderTask, _select_replies
+from api.utils import parse_fen_string
+from core.azul_model import AzulState
+
+
+def _wait_for(predicate, timeout: float = 30.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _best_move(state, agent_id=0):
+    return AzulAlphaBetaSearch(max_depth=1, max_time=1.0).search(state, agent_id, max_depth=1).best_move
+
+
+def _failing_task(max_time):
+    cpu_start = time.process_time()
+    while time.process_time() - cpu_start < 0.05:
+        pass
+    raise RuntimeError("search failed")
+
+
+class TestPonderCache:
+    """Test the shared pondering cache."""
+
+    def _entry(self, depth_reached, max_depth=3, max_time=4.0):
+        return {'depth_reached': depth_reached, 'max_depth': max_depth, 'max_time': max_time}
+
+    def test_only_thorough_results_are_served(self):
+        """Test that results are served only to requests they fully cover."""
+        cache = PonderCache()
+        cache.put((1, 0), self._entry(depth_reached=2, max_depth=3, max_time=2.0))
+
+        assert cache.get((1, 0), max_depth=2, max_time=10.0) is not None
+        assert cache.get((1, 0), max_depth=3, max_time=2.0) is not None
+        assert cache.get((1, 0), max_depth=3, max_time=4.0) is None
+        assert cache.get((1, 1), max_depth=1, max_time=1.0) is None
+        assert cache.get_stats()['hits'] == 2
+
+    def test_keeps_deeper_results_and_evicts_oldest(self):
+        """Test replacement and the size bound."""
+        cache = PonderCache(max_size=2)
+        cache.put((1, 0), self._entry(depth_reached=3))
+        cache.put((1, 0), self._entry(depth_reached=1))
+        assert cache.get((1, 0), max_depth=3, max_time=0.0)['depth_reached'] == 3
+
+        cache.put((2, 0), self._entry(depth_reached=1))
+        cache.put((3, 0), self._entry(depth_reached=1))
+        assert not cache.contains((1, 0))
+        assert cache.get_stats()['size'] == 2
+
+
+class TestPonderService:
+    """Test scheduling, quotas and cancellation."""
+
+    def test_ponders_top_replies(self):
+        """Test that the likeliest reply positions end up in the cache."""
+        state = AzulState(2)
+        best_move = _best_move(state)
+        service = PonderService(PonderConfig(workers=2, max_replies=2))
+        try:
+            assert service.start('session', state, 0, best_move, max_depth=1, max_time=1.0)
+            assert _wait_for(lambda: service.get_stats('session')['pending_tasks'] == 0)
+
+            positions = _select_replies(copy.deepcopy(state), 0, best_move, 2, 10.0)
+            assert len(positions) == 2
+            for position, agent_id in positions:
+                assert agent_id == 0
+                pondered = service.lookup(position, agent_id, max_depth=1, max_time=1.0, session_id='session')
+                assert pondered is not None
+                assert pondered['best_move'] is not None
+                # Results of one multiplayer search mode do not answer the other
+                assert service.lookup(position, agent_id, max_depth=1, max_time=1.0,
+                                      multiplayer_mode='maxn') is None
+            assert service.get_stats('session')['session']['positions_pondered'] == 2
+        finally:
+            service.shutdown()
+
+    def test_replies_follow_turn_order(self):
+        """Test that with three players the next agent replies and the third moves after."""
+        state = AzulState(3)
+        best_move = _best_move(state)
+        positions = _select_replies(copy.deepcopy(state), 0, best_move, 2, 10.0)
+        assert len(positions) == 2
+        assert [agent_id for _, agent_id in positions] == [2, 2]
+
+        service = PonderService(PonderConfig(workers=1, max_replies=1))
+        try:
+            assert service.start('session', state, 0, best_move, max_depth=1, max_time=1.0,
+                                 multiplayer_mode='maxn')
+            assert _wait_for(lambda: service.get_stats('session')['pending_tasks'] == 0)
+            position, agent_id = positions[0]
+            assert service.lookup(position, agent_id, max_depth=1, max_time=1.0, multiplayer_mode='maxn')
+            assert service.lookup(position, 0, max_depth=1, max_time=1.0, multiplayer_mode='maxn') is None
+        finally:
+            service.shutdown()
+
+    def test_cpu_quota_is_never_exceeded(self):
+        """Test that a session cannot schedule more work than its quota."""
+        state = AzulState(2)
+        best_move = _best_move(state)
+
+        starved = PonderService(PonderConfig(workers=1, cpu_quota=0.05))
+        try:
+            assert not starved.start('session', state, 0, best_move, max_depth=2, max_time=1.0)
+        finally:
+            starved.shutdown()
+
+        service = PonderService(PonderConfig(workers=1, max_replies=3, cpu_quota=1.0))
+        try:
+            assert service.start('session', state, 0, best_move, max_depth=5, max_time=1.0)
+            assert _wait_for(lambda: service.get_stats('session')['pending_tasks'] == 0)
+            session = service.get_stats('session')['session']
+            assert session['cpu_used'] <= 1.0 + 0.1  # Search time checks are not instantaneous
+            assert session['positions_pondered'] + session['cancelled_tasks'] == 3
+        finally:
+            service.shutdown()
+
+    def test_idle_sessions_are_cancelled(self):
+        """Test that queued work is dropped once a session goes idle."""
+        state = AzulState(2)
+        best_move = _best_move(state)
+        service = PonderService(PonderConfig(workers=1, max_replies=3, idle_timeout=0.3))
+        try:
+            assert service.start('session', state, 0, best_move, max_depth=5, max_time=1.0)
+            assert _wait_for(lambda: service.get_stats()['active_sessions'] == 0, timeout=10.0)
+            assert service.positions_pondered < 3
+        finally:
+            service.shutdown()
+
+    def test_cancel(self):
+        """Test explicit cancellation and starting without a move."""
+        service = PonderService(PonderConfig(workers=1))
+        try:
+            assert not service.start('session', AzulState(2), 0, None, max_depth=1, max_time=1.0)
+            assert service.cancel('unknown') == 0
+        finally:
+            service.shutdown()
+
+    def test_failed_tasks_are_charged_and_logged(self, caplog):
+        """Test that a task that raises still uses up quota and is logged."""
+        service = PonderService(PonderConfig(workers=1))
+        results = []
+        try:
+            with service._lock:
+                service._ensure_started()
+                session = service._session('session')
+                session.queue.append(PonderTask(fn=_failing_task, args=(), max_time=1.0, generation=0,
+                                                on_done=lambda *args: results.append(args)))
+                service._dispatch()
+            assert _wait_for(lambda: service.get_stats('session')['pending_tasks'] == 0)
+
+            assert results == []
+            assert service.cpu_seconds >= 0.05
+            assert service.get_stats('session')['session']['cpu_used'] >= 0.05
+            assert "_failing_task failed" in caplog.text
+            assert "search failed" in caplog.text
+        finally:
+            service.shutdown()
+
+
+class TestPonderAPI:
+    """Test pondering through the analysis endpoints."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.app = create_test_app()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/session')
+        self.headers = {'X-Session-ID': json.loads(response.data)['session_id']}
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.app.ponder_service.shutdown()
+        self.app.cleanup()
+
+    def test_next_position_is_answered_from_ponder_cache(self):
+        """Test that an opted-in analysis makes the reply position instant."""
+        state = parse_fen_string('initial')
+        request = {'fen_string': 'initial', 'depth': 1, 'time_budget': 1.0, 'ponder': True}
+        response = self.client.post('/api/v1/analyze', headers=self.headers, json=request)
+        analysis = json.loads(response.data)['analysis']
+        assert analysis['source'] == 'search'
+        assert analysis['pondering']
+
+        service = self.app.ponder_service
+        assert _wait_for(lambda: service.get_stats(self.headers['X-Session-ID'])['pending_tasks'] == 0)
+
+        best_move = _best_move(state)
+        positions = _select_replies(state, 0, best_move, service.config.max_replies, 10.0)
+        response = self.client.post('/api/v1/analyze', headers=self.headers,
+                                    json={'fen_string': positions[0][0].to_fen(), 'depth': 1, 'time_budget': 1.0,
+                                          'ponder': True})
+        analysis = json.loads(response.data)['analysis']
+        assert analysis['source'] == 'ponder'
+        # A pondered answer keeps the session pondering
+        assert analysis['pondering']
+        assert _wait_for(lambda: service.get_stats(self.headers['X-Session-ID'])['pending_tasks'] == 0)
+
+        response = self.client.get('/api/v1/ponder', headers=self.headers)
+        stats = json.loads(response.data)['ponder']
+        assert stats['cache']['hits'] == 1
+        assert stats['session']['positions_pondered'] >= 1
+
+        response = self.client.delete('/api/v1/ponder', headers=self.headers)
+        assert json.loads(response.data)['cancelled_tasks'] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,154 @@
+"""
+Tests for the neural result cache and its use in front of AzulNet.
+"""
+
+import pytest
+import torch
+
+from analysis_engine.mathematical_optimization.azul_evaluator import AzulEvaluator
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from core.azul_model import AzulState
+from neural.azul_net import AzulNeuralRolloutPolicy, create_azul_net
+from neural.batch_evaluator import BatchConfig, BatchNeuralEvaluator
+from neural.inference_server import InferenceServerConfig, NeuralInferenceServer
+from neural.move_encoding import MoveEncoder
+from neural.result_cache import ENTRY_OVERHEAD_BYTES, NeuralResultCache, position_key
+
+
+def _logits(size: int = 100) -> torch.Tensor:
+    return torch.randn(size)
+
+
+class TestNeuralResultCache:
+    """Test keys, LRU eviction and invalidation."""
+
+    def test_position_key(self):
+        """Test that keys follow the position and the agent, not the object."""
+        state = AzulState(2)
+        assert position_key(state, 0) == position_key(state.clone(), 0)
+
+        moved = state.clone()
+        moved.agents[0].lines_number[0] = 1
+        moved.agents[0].lines_tile[0] = 2
+        assert position_key(moved, 0) != position_key(state, 0)
+        # The boards are read from agent_id's side
+        assert position_key(moved, 0) != position_key(moved, 1)
+
+        # Factory order matters, since policy indices name factories
+        swapped = state.clone()
+        swapped.factories[0], swapped.factories[1] = swapped.factories[1], swapped.factories[0]
+        if dict(state.factories[0].tiles) != dict(state.factories[1].tiles):
+            assert position_key(swapped, 0) != position_key(state, 0)
+
+    def test_lru_eviction_within_byte_budget(self):
+        """Test that the least recently used entry is evicted first."""
+        entry_bytes = 100 * 4 + ENTRY_OVERHEAD_BYTES
+        cache = NeuralResultCache(max_bytes=3 * entry_bytes)
+        for key in range(3):
+            cache.put(key, 0, 0.5, _logits())
+        assert cache.get(0, 0) is not None  # Key 1 is now the oldest
+
+        cache.put(3, 0, 0.5, _logits())
+        assert len(cache) == 3 and cache.bytes_used == 3 * entry_bytes
+        assert cache.get(1, 0) is None
+        assert cache.get(0, 0) is not None and cache.get(3, 0) is not None
+
+        stats = cache.get_stats()
+        assert stats['evictions'] == 1 and stats['stores'] == 4
+        assert stats['hits'] == 3 and stats['misses'] == 1
+        assert stats['hit_rate'] == pytest.approx(0.75)
+
+    def test_weight_changes_invalidate(self, azul_net):
+        """Test that loading new weights or an optimizer step clears the cache."""
+        model, _ = azul_net
+        cache = NeuralResultCache()
+        assert not cache.check_model(model)
+        cache.put(1, 0, 0.5, _logits())
+        assert not cache.check_model(model)
+        assert len(cache) == 1
+
+        other, _ = create_azul_net()
+        model.load_state_dict(other.state_dict())
+        assert cache.check_model(model)
+        assert len(cache) == 0 and cache.bytes_used == 0
+
+        cache.put(1, 0, 0.5, _logits())
+        assert cache.check_model(other)  # Another model
+        assert cache.get_stats()['invalidations'] == 2
+
+
+class TestCachedInference:
+    """Test the cache in the rollout policy, batch evaluator and inference server."""
+
+    def test_rollout_policy_caches_masked_policy(self, azul_net):
+        """Test that a repeated position is served from the cache with its policy masked."""
+        model, encoder = azul_net
+        policy = AzulNeuralRolloutPolicy(model, encoder, AzulEvaluator(), FastMoveGenerator())
+        state = AzulState(2)
+        moves = FastMoveGenerator().generate_moves_fast(state, 0)
+
+        probs, value = policy._policy_and_value(state, 0, moves)
+        with torch.no_grad():
+            expected_probs, expected_value = model.get_policy_and_value(encoder.encode_state(state, 0))
+        assert value == pytest.approx(expected_value.item(), abs=1e-6)
+
+        legal = MoveEncoder().create_policy_mask(moves, probs.shape[-1])
+        assert legal.any()
+        assert torch.all(probs[0, ~legal] == 0)
+        assert probs.sum().item() == pytest.approx(1.0, abs=1e-5)
+        # Legal moves keep their relative probabilities
+        expected = expected_probs[0, legal] / expected_probs[0, legal].sum()
+        assert torch.allclose(probs[0, legal], expected, atol=1e-6)
+
+        cached_probs, cached_value = policy._policy_and_value(state.clone(), 0, moves)
+        assert torch.equal(cached_probs, probs) and cached_value == value
+        stats = policy.get_cache_stats()
+        assert stats['enabled'] and stats['hits'] == 1 and stats['misses'] == 1
+
+        disabled = AzulNeuralRolloutPolicy(model, encoder, AzulEvaluator(), FastMoveGenerator(), cache_bytes=0)
+        assert disabled.get_cache_stats() == {'enabled': False}
+
+    def test_batch_evaluator_serves_repeats_from_cache(self, azul_net):
+        """Test that only uncached states reach the model and results are unchanged."""
+        model, encoder = azul_net
+        evaluator = BatchNeuralEvaluator(model, encoder, BatchConfig(auto_device_selection=False,
+                                                                     preferred_device="cpu"))
+        states = [AzulState(2) for _ in range(3)]
+        first = evaluator.evaluate_batch(states, [0, 1, 0])
+        again = evaluator.evaluate_batch(states + [states[0]], [0, 1, 0, 0])
+        assert again == pytest.approx(first + [first[0]])
+
+        stats = evaluator.get_cache_stats()
+        assert stats['misses'] == 3 and stats['hits'] == 4
+
+        policies = evaluator.get_policy_batch(states[:1], [0])
+        with torch.no_grad():
+            logits, _ = model(encoder.encode_state(states[0], 0))
+        assert torch.allclose(policies[0].reshape(-1), logits.reshape(-1), atol=1e-6)
+
+        # Training steps change the weights and empty the cache
+        with torch.no_grad():
+            for parameter in model.parameters():
+                parameter.add_(0.01)
+        evaluator.evaluate_batch(states[:1], [0])
+        assert evaluator.get_cache_stats()['invalidations'] == 1
+
+    def test_inference_server_cache(self, azul_net):
+        """Test that an enabled server cache answers repeated states without a forward pass."""
+        model, encoder = azul_net
+        server = NeuralInferenceServer(InferenceServerConfig(max_batch_size=8, cache_bytes=1 << 20),
+                                       model=model, encoder=encoder).start()
+        try:
+            state = AzulState(2)
+            first = server.evaluate(state, 0)
+            second = server.evaluate(state.clone(), 0)
+            stats = server.get_stats()
+        finally:
+            server.stop()
+        assert torch.allclose(second.policy, first.policy) and second.value == pytest.approx(first.value)
+        assert stats['requests'] == 1
+        assert stats['cache']['hits'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,132 @@
+"""
+Tests for the lightweight MCTS rollout simulator.
+"""
+
+import random
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_rollout import RolloutSimulator
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from core.azul_model import AzulState, AzulGameRule
+
+
+def _play_random_round(state, simulator, rng):
+    """Play one round on both the real engine and the simulator with the same moves."""
+    move_generator = FastMoveGenerator()
+    game_rule = AzulGameRule(len(state.agents))
+    agent = state.first_agent
+    simulator.load(state)
+
+    while state.TilesRemaining():
+        move = rng.choice(move_generator.generate_moves_fast(state, agent))
+        game_rule.generateSuccessor(state, move.to_tuple(), agent)
+        simulator._apply(agent, move.source_id, move.tile_type, move.pattern_line_dest)
+        agent = (agent + 1) % len(state.agents)
+
+    game_rule.generateSuccessor(state, "ENDROUND", 0)
+    simulator._score_round()
+
+
+class TestRolloutSimulator:
+    """Test RolloutSimulator behaviour."""
+
+    def test_invalid_arguments(self):
+        """Test that unknown policies and round counts are rejected."""
+        with pytest.raises(ValueError):
+            RolloutSimulator(policy="neural")
+        with pytest.raises(ValueError):
+            RolloutSimulator(max_rounds=0)
+
+    def test_load_copies_position(self):
+        """Test that loading mirrors the factories, bag and agents."""
+        state = AzulState(2)
+        simulator = RolloutSimulator()
+        simulator.load(state)
+
+        for f, factory in enumerate(state.factories):
+            assert simulator.factory_totals[f] == factory.total
+        assert simulator.bag_total == len(state.bag)
+        assert simulator.centre_total == 0
+        assert simulator.scores == [0, 0]
+
+    def test_round_scoring_matches_game_rules(self):
+        """Test that simulated moves and scoring agree with AzulGameRule."""
+        for seed in range(20):
+            rng = random.Random(seed)
+            random.seed(seed)
+            state = AzulState(2)
+            simulator = RolloutSimulator()
+
+            _play_random_round(state, simulator, rng)
+
+            assert simulator.scores == [agent.score for agent in state.agents]
+            for a, agent in enumerate(state.agents):
+                assert simulator.walls[a] == [int(v) for v in agent.grid_state.flatten()]
+                assert simulator.lines_number[a] == agent.lines_number
+
+    def test_simulate_does_not_modify_state(self):
+        """Test that rollouts leave the input state untouched."""
+        state = AzulState(2)
+        factories_before = [dict(f.tiles) for f in state.factories]
+        bag_before = list(state.bag)
+
+        simulator = RolloutSimulator(policy="heavy", max_rounds=3)
+        simulator.simulate(state, 0)
+
+        assert [dict(f.tiles) for f in state.factories] == factories_before
+        assert state.bag == bag_before
+
+    def test_single_round_rollout(self):
+        """Test a rollout to the end of the current round."""
+        simulator = RolloutSimulator()
+        score = simulator.simulate(AzulState(2), 0)
+
+        assert isinstance(score, float)
+        assert simulator.last_rounds == 1
+        # 20 tiles on the factories need at least 5 and at most 20 moves
+        assert 5 <= simulator.last_depth <= 20
+        assert score == simulator.scores[0] - simulator.scores[1]
+
+    def test_multi_round_rollout(self):
+        """Test that rollouts continue through scoring and refills."""
+        simulator = RolloutSimulator(policy="heavy", max_rounds=3, rng=random.Random(1))
+        simulator.simulate(AzulState(2), 1, max_depth=500)
+
+        assert simulator.last_rounds == 3
+        assert simulator.last_depth > 20
+
+    def test_seeded_rollouts_are_reproducible(self):
+        """Test that a seeded generator gives identical playouts."""
+        state = AzulState(2)
+        first = RolloutSimulator(max_rounds=5, rng=random.Random(7))
+        second = RolloutSimulator(max_rounds=5, rng=random.Random(7))
+
+        assert first.simulate(state, 0, max_depth=500) == second.simulate(state, 0, max_depth=500)
+        assert first.last_depth == second.last_depth
+
+    def test_recorded_moves_match_fast_move_keys(self):
+        """Test that recorded playout moves use the FastMove.bit_mask layout."""
+        state = AzulState(2)
+        simulator = RolloutSimulator()
+        simulator.record_moves = True
+
+        for move in FastMoveGenerator().generate_moves_fast(state, 0)[:10]:
+            simulator.load(state)
+            simulator.num_played = 0
+            simulator._apply(0, move.source_id, move.tile_type, move.pattern_line_dest)
+            assert simulator.num_played == 1
+            assert simulator.played_moves[0] == move.bit_mask
+            assert simulator.played_agents[0] == 0
+
+    def test_max_depth_stops_rollout(self):
+        """Test that max_depth bounds the number of moves played."""
+        simulator = RolloutSimulator(max_rounds=5)
+        simulator.simulate(AzulState(2), 0, max_depth=3)
+
+        assert simulator.last_depth == 3
+        assert simulator.last_rounds == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
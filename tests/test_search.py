@@ -14,7 +14,7 @@ import time
 import signal
 from unittest.mock import Mock, patch
 
-from analysis_engine.mathematical_optimization.azul_search import TranspositionTable, AzulAlphaBetaSearch, SearchResult
+from analysis_engine.mathematical_optimization.azul_search import TranspositionTable, AzulAlphaBetaSearch, SearchResult, MultiPVResult
 from core.azul_model import AzulState, AzulGameRule
 from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator, FastMove
 from analysis_engine.strategic_analysis.azul_endgame import EndgameDatabase
@@ -57,6 +57,19 @@ class TestTranspositionTable:
         assert score == 10.5
         assert best_move == move
     
+    def test_bound_entries_respect_window(self):
+        """Test that bound entries are only returned when they cut the window."""
+        tt = TranspositionTable()
+        move = FastMove(utils.Action.TAKE_FROM_FACTORY, 0, utils.Tile.BLUE, 0, 2, 0)
+        
+        tt.put(1, 3, 10.0, move, 0.0, 20.0, "LOWER_BOUND")
+        assert tt.get(1, 3, 0.0, 20.0) is None
+        assert tt.get(1, 3, 0.0, 8.0) == (10.0, move)
+        
+        tt.put(2, 3, 4.0, move, 0.0, 20.0, "UPPER_BOUND")
+        assert tt.get(2, 3, 0.0, 20.0) is None
+        assert tt.get(2, 3, 5.0, 20.0) == (4.0, move)
+    
     def test_get_with_insufficient_depth(self):
         """Test that get returns None for insufficient depth."""
         tt = TranspositionTable()
@@ -258,6 +271,15 @@ class TestEndgameIntegration:
         assert isinstance(result, SearchResult)
         assert search.endgame_database is None
     
+    def test_endgame_probed_once_per_node(self):
+        """Test that search nodes look up endgame solutions with a single get_solution."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=5.0, use_endgame=True)
+        search.endgame_database = Mock(wraps=search.endgame_database)
+        
+        search.search(AzulState(2), 0, max_depth=2)
+        assert search.endgame_database.get_solution.call_count > 0
+        search.endgame_database.has_solution.assert_not_called()
+    
     def test_analyze_endgame_method(self):
         """Test the analyze_endgame method."""
         search = AzulAlphaBetaSearch(max_depth=3, max_time=1.0, use_endgame=True)
@@ -320,6 +342,271 @@ class TestEndgameIntegration:
         assert len(stats) == 1  # Only 'enabled' key
 
 
+class TestMultiPVSearch:
+    """Test multi-PV root search."""
+    
+    def _late_state(self):
+        """A position with few tiles left so every root move can be searched quickly."""
+        state = AzulState(2)
+        game_rule = AzulGameRule(2)
+        generator = FastMoveGenerator()
+        agent = 0
+        while state.centre_pool.total + sum(f.total for f in state.factories) > 10:
+            move = generator.generate_moves_fast(state, agent)[0]
+            game_rule.generateSuccessor(state, move.to_tuple(), agent)
+            agent = 1 - agent
+        return state, agent
+    
+    def test_scores_every_root_move(self):
+        """Test that all legal moves are scored exactly and sorted best first."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        result = search.search_multipv(state, agent)
+        legal = search.move_generator.generate_moves_fast(state, agent)
+        
+        assert isinstance(result, MultiPVResult)
+        assert result.depth_reached == 2
+        assert len(result.move_scores) == len(legal)
+        assert all(entry.bound == 'EXACT' for entry in result.move_scores)
+        scores = [entry.score for entry in result.move_scores]
+        assert scores == sorted(scores, reverse=True)
+        assert result.best_move == result.move_scores[0].move
+        assert result.move_scores[0].principal_variation[0] == result.best_move
+    
+    def test_depth_one_scores_match_evaluator(self):
+        """Test that depth-1 scores are the root agent's evaluation after each move."""
+        search = AzulAlphaBetaSearch(max_depth=1, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        result = search.search_multipv(state, agent, max_depth=1)
+        for entry in result.move_scores:
+            child = search._apply_move(state, entry.move, agent)
+            assert entry.score == search.evaluator.evaluate_position(child, agent)
+    
+    def test_best_score_matches_single_pv_search(self):
+        """Test that the top multi-PV line agrees with the regular search."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        multipv = search.search_multipv(state, agent, max_depth=2)
+        single = search.search(state, agent, max_depth=2)
+        assert multipv.best_score == single.best_score
+    
+    def test_top_k_bounds(self):
+        """Test that moves outside the top K are reported as upper bounds."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        full = search.search_multipv(state, agent, max_depth=2)
+        top = search.search_multipv(state, agent, num_pv=2, max_depth=2)
+        exact = {entry.move.bit_mask: entry.score for entry in full.move_scores}
+        
+        assert len(top.move_scores) == len(full.move_scores)
+        assert top.move_scores[0].bound == 'EXACT'
+        assert top.best_score == full.best_score
+        for entry in top.move_scores:
+            if entry.bound == 'EXACT':
+                assert entry.score == exact[entry.move.bit_mask]
+            else:
+                assert exact[entry.move.bit_mask] <= entry.score
+    
+    def test_root_moves_restrict_search(self):
+        """Test that root_moves searches only the given moves, scored as in the full search."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        full = search.search_multipv(state, agent, max_depth=2)
+        worst = full.move_scores[-1]
+        single = search.search_multipv(state, agent, max_depth=2, root_moves=[worst.move])
+        assert [entry.move.bit_mask for entry in single.move_scores] == [worst.move.bit_mask]
+        assert single.best_score == worst.score
+    
+    def test_score_margin_bounds(self):
+        """Test that moves far below the best are only bounded."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        result = search.search_multipv(state, agent, score_margin=1.0, max_depth=2)
+        for entry in result.move_scores:
+            if entry.bound == 'UPPER_BOUND':
+                assert entry.score <= result.best_score - 1.0 + 1e-9
+
+    
+    def test_progress_reports_each_depth(self):
+        """Test that every completed depth is reported, deepest last."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        reported = []
+        
+        result = search.search(state, agent, progress=lambda partial: reported.append(partial) or True)
+        assert [partial.depth_reached for partial in reported] == [1, 2]
+        assert reported[-1].best_move == result.best_move
+        assert reported[-1].best_score == result.best_score
+    
+    def test_progress_and_stop_end_search(self):
+        """Test that a False progress return or stop() ends the search early."""
+        search = AzulAlphaBetaSearch(max_depth=4, max_time=30.0, use_endgame=False)
+        state, agent = self._late_state()
+        
+        result = search.search(state, agent, progress=lambda partial: False)
+        assert result.depth_reached == 1
+        
+        def stop_after_first_depth(partial):
+            search.stop()
+            return True
+        result = search.search(state, agent, progress=stop_after_first_depth)
+        assert result.depth_reached == 1
+        assert search.stop_requested
+
+
+class TestMultiPlayerSearch:
+    """Test paranoid and max-n search for 3- and 4-player games."""
+    
+    def _late_state(self, num_agents, tiles_left=10):
+        """A multi-player position with few tiles left."""
+        state = AzulState(num_agents)
+        game_rule = AzulGameRule(num_agents)
+        generator = FastMoveGenerator()
+        agent = 0
+        while state.centre_pool.total + sum(f.total for f in state.factories) > tiles_left:
+            move = generator.generate_moves_fast(state, agent)[0]
+            game_rule.generateSuccessor(state, move.to_tuple(), agent)
+            agent = (agent + 1) % num_agents
+        return state, agent
+    
+    def _maxn_reference(self, search, state, agent_id, depth):
+        """Max-n without pruning; returns the per-player scores."""
+        moves = search.move_generator.generate_moves_fast(state, agent_id)
+        if depth == 0 or not moves:
+            return search._evaluate_vector(state)['scores']
+        best, best_share = None, float('-inf')
+        for move in search._order_moves(state, agent_id, moves, depth):
+            child = search._apply_move(state, move, agent_id)
+            scores = self._maxn_reference(search, child, search._get_next_agent(agent_id, child), depth - 1)
+            share = search._maxn_shares(scores)[agent_id]
+            if share > best_share:
+                best, best_share = scores, share
+        return best
+    
+    def test_invalid_mode(self):
+        """Test that unknown modes are rejected."""
+        with pytest.raises(ValueError):
+            AzulAlphaBetaSearch(multiplayer_mode='best-reply')
+    
+    def test_next_agent_follows_game_rule(self):
+        """Test turn order within a round and across the round boundary."""
+        search = AzulAlphaBetaSearch(use_endgame=False)
+        state = AzulState(3)
+        assert search._get_next_agent(2, state) == 0
+        
+        for factory in state.factories:
+            factory.tiles = {tile: 0 for tile in factory.tiles}
+            factory.total = 0
+        state.centre_pool.tiles = {tile: 0 for tile in state.centre_pool.tiles}
+        state.centre_pool.total = 0
+        state.next_first_agent = 1
+        assert search._get_next_agent(2, state) == 1
+    
+    @pytest.mark.parametrize("num_agents", [3, 4])
+    def test_paranoid_search(self, num_agents):
+        """Test that paranoid search returns a legal move with every agent but the root minimizing."""
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0)
+        state, agent = self._late_state(num_agents)
+        
+        result = search.search(state, agent)
+        assert result.depth_reached == 2
+        assert result.best_move in search.move_generator.generate_moves_fast(state, agent)
+        
+        # At depth 2 the root score is the worst reply for the root agent
+        worst_replies = []
+        for move in search.move_generator.generate_moves_fast(state, agent):
+            child = search._apply_move(state, move, agent)
+            reply_agent = search._get_next_agent(agent, child)
+            replies = [search._apply_move(child, reply, reply_agent)
+                       for reply in search.move_generator.generate_moves_fast(child, reply_agent)]
+            if replies:
+                worst_replies.append(min(search.evaluator.evaluate_position(reply, agent) for reply in replies))
+            else:
+                # Without chance nodes a move that ends the round is scored as terminal
+                worst_replies.append(search._evaluate_terminal_state(child.clone(), agent)['score'])
+        assert result.best_score == max(worst_replies)
+    
+    @pytest.mark.parametrize("num_agents", [3, 4])
+    def test_maxn_matches_unpruned_search(self, num_agents):
+        """Test that shallow pruning does not change the max-n result."""
+        search = AzulAlphaBetaSearch(max_depth=3, max_time=60.0, multiplayer_mode='maxn')
+        state, agent = self._late_state(num_agents)
+        
+        result = search.search(state, agent, max_depth=3)
+        assert result.depth_reached == 3
+        assert result.best_move in search.move_generator.generate_moves_fast(state, agent)
+        
+        search.transposition_table.clear()
+        search.root_agent = agent
+        pruned = search._maxn_search(state, agent, 3, None, float('-inf'))
+        assert pruned['scores'] == self._maxn_reference(search, state, agent, 3)
+        assert pruned['score'] == result.best_score
+        
+        # Max-n entries keep the whole score vector
+        entries = [entry for entry in search.transposition_table.table.values()]
+        assert entries and all(len(entry['scores']) == num_agents for entry in entries)
+
+class TestIncrementalSearch:
+    """Test that incremental leaf evaluation leaves search results unchanged."""
+    
+    def _late_state(self, num_agents):
+        return TestMultiPlayerSearch()._late_state(num_agents, tiles_left=12)
+    
+    @pytest.mark.parametrize("num_agents,mode", [(2, 'paranoid'), (3, 'paranoid'), (3, 'maxn')])
+    def test_matches_full_evaluation(self, num_agents, mode):
+        """Test identical results with incremental evaluation checked against full evaluation."""
+        state, agent = self._late_state(num_agents)
+        incremental = AzulAlphaBetaSearch(max_depth=2, max_time=60.0, use_endgame=False,
+                                          multiplayer_mode=mode, check_incremental=True)
+        full = AzulAlphaBetaSearch(max_depth=2, max_time=60.0, use_endgame=False,
+                                   multiplayer_mode=mode, incremental_eval=False)
+        
+        result = incremental.search(state, agent)
+        expected = full.search(state, agent)
+        assert result.best_move == expected.best_move
+        assert result.best_score == expected.best_score
+        assert result.nodes_searched == expected.nodes_searched
+        
+        stats = incremental.get_search_stats()['incremental_eval']
+        assert stats['incremental_evaluations'] > 0
+        assert stats['term_updates'] > stats['full_term_computations']
+        assert full.get_search_stats()['incremental_eval'] is None
+    
+    def test_root_changed_in_place_is_refreshed(self):
+        """Test that searching a state again after changing it uses fresh terms."""
+        state, agent = self._late_state(2)
+        search = AzulAlphaBetaSearch(max_depth=1, max_time=60.0, use_endgame=False, check_incremental=True)
+        search.search(state, agent)
+        
+        state.agents[agent].floor_tiles.append(utils.Tile.RED)
+        state.agents[agent].floor[len(state.agents[agent].floor_tiles) - 1] = 1
+        search.search(state, agent)
+    
+    @pytest.mark.parametrize("num_agents,mode", [(2, 'paranoid'), (3, 'maxn')])
+    def test_eval_cache_leaves_results_unchanged(self, num_agents, mode):
+        """Test that cached leaf evaluations give the same result as uncached ones."""
+        state, agent = self._late_state(num_agents)
+        cached = AzulAlphaBetaSearch(max_depth=3, max_time=60.0, use_endgame=False, multiplayer_mode=mode)
+        uncached = AzulAlphaBetaSearch(max_depth=3, max_time=60.0, use_endgame=False, multiplayer_mode=mode,
+                                       eval_cache_size=0)
+        expected = uncached.search(state, agent)
+        
+        # The cache outlives the transposition table, so searching again reuses leaves
+        for _ in range(2):
+            result = cached.search(state, agent)
+            assert result.best_move == expected.best_move
+            assert result.best_score == expected.best_score
+        
+        stats = cached.get_search_stats()['eval_cache']
+        assert stats['hits'] > 0
+        assert uncached.get_search_stats()['eval_cache'] == {'enabled': False}
+
 class TestSearchIntegration:
     """Test integration with existing components."""
     
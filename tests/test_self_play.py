@@ -0,0 +1,110 @@
+"""
+Tests for self-play game generation and the shard format.
+"""
+
+import numpy as np
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_mcts import AzulMCTS
+from core.azul_model import AzulState
+from neural.self_play import (
+    SHARD_DTYPES, GameRecord, SelfPlayConfig, SelfPlayGenerator, ShardWriter,
+    generate_self_play_data, open_shard, read_manifest
+)
+
+
+def _fast_config(**overrides) -> SelfPlayConfig:
+    settings = dict(max_rollouts=10, search_depth=1, search_time=0.2, shard_size=100)
+    settings.update(overrides)
+    return SelfPlayConfig(**settings)
+
+
+class TestSelfPlayGames:
+    """Test that games are played to the end with valid targets."""
+
+    @pytest.mark.parametrize("engine", ["mcts", "alpha_beta"])
+    def test_complete_game_targets(self, engine):
+        """Test feature, policy and value targets of one game."""
+        generator = SelfPlayGenerator(_fast_config(engine=engine))
+        record = generator.play_game(1)
+
+        moves = len(record.agent_ids)
+        assert moves > 20  # More than one round
+        assert record.features.shape == (moves, generator.encoder.feature_size)
+        assert record.policies.shape == (moves, generator.policy_size)
+        assert np.allclose(record.policies.sum(axis=1), 1.0)
+        assert all(isinstance(score, int) for score in record.final_scores)
+
+        values = record.values
+        winner = int(np.argmax(record.final_scores))
+        if record.final_scores.count(max(record.final_scores)) == 1:
+            assert np.all(values[record.agent_ids == winner] == 1.0)
+            assert np.all(values[record.agent_ids != winner] == -1.0)
+
+    def test_unknown_engine(self):
+        """Test that an unsupported engine is rejected."""
+        with pytest.raises(ValueError):
+            SelfPlayGenerator(SelfPlayConfig(engine="random"))
+
+    def test_shared_win_value(self):
+        """Test that tied winners get a value of 0."""
+        record = GameRecord(features=np.zeros((3, 1)), policies=np.zeros((3, 1)),
+                            agent_ids=np.array([0, 1, 2]), final_scores=[10, 10, 4])
+        assert record.values.tolist() == [0.0, 0.0, -1.0]
+
+    def test_mcts_reports_root_visits(self):
+        """Test that MCTS results carry the visit count of every root move."""
+        result = AzulMCTS(max_time=5.0, max_rollouts=30).search(AzulState(2), 0)
+        assert result.move_visits
+        assert sum(visits for _, visits in result.move_visits) > 0
+        assert result.best_move in [move for move, _ in result.move_visits]
+
+
+class TestShards:
+    """Test writing and reading shards."""
+
+    def test_shard_writer_splits_games(self, tmp_path):
+        """Test that samples are split across shards in order."""
+        writer = ShardWriter(str(tmp_path), "shard", feature_size=4, policy_size=3, shard_size=5)
+        for game in range(3):
+            record = GameRecord(features=np.full((4, 4), game, dtype=np.float32),
+                                policies=np.full((4, 3), 1 / 3, dtype=np.float32),
+                                agent_ids=np.array([0, 1, 0, 1]), final_scores=[5, 3])
+            writer.add_game(record)
+        shards = writer.close()
+
+        assert [shard['samples'] for shard in shards] == [5, 5, 2]
+        features = np.concatenate([open_shard(str(tmp_path), shard)['features'] for shard in shards])
+        assert features[:, 0].tolist() == [0] * 4 + [1] * 4 + [2] * 4
+        arrays = open_shard(str(tmp_path), shards[0])
+        assert isinstance(arrays['features'], np.memmap)
+        for key, dtype in SHARD_DTYPES.items():
+            assert arrays[key].dtype == dtype
+        assert arrays['value'].tolist() == [1, -1, 1, -1, 1]
+
+    def test_parallel_generation_matches_serial(self, tmp_path):
+        """Test that worker processes write the same games and shards as a single process."""
+        serial = generate_self_play_data(_fast_config(engine="alpha_beta", num_games=4), str(tmp_path / "serial"))
+        parallel = generate_self_play_data(_fast_config(engine="alpha_beta", num_games=4, workers=2),
+                                           str(tmp_path / "parallel"))
+
+        assert read_manifest(str(tmp_path / "parallel")) == parallel
+        assert parallel['games'] == 4
+        assert parallel['policy_size'] == 650
+        assert parallel['samples'] == sum(shard['samples'] for shard in parallel['shards'])
+        assert serial['games'] == parallel['games']
+        # Each task owns its shard files, whichever process ran it
+        assert [s['name'] for s in parallel['shards']] == [s['name'] for s in serial['shards']]
+        for shard in parallel['shards']:
+            arrays = open_shard(str(tmp_path / "parallel"), shard)
+            assert len(arrays['features']) == len(arrays['policy']) == shard['samples']
+
+    def test_unsupported_manifest_version(self, tmp_path):
+        """Test that a manifest from another shard format is refused."""
+        (tmp_path / "manifest.json").write_text('{"format_version": 0}')
+        with pytest.raises(ValueError):
+            read_manifest(str(tmp_path))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
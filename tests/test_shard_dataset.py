@@ -0,0 +1,115 @@
+"""
+Tests for the shard datasets and training AzulNet on self-play shards.
+"""
+
+import json
+
+import numpy as np
+import pytest
+import torch
+
+from neural.self_play import MANIFEST_NAME, SHARD_DTYPES, SHARD_FORMAT_VERSION, GameRecord, ShardWriter
+from neural.shard_dataset import ShardDataset, ShardIterableDataset, create_shard_loader
+from neural.train import AzulNetTrainer, TrainingConfig
+
+FEATURE_SIZE = 542
+POLICY_SIZE = 650
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    """25 samples in shards of 10; sample i has every feature equal to i."""
+    writer = ShardWriter(str(tmp_path), "shard_t0000", FEATURE_SIZE, POLICY_SIZE, shard_size=10)
+    samples = np.arange(25)
+    policies = np.zeros((25, POLICY_SIZE), dtype=np.float32)
+    policies[samples, samples % POLICY_SIZE] = 1.0
+    writer.add_game(GameRecord(features=np.repeat(samples[:, None], FEATURE_SIZE, axis=1).astype(np.float32),
+                               policies=policies, agent_ids=samples % 2, final_scores=[20, 10]))
+    shards = writer.close()
+    manifest = {
+        'format_version': SHARD_FORMAT_VERSION,
+        'feature_size': FEATURE_SIZE,
+        'policy_size': POLICY_SIZE,
+        'dtypes': {key: np.dtype(dtype).name for key, dtype in SHARD_DTYPES.items()},
+        'games': 1,
+        'samples': 25,
+        'shards': shards
+    }
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest))
+    return str(tmp_path)
+
+
+def _sample_ids(batches):
+    return [int(i) for features, _, _ in batches for i in features[:, 0]]
+
+
+class TestShardDatasets:
+    """Test the map-style and streaming datasets."""
+
+    def test_map_style_dataset(self, shard_dir):
+        """Test indexing across shard boundaries."""
+        dataset = ShardDataset(shard_dir)
+        assert len(dataset) == 25
+        features, policy, value = dataset[13]
+        assert features.dtype == torch.float32 and features.shape == (FEATURE_SIZE,)
+        assert features[0] == 13 and policy[13] == 1.0
+        assert value.item() == -1.0  # Agent 1 lost
+        assert dataset[-1][0][0] == 24
+        with pytest.raises(IndexError):
+            dataset[25]
+
+    def test_epoch_covers_every_sample_once(self, shard_dir):
+        """Test that a shuffled epoch yields each sample exactly once, in batches."""
+        dataset = ShardIterableDataset(shard_dir, batch_size=4, shuffle_buffer=6, seed=1)
+        batches = list(dataset)
+        assert [len(features) for features, _, _ in batches] == [4] * 6 + [1]
+        assert sorted(_sample_ids(batches)) == list(range(25))
+        for features, policy, value in batches:
+            assert torch.equal(policy.argmax(dim=1), features[:, 0].long())
+            assert value.shape == (len(features), 1)
+
+    def test_epochs_reshuffle(self, shard_dir):
+        """Test that set_epoch changes the order and the same epoch repeats it."""
+        dataset = ShardIterableDataset(shard_dir, batch_size=5, shuffle_buffer=10)
+        first = _sample_ids(dataset)
+        assert _sample_ids(dataset) == first
+        dataset.set_epoch(1)
+        assert _sample_ids(dataset) != first
+
+        ordered = ShardIterableDataset(shard_dir, batch_size=5, shuffle=False, drop_last=True)
+        assert _sample_ids(ordered) == list(range(25))
+
+    def test_loader_workers_split_blocks(self, shard_dir):
+        """Test that worker processes share the epoch without duplicates."""
+        loader = create_shard_loader(shard_dir, batch_size=4, num_workers=2, shuffle_buffer=5)
+        assert sorted(_sample_ids(loader)) == list(range(25))
+
+
+class TestShardTraining:
+    """Test AzulNetTrainer on shards."""
+
+    def test_trainer_streams_shards(self, shard_dir):
+        """Test that training sizes the policy head from the manifest and reports throughput."""
+        config = TrainingConfig(batch_size=8, num_epochs=2, hidden_size=32, num_layers=1, data_dir=shard_dir)
+        trainer = AzulNetTrainer(config)
+        assert trainer.model.config.num_actions == POLICY_SIZE
+
+        losses = trainer.train()
+        assert len(losses) == 2 and all(np.isfinite(losses))
+        assert [stats['samples'] for stats in trainer.epoch_stats] == [25, 25]
+        assert all(stats['samples_per_second'] > 0 for stats in trainer.epoch_stats)
+
+    def test_trainer_rejects_mismatched_features(self, shard_dir):
+        """Test that shards from another encoding are refused."""
+        path = f"{shard_dir}/{MANIFEST_NAME}"
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest['feature_size'] = 100
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+        with pytest.raises(ValueError):
+            AzulNetTrainer(TrainingConfig(data_dir=shard_dir))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
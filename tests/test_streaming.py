@@ -0,0 +1,99 @@
+"""
+Tests for the Server-Sent Events analysis and hint endpoints.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from api.app import create_test_app
+from api.utils import format_sse
+
+
+def _parse_events(body: str):
+    """Parse an SSE body into (event, data) pairs, skipping keep-alive comments."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = [line for line in block.split("\n") if line and not line.startswith(":")]
+        if not lines:
+            continue
+        fields = dict(line.split(": ", 1) for line in lines)
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def _search_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "sse-search"]
+
+
+class TestFormatSSE:
+    """Test event formatting."""
+
+    def test_format(self):
+        """Test that events are framed with a blank line."""
+        assert format_sse('depth', {'a': 1}) == 'event: depth\ndata: {"a": 1}\n\n'
+
+
+class TestStreamingEndpoints:
+    """Test /analyze/stream and /hint/stream."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.app = create_test_app()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/session')
+        self.headers = {'X-Session-ID': json.loads(response.data)['session_id']}
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.app.cleanup()
+
+    def test_analyze_stream_sends_each_depth(self):
+        """Test one event per completed depth, then the final result."""
+        response = self.client.post('/api/v1/analyze/stream', headers=self.headers,
+                                    json={'fen_string': 'initial', 'depth': 2, 'time_budget': 30.0})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+
+        events = _parse_events(response.get_data(as_text=True))
+        assert [event for event, _ in events] == ['depth', 'depth', 'done']
+        assert [data['depth_reached'] for _, data in events[:2]] == [1, 2]
+        assert events[-1][1]['best_move'] == events[1][1]['best_move']
+        assert 'nodes_per_second' in events[-1][1]
+        assert events[-1][1]['principal_variation']
+
+    def test_hint_stream_sends_rollout_updates(self):
+        """Test periodic rollout events for MCTS hints."""
+        response = self.client.post('/api/v1/hint/stream', headers=self.headers,
+                                    json={'fen_string': 'initial', 'budget': 30.0, 'rollouts': 40,
+                                          'progress_interval': 10})
+        events = _parse_events(response.get_data(as_text=True))
+
+        assert [event for event, _ in events] == ['rollouts', 'rollouts', 'rollouts', 'done']
+        assert [data['rollouts_performed'] for _, data in events] == [10, 20, 30, 40]
+        assert events[-1][1]['best_move'] is not None
+
+    def test_disconnect_stops_search(self):
+        """Test that closing the stream stops the search instead of running out the budget."""
+        response = self.client.post('/api/v1/analyze/stream', headers=self.headers,
+                                    json={'fen_string': 'initial', 'depth': 10, 'time_budget': 120.0},
+                                    buffered=False)
+        first = next(iter(response.response))
+        assert first.startswith(b"event: depth")
+
+        response.close()
+        deadline = time.time() + 10.0
+        while _search_threads() and time.time() < deadline:
+            time.sleep(0.05)
+        assert not _search_threads()
+
+    def test_invalid_request(self):
+        """Test that bad requests fail before streaming starts."""
+        response = self.client.post('/api/v1/analyze/stream', headers=self.headers, json={'depth': 2})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
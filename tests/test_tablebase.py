@@ -0,0 +1,316 @@
+"""
+Tests for the exact end-of-round solver and the on-disk endgame tablebase.
+"""
+
+import copy
+import json
+import random
+
+import pytest
+
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from analysis_engine.mathematical_optimization.azul_search import AzulAlphaBetaSearch
+from analysis_engine.strategic_analysis.azul_endgame import EndgameDatabase, EndgameDetector
+from analysis_engine.strategic_analysis.azul_tablebase import (
+    EndgameTablebase, RoundEndSolver, move_from_key, position_key, remaining_tiles
+)
+from core.azul_model import AzulState, AzulGameRule
+from tools.tablebase_generator import generate_tablebase, load_library_states, sample_late_positions
+
+
+def _late_round_state(seed: int, max_tiles: int = 6):
+    """Play random moves until at most max_tiles tiles are left. Returns (state, agent to move)."""
+    random.seed(seed)
+    rng = random.Random(seed)
+    state = AzulState(2)
+    game_rule = AzulGameRule(2)
+    move_generator = FastMoveGenerator()
+    agent = 0
+    while remaining_tiles(state) > max_tiles:
+        move = rng.choice(move_generator.generate_moves_fast(state, agent))
+        game_rule.generateSuccessor(state, move.to_tuple(), agent)
+        agent = 1 - agent
+    return state, agent
+
+
+def _brute_force(state, agent):
+    """Round margin for agent under perfect play, computed with the real game rules."""
+    game_rule = AzulGameRule(2)
+    if not state.TilesRemaining():
+        final = copy.deepcopy(state)
+        before = [a.score for a in final.agents]
+        game_rule.generateSuccessor(final, "ENDROUND", 0)
+        if any(a.GetCompletedRows() for a in final.agents):
+            for a in final.agents:
+                a.EndOfGameScore()
+        gains = [final.agents[i].score - before[i] for i in range(2)]
+        return gains[agent] - gains[1 - agent]
+
+    best = float('-inf')
+    for move in FastMoveGenerator().generate_moves_fast(state, agent):
+        child = copy.deepcopy(state)
+        game_rule.generateSuccessor(child, move.to_tuple(), agent)
+        best = max(best, -_brute_force(child, 1 - agent))
+    return best
+
+
+class TestPositionKey:
+    """Test canonical position keys."""
+
+    def test_key_is_stable_and_nonzero(self):
+        """Test that keys are deterministic 64-bit integers."""
+        state = AzulState(2)
+        key = position_key(state, 0)
+        assert key == position_key(state, 0)
+        assert 0 < key < 2 ** 64
+
+    def test_player_swap_symmetry(self):
+        """Test that swapping the agents and the side to move gives the same key."""
+        state, agent = _late_round_state(3)
+        swapped = copy.deepcopy(state)
+        swapped.agents.reverse()
+
+        assert position_key(state, agent) == position_key(swapped, 1 - agent)
+        assert position_key(state, agent) != position_key(state, 1 - agent)
+
+    def test_factory_order_is_ignored(self):
+        """Test that permuting factories does not change the key."""
+        state = AzulState(2)
+        permuted = copy.deepcopy(state)
+        permuted.factories.reverse()
+        assert position_key(state, 0) == position_key(permuted, 0)
+
+    def test_scores_are_capped(self):
+        """Test that scores beyond the floor-penalty range share keys only when capped."""
+        state = AzulState(2)
+        higher = copy.deepcopy(state)
+        state.agents[0].score = 30
+        higher.agents[0].score = 40
+
+        assert position_key(state, 0) == position_key(higher, 0)
+        assert position_key(state, 0, cap_scores=False) != position_key(higher, 0, cap_scores=False)
+
+    def test_detector_symmetry_hash_uses_swapped_position(self):
+        """Test that the detector's swapped hash is the real mirrored position key."""
+        detector = EndgameDetector(max_tiles=20)
+        state, _ = _late_round_state(5)
+        swapped = copy.deepcopy(state)
+        swapped.agents.reverse()
+        swapped.current_player = 1
+
+        assert detector._compute_symmetry_hash(state) == detector._compute_symmetry_hash(swapped)
+        assert detector._compute_swapped_player_hash(state) != detector._compute_symmetry_hash(state)
+
+    def test_solutions_are_keyed_by_side_to_move(self, tmp_path):
+        """Test that a stored solution is only returned for the side it was solved for."""
+        database = EndgameDatabase(max_tiles=20, tablebase_path=str(tmp_path / "none.bin"))
+        state, _ = _late_round_state(5)
+        solution = {'best_move': None, 'score': 3.0, 'depth': 1, 'exact': True}
+
+        database.store_solution(state, solution, agent_id=0)
+        assert database.detector.get_position_key(state, 0) != database.detector.get_position_key(state, 1)
+        assert database.get_solution(state, 0) == solution
+        assert database.get_solution(state, 1) is None
+
+
+class TestRoundEndSolver:
+    """Test the exact end-of-round solver."""
+
+    def test_matches_brute_force(self):
+        """Test solver values against exhaustive search with the real game rules."""
+        solver = RoundEndSolver(max_tiles=10)
+        for seed in range(8):
+            state, agent = _late_round_state(seed, max_tiles=5)
+            result = solver.solve(state, agent)
+
+            assert result['exact']
+            assert result['round_margin'] == _brute_force(state, agent)
+
+            margin = state.agents[agent].score - state.agents[1 - agent].score
+            assert result['score'] == margin + result['round_margin']
+
+    def test_best_move_is_legal_and_optimal(self):
+        """Test that the returned move achieves the solved value."""
+        solver = RoundEndSolver(max_tiles=10)
+        state, agent = _late_round_state(11, max_tiles=5)
+        result = solver.solve(state, agent)
+
+        legal = FastMoveGenerator().generate_moves_fast(state, agent)
+        assert result['best_move'] in legal
+
+        child = copy.deepcopy(state)
+        AzulGameRule(2).generateSuccessor(child, result['best_move'].to_tuple(), agent)
+        assert -_brute_force(child, 1 - agent) == result['round_margin']
+
+    def test_solve_does_not_modify_state(self):
+        """Test that make/unmake leaves the input position untouched."""
+        state, agent = _late_round_state(2, max_tiles=8)
+        before = position_key(state, agent, cap_scores=False)
+        RoundEndSolver().solve(state, agent)
+        assert position_key(state, agent, cap_scores=False) == before
+
+    def test_rejects_large_and_multiplayer_positions(self):
+        """Test that only small 2-player positions are solved."""
+        solver = RoundEndSolver(max_tiles=10)
+        assert solver.solve(AzulState(2), 0) is None
+        assert not solver.can_solve(AzulState(3))
+
+    def test_node_budget(self):
+        """Test that running out of nodes returns None."""
+        state, agent = _late_round_state(4, max_tiles=10)
+        assert RoundEndSolver(max_tiles=10, max_nodes=1).solve(state, agent) is None
+
+
+class TestEndgameTablebase:
+    """Test the memory-mapped tablebase file."""
+
+    def test_store_and_probe(self, tmp_path):
+        """Test round-tripping entries, including the packed best move."""
+        path = str(tmp_path / "tb.bin")
+        move = FastMoveGenerator().generate_moves_fast(AzulState(2), 0)[3]
+
+        tablebase = EndgameTablebase(path, readonly=False)
+        tablebase.store(12345, -3.0, move, depth=4)
+        entry = tablebase.probe(12345)
+
+        assert entry.value == -3.0
+        assert entry.best_move == move
+        assert entry.depth == 4
+        assert entry.exact
+        assert tablebase.probe(54321) is None
+        assert len(tablebase) == 1
+
+    def test_persists_and_shares_read_only(self, tmp_path):
+        """Test that a reopened read-only tablebase sees stored entries."""
+        path = str(tmp_path / "tb.bin")
+        writer = EndgameTablebase(path, readonly=False)
+        writer.store(7, 2.0)
+        writer.flush()
+
+        reader = EndgameTablebase(path)
+        assert reader.probe(7).value == 2.0
+        assert reader.probe(7).best_move is None
+        with pytest.raises(PermissionError):
+            reader.store(8, 1.0)
+
+    def test_growth_keeps_entries(self, tmp_path):
+        """Test that the table grows past its initial capacity without losing entries."""
+        path = str(tmp_path / "tb.bin")
+        tablebase = EndgameTablebase(path, readonly=False, initial_capacity=8)
+        for key in range(1, 101):
+            tablebase.store(key, float(key))
+
+        assert tablebase.capacity >= 128
+        assert len(tablebase) == 100
+        assert all(tablebase.probe(key).value == float(key) for key in range(1, 101))
+
+    def test_invalid_files(self, tmp_path):
+        """Test that missing and foreign files are rejected."""
+        with pytest.raises(FileNotFoundError):
+            EndgameTablebase(str(tmp_path / "missing.bin"))
+
+        bogus = tmp_path / "bogus.bin"
+        bogus.write_bytes(b"\0" * 256)
+        with pytest.raises(ValueError):
+            EndgameTablebase(str(bogus))
+
+    def test_move_key_round_trip(self):
+        """Test that move keys decode back to the same FastMove."""
+        for move in FastMoveGenerator().generate_moves_fast(AzulState(2), 1):
+            assert move_from_key(move.bit_mask) == move
+
+
+class TestEndgameDatabaseTablebase:
+    """Test EndgameDatabase integration with the solver and tablebase."""
+
+    def test_solve_round_writes_tablebase(self, tmp_path):
+        """Test that solved positions are stored and served from the file."""
+        path = str(tmp_path / "tb.bin")
+        state, agent = _late_round_state(6)
+
+        writer = EndgameDatabase(max_tiles=10, tablebase_path=path, readonly=False)
+        solution = writer.solve_round(state, agent)
+        writer.tablebase.flush()
+
+        reader = EndgameDatabase(max_tiles=10, tablebase_path=path)
+        assert reader.has_solution(state, agent)
+        assert not reader.has_solution(state)
+        stored = reader.get_solution(state, agent)
+        assert stored['score'] == solution['score']
+        assert stored['best_move'] == solution['best_move']
+        assert reader.get_stats()['tablebase']['entries'] == 1
+
+    def test_missing_tablebase_is_optional(self, tmp_path):
+        """Test that a missing read-only tablebase disables lookups."""
+        db = EndgameDatabase(tablebase_path=str(tmp_path / "none.bin"))
+        state, agent = _late_round_state(6)
+
+        assert db.tablebase is None
+        assert not db.has_solution(state, agent)
+        assert db.solve_round(state, agent)['exact']
+
+
+class TestTablebaseGenerator:
+    """Test the offline tablebase generation tool."""
+
+    def _write_library(self, tmp_path):
+        positions = {
+            "late_round": {
+                "description": "Few tiles left",
+                "setup": {
+                    "factories": {"0": {"0": 2, "1": 2}, "1": {"2": 3, "3": 1}},
+                    "center_pool": {"4": 2}
+                }
+            }
+        }
+        path = tmp_path / "positions.json"
+        path.write_text(json.dumps(positions))
+        return str(path)
+
+    def test_sampling_is_deterministic(self):
+        """Test that seeded sampling returns the same late-round positions."""
+        state = AzulState(2)
+        first = sample_late_positions(state, 0, "source", max_tiles=6, samples=2)
+        second = sample_late_positions(state, 0, "source", max_tiles=6, samples=2)
+
+        assert first
+        assert all(remaining_tiles(s) <= 6 for s, _ in first)
+        assert [position_key(s, a) for s, a in first] == [position_key(s, a) for s, a in second]
+
+    def test_default_search_reads_generated_tablebase(self, tmp_path, monkeypatch):
+        """Test that a tablebase generated at the default path is probed by a default search."""
+        positions_file = self._write_library(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv('AZUL_TABLEBASE_PATH', raising=False)
+        assert AzulAlphaBetaSearch().endgame_database.tablebase is None
+
+        stats = generate_tablebase(db_path=None, positions_file=positions_file, max_tiles=8, samples=1)
+        assert stats['solved'] > 0
+
+        search = AzulAlphaBetaSearch(max_depth=2, max_time=30.0)
+        assert search.endgame_database.tablebase is AzulAlphaBetaSearch().endgame_database.tablebase
+        (source_id, state, agent), = load_library_states(positions_file)
+        late_state, late_agent = sample_late_positions(state, agent, source_id, max_tiles=8, samples=1)[0]
+        search.search(late_state, late_agent, max_depth=2)
+        assert search.get_endgame_stats()['tablebase']['hits'] > 0
+
+    def test_generate_and_resume(self, tmp_path):
+        """Test that a second run skips positions solved by the first."""
+        tablebase_path = str(tmp_path / "tb.bin")
+        positions_file = self._write_library(tmp_path)
+
+        first = generate_tablebase(tablebase_path, db_path=None, positions_file=positions_file,
+                                   max_tiles=8, samples=2, workers=1)
+        assert first['sources'] == 1
+        assert first['solved'] > 0
+        assert first['solved'] + first['skipped'] == first['sampled']
+        assert first['positions_per_second'] > 0
+
+        second = generate_tablebase(tablebase_path, db_path=None, positions_file=positions_file,
+                                    max_tiles=8, samples=2, workers=1)
+        assert second['solved'] == 0
+        assert second['entries'] == first['entries']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,159 @@
+"""
+Tests for engine tournaments: paired openings, Elo, SPRT and the engines.
+"""
+
+import pytest
+import torch
+
+from analysis_engine.mathematical_optimization.azul_evaluator import EvaluatorWeights, save_evaluator_weights
+from neural.azul_net import AzulNetConfig, create_azul_net
+from neural.tournament import (
+    EngineSpec, MatchStats, SPRTConfig, TournamentConfig, TournamentEngine, elo_from_score,
+    expected_score, fit_ratings, parse_engine_spec, play_game, run_match, run_tournament, strength_check
+)
+
+
+def _pair(points_a: float) -> dict:
+    """A pair in which A scores points_a from two games, without ties on score."""
+    first = 1.0 if points_a >= 1.0 else 0.0
+    second = points_a - first
+    return {'points': points_a, 'games': [
+        {'scores': [10, 5] if first == 1.0 else [5, 10], 'completed_rows': [0, 0]},
+        {'scores': [5, 10] if second == 1.0 else [10, 5], 'completed_rows': [0, 0]},
+    ]}
+
+
+def _stats(counts) -> MatchStats:
+    stats = MatchStats()
+    for points, count in zip((0.0, 1.0, 2.0), counts):
+        for _ in range(count):
+            stats.add_pair(_pair(points))
+    return stats
+
+
+class TestEngineSpecs:
+    """Test parsing and building engine configurations."""
+
+    def test_parse_engine_spec(self):
+        """Test named and unnamed specs and their validation."""
+        spec = parse_engine_spec("ab3=alpha_beta:depth=3,time=0.5,weights=w.json")
+        assert spec == EngineSpec(name="ab3", kind="alpha_beta", depth=3, time_limit=0.5, weights_path="w.json")
+        assert parse_engine_spec("mcts:rollouts=50,policy=heavy") == EngineSpec(
+            name="mcts", kind="mcts", rollouts=50, rollout_policy="heavy")
+        assert parse_engine_spec("random").kind == "random"
+        with pytest.raises(ValueError):
+            parse_engine_spec("ab=alpha_beta:width=3")
+        with pytest.raises(ValueError):
+            parse_engine_spec("x=minimax")
+
+    def test_engines_use_weights_and_models(self, tmp_path):
+        """Test that weights files and trained models reach the searches."""
+        weights = save_evaluator_weights(EvaluatorWeights(row_bonus=7.0), str(tmp_path / "weights.json"))
+        engine = TournamentEngine(EngineSpec("ab", depth=1, weights_path=str(tmp_path / "weights.json")))
+        assert engine.search.evaluator.weights == weights
+        with pytest.raises(ValueError):
+            TournamentEngine(EngineSpec("ab", weights_path=str(tmp_path / "missing.json")))
+
+        model, encoder = create_azul_net(AzulNetConfig(hidden_size=16, num_layers=1))
+        path = str(tmp_path / "model.pth")
+        torch.save({'model_state_dict': model.state_dict(), 'encoder_config': encoder.config}, path)
+        engine = TournamentEngine(EngineSpec("net", kind="neural", model_path=path))
+        loaded = engine.search._rollout_policy_instance.model
+        assert loaded.config.hidden_size == 16
+        assert torch.equal(loaded.policy_head.weight, model.policy_head.weight)
+
+
+class TestMatchStatistics:
+    """Test Elo, confidence intervals, SPRT and rating fits."""
+
+    def test_elo_conversions(self):
+        """Test that scores and Elo differences convert both ways."""
+        for elo in (-300.0, 0.0, 55.0, 400.0):
+            assert elo_from_score(expected_score(elo)) == pytest.approx(elo)
+        assert expected_score(0.0) == 0.5
+
+    def test_pair_counts_and_interval(self):
+        """Test the pentanomial counts, game results and Elo interval."""
+        stats = _stats((2, 5, 13))
+        assert stats.pair_counts == [2, 0, 5, 0, 13] and stats.pairs == 20
+        assert (stats.wins, stats.draws, stats.losses) == (31, 0, 9)
+        assert stats.score == pytest.approx(31 / 40)
+
+        elo, low, high = stats.elo()
+        assert low < elo < high
+        assert elo == pytest.approx(elo_from_score(31 / 40))
+        # More pairs with the same proportions narrow the interval
+        _, narrow_low, narrow_high = _stats((4, 10, 26)).elo()
+        assert narrow_high - narrow_low < high - low
+
+    def test_sprt_decisions(self):
+        """Test that clear results end the test and close ones do not."""
+        sprt = SPRTConfig(elo0=0.0, elo1=50.0)
+        assert _stats((2, 5, 30)).sprt_decision(sprt) == 'H1'
+        assert _stats((30, 5, 2)).sprt_decision(sprt) == 'H0'
+        assert _stats((3, 4, 3)).sprt_decision(sprt) is None
+        lower, upper = sprt.bounds
+        assert lower == pytest.approx(-upper)
+
+    def test_fit_ratings(self):
+        """Test that ratings order engines and anchor the first at 0."""
+        def match(a, b, wins, losses):
+            return {'engines': [a, b], 'wins': wins, 'draws': 0, 'losses': losses, 'games': wins + losses}
+
+        ratings = fit_ratings(['a', 'b', 'c'], [match('a', 'b', 30, 10), match('b', 'c', 30, 10),
+                                                match('a', 'c', 38, 2)])
+        assert ratings['a'] == 0.0
+        assert ratings['a'] > ratings['b'] > ratings['c']
+
+
+class TestTournamentPlay:
+    """Test games, matches and round robins with fast engines."""
+
+    def test_paired_openings_are_reproducible(self):
+        """Test that a seed fixes the deals and opening moves of a game."""
+        engines = [TournamentEngine(EngineSpec("r1", kind="random")), TournamentEngine(EngineSpec("r2", kind="random"))]
+        first = play_game(engines, seed=5, opening_moves=4)
+        again = play_game(engines, seed=5, opening_moves=4)
+        assert first == again
+        assert first['moves'] > 20 and max(first['scores']) > 0
+
+    def test_match_in_process_pool(self):
+        """Test that pool and serial matches play the same pairs."""
+        spec_a, spec_b = EngineSpec("r1", kind="random"), EngineSpec("r2", kind="random")
+        threads = torch.get_num_threads()
+        torch.set_num_threads(2)
+        try:
+            serial = run_match(spec_a, spec_b, TournamentConfig(pairs=3, workers=1))
+            assert torch.get_num_threads() == 2  # Only pool workers are limited to one thread
+        finally:
+            torch.set_num_threads(threads)
+        pooled = run_match(spec_a, spec_b, TournamentConfig(pairs=3, workers=2))
+        assert serial['games'] == pooled['games'] == 6
+        assert serial['wins'] + serial['draws'] + serial['losses'] == 6
+        assert serial['pair_counts'] == pooled['pair_counts']
+        assert pooled['games_per_second'] > 0
+
+    def test_sprt_stops_match(self):
+        """Test that a decided SPRT stops before the pair limit."""
+        spec_a = EngineSpec("ab", depth=1, time_limit=0.05)
+        config = TournamentConfig(pairs=20, sprt=SPRTConfig(elo0=-400.0, elo1=-300.0), min_pairs=2)
+        result = run_match(spec_a, EngineSpec("random", kind="random"), config)
+        assert result['sprt']['decision'] == 'H1'
+        assert result['pairs'] < 20
+
+        check = strength_check(EngineSpec("r1", kind="random"), EngineSpec("r2", kind="random"),
+                               TournamentConfig(pairs=2))
+        assert check['sprt']['elo0'] == -20.0 and check['passed'] is None
+
+    def test_round_robin(self):
+        """Test that every engine meets every other and gets a rating."""
+        specs = [EngineSpec(name, kind="random") for name in ("a", "b", "c")]
+        results = run_tournament(specs, TournamentConfig(pairs=1))
+        assert [match['engines'] for match in results['matches']] == [['a', 'b'], ['a', 'c'], ['b', 'c']]
+        assert set(results['ratings']) == {'a', 'b', 'c'} and results['games'] == 6
+        with pytest.raises(ValueError):
+            run_tournament([specs[0], specs[0]])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
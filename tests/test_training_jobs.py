@@ -0,0 +1,194 @@
+"""
+Tests for training checkpoints and out-of-process training jobs.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pytest
+import torch
+
+from core.azul_database import AzulDatabase, NeuralTrainingSession
+from neural.train import AzulNetTrainer, TrainingConfig
+from neural.training_jobs import TrainingJobSupervisor, TrainingProgressWriter
+
+
+def _config(**overrides) -> TrainingConfig:
+    settings = dict(batch_size=8, num_epochs=4, num_samples=16, hidden_size=16, num_layers=1)
+    settings.update(overrides)
+    return TrainingConfig(**settings)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return AzulDatabase(str(tmp_path / "training.db"))
+
+
+def _create_session(db, session_id: str, epochs: int = 4) -> NeuralTrainingSession:
+    session = NeuralTrainingSession(
+        session_id=session_id, status='starting', start_time=datetime.now(),
+        config={'config': 'small', 'samples': 16}, logs=['Training session created'],
+        loss_history=[], epoch_history=[], timestamp_history=[], cpu_usage=[], memory_usage=[],
+        total_epochs=epochs, created_at=datetime.now()
+    )
+    db.save_neural_training_session(session)
+    return session
+
+
+def _resume_run(path: str):
+    """Losses and weights of an uninterrupted run and of a stopped and resumed one."""
+    torch.manual_seed(0)
+    reference = AzulNetTrainer(_config())
+    reference_losses = reference.train()
+
+    torch.manual_seed(0)
+    first = AzulNetTrainer(_config())
+    first.train(checkpoint_path=path, on_epoch_end=lambda stats: stats['epoch'] == 2)
+    assert first.stopped and len(first.epoch_stats) == 2
+
+    second = AzulNetTrainer(_config())
+    losses = second.train(checkpoint_path=path)
+    assert not second.stopped
+    return reference_losses, reference.model.state_dict(), losses, second.model.state_dict()
+
+
+class TestTrainingCheckpoints:
+    """Test resuming AzulNetTrainer from checkpoints."""
+
+    def test_resume_matches_uninterrupted_run(self, tmp_path):
+        """Test that stopping and resuming gives the same weights and losses as one run."""
+        path = str(tmp_path / "checkpoint.pt")
+        # Trained in a fresh process: threads left running by other tests draw
+        # from the global RNGs that training seeds
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            reference_losses, reference_weights, losses, weights = pool.submit(_resume_run, path).result(timeout=300)
+
+        assert losses == pytest.approx(reference_losses)
+        for name, tensor in reference_weights.items():
+            assert torch.allclose(weights[name], tensor)
+        assert torch.load(path, weights_only=False)['epoch'] == 4
+
+
+class TestTrainingProgressWriter:
+    """Test batching of progress reports."""
+
+    def test_reports_are_written_in_one_flush(self, db):
+        """Test that buffered reports update the session and its epoch rows together."""
+        _create_session(db, "batched")
+        writer = TrainingProgressWriter(db, flush_interval=60.0)
+        now = datetime.now().isoformat()
+        writer.add({'session_id': 'batched', 'type': 'status', 'timestamp': now, 'status': 'running',
+                    'log': 'Training started'})
+        for epoch in (1, 2, 3):
+            writer.add({'session_id': 'batched', 'type': 'epoch', 'timestamp': now, 'epoch': epoch,
+                        'loss': 1.0 / epoch, 'samples_per_second': 100.0, 'cpu_percent': 50.0,
+                        'memory_percent': 1.0, 'progress': epoch * 20})
+        assert not writer.due()
+        assert db.get_neural_training_session("batched").status == 'starting'
+
+        assert writer.flush() == 1
+        session = db.get_neural_training_session("batched")
+        assert session.status == 'running'
+        assert session.epoch_history == [1, 2, 3] and session.current_epoch == 3
+        assert session.progress == 60
+        assert [row.epoch for row in db.get_neural_training_progress("batched")] == [1, 2, 3]
+
+        # Later session saves keep the progress rows
+        db.save_neural_training_session(session)
+        assert len(db.get_neural_training_progress("batched")) == 3
+
+        assert writer.add({'session_id': 'batched', 'type': 'status', 'timestamp': now, 'status': 'failed',
+                           'error': 'boom'})
+        assert writer.due()
+
+
+class TestTrainingJobSupervisor:
+    """Test training in worker processes."""
+
+    def test_job_runs_to_completion(self, db, tmp_path):
+        """Test that a job trains, saves its model and records progress."""
+        supervisor = TrainingJobSupervisor(db, checkpoint_dir=str(tmp_path / "checkpoints"), flush_interval=0.2)
+        _create_session(db, "complete")
+        model_path = str(tmp_path / "model.pth")
+        try:
+            supervisor.start("complete", _config(), model_path)
+            assert supervisor.wait("complete", timeout=120)
+        finally:
+            supervisor.shutdown()
+
+        session = db.get_neural_training_session("complete")
+        assert session.status == 'completed', session.error
+        assert session.progress == 100 and session.epoch_history == [1, 2, 3, 4]
+        assert session.results['model_path'] == model_path
+        assert len(db.get_neural_training_progress("complete")) == 4
+        # A completed session cannot be resumed, so its checkpoint is removed
+        assert not supervisor.has_checkpoint("complete")
+
+    def test_stop_then_resume(self, db, tmp_path):
+        """Test that a stopped job checkpoints and a resumed one finishes the remaining epochs."""
+        supervisor = TrainingJobSupervisor(db, checkpoint_dir=str(tmp_path / "checkpoints"), flush_interval=0.2)
+        _create_session(db, "resume", epochs=1000)
+        model_path = str(tmp_path / "model.pth")
+        try:
+            job = supervisor.start("resume", _config(num_epochs=1000), model_path)
+            with pytest.raises(RuntimeError):
+                supervisor.start("resume", _config(num_epochs=1000), model_path)
+
+            deadline = time.time() + 120
+            while not supervisor.has_checkpoint("resume") and time.time() < deadline:
+                time.sleep(0.05)
+            assert supervisor.stop("resume")
+            assert supervisor.wait("resume", timeout=120)
+            stopped = db.get_neural_training_session("resume")
+            assert stopped.status == 'stopped'
+            assert not job.resumed
+
+            job = supervisor.start("resume", _config(num_epochs=1000), model_path)
+            assert job.resumed
+            assert supervisor.wait("resume", timeout=300)
+        finally:
+            supervisor.shutdown()
+
+        session = db.get_neural_training_session("resume")
+        assert session.status == 'completed', session.error
+        assert session.epoch_history == list(range(1, 1001))
+        assert not supervisor.has_checkpoint("resume")
+
+    def test_crashed_job_is_marked_failed(self, db, tmp_path):
+        """Test that a worker killed without reporting leaves a failed, resumable session."""
+        supervisor = TrainingJobSupervisor(db, checkpoint_dir=str(tmp_path / "checkpoints"), flush_interval=0.2)
+        _create_session(db, "crash", epochs=100000)
+        try:
+            job = supervisor.start("crash", _config(num_epochs=100000), str(tmp_path / "model.pth"))
+            deadline = time.time() + 120
+            while not supervisor.has_checkpoint("crash") and time.time() < deadline:
+                time.sleep(0.05)
+            job.process.kill()
+            assert supervisor.wait("crash", timeout=30)
+        finally:
+            supervisor.shutdown()
+
+        session = db.get_neural_training_session("crash")
+        assert session.status == 'failed'
+        assert 'exited unexpectedly' in session.error
+        assert supervisor.get_stats()['jobs_crashed'] == 1
+
+    def test_routes_keep_one_supervisor(self, db, tmp_path, monkeypatch):
+        """Test that rebinding the routes' database keeps the supervisor and redirects its reports."""
+        from api.routes import neural as neural_routes
+
+        monkeypatch.setattr(neural_routes, 'db', None)
+        monkeypatch.setattr(neural_routes, 'training_supervisor', None)
+        neural_routes.init_neural_routes(db)
+        supervisor = neural_routes.get_training_supervisor()
+
+        other = AzulDatabase(str(tmp_path / "other.db"))
+        neural_routes.init_neural_routes(other)
+        assert neural_routes.get_training_supervisor() is supervisor
+        assert supervisor.db is other and supervisor.writer.db is other
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
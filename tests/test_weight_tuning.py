@@ -0,0 +1,201 @@
+"""
+Tests for evaluator weights files and Texel-style weight tuning.
+"""
+
+import json
+import os
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from analysis_engine.mathematical_optimization import azul_evaluator
+from analysis_engine.mathematical_optimization.azul_evaluator import (
+    AzulEvaluator, EvaluationBatch, EvaluatorWeights, load_evaluator_weights, save_evaluator_weights
+)
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from analysis_engine.mathematical_optimization.azul_weight_tuning import (
+    TuningSet, load_tuning_set, position_features, tune_evaluator_weights
+)
+from core.azul_model import AzulState, AzulGameRule
+
+# A stored position from the move quality databases (initial factories, empty boards)
+STORED_FEN = ("BBBB|BYYY|YYRR|BBBY|BBBB/-/-----|-----|-----|-----|-----/-|--|---|----|-----/-/"
+              "-----|-----|-----|-----|-----/-|--|---|----|-----/-/0,0/1/0")
+
+
+def _random_positions(count: int, seed: int = 0):
+    """Positions (and the agent to evaluate) from random two-player games."""
+    rng = random.Random(seed)
+    generator = FastMoveGenerator()
+    positions = []
+    while len(positions) < count:
+        state = AzulState(2)
+        game_rule = AzulGameRule(2)
+        agent = 0
+        while state.TilesRemaining() and len(positions) < count:
+            move = rng.choice(generator.generate_moves_fast(state, agent))
+            game_rule.generateSuccessor(state, move.to_tuple(), agent)
+            agent = 1 - agent
+            positions.append((state.clone(), agent))
+    return positions
+
+
+class TestEvaluatorWeights:
+    """Test weights vectors and weights files."""
+
+    def test_vector_round_trip(self):
+        """Test that weights survive conversion to and from a vector."""
+        weights = EvaluatorWeights()
+        assert EvaluatorWeights.from_vector(weights.to_vector()) == weights
+        with pytest.raises(ValueError):
+            EvaluatorWeights.from_vector([1.0, 2.0])
+
+    def test_file_round_trip(self, tmp_path):
+        """Test that saved weights load with a content version."""
+        path = str(tmp_path / "weights.json")
+        vector = EvaluatorWeights().to_vector()
+        vector[12] = 4.5
+        saved = save_evaluator_weights(EvaluatorWeights.from_vector(vector), path, {'positions': 3})
+
+        loaded = load_evaluator_weights(path)
+        assert loaded == saved
+        assert loaded.version == saved.content_version()
+        assert json.load(open(path))['metadata'] == {'positions': 3}
+
+    def test_evaluator_loads_weights_file(self, tmp_path, monkeypatch):
+        """Test that evaluators created after a weights file is written use it."""
+        path = str(tmp_path / "weights.json")
+        vector = EvaluatorWeights().to_vector()
+        vector[5:12] *= 2  # Double every floor penalty
+        save_evaluator_weights(EvaluatorWeights.from_vector(vector), path)
+        monkeypatch.setenv('AZUL_EVALUATOR_WEIGHTS_PATH', path)
+
+        state = AzulState(2)
+        state.agents[0].floor_tiles = [0, 0]
+        default = AzulEvaluator(weights=EvaluatorWeights()).evaluate_position(state, 0)
+        evaluator = AzulEvaluator()
+        assert evaluator.weights.version == load_evaluator_weights(path).version
+        assert evaluator.evaluate_position(state, 0) == 2 * default
+        assert evaluator.get_cache_stats()['weights_version'] == evaluator.weights.version
+
+    def test_weights_file_is_parsed_once(self, tmp_path, monkeypatch):
+        """Test that evaluators share one parse of the weights file until it changes."""
+        path = str(tmp_path / "weights.json")
+        save_evaluator_weights(EvaluatorWeights(row_bonus=3.0), path)
+        monkeypatch.setenv('AZUL_EVALUATOR_WEIGHTS_PATH', path)
+        reads = []
+        read = azul_evaluator._read_evaluator_weights
+        monkeypatch.setattr(azul_evaluator, '_read_evaluator_weights', lambda p: reads.append(p) or read(p))
+
+        first, second = AzulEvaluator(), AzulEvaluator()
+        assert first.weights is second.weights and len(reads) == 1
+
+        save_evaluator_weights(EvaluatorWeights(row_bonus=5.0), path)
+        assert AzulEvaluator().weights.row_bonus == 5.0 and len(reads) == 2
+
+        os.remove(path)
+        assert AzulEvaluator().weights == EvaluatorWeights()
+
+    def test_missing_and_unsupported_files(self, tmp_path):
+        """Test that a missing file means defaults and an unknown format is rejected."""
+        assert load_evaluator_weights(str(tmp_path / "missing.json")) is None
+
+        path = tmp_path / "weights.json"
+        path.write_text(json.dumps({'format_version': 99, 'weights': {}}))
+        with pytest.raises(ValueError):
+            load_evaluator_weights(str(path))
+
+    def test_tuned_weights_match_in_every_path(self):
+        """Test that fractional weights give the same score scalar, batched and incrementally."""
+        vector = EvaluatorWeights().to_vector() + np.linspace(0.1, 1.5, EvaluatorWeights.NUM_WEIGHTS)
+        evaluator = AzulEvaluator(weights=EvaluatorWeights.from_vector(vector))
+        positions = _random_positions(40)
+
+        states = [state for state, _ in positions]
+        agents = [agent for _, agent in positions]
+        batched = evaluator.evaluate_positions(states, agents)
+        for (state, agent), score in zip(positions, batched):
+            evaluator.attach_terms(state)
+            assert evaluator.evaluate_position(state, agent) == score
+            assert evaluator.evaluate_incremental(state, agent) == score
+
+
+class TestWeightTuning:
+    """Test feature extraction, data loading and coordinate descent."""
+
+    def test_features_are_linear_in_the_weights(self):
+        """Test that features times the weight vector is the evaluation."""
+        positions = _random_positions(60, seed=1)
+        batch = EvaluationBatch.from_states([state for state, _ in positions], [agent for _, agent in positions])
+        for weights in (EvaluatorWeights(), EvaluatorWeights.from_vector(np.arange(15) - 7.0)):
+            expected = AzulEvaluator(weights=weights).evaluate_positions(batch)
+            assert np.allclose(position_features(batch) @ weights.to_vector(), expected)
+
+    def test_load_from_database(self, tmp_path):
+        """Test that labelled moves become feature gains, skipping rows without a legal move."""
+        state = AzulState.from_fen(STORED_FEN)
+        move = FastMoveGenerator().generate_moves_fast(state, 0)[0]
+        move_data = json.dumps({field: int(getattr(move, field)) for field in
+                                ('source_id', 'tile_type', 'pattern_line_dest', 'num_to_pattern_line',
+                                 'num_to_floor_line')})
+
+        path = str(tmp_path / "quality.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE move_quality_data (position_fen TEXT, move_data TEXT, quality_score REAL)")
+        conn.executemany("INSERT INTO move_quality_data VALUES (?, ?, ?)", [
+            (STORED_FEN, move_data, 40.0),
+            (STORED_FEN, move_data, 60.0),
+            (STORED_FEN, json.dumps({'source_id': 9}), 10.0),
+            ('', move_data, 10.0),
+        ])
+        conn.commit()
+        conn.close()
+
+        tuning_set = load_tuning_set([path, str(tmp_path / "missing.db")])
+        assert len(tuning_set) == 1
+        assert tuning_set.labels[0] == pytest.approx(0.5)
+        assert tuning_set.skipped == 2
+        assert tuning_set.sources == {f"{path}:move_quality_data": 3}
+
+        # The move adds tiles to its pattern line and floor only
+        gain = tuning_set.features[0]
+        assert gain[move.pattern_line_dest] > 0
+        assert gain[5:5 + move.num_to_floor_line].all()
+        assert not gain[12:].any()
+
+    def test_tuning_recovers_label_weights(self):
+        """Test that tuning moves the weights towards those that generated the labels."""
+        rng = np.random.default_rng(0)
+        features = rng.normal(size=(2000, EvaluatorWeights.NUM_WEIGHTS))
+        target = EvaluatorWeights().to_vector()
+        target[1] += 3.0
+        labels = 1.0 / (1.0 + np.exp(-0.1 * features @ target))
+        tuning_set = TuningSet(features, labels)
+
+        result = tune_evaluator_weights(tuning_set, max_iterations=50, regularization=0.0, tunable=[1])
+        assert result.final_error < result.initial_error
+        assert abs(result.weights.to_vector()[1] - target[1]) < 1.0
+        assert result.weights.to_vector()[0] == target[0]
+
+    def test_parallel_matches_serial(self):
+        """Test that scoring candidates in worker processes gives the same result."""
+        rng = np.random.default_rng(1)
+        features = rng.normal(size=(500, EvaluatorWeights.NUM_WEIGHTS))
+        labels = rng.uniform(size=500)
+        tuning_set = TuningSet(features, labels)
+
+        serial = tune_evaluator_weights(tuning_set, max_iterations=5)
+        parallel = tune_evaluator_weights(tuning_set, max_iterations=5, workers=2)
+        assert parallel.weights == serial.weights
+        assert parallel.final_error == pytest.approx(serial.final_error)
+
+    def test_empty_set_is_rejected(self):
+        """Test that tuning needs labelled positions."""
+        with pytest.raises(ValueError):
+            tune_evaluator_weights(TuningSet(np.zeros((0, EvaluatorWeights.NUM_WEIGHTS)), np.zeros(0)))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
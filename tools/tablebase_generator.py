@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Endgame Tablebase Generator
+
+Samples late-round positions (few tiles left in factories and centre)
+reachable from stored games and from data/positions.json, solves them
+exactly with a process pool and merges the results into the on-disk
+endgame tablebase used by AzulAlphaBetaSearch.
+
+Sampling is seeded per source position and positions already in the
+tablebase are skipped, so an interrupted run can simply be restarted.
+
+Usage:
+    python -m tools.tablebase_generator --max-tiles 10 --workers 4
+"""
+
+import copy
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import click
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import azul_utils as utils
+from core.azul_model import AzulState, AzulGameRule
+from analysis_engine.mathematical_optimization.azul_move_generator import FastMoveGenerator
+from analysis_engine.strategic_analysis.azul_tablebase import (
+    DEFAULT_TABLEBASE_PATH, EndgameTablebase, RoundEndSolver, canonical_move, position_key,
+    remaining_tiles
+)
+
+
+DEFAULT_DATABASE_PATH = "data/azul_research.db"
+DEFAULT_POSITIONS_FILE = "data/positions.json"
+
+_worker_solver: Optional[RoundEndSolver] = None
+
+
+def load_database_states(db_path: str) -> Iterator[Tuple[str, AzulState, int]]:
+    """
+    Yield (source_id, state, agent_id) for positions stored in the research database.
+
+    Reads cached analysis positions, the opening explorer positions and the
+    positions recorded before each move of uploaded games.
+    """
+    if not db_path or not os.path.exists(db_path):
+        return
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        fens = []
+        for table in ("positions", "position_database"):
+            try:
+                fens.extend(row[0] for row in conn.execute(f"SELECT fen_string FROM {table}"))
+            except sqlite3.OperationalError:
+                continue
+
+        try:
+            for game_id, game_data in conn.execute("SELECT game_id, game_data FROM game_analyses"):
+                try:
+                    moves = json.loads(game_data).get('moves', [])
+                except (TypeError, ValueError):
+                    continue
+                for move in moves:
+                    position = move.get('position_before')
+                    if position and position != 'initial':
+                        fens.append(position)
+        except sqlite3.OperationalError:
+            pass
+    finally:
+        conn.close()
+
+    for fen in dict.fromkeys(fens):
+        if not AzulState.validate_fen(fen):
+            continue
+        state = AzulState.from_fen(fen)
+        yield f"fen:{fen}", state, getattr(state, 'current_player', 0)
+
+
+def load_library_states(positions_file: str) -> Iterator[Tuple[str, AzulState, int]]:
+    """Yield (source_id, state, agent_id) for the positions in data/positions.json."""
+    if not positions_file or not os.path.exists(positions_file):
+        return
+
+    from api.utils.position_loader import PositionLoader
+
+    loader = PositionLoader()
+    loader.positions_file = positions_file
+    loader._load_positions()
+    for name in loader.positions_cache:
+        state = loader.create_position(name)
+        if state is not None:
+            yield f"library:{name}", state, 0
+
+
+def _normalize_tile_displays(state: AzulState):
+    """
+    Re-key factory and centre tiles by utils.Tile with matching totals.
+
+    Positions built from FEN strings or the position library may use plain
+    int keys, which generateSuccessor rejects.
+    """
+    for display in list(state.factories) + [state.centre_pool]:
+        display.tiles = {tile: int(display.tiles.get(tile, 0)) for tile in utils.Tile}
+        display.total = sum(display.tiles.values())
+
+
+def sample_late_positions(state: AzulState, agent_id: int, source_id: str, max_tiles: int,
+                          samples: int) -> List[Tuple[AzulState, int]]:
+    """
+    Play seeded random moves from a source position and collect every
+    position reached with at most max_tiles tiles left in the round.
+
+    Args:
+        state: Source position
+        agent_id: Agent to move in the source position
+        source_id: Stable identifier used to seed the playouts
+        max_tiles: Tile threshold for late-round positions
+        samples: Number of playouts from the source position
+
+    Returns:
+        List of (state, agent to move) pairs
+    """
+    if len(state.agents) != 2 or remaining_tiles(state) == 0:
+        return []
+
+    state = copy.deepcopy(state)
+    _normalize_tile_displays(state)
+    move_generator = FastMoveGenerator()
+    game_rule = AzulGameRule(len(state.agents))
+    positions = []
+
+    for sample in range(samples):
+        rng = random.Random(f"{source_id}:{sample}")
+        current = copy.deepcopy(state)
+        agent = agent_id
+        while remaining_tiles(current) > 0:
+            if remaining_tiles(current) <= max_tiles:
+                positions.append((copy.deepcopy(current), agent))
+            moves = move_generator.generate_moves_fast(current, agent)
+            if not moves:
+                break
+            game_rule.generateSuccessor(current, rng.choice(moves).to_tuple(), agent)
+            agent = 1 - agent
+
+    return positions
+
+
+def _init_worker(max_tiles: int, max_nodes: int):
+    """Create the per-process solver."""
+    global _worker_solver
+    _worker_solver = RoundEndSolver(max_tiles=max_tiles, max_nodes=max_nodes)
+
+
+def _solve_position(task: Tuple[int, AzulState, int]) -> Tuple[int, Optional[Dict]]:
+    """Worker: solve one position. Returns (key, solution or None)."""
+    key, state, agent_id = task
+    solution = _worker_solver.solve(state, agent_id)
+    if solution is None:
+        return key, None
+    best_move = solution['best_move']
+    return key, {
+        'round_margin': solution['round_margin'],
+        'best_move': canonical_move(state, best_move) if best_move is not None else None,
+        'depth': solution['depth'],
+        'nodes': solution['nodes']
+    }
+
+
+def generate_tablebase(tablebase_path: str = DEFAULT_TABLEBASE_PATH,
+                       db_path: Optional[str] = DEFAULT_DATABASE_PATH,
+                       positions_file: Optional[str] = DEFAULT_POSITIONS_FILE,
+                       max_tiles: int = 10, samples: int = 8, workers: int = 1,
+                       max_nodes: int = 2_000_000, chunk_size: int = 256,
+                       progress=None) -> Dict:
+    """
+    Sample, solve and store late-round positions.
+
+    Args:
+        tablebase_path: Tablebase file to create or extend
+        db_path: Research database with stored games (None to skip)
+        positions_file: Position library JSON (None to skip)
+        max_tiles: Tile threshold for late-round positions
+        samples: Random playouts per source position
+        workers: Solver processes
+        max_nodes: Node budget per solve
+        chunk_size: Positions submitted to the pool between flushes
+        progress: Optional callback receiving the running statistics dict
+
+    Returns:
+        Statistics dict
+    """
+    tablebase = EndgameTablebase(tablebase_path, readonly=False)
+    stats = {
+        'sources': 0,
+        'sampled': 0,
+        'skipped': 0,
+        'solved': 0,
+        'unsolved': 0,
+        'nodes': 0,
+        'elapsed': 0.0,
+        'positions_per_second': 0.0
+    }
+    start_time = time.time()
+    pending: Dict[int, Tuple[int, AzulState, int]] = {}
+
+    def flush_pending(executor):
+        results = executor.map(_solve_position, pending.values(), chunksize=max(1, len(pending) // (workers * 4)))
+        for key, solution in results:
+            if solution is None:
+                stats['unsolved'] += 1
+                continue
+            tablebase.store(key, solution['round_margin'], solution['best_move'], solution['depth'])
+            stats['solved'] += 1
+            stats['nodes'] += solution['nodes']
+        tablebase.flush()
+        pending.clear()
+
+        stats['elapsed'] = time.time() - start_time
+        stats['positions_per_second'] = stats['solved'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        if progress is not None:
+            progress(stats)
+
+    sources = []
+    if db_path:
+        sources.append(load_database_states(db_path))
+    if positions_file:
+        sources.append(load_library_states(positions_file))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(max_tiles, max_nodes)) as executor:
+            for source in sources:
+                for source_id, state, agent_id in source:
+                    stats['sources'] += 1
+                    for late_state, agent in sample_late_positions(state, agent_id, source_id, max_tiles, samples):
+                        stats['sampled'] += 1
+                        key = position_key(late_state, agent)
+                        if key in pending or tablebase.probe(key) is not None:
+                            stats['skipped'] += 1
+                            continue
+                        pending[key] = (key, late_state, agent)
+                        if len(pending) >= chunk_size:
+                            flush_pending(executor)
+            if pending:
+                flush_pending(executor)
+        stats['entries'] = len(tablebase)
+    finally:
+        tablebase.close()
+
+    stats['elapsed'] = time.time() - start_time
+    stats['positions_per_second'] = stats['solved'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+    return stats
+
+
+@click.command()
+@click.option('--tablebase', default=DEFAULT_TABLEBASE_PATH, help='Tablebase file to create or extend')
+@click.option('--database', default=DEFAULT_DATABASE_PATH, help='Research database with stored games')
+@click.option('--positions', default=DEFAULT_POSITIONS_FILE, help='Position library JSON file')
+@click.option('--no-database', is_flag=True, help='Skip positions from the research database')
+@click.option('--no-positions', is_flag=True, help='Skip positions from the position library')
+@click.option('--max-tiles', default=10, help='Solve positions with at most this many tiles left')
+@click.option('--samples', default=8, help='Random playouts per source position')
+@click.option('--workers', default=os.cpu_count() or 1, help='Solver processes')
+@click.option('--max-nodes', default=2_000_000, help='Node budget per position')
+def main(tablebase: str, database: str, positions: str, no_database: bool, no_positions: bool,
+         max_tiles: int, samples: int, workers: int, max_nodes: int):
+    """Generate or extend the endgame tablebase from stored positions."""
+    click.echo("🧮 Azul Endgame Tablebase Generator")
+    click.echo("=" * 50)
+
+    def report(stats):
+        click.echo(f"   solved {stats['solved']:>8}  skipped {stats['skipped']:>8}  "
+                   f"unsolved {stats['unsolved']:>5}  {stats['positions_per_second']:.1f} positions/s")
+
+    stats = generate_tablebase(
+        tablebase_path=tablebase,
+        db_path=None if no_database else database,
+        positions_file=None if no_positions else positions,
+        max_tiles=max_tiles,
+        samples=samples,
+        workers=workers,
+        max_nodes=max_nodes,
+        progress=report
+    )
+
+    click.echo("\n📊 Summary")
+    click.echo(f"   Source positions: {stats['sources']}")
+    click.echo(f"   Sampled late-round positions: {stats['sampled']}")
+    click.echo(f"   Already solved: {stats['skipped']}")
+    click.echo(f"   Newly solved: {stats['solved']}")
+    click.echo(f"   Over node budget: {stats['unsolved']}")
+    click.echo(f"   Time: {stats['elapsed']:.1f}s ({stats['positions_per_second']:.1f} positions/s)")
+    click.echo(f"   Tablebase entries: {stats['entries']} ({tablebase})")
+
+
+if __name__ == '__main__':
+    main()